@@ -5,18 +5,33 @@ Flask application factory module
 from flask import Flask
 from routes.recipe_routes import recipe_bp
 from routes.user_routes import user_bp
+from routes.job_routes import job_bp
 from routes.auth_routes import auth_bp
-from flask_pymongo import PyMongo
+from routes.ai_recipe_routes import ai_recipe_bp
 from flask_cors import CORS
 from flask_jwt_extended import JWTManager
 from dotenv import load_dotenv
+from config import registry
+from config.database import manager as db_manager
+from config.indexes import start_background_index_build, index_report
+from config.settings import JOB_WORKERS, WARM_CACHE_HOURS, validate_settings
+from services.job_queue import queue_stats, start_workers
+from services import recommender, vector_index
+from services.structured_output import structured_output_stats
+from services.model_router import router_stats
+from services.generation_cache import cache_stats as generation_cache_stats
+from services.cache_warming import start_pantry_recorder, warming_stats
+from services.recipe_jobs import schedule_warming
+from utils.circuit_breaker import breaker_stats
+from utils.serialization import FastJSONProvider
+from middleware.compression import init_compression
+import atexit
 import os
 
 # Load environment variables
 load_dotenv()
 
 # Initialize extensions
-mongo = PyMongo()
 jwt = JWTManager()
 
 
@@ -24,6 +39,12 @@ def create_app():
     """App factory function for creating the Flask app instance."""
     app = Flask(__name__)
 
+    # Encode responses with orjson; ObjectId and datetime are handled natively
+    app.json = FastJSONProvider(app)
+
+    # Fail fast on missing environment variables
+    validate_settings()
+
     # Load configurations
     app.config["MONGO_URI"] = os.getenv("MONGODB_URI")
     if not app.config["MONGO_URI"]:
@@ -43,17 +64,43 @@ def create_app():
     app.config["JWT_REFRESH_TOKEN_EXPIRES"] = 2592000  # 30 days
 
     # Initialize extensions
-    mongo.init_app(app)
     jwt.init_app(app)
+
+    # Open the MongoDB connection pool before the first request arrives
+    if not db_manager.warm_up():
+        raise RuntimeError("⚠️ Could not connect to MongoDB.")
+
+    # Build missing indexes in the background; requests are served meanwhile
+    start_background_index_build()
     CORS(app)
 
+    # Compress large text responses (gzip, or brotli when installed)
+    init_compression(app)
+
     # Register blueprints (routes)
     with app.app_context():
         # Import blueprints inside app context to avoid circular imports
 
         app.register_blueprint(recipe_bp, url_prefix="/api/recipes")
+        app.register_blueprint(ai_recipe_bp, url_prefix="/api/recipes")
         app.register_blueprint(user_bp, url_prefix="/api/users")
         app.register_blueprint(auth_bp, url_prefix="/api/auth")
+        app.register_blueprint(job_bp, url_prefix="/api/jobs")
+
+    # Run slow work (AI generation, backfills) off the request threads
+    start_workers(JOB_WORKERS)
+
+    # Build the recommender and vector indexes before the first search
+    recommender.warm_up_in_background()
+    vector_index.start_rebuild()
+
+    # Count popular pantries and warm the caches for them off-peak
+    start_pantry_recorder()
+    if WARM_CACHE_HOURS:
+        schedule_warming()
+
+    # Close shared clients (the OpenAI connection pool) on exit
+    atexit.register(registry.close_all)
 
     # Error handlers
     @app.errorhandler(404)
@@ -69,6 +116,45 @@ def create_app():
     def home():
         return {"success": True, "message": "Welcome to the Recipe Generator API"}
 
+    @app.route("/health")
+    def health():
+        return {
+            "success": True,
+            "database": db_manager.pool_stats(),
+            "upstreams": breaker_stats(),
+        }
+
+    @app.route("/health/indexes")
+    def health_indexes():
+        return {"success": True, "indexes": index_report()}
+
+    @app.route("/health/jobs")
+    def health_jobs():
+        return {"success": True, "jobs": queue_stats()}
+
+    @app.route("/health/recommender")
+    def health_recommender():
+        return {"success": True, "recommender": recommender.index_stats()}
+
+    @app.route("/health/vectors")
+    def health_vectors():
+        return {"success": True, "vectors": vector_index.index_stats()}
+
+    @app.route("/health/llm")
+    def health_llm():
+        return {
+            "success": True,
+            "client": (
+                registry.get("openai").stats()
+                if registry.is_built("openai")
+                else None
+            ),
+            "structuredOutput": structured_output_stats(),
+            "routes": router_stats(),
+            "generationCache": generation_cache_stats(),
+            "warming": warming_stats(),
+        }
+
     return app
 
 
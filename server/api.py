@@ -2,24 +2,111 @@
 Recipe API client that interacts with Spoonacular API
 """
 
-import requests
 import sys
 from dotenv import load_dotenv
 import os
 import html
 import re
+import threading
+import time
+from collections import OrderedDict
+
+# Make src/ importable when run as a script
+SRC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "src")
+if SRC_DIR not in sys.path:
+    sys.path.append(SRC_DIR)
+
+from config.settings import (  # noqa: E402
+    SPOONACULAR_BASE_URL,
+    SPOONACULAR_SLOW_SECONDS,
+)
+from utils.circuit_breaker import CircuitOpenError, get_breaker  # noqa: E402
 
 # Load environment variables
 load_dotenv()
 
-# Get API key from environment
+# Get API key from environment (checked when a request is made, not at import)
 API_KEY = os.getenv("SPOONACULAR_API_KEY")
-if not API_KEY:
-    print("⚠️ Error: SPOONACULAR_API_KEY is not set in environment variables")
-    sys.exit(1)
 
 # API base URL
-BASE_URL = "https://api.spoonacular.com/recipes"
+BASE_URL = f"{SPOONACULAR_BASE_URL.rstrip('/')}/recipes"
+
+# HTTP session, created on first request
+_session = None
+
+# Seconds to wait for Spoonacular before giving up on a request
+REQUEST_TIMEOUT = float(os.getenv("SPOONACULAR_TIMEOUT", "10"))
+
+# Stops calls while Spoonacular is failing or slow
+breaker = get_breaker("spoonacular", SPOONACULAR_SLOW_SECONDS)
+
+# Successful responses are cached per process (Spoonacular bills per request)
+CACHE_TTL = int(os.getenv("SPOONACULAR_CACHE_TTL", "3600"))  # seconds
+CACHE_SIZE = 1000
+_cache = OrderedDict()
+_cache_lock = threading.Lock()
+
+
+def get_session():
+    """
+    Get the shared HTTP session, importing requests on first use
+
+    Returns:
+        requests.Session reused across calls for connection keep-alive
+    """
+    global _session
+    if _session is None:
+        import requests
+
+        _session = requests.Session()
+    return _session
+
+
+def cache_get(key):
+    """Get a cached response, or None if missing or expired"""
+    with _cache_lock:
+        entry = _cache.get(key)
+        if entry is None or entry[0] < time.monotonic():
+            _cache.pop(key, None)
+            return None
+        _cache.move_to_end(key)
+        return entry[1]
+
+
+def cache_set(key, value):
+    """Cache a response, evicting the least recently used if full"""
+    with _cache_lock:
+        _cache[key] = (time.monotonic() + CACHE_TTL, value)
+        _cache.move_to_end(key)
+        while len(_cache) > CACHE_SIZE:
+            _cache.popitem(last=False)
+
+
+def fetch(url, params):
+    """
+    GET a Spoonacular URL through the circuit breaker
+
+    Server errors, rate limiting, timeouts and connection errors count as
+    failures; other client errors do not.
+
+    Raises:
+        CircuitOpenError: If Spoonacular is failing and the breaker is open
+        requests.exceptions.RequestException: If the request fails
+    """
+    probe = breaker.before_call()
+    started = time.monotonic()
+    failed = True
+    try:
+        response = get_session().get(url, params=params, timeout=REQUEST_TIMEOUT)
+        failed = response.status_code >= 500 or response.status_code == 429
+    finally:
+        breaker.after_call(failed, time.monotonic() - started, probe)
+    return response
+
+
+def missing_api_key_error():
+    """Error payload returned when SPOONACULAR_API_KEY is not configured"""
+    return {"error": "SPOONACULAR_API_KEY is not set in environment variables"}
 
 
 def get_recipes_by_ingredients(ingredients, number=5):
@@ -33,6 +120,21 @@ def get_recipes_by_ingredients(ingredients, number=5):
     Returns:
         List of recipe dictionaries or error message
     """
+    if not API_KEY:
+        return missing_api_key_error()
+
+    # Same ingredients in any order or case share a cache entry
+    cache_key = (
+        "findByIngredients",
+        tuple(sorted({item.strip().lower() for item in ingredients})),
+        number,
+    )
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    import requests
+
     url = f"{BASE_URL}/findByIngredients"
     params = {
         "apiKey": API_KEY,
@@ -42,9 +144,13 @@ def get_recipes_by_ingredients(ingredients, number=5):
     }
 
     try:
-        response = requests.get(url, params=params)
+        response = fetch(url, params)
         response.raise_for_status()  # Raise exception for 4XX/5XX responses
-        return response.json()
+        recipes = response.json()
+        cache_set(cache_key, recipes)
+        return recipes
+    except CircuitOpenError as e:
+        return {"error": f"{e}. Please try again later."}
     except requests.exceptions.HTTPError as e:
         return {"error": f"HTTP error: {e}", "status_code": response.status_code}
     except requests.exceptions.ConnectionError:
@@ -67,13 +173,27 @@ def get_recipe_details(recipe_id):
     Returns:
         Recipe details dictionary or error message
     """
+    if not API_KEY:
+        return missing_api_key_error()
+
+    cache_key = ("information", str(recipe_id))
+    cached = cache_get(cache_key)
+    if cached is not None:
+        return cached
+
+    import requests
+
     url = f"{BASE_URL}/{recipe_id}/information"
     params = {"apiKey": API_KEY, "includeNutrition": False}
 
     try:
-        response = requests.get(url, params=params)
+        response = fetch(url, params)
         response.raise_for_status()
-        return response.json()
+        details = response.json()
+        cache_set(cache_key, details)
+        return details
+    except CircuitOpenError as e:
+        return {"error": f"{e}. Please try again later."}
     except requests.exceptions.HTTPError as e:
         return {"error": f"HTTP error: {e}", "status_code": response.status_code}
     except requests.exceptions.ConnectionError:
@@ -116,6 +236,10 @@ def make_recipe():
     print("Recipe Finder")
     print("-------------------")
 
+    if not API_KEY:
+        print("⚠️ Error: SPOONACULAR_API_KEY is not set in environment variables")
+        return
+
     # Get ingredients from user
     ingredients_input = input("\nEnter ingredients separated by commas: ").strip()
     if not ingredients_input:
@@ -0,0 +1,111 @@
+"""
+Record construction benchmark
+
+Compares building the pydantic response models (the old db_to_recipe and
+db_to_user path) with the slotted records in models.records, per object:
+construction time and retained memory.
+
+Usage:
+    python benchmarks/bench_records.py
+    python benchmarks/bench_records.py --count 50000
+"""
+
+import argparse
+import gc
+import os
+import sys
+import time
+import tracemalloc
+from datetime import datetime
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [SERVER_DIR, os.path.join(SERVER_DIR, "src")]
+
+from bson import ObjectId  # noqa: E402
+
+from models.recipe import RecipeResponse  # noqa: E402
+from models.records import RecipeRecord, UserRecord  # noqa: E402
+from models.user import UserResponse  # noqa: E402
+
+
+def recipe_doc(index):
+    return {
+        "_id": ObjectId(),
+        "name": f"Recipe {index}",
+        "ingredients": ["200g spaghetti", "100g pancetta", "2 eggs", "Black pepper"],
+        "instructions": "1. Cook pasta until al dente...",
+        "estimatedCalories": 600.0,
+        "createdBy": "60d5ec9af682dbd12345678a",
+        "createdAt": datetime(2025, 1, 1),
+    }
+
+
+def user_doc(index):
+    return {
+        "_id": ObjectId(),
+        "username": f"user{index}",
+        "email": f"user{index}@example.com",
+        "password_hash": "[hashed_password]",
+        "created_at": datetime(2025, 1, 1),
+    }
+
+
+# The previous db_to_* implementations, kept here for comparison
+def pydantic_recipe(doc):
+    return RecipeResponse(
+        _id=str(doc.get("_id")),
+        name=doc.get("name"),
+        ingredients=doc.get("ingredients", []),
+        instructions=doc.get("instructions"),
+        estimatedCalories=doc.get("estimatedCalories"),
+        createdBy=doc.get("createdBy"),
+        createdAt=doc.get("createdAt"),
+    )
+
+
+def pydantic_user(doc):
+    return UserResponse(
+        _id=str(doc.get("_id")),
+        username=doc.get("username"),
+        email=doc.get("email"),
+        created_at=doc.get("created_at"),
+    )
+
+
+CASES = [
+    ("recipe", recipe_doc, pydantic_recipe, RecipeRecord.from_doc),
+    ("user", user_doc, pydantic_user, UserRecord.from_doc),
+]
+
+
+def measure(build, docs):
+    """Return (microseconds per object, retained bytes per object)"""
+    start = time.perf_counter()
+    for doc in docs:
+        build(doc)
+    per_object_us = (time.perf_counter() - start) / len(docs) * 1e6
+
+    gc.collect()
+    tracemalloc.start()
+    kept = [build(doc) for doc in docs]
+    retained, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del kept
+    return per_object_us, retained / len(docs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=20000, help="Objects per case")
+    args = parser.parse_args()
+
+    print(f"{'case':<18}{'us/object':>12}{'bytes/object':>14}")
+    for name, make_doc, old, new in CASES:
+        docs = [make_doc(i) for i in range(args.count)]
+        for label, build in (("pydantic", old), ("record", new)):
+            per_object_us, per_object_bytes = measure(build, docs)
+            print(f"{name + ' ' + label:<18}{per_object_us:>12.2f}{per_object_bytes:>14.0f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+"""
+Serialization benchmark for recipe listings
+
+Compares the old response path (convert every `_id` to a string, then encode
+with the stdlib json module) against utils.serialization.dumps on the raw
+documents, using synthetic recipes shaped like the real collection.
+
+Usage:
+    python benchmarks/bench_serialization.py
+    python benchmarks/bench_serialization.py --size 1000 --rounds 200
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+import tracemalloc
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [SERVER_DIR, os.path.join(SERVER_DIR, "src")]
+
+from seeds.synthetic import generate_recipes  # noqa: E402
+from utils.serialization import dumps  # noqa: E402
+
+
+def legacy_encode(recipes):
+    """The previous path: mutate each document, then stdlib json"""
+    for recipe in recipes:
+        recipe["_id"] = str(recipe["_id"])
+    return json.dumps({"success": True, "data": recipes}, default=str).encode()
+
+
+def fast_encode(recipes):
+    return dumps({"success": True, "data": recipes})
+
+
+def make_listing(size, seed):
+    return generate_recipes(size, 100, seed=seed, batch_index=0, batch_size=size)
+
+
+def measure(encode, size, rounds):
+    """Return (seconds per call, peak bytes allocated in one call)"""
+    batches = [make_listing(size, seed) for seed in range(rounds)]
+
+    start = time.perf_counter()
+    for recipes in batches:
+        encode(recipes)
+    elapsed = (time.perf_counter() - start) / rounds
+
+    recipes = make_listing(size, rounds)
+    tracemalloc.start()
+    encode(recipes)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=500, help="Recipes per listing")
+    parser.add_argument("--rounds", type=int, default=50, help="Listings to encode")
+    args = parser.parse_args()
+
+    legacy_time, legacy_peak = measure(legacy_encode, args.size, args.rounds)
+    fast_time, fast_peak = measure(fast_encode, args.size, args.rounds)
+
+    print(f"{'path':<10}{'ms/listing':>12}{'peak KiB':>12}")
+    print(f"{'legacy':<10}{legacy_time * 1000:>12.2f}{legacy_peak / 1024:>12.0f}")
+    print(f"{'fast':<10}{fast_time * 1000:>12.2f}{fast_peak / 1024:>12.0f}")
+    print(f"speedup: {legacy_time / fast_time:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,110 @@
+"""
+Vector search benchmark
+
+Writes a vector index snapshot of synthetic clustered embeddings (no
+database needed), then measures query latency and recall@10 against exact
+search for several VECTOR_NPROBE values.
+
+Usage:
+    python benchmarks/bench_vector_search.py
+    python benchmarks/bench_vector_search.py --count 1000000 --queries 500
+"""
+
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+import numpy as np
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [SERVER_DIR, os.path.join(SERVER_DIR, "src")]
+
+from services.embeddings import HashingEmbedder, normalize  # noqa: E402
+from services.vector_index import (  # noqa: E402
+    VectorIndex,
+    new_snapshot_path,
+    write_snapshot,
+)
+
+CHUNK = 100000
+
+
+def synthetic_vectors(path, count, dim, topics, seed=0):
+    """Unit vectors scattered around random topic centers, as a memory map"""
+    rng = np.random.default_rng(seed)
+    centers = normalize(rng.standard_normal((topics, dim)).astype(np.float32))
+    vectors = np.memmap(path, dtype=np.float32, mode="w+", shape=(count, dim))
+    for start in range(0, count, CHUNK):
+        size = min(CHUNK, count - start)
+        noise = rng.standard_normal((size, dim)).astype(np.float32) * 0.03
+        vectors[start : start + size] = normalize(
+            centers[rng.integers(topics, size=size)] + noise
+        )
+    vectors.flush()
+    return vectors
+
+
+def exact_top(vectors, query, k):
+    scores = np.empty(len(vectors), dtype=np.float32)
+    for start in range(0, len(vectors), CHUNK):
+        scores[start : start + CHUNK] = vectors[start : start + CHUNK] @ query
+    return set(np.argpartition(-scores, k)[:k].tolist())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--count", type=int, default=200000, help="Recipes")
+    parser.add_argument("--dim", type=int, default=256, help="Vector dimensions")
+    parser.add_argument("--topics", type=int, default=5000, help="Clusters in data")
+    parser.add_argument("--queries", type=int, default=200, help="Queries per run")
+    args = parser.parse_args()
+
+    directory = tempfile.mkdtemp(prefix="bench-vectors-")
+    try:
+        embedder = HashingEmbedder(args.dim)
+        path = new_snapshot_path(directory)
+        raw_path = os.path.join(directory, "raw.f32")
+
+        started = time.perf_counter()
+        vectors = synthetic_vectors(raw_path, args.count, args.dim, args.topics)
+        ids = [f"{row:024x}" for row in range(args.count)]
+        write_snapshot(path, ids, [0] * args.count, vectors, embedder, datetime.now())
+        print(f"build: {time.perf_counter() - started:.1f}s for {args.count} vectors")
+
+        index = VectorIndex(path, embedder)
+        rng = np.random.default_rng(1)
+        rows = rng.integers(args.count, size=args.queries)
+        queries = [
+            normalize(
+                vectors[row : row + 1]
+                + rng.standard_normal((1, args.dim)).astype(np.float32) * 0.05
+            )[0]
+            for row in rows.tolist()
+        ]
+        truth = [exact_top(vectors, query, 10) for query in queries[:50]]
+
+        print(f"lists: {index.n_lists}")
+        print(f"{'nprobe':>8}{'p50 ms':>10}{'p99 ms':>10}{'recall@10':>12}")
+        for nprobe in (4, 8, 16, 32, 64):
+            timings, hits = [], 0
+            for number, query in enumerate(queries):
+                start = time.perf_counter()
+                found = index.search(query, 10, nprobe=nprobe)
+                timings.append((time.perf_counter() - start) * 1000)
+                if number < len(truth):
+                    found_rows = {int(recipe_id, 16) for recipe_id, _ in found}
+                    hits += len(found_rows & truth[number])
+
+            p50, p99 = np.percentile(timings, [50, 99])
+            recall = hits / (10 * len(truth))
+            print(f"{nprobe:>8}{p50:>10.2f}{p99:>10.2f}{recall:>12.3f}")
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
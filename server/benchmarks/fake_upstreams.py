@@ -0,0 +1,462 @@
+"""
+Fake OpenAI and Spoonacular servers for offline benchmarks
+
+One ASGI app stands in for both upstreams. Generation, calorie estimates and
+the Spoonacular client (api.py) can then be benchmarked and load tested on a
+laptop, with no network access and no API bills:
+
+- POST /v1/chat/completions answers with a recipe built from the
+  ingredients in the prompt. The recipe comes back as a function call, or
+  as JSON content, whichever the request asks for. Short requests
+  (max_tokens of at most SHORT_REPLY_TOKENS, like the calorie route) get a
+  calorie count. "stream": true streams the reply as server-sent events.
+- GET /recipes/findByIngredients and GET /recipes/{id}/information return
+  recipes derived from the ingredients and the ID.
+
+Replies depend only on the request, so they are the same on every run. Each
+response is delayed by a sample of its upstream's latency distribution, and
+a share of requests fail (--error-rate). Samples come from a generator
+seeded with --seed, so a run can be repeated.
+
+While the server runs, GET/POST /_fake/config reads or changes its settings
+(e.g. to start an outage in the middle of a load test). /_fake/stats counts
+requests and /_fake/reset clears the counts.
+
+Point the app at it with:
+    OPENAI_BASE_URL=http://127.0.0.1:8100/v1
+    SPOONACULAR_BASE_URL=http://127.0.0.1:8100
+    OPENAI_API_KEY=fake SPOONACULAR_API_KEY=fake
+
+The OpenAI client retries failed requests (OPENAI_MAX_RETRIES), so a request
+that fails here may still succeed for the caller.
+
+Latency specs: a number of seconds (fixed), "uniform:LOW:HIGH",
+"normal:MEAN:SD", "lognormal:MEDIAN:SIGMA" or "exponential:MEAN".
+
+Usage:
+    python benchmarks/fake_upstreams.py
+    python benchmarks/fake_upstreams.py --openai-latency lognormal:1.5:0.5 \\
+        --token-latency 0.01 --error-rate 0.02 --seed 7
+"""
+
+import argparse
+import asyncio
+import hashlib
+import json
+import math
+import random
+import re
+import threading
+import time
+from collections import Counter
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from fastapi import Body, FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+# Requests with at most this many max_tokens are answered with a number
+SHORT_REPLY_TOKENS = 50
+
+# Characters per streamed chunk, and per token when counting usage
+CHUNK_CHARS = 16
+CHARS_PER_TOKEN = 4
+
+UPSTREAMS = ("openai", "spoonacular")
+
+
+class Latency:
+    """
+    A latency distribution, parsed from a spec such as "lognormal:1.5:0.5"
+
+    Raises:
+        ValueError: If the spec is not understood
+    """
+
+    ARGUMENTS = {
+        "fixed": 1,
+        "uniform": 2,
+        "normal": 2,
+        "lognormal": 2,
+        "exponential": 1,
+    }
+
+    def __init__(self, spec: str):
+        kind, *args = str(spec).split(":")
+        if not args:
+            kind, args = "fixed", [kind]
+        if self.ARGUMENTS.get(kind) != len(args):
+            raise ValueError(f"Invalid latency spec: {spec}")
+        self.spec = str(spec)
+        self.kind = kind
+        self.args = [float(arg) for arg in args]
+
+    def sample(self, rng: random.Random) -> float:
+        """Draw a latency in seconds"""
+        if self.kind == "fixed":
+            return self.args[0]
+        a, *rest = self.args
+        if self.kind == "uniform":
+            return rng.uniform(a, rest[0])
+        if self.kind == "normal":
+            return max(0.0, rng.gauss(a, rest[0]))
+        if self.kind == "lognormal":
+            return a * math.exp(rng.gauss(0, rest[0]))
+        return rng.expovariate(1 / a) if a > 0 else 0.0
+
+
+@dataclass
+class UpstreamConfig:
+    """How one fake upstream behaves"""
+
+    latency: Latency
+    error_rate: float = 0.0
+    error_status: int = 503
+    # Extra seconds per completion token (OpenAI only)
+    token_latency: float = 0.0
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "latency": self.latency.spec,
+            "errorRate": self.error_rate,
+            "errorStatus": self.error_status,
+            "tokenLatency": self.token_latency,
+        }
+
+    def update(self, values: Dict[str, Any]):
+        if "latency" in values:
+            self.latency = Latency(values["latency"])
+        self.error_rate = float(values.get("errorRate", self.error_rate))
+        self.error_status = int(values.get("errorStatus", self.error_status))
+        self.token_latency = float(values.get("tokenLatency", self.token_latency))
+
+
+def digest(*parts: Any) -> int:
+    """Stable hash of the parts (the built-in hash() changes per process)"""
+    data = json.dumps(parts, sort_keys=True, default=str).encode()
+    return int.from_bytes(hashlib.blake2b(data, digest_size=8).digest(), "big")
+
+
+def prompt_ingredients(text: str) -> List[str]:
+    """Ingredients listed after "ingredients:" in a prompt"""
+    match = re.search(r"ingredients:\s*([^\n.]*)", text, re.IGNORECASE)
+    items = match.group(1).split(",") if match else []
+    items = [re.sub(r"\(.*", "", item).strip() for item in items]
+    return [item for item in items if item][:12] or ["pantry staples"]
+
+
+def fake_recipe(ingredients: List[str], seed: int) -> Dict[str, Any]:
+    """A recipe made from the given ingredients"""
+    main = ingredients[0]
+    style = ("skillet", "bake", "stir-fry", "salad", "soup")[seed % 5]
+    return {
+        "name": f"{main.title()} {style}",
+        "ingredients": [
+            f"{100 + 50 * ((seed >> index) % 4)}g {item}"
+            for index, item in enumerate(ingredients)
+        ],
+        "instructions": (
+            f"1. Prepare the {', '.join(ingredients)}. "
+            f"2. Cook the {main} for {10 + seed % 20} minutes. "
+            "3. Combine everything, season and serve."
+        ),
+        "estimatedCalories": 300 + seed % 600,
+    }
+
+
+def chat_reply(body: Dict[str, Any]) -> Tuple[Optional[str], Optional[Dict[str, str]]]:
+    """
+    The reply to a chat completion request
+
+    Returns:
+        (content, function_call); one of them is None
+    """
+    messages = body.get("messages") or []
+    prompt = next(
+        (m.get("content") or "" for m in reversed(messages) if m.get("role") == "user"),
+        "",
+    )
+    seed = digest(prompt)
+    recipe = fake_recipe(prompt_ingredients(prompt), seed)
+
+    if (body.get("max_tokens") or SHORT_REPLY_TOKENS + 1) <= SHORT_REPLY_TOKENS:
+        return str(recipe["estimatedCalories"]), None
+    arguments = json.dumps(recipe)
+    if body.get("functions"):
+        return None, {"name": body["functions"][0]["name"], "arguments": arguments}
+    return arguments, None
+
+
+def count_tokens(text: str) -> int:
+    return max(1, -(-len(text) // CHARS_PER_TOKEN))
+
+
+def chat_usage(body: Dict[str, Any], reply: str) -> Dict[str, int]:
+    messages = body.get("messages") or []
+    prompt = 3 + sum(count_tokens(m.get("content") or "") + 4 for m in messages)
+    completion = count_tokens(reply)
+    return {
+        "prompt_tokens": prompt,
+        "completion_tokens": completion,
+        "total_tokens": prompt + completion,
+    }
+
+
+def create_app(
+    configs: Optional[Dict[str, UpstreamConfig]] = None, seed: int = 0
+) -> FastAPI:
+    """
+    Build the fake upstreams app
+
+    Args:
+        configs: Behaviour per upstream ("openai", "spoonacular"); no latency
+            and no errors by default
+        seed: Seed of the latency and error samples
+    """
+    configs = configs or {}
+    for name in UPSTREAMS:
+        configs.setdefault(name, UpstreamConfig(Latency("0")))
+
+    app = FastAPI(title="Fake upstreams")
+    rng = random.Random(seed)
+    lock = threading.Lock()
+    stats: Counter = Counter()
+
+    async def delay(upstream: str, tokens: int = 0) -> Optional[JSONResponse]:
+        """Wait out a latency sample; returns an error response if one is drawn"""
+        config = configs[upstream]
+        with lock:
+            seconds = config.latency.sample(rng) + config.token_latency * tokens
+            failed = rng.random() < config.error_rate
+            stats[f"{upstream}.requests"] += 1
+            stats[f"{upstream}.errors"] += failed
+        await asyncio.sleep(seconds)
+        if not failed:
+            return None
+
+        headers = {"Retry-After": "1"} if config.error_status == 429 else None
+        if upstream == "openai":
+            content = {
+                "error": {
+                    "message": "Fake upstream error",
+                    "type": "server_error",
+                    "code": None,
+                }
+            }
+        else:
+            content = {
+                "status": "failure",
+                "code": config.error_status,
+                "message": "Fake upstream error",
+            }
+        return JSONResponse(content, status_code=config.error_status, headers=headers)
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(body: Dict[str, Any] = Body(...)):
+        content, function_call = chat_reply(body)
+        reply = content if content is not None else function_call["arguments"]
+        usage = chat_usage(body, reply)
+        model = body.get("model", "gpt-3.5-turbo")
+        completion_id = f"chatcmpl-fake{digest(body) % 10**12}"
+        finish_reason = "function_call" if function_call else "stop"
+
+        if body.get("stream"):
+            error = await delay("openai")
+            if error is not None:
+                return error
+            with lock:
+                stats["openai.streamed"] += 1
+            return StreamingResponse(
+                stream_chat(
+                    completion_id, model, content, function_call, usage, body
+                ),
+                media_type="text/event-stream",
+            )
+
+        error = await delay("openai", usage["completion_tokens"])
+        if error is not None:
+            return error
+        message = {"role": "assistant", "content": content}
+        if function_call:
+            message["function_call"] = function_call
+        return {
+            "id": completion_id,
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": model,
+            "choices": [
+                {"index": 0, "message": message, "finish_reason": finish_reason}
+            ],
+            "usage": usage,
+        }
+
+    async def stream_chat(completion_id, model, content, function_call, usage, body):
+        """Server-sent events of a streamed completion, paced per token"""
+
+        def event(delta, finish_reason=None, **extra):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [
+                    {"index": 0, "delta": delta, "finish_reason": finish_reason}
+                ],
+                **extra,
+            }
+            return f"data: {json.dumps(chunk)}\n\n"
+
+        token_latency = configs["openai"].token_latency
+        text = content if content is not None else function_call["arguments"]
+        first = {"role": "assistant", "content": "" if content is not None else None}
+        if function_call:
+            first["function_call"] = {"name": function_call["name"], "arguments": ""}
+        yield event(first)
+
+        for start in range(0, len(text), CHUNK_CHARS):
+            piece = text[start : start + CHUNK_CHARS]
+            await asyncio.sleep(token_latency * count_tokens(piece))
+            if function_call:
+                yield event({"function_call": {"arguments": piece}})
+            else:
+                yield event({"content": piece})
+
+        yield event({}, "function_call" if function_call else "stop")
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": completion_id,
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": model,
+                "choices": [],
+                "usage": usage,
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.get("/recipes/findByIngredients")
+    async def find_by_ingredients(ingredients: str = "", number: int = 10):
+        error = await delay("spoonacular")
+        if error is not None:
+            return error
+
+        items = [item.strip() for item in ingredients.split(",") if item.strip()]
+        recipes = []
+        for index in range(max(0, number)):
+            recipe_id = 100000 + digest(sorted(items), index) % 900000
+            recipe = fake_recipe(items or ["pantry staples"], recipe_id)
+            used = items[: max(1, len(items) - index % 3)]
+            missed = [f"missing item {n + 1}" for n in range(index % 3)]
+            recipes.append(
+                {
+                    "id": recipe_id,
+                    "title": recipe["name"],
+                    "image": f"https://img.example.com/{recipe_id}.jpg",
+                    "imageType": "jpg",
+                    "usedIngredientCount": len(used),
+                    "missedIngredientCount": len(missed),
+                    "usedIngredients": [{"name": name} for name in used],
+                    "missedIngredients": [{"name": name} for name in missed],
+                    "likes": recipe_id % 500,
+                }
+            )
+        return recipes
+
+    @app.get("/recipes/{recipe_id}/information")
+    async def recipe_information(recipe_id: int):
+        error = await delay("spoonacular")
+        if error is not None:
+            return error
+
+        pantry = ["chicken", "rice", "onion", "garlic", "tomato", "spinach", "egg"]
+        items = [pantry[(recipe_id >> shift) % len(pantry)] for shift in (0, 3, 6)]
+        recipe = fake_recipe(list(dict.fromkeys(items)), recipe_id)
+        steps = recipe["instructions"].split(". ")
+        return {
+            "id": recipe_id,
+            "title": recipe["name"],
+            "readyInMinutes": 15 + recipe_id % 45,
+            "servings": 2 + recipe_id % 4,
+            "sourceUrl": f"https://recipes.example.com/{recipe_id}",
+            "extendedIngredients": [
+                {"id": index, "name": line.split(" ", 1)[1], "original": line}
+                for index, line in enumerate(recipe["ingredients"])
+            ],
+            "instructions": "<ol>"
+            + "".join(f"<li>{step}</li>" for step in steps)
+            + "</ol>",
+        }
+
+    @app.get("/_fake/config")
+    async def get_config():
+        return {name: config.to_dict() for name, config in configs.items()}
+
+    @app.post("/_fake/config")
+    async def set_config(body: Dict[str, Dict[str, Any]] = Body(...)):
+        try:
+            with lock:
+                for name, values in body.items():
+                    configs[name].update(values)
+        except (KeyError, ValueError) as e:
+            return JSONResponse({"error": f"Invalid config: {e}"}, status_code=400)
+        return await get_config()
+
+    @app.get("/_fake/stats")
+    async def get_stats():
+        with lock:
+            return dict(stats)
+
+    @app.post("/_fake/reset")
+    async def reset_stats():
+        with lock:
+            stats.clear()
+        return {}
+
+    return app
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.split("\n")[1])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8100)
+    parser.add_argument("--openai-latency", default="lognormal:1.0:0.4")
+    parser.add_argument(
+        "--token-latency",
+        type=float,
+        default=0.0,
+        help="extra seconds per completion token",
+    )
+    parser.add_argument("--spoonacular-latency", default="lognormal:0.2:0.3")
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--openai-error-rate", type=float)
+    parser.add_argument("--spoonacular-error-rate", type=float)
+    parser.add_argument("--error-status", type=int, default=503)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    import uvicorn
+
+    def error_rate(value):
+        return args.error_rate if value is None else value
+
+    configs = {
+        "openai": UpstreamConfig(
+            Latency(args.openai_latency),
+            error_rate(args.openai_error_rate),
+            args.error_status,
+            args.token_latency,
+        ),
+        "spoonacular": UpstreamConfig(
+            Latency(args.spoonacular_latency),
+            error_rate(args.spoonacular_error_rate),
+            args.error_status,
+        ),
+    }
+    print(f"Fake upstreams on http://{args.host}:{args.port}")
+    print(f"  OPENAI_BASE_URL=http://{args.host}:{args.port}/v1")
+    print(f"  SPOONACULAR_BASE_URL=http://{args.host}:{args.port}")
+    uvicorn.run(create_app(configs, args.seed), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,634 @@
+"""
+End-to-end load test with a per-endpoint latency report
+
+Simulated users drive a running server over HTTP. Each signs up, logs in,
+then repeats actions picked from a weighted mix (--mix) until the time is up:
+
+    browse    list recipes, by page or by meaning (?q=), and recommendations
+    search    search by ingredients, then for recipes similar to one
+    view      open a recipe, revalidating with its ETag like a browser does
+    save      save a recipe, list saved recipes, sometimes unsave one
+    calories  log a day's calories and read the log back
+    generate  generate a recipe (with an Idempotency-Key) and poll its job
+
+For numbers that can be compared between commits, run it against a local
+mongod and the fake upstreams (benchmarks/fake_upstreams.py), not the paid
+APIs:
+
+    mongod --dbpath /tmp/loadtest-db
+    python benchmarks/fake_upstreams.py
+    MONGODB_URI=mongodb://localhost:27017/loadtest \\
+        OPENAI_BASE_URL=http://127.0.0.1:8100/v1 OPENAI_API_KEY=fake \\
+        SPOONACULAR_BASE_URL=http://127.0.0.1:8100 SPOONACULAR_API_KEY=fake \\
+        python __init__.py
+    python benchmarks/loadtest.py --users 50 --duration 120 --output report.json
+
+The report has throughput, error rate and p50/p95/p99 latency for each
+endpoint (routes are grouped by pattern, e.g. GET /api/recipes/{id}) and in
+total. It checks them against the SLOs (--slo) and is written as JSON,
+labelled with the current commit. --baseline takes an earlier report and
+shows each endpoint's change against it. The exit status is 1 when an SLO is
+missed.
+
+Usage:
+    python benchmarks/loadtest.py
+    python benchmarks/loadtest.py --users 100 --think-time 0 --duration 60 \\
+        --mix browse=50,view=30,generate=20 --slo p95=300 --output run.json
+    python benchmarks/loadtest.py --baseline main.json --output branch.json
+"""
+
+import argparse
+import asyncio
+import json
+import math
+import os
+import random
+import subprocess
+import sys
+import time
+import uuid
+from collections import Counter
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional
+
+import httpx
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [SERVER_DIR, os.path.join(SERVER_DIR, "src")]
+
+ACTIONS = ("browse", "search", "view", "save", "calories", "generate")
+DEFAULT_MIX = "browse=35,search=20,view=25,save=8,calories=8,generate=4"
+DEFAULT_SLOS = ["p95=500", "p99=1500", "errors=0.01"]
+
+# Job states a generation can end in (see services.job_queue)
+TERMINAL_STATES = ("succeeded", "failed", "cancelled")
+
+# Pseudo-endpoint timing a generation from request to finished job; it is
+# reported but not held to the SLOs, which are for single requests
+GENERATION_END_TO_END = "generate: job finished"
+
+# Recipes the test wants to exist; missing ones are created before it starts
+MIN_RECIPES = 30
+
+PANTRIES = [
+    ["chicken breast", "rice", "broccoli", "soy sauce", "garlic"],
+    ["spaghetti", "eggs", "pancetta", "parmesan", "black pepper"],
+    ["chickpeas", "spinach", "coconut milk", "curry powder", "onion"],
+    ["salmon", "potatoes", "lemon", "dill", "butter"],
+    ["black beans", "tortillas", "avocado", "tomato", "lime"],
+    ["tofu", "noodles", "peanut butter", "carrot", "green onion"],
+    ["ground beef", "onion", "tomato sauce", "kidney beans", "chili powder"],
+    ["oats", "banana", "milk", "honey", "cinnamon"],
+]
+
+QUERIES = [
+    "creamy pasta",
+    "quick chicken dinner",
+    "vegan curry",
+    "something like carbonara",
+    "light summer salad",
+    "spicy beef stew",
+    "healthy breakfast",
+]
+
+
+def percentile(samples: List[float], p: float) -> float:
+    """Nearest-rank percentile of sorted samples"""
+    if not samples:
+        return 0.0
+    return samples[max(0, min(len(samples) - 1, math.ceil(p * len(samples)) - 1))]
+
+
+class EndpointStats:
+    """Latencies and outcomes of one endpoint"""
+
+    def __init__(self):
+        self.latencies: List[float] = []
+        self.statuses: Counter = Counter()
+        self.errors = 0
+
+    def add(self, seconds: float, status: Any, error: bool):
+        self.latencies.append(seconds)
+        self.statuses[str(status)] += 1
+        self.errors += error
+
+    def merge(self, other: "EndpointStats"):
+        self.latencies.extend(other.latencies)
+        self.statuses.update(other.statuses)
+        self.errors += other.errors
+
+    def summary(self, duration: float) -> Dict[str, Any]:
+        samples = sorted(self.latencies)
+        count = len(samples)
+        return {
+            "requests": count,
+            "throughput": round(count / duration, 3) if duration else 0.0,
+            "errors": self.errors,
+            "errorRate": round(self.errors / count, 5) if count else 0.0,
+            "statuses": dict(self.statuses),
+            "latencyMs": {
+                "p50": round(percentile(samples, 0.50) * 1000, 2),
+                "p95": round(percentile(samples, 0.95) * 1000, 2),
+                "p99": round(percentile(samples, 0.99) * 1000, 2),
+                "max": round(samples[-1] * 1000, 2) if samples else 0.0,
+                "mean": round(sum(samples) / count * 1000, 2) if count else 0.0,
+            },
+        }
+
+
+class LoadTest:
+    """Shared state of a run: the HTTP client, known recipes and results"""
+
+    def __init__(self, args: argparse.Namespace):
+        self.args = args
+        self.client = httpx.AsyncClient(
+            base_url=args.base_url,
+            timeout=args.timeout,
+            limits=httpx.Limits(max_connections=args.users * 2),
+        )
+        self.recipe_ids: List[str] = []
+        self.endpoints: Dict[str, EndpointStats] = {}
+
+    def record(self, name: str, seconds: float, status: Any, error: bool):
+        self.endpoints.setdefault(name, EndpointStats()).add(seconds, status, error)
+
+
+def recipe_id(recipe: Dict[str, Any]) -> Optional[str]:
+    """ID of a recipe in a response ("_id" as a string or extended JSON)"""
+    value = recipe.get("_id", recipe.get("id"))
+    if isinstance(value, dict):
+        value = value.get("$oid")
+    return str(value) if value else None
+
+
+class VirtualUser:
+    """One simulated user, with its own token, ETags and saved recipes"""
+
+    def __init__(self, number: int, test: LoadTest, rng: random.Random):
+        self.number = number
+        self.test = test
+        self.rng = rng
+        self.headers: Dict[str, str] = {}
+        self.etags: Dict[str, str] = {}
+        self.saved: List[str] = []
+
+    async def request(
+        self, name: str, method: str, url: str, **kwargs
+    ) -> Optional[httpx.Response]:
+        """
+        Send a request and record it under an endpoint name
+
+        Statuses of 400 and above count as errors. Returns None if the
+        request failed without a response.
+        """
+        headers = {**self.headers, **kwargs.pop("headers", {})}
+        started = time.perf_counter()
+        try:
+            response = await self.test.client.request(
+                method, url, headers=headers, **kwargs
+            )
+        except httpx.HTTPError as e:
+            seconds = time.perf_counter() - started
+            self.test.record(name, seconds, type(e).__name__, True)
+            return None
+        seconds = time.perf_counter() - started
+        status = response.status_code
+        self.test.record(name, seconds, status, status >= 400)
+        return response
+
+    def pick_recipe(self) -> Optional[str]:
+        ids = self.test.recipe_ids
+        return self.rng.choice(ids) if ids else None
+
+    async def sign_up(self):
+        """Register and log in; use the returned token on later requests"""
+        run = self.test.args.run_id
+        email = f"loadtest-{run}-{self.number}@example.com"
+        password = f"Load-test-{run}"
+        await self.request(
+            "POST /api/auth/register",
+            "POST",
+            "/api/auth/register",
+            json={
+                "username": f"loadtest{run}{self.number}",
+                "email": email,
+                "password": password,
+            },
+        )
+        response = await self.request(
+            "POST /api/auth/login",
+            "POST",
+            "/api/auth/login",
+            json={"email": email, "password": password},
+        )
+
+        token = None
+        if response is not None and response.status_code == 200:
+            try:
+                token = response.json()["data"]["token"]
+            except (ValueError, KeyError, TypeError):
+                token = None
+        if token:
+            self.headers["Authorization"] = f"Bearer {token}"
+
+    async def browse(self):
+        if self.rng.random() < 0.25:
+            await self.request(
+                "GET /api/recipes/?q=",
+                "GET",
+                "/api/recipes/",
+                params={"q": self.rng.choice(QUERIES), "limit": 12},
+            )
+        else:
+            await self.request(
+                "GET /api/recipes/",
+                "GET",
+                "/api/recipes/",
+                params={"page": self.rng.randint(1, 5), "limit": 12},
+            )
+        if self.rng.random() < 0.3:
+            await self.request(
+                "GET /api/recipes/recommend",
+                "GET",
+                "/api/recipes/recommend",
+                params={"pantry": ",".join(self.rng.choice(PANTRIES)), "limit": 10},
+            )
+
+    async def search(self):
+        pantry = self.rng.sample(self.rng.choice(PANTRIES), 3)
+        await self.request(
+            "GET /api/recipes/search",
+            "GET",
+            "/api/recipes/search",
+            params={"ingredients": ",".join(pantry), "limit": 10},
+        )
+        recipe = self.pick_recipe()
+        if recipe and self.rng.random() < 0.5:
+            await self.request(
+                "GET /api/recipes/similar",
+                "GET",
+                "/api/recipes/similar",
+                params={"id": recipe, "limit": 10},
+            )
+
+    async def view(self):
+        recipe = self.pick_recipe()
+        if not recipe:
+            return
+        url = f"/api/recipes/{recipe}"
+        headers = {"If-None-Match": self.etags[url]} if url in self.etags else {}
+        response = await self.request(
+            "GET /api/recipes/{id}", "GET", url, headers=headers
+        )
+        if response is not None and response.headers.get("ETag"):
+            self.etags[url] = response.headers["ETag"]
+
+    async def save(self):
+        recipe = self.pick_recipe()
+        if recipe:
+            response = await self.request(
+                "POST /api/users/saved-recipes/{id}",
+                "POST",
+                f"/api/users/saved-recipes/{recipe}",
+            )
+            if response is not None and response.status_code == 200:
+                self.saved.append(recipe)
+        await self.request(
+            "GET /api/users/saved-recipes",
+            "GET",
+            "/api/users/saved-recipes",
+            params={"limit": 20},
+        )
+        if self.saved and self.rng.random() < 0.3:
+            recipe = self.saved.pop(self.rng.randrange(len(self.saved)))
+            await self.request(
+                "DELETE /api/users/saved-recipes/{id}",
+                "DELETE",
+                f"/api/users/saved-recipes/{recipe}",
+            )
+
+    async def calories(self):
+        day = date.today() - timedelta(days=self.rng.randint(0, 30))
+        await self.request(
+            "POST /api/users/calorie-log",
+            "POST",
+            "/api/users/calorie-log",
+            json={
+                "date": day.isoformat(),
+                "caloriesConsumed": self.rng.randint(1200, 3200),
+                "caloriesBurned": self.rng.randint(0, 900),
+            },
+        )
+        await self.request(
+            "GET /api/users/calorie-log",
+            "GET",
+            "/api/users/calorie-log",
+            params={"limit": 30},
+        )
+
+    async def generate(self):
+        started = time.perf_counter()
+        response = await self.request(
+            "POST /api/recipes/generate",
+            "POST",
+            "/api/recipes/generate",
+            headers={"Idempotency-Key": str(uuid.uuid4())},
+            json={
+                "ingredients": self.rng.choice(PANTRIES),
+                "useExisting": self.rng.random() < 0.5,
+            },
+        )
+        if response is None or response.status_code != 202:
+            return
+        if not self.test.args.wait_jobs:
+            return
+
+        # Poll the job the way the mobile client does, until it finishes
+        job_url = response.headers.get("Location") or (
+            f"/api/jobs/{response.json()['data']['jobId']}"
+        )
+        status = "timeout"
+        give_up = time.monotonic() + self.test.args.job_timeout
+        while time.monotonic() < give_up:
+            response = await self.request("GET /api/jobs/{id}", "GET", job_url)
+            if response is None or response.status_code != 200:
+                status = "lost"
+                break
+            status = response.json()["data"]["status"]
+            if status in TERMINAL_STATES:
+                break
+            await asyncio.sleep(float(response.headers.get("Retry-After", 1)))
+        self.test.record(
+            GENERATION_END_TO_END,
+            time.perf_counter() - started,
+            status,
+            status != "succeeded",
+        )
+
+    async def run(self, mix: Dict[str, float], stop_at: float):
+        await self.sign_up()
+        actions, weights = zip(*mix.items())
+        while time.monotonic() < stop_at:
+            action = self.rng.choices(actions, weights)[0]
+            try:
+                await getattr(self, action)()
+            except (ValueError, KeyError, TypeError) as e:
+                # A response without the fields the client needs
+                self.test.record(f"{action}: bad response", 0.0, type(e).__name__, True)
+            think = self.test.args.think_time
+            if think > 0:
+                pause = min(self.rng.expovariate(1 / think), 10 * think)
+                await asyncio.sleep(max(0.0, min(pause, stop_at - time.monotonic())))
+
+
+async def prepare(test: LoadTest):
+    """Collect recipe IDs to view and save, creating recipes if too few exist"""
+    response = await test.client.get("/api/recipes/", params={"limit": 100})
+    response.raise_for_status()
+    test.recipe_ids = [
+        found for found in map(recipe_id, response.json().get("data", [])) if found
+    ]
+
+    missing = MIN_RECIPES - len(test.recipe_ids)
+    if missing <= 0:
+        return
+    creator = VirtualUser(-1, test, random.Random(0))
+    await creator.sign_up()
+    rng = random.Random(test.args.seed)
+    for number in range(missing):
+        pantry = rng.choice(PANTRIES)
+        response = await test.client.post(
+            "/api/recipes/",
+            headers=creator.headers,
+            json={
+                "name": f"Load test {pantry[0]} {number}",
+                "ingredients": [
+                    f"{rng.randint(1, 4) * 100}g {item}" for item in pantry
+                ],
+                "instructions": "1. Prepare. 2. Cook. 3. Serve.",
+            },
+        )
+        if response.status_code != 201:
+            print(
+                f"Could not create test recipes ({response.status_code}); "
+                f"continuing with {len(test.recipe_ids)}"
+            )
+            break
+        created = recipe_id(response.json()["data"])
+        if created:
+            test.recipe_ids.append(created)
+    # Setup requests are not part of the results
+    test.endpoints.clear()
+
+
+async def run_test(args: argparse.Namespace, mix: Dict[str, float]) -> Dict[str, Any]:
+    test = LoadTest(args)
+    try:
+        await prepare(test)
+        started = time.monotonic()
+        stop_at = started + args.ramp_up + args.duration
+        users = []
+        for number in range(args.users):
+            user = VirtualUser(number, test, random.Random(f"{args.seed}-{number}"))
+            users.append(asyncio.create_task(user.run(mix, stop_at)))
+            if args.ramp_up:
+                await asyncio.sleep(args.ramp_up / args.users)
+        await asyncio.gather(*users)
+        duration = time.monotonic() - started
+    finally:
+        await test.client.aclose()
+
+    total = EndpointStats()
+    for name, stats in test.endpoints.items():
+        if name.split(" ")[0] in ("GET", "POST", "PUT", "DELETE"):
+            total.merge(stats)
+    return {
+        "label": args.label,
+        "startedAt": datetime.now().isoformat(timespec="seconds"),
+        "config": {
+            "baseUrl": args.base_url,
+            "users": args.users,
+            "durationSeconds": args.duration,
+            "rampUpSeconds": args.ramp_up,
+            "thinkTimeSeconds": args.think_time,
+            "mix": mix,
+            "seed": args.seed,
+            "recipes": len(test.recipe_ids),
+        },
+        "durationSeconds": round(duration, 3),
+        "overall": total.summary(duration),
+        "endpoints": {
+            name: stats.summary(duration)
+            for name, stats in sorted(test.endpoints.items())
+        },
+    }
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    """
+    Parse "browse=35,view=25,..." into action weights
+
+    Raises:
+        ValueError: If an action is unknown or no weight is positive
+    """
+    mix = {}
+    for part in filter(None, (part.strip() for part in text.split(","))):
+        action, _, weight = part.partition("=")
+        if action not in ACTIONS:
+            raise ValueError(f"Unknown action {action!r}; use {', '.join(ACTIONS)}")
+        mix[action] = float(weight or 1)
+    mix = {action: weight for action, weight in mix.items() if weight > 0}
+    if not mix:
+        raise ValueError("The mix has no actions")
+    return mix
+
+
+def parse_slos(specs: List[str]) -> Dict[Optional[str], Dict[str, float]]:
+    """
+    Parse SLOs such as "p95=500" (ms, every endpoint), "errors=0.01" (error
+    rate) or "GET /api/recipes/{id}:p99=300" (one endpoint)
+
+    Returns:
+        Limits per endpoint; None holds the limits for every endpoint
+    """
+    slos: Dict[Optional[str], Dict[str, float]] = {}
+    for spec in specs:
+        endpoint, _, limit = spec.rpartition(":")
+        metric, _, value = limit.partition("=")
+        if metric not in ("p50", "p95", "p99", "errors") or not value:
+            raise ValueError(f"Invalid SLO {spec!r}")
+        slos.setdefault(endpoint or None, {})[metric] = float(value)
+    return slos
+
+
+def check_slos(report: Dict[str, Any], slos: Dict[Optional[str], Dict[str, float]]):
+    """Add the SLO limits and any violations to the report"""
+    violations = []
+    for name, summary in report["endpoints"].items():
+        if name.split(" ")[0] not in ("GET", "POST", "PUT", "DELETE"):
+            continue
+        limits = {**slos.get(None, {}), **slos.get(name, {})}
+        for metric, limit in limits.items():
+            if metric == "errors":
+                value = summary["errorRate"]
+                if value > limit:
+                    violations.append(f"{name}: error rate {value:.2%} > {limit:.2%}")
+            else:
+                value = summary["latencyMs"][metric]
+                if value > limit:
+                    violations.append(
+                        f"{name}: {metric} {value:.0f} ms > {limit:.0f} ms"
+                    )
+    report["slo"] = {
+        "limits": {name or "*": limits for name, limits in slos.items()},
+        "passed": not violations,
+        "violations": violations,
+    }
+
+
+def print_report(report: Dict[str, Any], baseline: Optional[Dict[str, Any]]):
+    old = (baseline or {}).get("endpoints", {})
+    columns = f"{'endpoint':<38}{'reqs':>8}{'req/s':>9}{'err%':>7}"
+    columns += f"{'p50':>9}{'p95':>9}{'p99':>9}"
+    if baseline:
+        columns += f"{'p95 vs base':>13}"
+    print(
+        f"\n{report['label']}: {report['config']['users']} users, "
+        f"{report['durationSeconds']:.0f}s"
+    )
+    print(columns)
+
+    rows = list(report["endpoints"].items()) + [("TOTAL", report["overall"])]
+    for name, summary in rows:
+        latency = summary["latencyMs"]
+        line = (
+            f"{name[:37]:<38}{summary['requests']:>8}{summary['throughput']:>9.1f}"
+            f"{summary['errorRate'] * 100:>7.1f}"
+            f"{latency['p50']:>9.0f}{latency['p95']:>9.0f}{latency['p99']:>9.0f}"
+        )
+        before = baseline["overall"] if name == "TOTAL" and baseline else old.get(name)
+        if before and before["latencyMs"]["p95"]:
+            change = latency["p95"] / before["latencyMs"]["p95"] - 1
+            line += f"{change:>+13.0%}"
+        print(line)
+
+    for violation in report["slo"]["violations"]:
+        print(f"SLO missed: {violation}")
+    if report["slo"]["passed"]:
+        print("All SLOs met")
+
+
+def git_label() -> str:
+    """Current commit, for telling reports apart"""
+    try:
+        return subprocess.run(
+            ["git", "describe", "--always", "--dirty"],
+            cwd=SERVER_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return "unknown"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--base-url", default="http://127.0.0.1:3000")
+    parser.add_argument("--users", type=int, default=20, help="Concurrent users")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds")
+    parser.add_argument(
+        "--ramp-up", type=float, default=5, help="Seconds to start all users"
+    )
+    parser.add_argument(
+        "--think-time",
+        type=float,
+        default=1.0,
+        help="Mean pause between actions (0 for back-to-back requests)",
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="Action weights")
+    parser.add_argument(
+        "--slo",
+        action="append",
+        help=f"Latency (ms) or error rate limit (default {' '.join(DEFAULT_SLOS)})",
+    )
+    parser.add_argument("--timeout", type=float, default=30, help="Request timeout")
+    parser.add_argument(
+        "--no-wait-jobs",
+        dest="wait_jobs",
+        action="store_false",
+        help="Do not poll generation jobs until they finish",
+    )
+    parser.add_argument("--job-timeout", type=float, default=120)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--label", default=None, help="Report label (git commit)")
+    parser.add_argument("--output", help="Write the JSON report here")
+    parser.add_argument("--baseline", help="Earlier report to compare with")
+    args = parser.parse_args()
+
+    try:
+        mix = parse_mix(args.mix)
+        slos = parse_slos(args.slo or DEFAULT_SLOS)
+    except ValueError as e:
+        parser.error(str(e))
+    args.label = args.label or git_label()
+    args.run_id = uuid.uuid4().hex[:8]
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    report = asyncio.run(run_test(args, mix))
+    check_slos(report, slos)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2)
+        print(f"Report written to {args.output}")
+    sys.exit(0 if report["slo"]["passed"] else 1)
+
+
+if __name__ == "__main__":
+    main()
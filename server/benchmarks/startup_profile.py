@@ -0,0 +1,170 @@
+"""
+Startup profile for the server and CLI entry points
+
+Runs each entry point in a fresh interpreter with `-X importtime`, reports the
+slowest imports, and checks the cumulative import time against a budget. It
+also measures time-to-first-request: process start until the app factory has
+served GET / through the Flask test client.
+
+Usage:
+    python benchmarks/startup_profile.py            # Profile all targets
+    python benchmarks/startup_profile.py --top 20   # Show more slow imports
+    python benchmarks/startup_profile.py --skip-first-request
+
+Exits with status 1 when any target exceeds its budget, so it can gate CI.
+"""
+
+import argparse
+import os
+import re
+import subprocess
+import sys
+import time
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Import budgets in milliseconds (cumulative, as reported by -X importtime)
+IMPORT_BUDGETS_MS = {
+    "run": 150,
+    "api": 150,
+    "routes.recipe_routes": 600,
+    "routes.user_routes": 600,
+    "services.recipe_service": 300,
+}
+
+# Budget for process start -> first response served
+FIRST_REQUEST_BUDGET_MS = 2500
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+(\d+)\s+\|\s+(\d+)\s+\|(\s*)(\S+)")
+
+FIRST_REQUEST_SNIPPET = """
+import time
+start = time.perf_counter()
+from __init__ import create_app
+app = create_app()
+response = app.test_client().get("/")
+print(round((time.perf_counter() - start) * 1000, 1), response.status_code)
+"""
+
+
+def _env():
+    env = os.environ.copy()
+    env["PYTHONPATH"] = os.pathsep.join(
+        [SERVER_DIR, os.path.join(SERVER_DIR, "src"), env.get("PYTHONPATH", "")]
+    )
+    return env
+
+
+def profile_import(module):
+    """
+    Import a module in a fresh interpreter with -X importtime
+
+    Args:
+        module: Dotted module name to import
+
+    Returns:
+        Tuple of (total cumulative ms, list of (cumulative ms, module) rows),
+        or (None, error output) if the import failed
+    """
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", f"import {module}"],
+        cwd=SERVER_DIR,
+        env=_env(),
+        capture_output=True,
+        text=True,
+    )
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1:]
+
+    rows = []
+    total_us = 0
+    for line in result.stderr.splitlines():
+        match = IMPORTTIME_LINE.match(line)
+        if not match:
+            continue
+        cumulative_us = int(match.group(2))
+        name = match.group(4)
+        rows.append((cumulative_us / 1000, name))
+        # Top-level imports have no indentation before the module name
+        if len(match.group(3)) <= 1:
+            total_us += cumulative_us
+
+    rows.sort(reverse=True)
+    return total_us / 1000, rows
+
+
+def measure_first_request():
+    """
+    Measure process start until the first request is served
+
+    Returns:
+        Tuple of (wall ms including interpreter start, in-process ms) or
+        (None, error output) on failure
+    """
+    start = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, "-c", FIRST_REQUEST_SNIPPET],
+        cwd=SERVER_DIR,
+        env=_env(),
+        capture_output=True,
+        text=True,
+    )
+    wall_ms = (time.perf_counter() - start) * 1000
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1:]
+
+    in_process_ms = float(result.stdout.split()[0])
+    return wall_ms, in_process_ms
+
+
+def main():
+    """Profile every target and report budget violations"""
+    parser = argparse.ArgumentParser(description="Profile server cold start")
+    parser.add_argument("--top", type=int, default=10, help="Slow imports to show")
+    parser.add_argument(
+        "--skip-first-request",
+        action="store_true",
+        help="Skip the time-to-first-request check (needs MongoDB and env vars)",
+    )
+    args = parser.parse_args()
+
+    over_budget = []
+
+    for module, budget in IMPORT_BUDGETS_MS.items():
+        total, rows = profile_import(module)
+        if total is None:
+            print(f"❌ {module}: import failed: {' '.join(rows)}")
+            over_budget.append(module)
+            continue
+
+        status = "✅" if total <= budget else "❌"
+        print(f"{status} {module}: {total:.1f} ms (budget {budget} ms)")
+        for cumulative_ms, name in rows[: args.top]:
+            print(f"    {cumulative_ms:8.1f} ms  {name}")
+
+        if total > budget:
+            over_budget.append(module)
+
+    if not args.skip_first_request:
+        wall_ms, in_process_ms = measure_first_request()
+        if wall_ms is None:
+            print(f"❌ first request failed: {' '.join(in_process_ms)}")
+            over_budget.append("first-request")
+        else:
+            status = "✅" if wall_ms <= FIRST_REQUEST_BUDGET_MS else "❌"
+            print(
+                f"{status} time to first request: {wall_ms:.1f} ms "
+                f"({in_process_ms:.1f} ms in-process, budget {FIRST_REQUEST_BUDGET_MS} ms)"
+            )
+            if wall_ms > FIRST_REQUEST_BUDGET_MS:
+                over_budget.append("first-request")
+
+    if over_budget:
+        print(f"\nOver budget: {', '.join(over_budget)}")
+        sys.exit(1)
+
+    print("\nAll startup budgets met.")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,39 +1,30 @@
-from mongoengine import connect, disconnect
 import os
-import time
+import sys
 
 from dotenv import load_dotenv
 
 load_dotenv()
 
+# The connection manager lives with the rest of the config in src/
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.dirname(__file__)), "src"))
+
+from config.database import manager  # noqa: E402
+
 
 def connect_db(retries=5):
-    """Establish connection to MongoDB with retry mechanism."""
-    mongo_uri = os.getenv("MONGODB_URI")
-
-    for attempt in range(retries):
-        try:
-            # Connect using mongoengine
-            connect(host=mongo_uri)
-            print(f"✅ MongoDB connected successfully on attempt {attempt + 1}")
-            return True
-        except Exception as error:
-            print(f"❌ MongoDB connection error on attempt {attempt + 1}: {error}")
-            if attempt < retries - 1:
-                wait_time = 5 * (attempt + 1)  # Exponential backoff
-                print(
-                    f"🔄 Retrying in {wait_time} seconds... ({retries - attempt - 1} attempts left)"
-                )
-                time.sleep(wait_time)
-            else:
-                print("🚨 MongoDB connection failed after multiple attempts.")
-                return False
+    """Establish connection to MongoDB through the shared connection manager."""
+    if manager.warm_up(retries):
+        print("✅ MongoDB connected successfully")
+        return True
+
+    print("🚨 MongoDB connection failed after multiple attempts.")
+    return False
 
 
 def close_db_connection():
     """Close the MongoDB connection."""
     try:
-        disconnect()
+        manager.close()
         print("🔻 MongoDB connection closed.")
         return True
     except Exception as error:
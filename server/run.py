@@ -20,24 +20,29 @@ load_dotenv()
 # Check if this is a Flask reload (Flask sets this env var on reload)
 is_flask_reload = os.environ.get("WERKZEUG_RUN_MAIN") == "true"
 
-# Import recipe generation functionality
-try:
-    from api import make_recipe
-except ImportError:
+
+def load_make_recipe():
+    """Import the recipe CLI on demand so --web-only never loads it"""
     try:
-        from recipe_api import make_recipe
+        from api import make_recipe
     except ImportError:
+        try:
+            from recipe_api import make_recipe
+        except ImportError:
+
+            def make_recipe():
+                print(
+                    "Recipe API module not found. Please ensure 'api.py' or 'recipe_api.py' exists."
+                )
 
-        def make_recipe():
-            print(
-                "Recipe API module not found. Please ensure 'api.py' or 'recipe_api.py' exists."
-            )
+    return make_recipe
 
 
 def run_recipe_generator():
     """Run the recipe generator CLI"""
     if not is_flask_reload:  # Skip on Flask reload
         print("Starting Recipe Generator CLI...")
+        make_recipe = load_make_recipe()
         make_recipe()
         print("Recipe Generator CLI completed successfully.")
 
@@ -0,0 +1,355 @@
+"""
+Service for saved recipes (bookmarks)
+
+Bookmarks live in their own collection, one document per (userId, recipeId)
+pair, backed by a unique index. Saving is an idempotent upsert and a
+membership check is a single index lookup, so neither depends on how many
+recipes a user has saved. Profile reads no longer carry the saved list.
+
+Users created before this change kept saved IDs in a `savedRecipes` array
+on the user document; migrate_legacy_bookmarks() moves them over on first
+access.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterable, List, Optional, Set, Tuple
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from config.database import get_collection
+from services.version_service import bump_versions, user_key
+from utils.cache import recipe_cache
+
+# Maximum number of recipe IDs accepted by one bulk request
+MAX_BULK_IDS = 500
+
+# Saved-recipe page size limits
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+
+# Listing projection: everything except the long instructions text
+SUMMARY_PROJECTION = {"instructions": 0}
+
+
+def _valid_ids(recipe_ids: Iterable[str]) -> List[str]:
+    """Deduplicate recipe IDs, keeping order and dropping invalid ones"""
+    seen = set()
+    valid = []
+    for recipe_id in recipe_ids:
+        recipe_id = str(recipe_id)
+        if recipe_id not in seen and ObjectId.is_valid(recipe_id):
+            seen.add(recipe_id)
+            valid.append(recipe_id)
+    return valid
+
+
+def add_bookmarks(user_id: str, recipe_ids: Iterable[str]) -> Dict[str, List[str]]:
+    """
+    Save one or more recipes for a user
+
+    Args:
+        user_id: ID of the user saving the recipes
+        recipe_ids: Recipe IDs to save
+
+    Returns:
+        Dictionary with the recipe IDs that were added, already saved,
+        or not found (including invalid IDs)
+    """
+    recipe_ids = [str(recipe_id) for recipe_id in recipe_ids]
+    valid = _valid_ids(recipe_ids)
+    result = {"added": [], "alreadySaved": [], "notFound": []}
+    result["notFound"] = [rid for rid in recipe_ids if not ObjectId.is_valid(rid)]
+
+    if not valid:
+        return result
+
+    # Check that every recipe exists with one indexed $in query
+    existing = {
+        str(recipe["_id"])
+        for recipe in get_collection("recipes").find(
+            {"_id": {"$in": [ObjectId(rid) for rid in valid]}}, {"_id": 1}
+        )
+    }
+    result["notFound"] += [rid for rid in valid if rid not in existing]
+    to_save = [rid for rid in valid if rid in existing]
+
+    if not to_save:
+        return result
+
+    # Upsert each pair; existing bookmarks keep their original createdAt
+    now = datetime.now()
+    write = get_collection("bookmarks").bulk_write(
+        [
+            UpdateOne(
+                {"userId": user_id, "recipeId": recipe_id},
+                {"$setOnInsert": {"createdAt": now}},
+                upsert=True,
+            )
+            for recipe_id in to_save
+        ],
+        ordered=False,
+    )
+
+    upserted = set(write.upserted_ids)
+    for index, recipe_id in enumerate(to_save):
+        if index in upserted:
+            result["added"].append(recipe_id)
+        else:
+            result["alreadySaved"].append(recipe_id)
+
+    if result["added"]:
+        bump_versions(user_key(user_id, "saved"))
+
+    return result
+
+
+def remove_bookmarks(user_id: str, recipe_ids: Iterable[str]) -> int:
+    """
+    Remove one or more saved recipes for a user
+
+    Args:
+        user_id: ID of the user
+        recipe_ids: Recipe IDs to remove
+
+    Returns:
+        Number of bookmarks removed
+    """
+    recipe_ids = list(dict.fromkeys(str(recipe_id) for recipe_id in recipe_ids))
+    if not recipe_ids:
+        return 0
+
+    result = get_collection("bookmarks").delete_many(
+        {"userId": user_id, "recipeId": {"$in": recipe_ids}}
+    )
+    if result.deleted_count:
+        bump_versions(user_key(user_id, "saved"))
+    return result.deleted_count
+
+
+def is_saved(user_id: str, recipe_id: str) -> bool:
+    """
+    Check whether a user has saved a recipe
+
+    Answered from the unique (userId, recipeId) index alone.
+
+    Args:
+        user_id: ID of the user
+        recipe_id: Recipe ID to check
+
+    Returns:
+        True if the recipe is saved
+    """
+    bookmark = get_collection("bookmarks").find_one(
+        {"userId": user_id, "recipeId": str(recipe_id)}, {"_id": 0, "recipeId": 1}
+    )
+    return bookmark is not None
+
+
+def saved_subset(user_id: str, recipe_ids: Iterable[str]) -> Set[str]:
+    """
+    Check membership for a batch of recipes in one query
+
+    Args:
+        user_id: ID of the user
+        recipe_ids: Recipe IDs to check (e.g. one page of a listing)
+
+    Returns:
+        Set of the given recipe IDs that the user has saved
+    """
+    recipe_ids = list(dict.fromkeys(str(recipe_id) for recipe_id in recipe_ids))
+    if not recipe_ids:
+        return set()
+
+    return {
+        bookmark["recipeId"]
+        for bookmark in get_collection("bookmarks").find(
+            {"userId": user_id, "recipeId": {"$in": recipe_ids}},
+            {"_id": 0, "recipeId": 1},
+        )
+    }
+
+
+def encode_cursor(bookmark: Dict[str, Any]) -> str:
+    """Encode a bookmark's sort position as an opaque page cursor"""
+    millis = int(bookmark["createdAt"].timestamp() * 1000)
+    return f"{millis}_{bookmark['_id']}"
+
+
+def decode_cursor(cursor: str) -> Tuple[datetime, ObjectId]:
+    """
+    Decode a page cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    millis, _, bookmark_id = cursor.partition("_")
+    if not ObjectId.is_valid(bookmark_id):
+        raise ValueError("Invalid cursor")
+    return datetime.fromtimestamp(int(millis) / 1000), ObjectId(bookmark_id)
+
+
+def list_bookmarks_page(
+    user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+    """
+    Get one page of a user's bookmarks in saved order (newest first)
+
+    Uses keyset pagination on (createdAt, _id), so every page costs the same
+    no matter how deep into the list it is.
+
+    Args:
+        user_id: ID of the user
+        limit: Page size
+        cursor: Cursor returned with the previous page, or None for the first
+
+    Returns:
+        Tuple of (bookmark documents, cursor for the next page or None)
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    query = {"userId": user_id}
+    if cursor:
+        created_at, bookmark_id = decode_cursor(cursor)
+        query["$or"] = [
+            {"createdAt": {"$lt": created_at}},
+            {"createdAt": created_at, "_id": {"$lt": bookmark_id}},
+        ]
+
+    # Fetch one extra to know whether another page exists
+    bookmarks = list(
+        get_collection("bookmarks")
+        .find(query, {"recipeId": 1, "createdAt": 1})
+        .sort([("createdAt", -1), ("_id", -1)])
+        .limit(limit + 1)
+    )
+
+    next_cursor = None
+    if len(bookmarks) > limit:
+        bookmarks = bookmarks[:limit]
+        next_cursor = encode_cursor(bookmarks[-1])
+
+    return bookmarks, next_cursor
+
+
+def hydrate_recipes(
+    recipe_ids: List[str], full: bool = False
+) -> Tuple[List[Dict[str, Any]], List[str]]:
+    """
+    Load recipes for a list of IDs, preserving the given order
+
+    Recipes already in the single-recipe cache are served from it; the rest
+    are fetched with one projected $in query.
+
+    Args:
+        recipe_ids: Recipe IDs in the order they should be returned
+        full: Include the instructions text
+
+    Returns:
+        Tuple of (recipe documents, IDs that no longer exist)
+    """
+    found = {}
+    for recipe_id, recipe in recipe_cache.get_many(recipe_ids).items():
+        recipe = dict(recipe)
+        if not full:
+            recipe.pop("instructions", None)
+        found[recipe_id] = recipe
+
+    missing = [ObjectId(rid) for rid in recipe_ids if rid not in found]
+    if missing:
+        projection = None if full else SUMMARY_PROJECTION
+        for recipe in get_collection("recipes").find(
+            {"_id": {"$in": missing}}, projection
+        ):
+            recipe_id = str(recipe["_id"])
+            if full:
+                recipe_cache.set(recipe_id, recipe)
+            found[recipe_id] = recipe
+
+    recipes = [found[rid] for rid in recipe_ids if rid in found]
+    dangling = [rid for rid in recipe_ids if rid not in found]
+    return recipes, dangling
+
+
+def get_saved_recipes_page(
+    user_id: str,
+    limit: int = DEFAULT_PAGE_SIZE,
+    cursor: Optional[str] = None,
+    full: bool = False,
+) -> Dict[str, Any]:
+    """
+    Get one page of a user's saved recipes, in saved order
+
+    Bookmarks whose recipe has been deleted are dropped as they are found.
+
+    Args:
+        user_id: ID of the user
+        limit: Page size (capped at MAX_PAGE_SIZE)
+        cursor: Cursor returned with the previous page, or None for the first
+        full: Include the instructions text
+
+    Returns:
+        Dictionary with the recipes and the next page cursor
+
+    Raises:
+        ValueError: If the cursor is malformed
+    """
+    limit = max(1, min(limit, MAX_PAGE_SIZE))
+    bookmarks, next_cursor = list_bookmarks_page(user_id, limit, cursor)
+
+    recipe_ids = [bookmark["recipeId"] for bookmark in bookmarks]
+    recipes, dangling = hydrate_recipes(recipe_ids, full=full)
+
+    # Drop bookmarks that point at deleted recipes
+    if dangling:
+        remove_bookmarks(user_id, dangling)
+
+    return {"recipes": recipes, "nextCursor": next_cursor}
+
+
+def migrate_legacy_bookmarks(user: Dict[str, Any]) -> int:
+    """
+    Move a user's legacy savedRecipes array into the bookmarks collection
+
+    Safe to call on every request: it is a no-op once the array is gone.
+
+    Args:
+        user: User document (only `_id` and `savedRecipes` are used)
+
+    Returns:
+        Number of bookmarks migrated
+    """
+    legacy_ids = user.get("savedRecipes")
+    if legacy_ids is None:
+        return 0
+
+    user_id = str(user["_id"])
+    valid = _valid_ids(legacy_ids)
+
+    if valid:
+        # Keep the original save order: later array entries are newer
+        now = datetime.now().timestamp()
+        get_collection("bookmarks").bulk_write(
+            [
+                UpdateOne(
+                    {"userId": user_id, "recipeId": recipe_id},
+                    {
+                        "$setOnInsert": {
+                            "createdAt": datetime.fromtimestamp(
+                                now - (len(valid) - index) / 1000
+                            )
+                        }
+                    },
+                    upsert=True,
+                )
+                for index, recipe_id in enumerate(valid)
+            ],
+            ordered=False,
+        )
+        bump_versions(user_key(user_id, "saved"))
+
+    get_collection("users").update_one(
+        {"_id": user["_id"]}, {"$unset": {"savedRecipes": ""}}
+    )
+    return len(valid)
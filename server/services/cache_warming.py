@@ -0,0 +1,200 @@
+"""
+Off-peak warming of the generation cache for popular pantries
+
+A few hundred ingredient combinations make up most /generate and /search
+traffic. Each process counts the pantries it is asked about in a
+Space-Saving sketch (PANTRY_SKETCH_SIZE counters, so memory stays bounded
+however many distinct pantries arrive) and adds the counts to the
+**pantry_counts** collection once a minute, one document per pantry per day.
+
+During the WARM_CACHE_HOURS window, the warm_caches job takes the most
+requested pantries of the last WARM_CACHE_LOOKBACK_DAYS and, for each one the
+generation cache cannot answer yet, generates a recipe, estimates its
+calories and fetches Spoonacular matches, until WARM_CACHE_TOKEN_BUDGET
+tokens have been spent. Peak-hour requests for those pantries are then
+cache hits.
+"""
+
+import asyncio
+import logging
+import threading
+import time
+from datetime import date, datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+from pymongo import UpdateOne
+
+import api
+from config.database import get_collection
+from config.settings import (
+    PANTRY_SKETCH_SIZE,
+    WARM_CACHE_HOURS,
+    WARM_CACHE_LOOKBACK_DAYS,
+)
+from services.generation_cache import (
+    cache_key,
+    generate_recipe_cached,
+    lookup,
+    normalize_preferences,
+    pantry_keys,
+    store,
+)
+from services.recipe_service import estimate_calories
+from utils.heavy_hitters import SpaceSaving
+
+logger = logging.getLogger(__name__)
+
+# Seconds between writes of the local counts to pantry_counts
+FLUSH_SECONDS = 60
+
+_sketch = SpaceSaving(PANTRY_SKETCH_SIZE)
+_flusher: Optional[threading.Thread] = None
+
+
+def record_pantry(ingredients: List[str], preferences: Optional[str] = None):
+    """Count a pantry a user asked about"""
+    keys = pantry_keys(ingredients)
+    if keys:
+        _sketch.add((tuple(keys), normalize_preferences(preferences)))
+
+
+def flush_pantry_counts() -> int:
+    """
+    Add the counts gathered by this process to pantry_counts
+
+    Returns:
+        Number of pantries written
+    """
+    items = _sketch.drain()
+    if not items:
+        return 0
+
+    day = date.today().isoformat()
+    now = datetime.now()
+    get_collection("pantry_counts").bulk_write(
+        [
+            UpdateOne(
+                {"_id": f"{day}:{cache_key(list(keys), preferences)}"},
+                {
+                    "$inc": {"count": count},
+                    "$set": {"updatedAt": now},
+                    "$setOnInsert": {
+                        "day": day,
+                        "keys": list(keys),
+                        "preferences": preferences,
+                    },
+                },
+                upsert=True,
+            )
+            for (keys, preferences), count, _ in items
+        ],
+        ordered=False,
+    )
+    return len(items)
+
+
+def _flush_loop():
+    while True:
+        time.sleep(FLUSH_SECONDS)
+        try:
+            flush_pantry_counts()
+        except Exception as e:
+            logger.error(f"Could not save pantry counts: {e}")
+
+
+def start_pantry_recorder():
+    """Start the thread that saves pantry counts (once per process)"""
+    global _flusher
+    if _flusher is None:
+        _flusher = threading.Thread(
+            target=_flush_loop, name="pantry-counts", daemon=True
+        )
+        _flusher.start()
+
+
+def top_pantries(
+    limit: int, days: int = WARM_CACHE_LOOKBACK_DAYS
+) -> List[Tuple[List[str], str, int]]:
+    """
+    Most requested pantries over recent days
+
+    Returns:
+        (ingredient keys, preferences, count) tuples, most requested first
+    """
+    since = (date.today() - timedelta(days=days)).isoformat()
+    rows = get_collection("pantry_counts").aggregate(
+        [
+            {"$match": {"day": {"$gte": since}}},
+            {
+                "$group": {
+                    "_id": {"keys": "$keys", "preferences": "$preferences"},
+                    "count": {"$sum": "$count"},
+                }
+            },
+            {"$sort": {"count": -1}},
+            {"$limit": limit},
+        ],
+        allowDiskUse=True,
+    )
+    return [
+        (row["_id"]["keys"], row["_id"]["preferences"], row["count"]) for row in rows
+    ]
+
+
+def off_peak_window(spec: str = WARM_CACHE_HOURS) -> Optional[Tuple[int, int]]:
+    """Parse "start-end" local hours (e.g. "2-6", or "22-4" across midnight)"""
+    if not spec:
+        return None
+    start, end = (int(hour) % 24 for hour in spec.split("-", 1))
+    return start, end
+
+
+def in_window(moment: datetime, window: Tuple[int, int]) -> bool:
+    """Whether a local time falls inside an off-peak window"""
+    start, end = window
+    if start <= end:
+        return start <= moment.hour < end
+    return moment.hour >= start or moment.hour < end
+
+
+def next_window_start(moment: datetime, window: Tuple[int, int]) -> datetime:
+    """Start of the next off-peak window after a local time"""
+    start = moment.replace(hour=window[0], minute=0, second=0, microsecond=0)
+    return start if start > moment else start + timedelta(days=1)
+
+
+async def warm_pantry(keys: List[str], preferences: str) -> str:
+    """
+    Make sure a pantry is answered from the caches
+
+    Returns:
+        "cached" if the generation cache already covered it, else "generated"
+    """
+    # The generation cache reads MongoDB; keep it off the shared event loop
+    if await asyncio.to_thread(lookup, keys, preferences, count=False):
+        return "cached"
+
+    recipe, _ = await generate_recipe_cached(keys, preferences, use_cache=False)
+    if recipe.get("estimatedCalories") is None:
+        calories = await estimate_calories(recipe["name"], recipe["ingredients"])
+        if calories:
+            await asyncio.to_thread(
+                store, keys, preferences, {**recipe, "estimatedCalories": calories}
+            )
+
+    if api.API_KEY:
+        # requests is blocking too
+        await asyncio.to_thread(api.get_recipes_by_ingredients, keys)
+    return "generated"
+
+
+def warming_stats() -> Dict[str, Any]:
+    """Local sketch state, for health checks"""
+    return {
+        "window": WARM_CACHE_HOURS or None,
+        "trackedPantries": len(_sketch),
+        "top": [
+            {"keys": list(keys), "preferences": preferences, "count": count}
+            for (keys, preferences), count, _ in _sketch.top(5)
+        ],
+    }
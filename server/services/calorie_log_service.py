@@ -0,0 +1,117 @@
+"""
+Service for calorie log entries
+
+Entries live in the `calorie_logs` collection, one document per entry,
+read through the (userId, date) index. An entry keeps every field the
+client posted. ISO dates are stored as datetimes so the index orders them,
+with the text the client sent in `dateText`; entry_response() puts that
+text back, so clients get their entries back as they posted them.
+
+Users created before this change kept entries in a `calorieLog` array on
+the user document; migrate_legacy_calorie_log() moves them over on first
+access.
+"""
+
+import hashlib
+from datetime import datetime
+from typing import Any, Dict
+
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from config.database import get_collection
+from services.version_service import bump_versions, user_key
+
+
+def parse_log_date(value: Any) -> Any:
+    """
+    Parse an ISO date as stored by clients
+
+    Returns:
+        A datetime, or the value unchanged if it is not an ISO date string
+    """
+    if isinstance(value, str):
+        try:
+            return datetime.fromisoformat(value.replace("Z", "+00:00"))
+        except ValueError:
+            pass
+    return value
+
+
+def log_entry(user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Build the calorie_logs document for an entry posted by a client
+
+    Args:
+        user_id: ID of the user (string form of the ObjectId)
+        data: The entry as posted (any fields; `_id` and `userId` are ignored)
+
+    Returns:
+        Document to store
+    """
+    entry = {k: v for k, v in data.items() if k not in ("_id", "userId")}
+    entry["userId"] = user_id
+    date = parse_log_date(entry.get("date"))
+    if date is not entry.get("date"):
+        entry["dateText"] = entry["date"]
+        entry["date"] = date
+    return entry
+
+
+def entry_response(entry: Dict[str, Any]) -> Dict[str, Any]:
+    """An entry as the client posted it (pass it without _id and userId)"""
+    if "dateText" in entry:
+        entry["date"] = entry.pop("dateText")
+    return entry
+
+
+def _legacy_entry_id(user_id: str, index: int) -> ObjectId:
+    """
+    Stable ID for a migrated entry, so a repeated migration upserts it
+
+    The ID starts with the user's creation time and then the array index, so
+    migrated entries keep their order and sort before entries added since.
+    """
+    owner = ObjectId(user_id)
+    digest = hashlib.blake2b(f"{user_id}:calorieLog".encode(), digest_size=4)
+    return ObjectId(owner.binary[:4] + index.to_bytes(4, "big") + digest.digest())
+
+
+def migrate_legacy_calorie_log(user_id: str) -> int:
+    """
+    Move a user's legacy calorieLog array into the calorie_logs collection
+
+    Safe to call on every request: it is a no-op once the array is gone, and
+    a migration interrupted (or run twice at once) upserts the same entries.
+
+    Args:
+        user_id: ID of the user (string form of the ObjectId)
+
+    Returns:
+        Number of entries migrated
+    """
+    users = get_collection("users")
+    user = users.find_one(
+        {"_id": ObjectId(user_id), "calorieLog": {"$exists": True}},
+        {"calorieLog": 1},
+    )
+    if user is None:
+        return 0
+
+    entries = [entry for entry in user["calorieLog"] or [] if isinstance(entry, dict)]
+    if entries:
+        get_collection("calorie_logs").bulk_write(
+            [
+                UpdateOne(
+                    {"_id": _legacy_entry_id(user_id, index)},
+                    {"$setOnInsert": log_entry(user_id, entry)},
+                    upsert=True,
+                )
+                for index, entry in enumerate(entries)
+            ],
+            ordered=False,
+        )
+        bump_versions(user_key(user_id, "calories"))
+
+    users.update_one({"_id": user["_id"]}, {"$unset": {"calorieLog": ""}})
+    return len(entries)
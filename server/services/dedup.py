@@ -0,0 +1,309 @@
+"""
+Near-duplicate detection for recipes
+
+AI generations from the same pantry come back nearly identical, so each
+generated recipe is fingerprinted before it is saved. A fingerprint is a
+MinHash signature of the recipe's name words and normalized ingredient keys;
+two signatures agree in a share of positions that estimates the Jaccard
+similarity of those sets.
+
+For lookup, the signature is cut into LSH bands and each band hashed to one
+integer. Recipes with a similarity of 0.8 or more share at least one band
+with high probability, so candidates are found with one indexed `$in`
+query on the `recipe_fingerprints` collection. Candidates are then checked
+against the recipe as currently stored.
+
+A generation that matches an existing recipe at DEDUP_THRESHOLD or above is
+linked to it (the user is added to its `generatedFor` list) instead of being
+inserted. dedup_collection() does the same for recipes saved before this
+check existed, merging each duplicate into the oldest matching recipe.
+"""
+
+import hashlib
+import logging
+import zlib
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+import numpy as np
+from bson import ObjectId
+from pymongo import UpdateOne
+
+from config.database import get_collection
+from config.settings import DEDUP_THRESHOLD
+from services.embeddings import tokenize
+from services.version_service import RECIPES, bump_versions, user_key
+from utils.cache import recipe_cache
+from utils.cdn import purge_recipe
+from utils.ingredients import normalize_ingredients
+
+logger = logging.getLogger(__name__)
+
+# 72 hash functions in 12 bands of 6 rows: a pair with Jaccard similarity s
+# shares a band with probability 1 - (1 - s**6)**12, i.e. ~0.97 at 0.8 but
+# only ~0.17 at 0.5
+NUM_PERM = 72
+BANDS = 12
+ROWS = NUM_PERM // BANDS
+
+# Most candidates checked per lookup
+CANDIDATE_LIMIT = 50
+
+# Recipes per bulk write in the batch job
+BATCH_SIZE = 500
+
+# Fixed seed: fingerprints must be comparable across processes and restarts
+_PRIME = np.uint64((1 << 31) - 1)
+_rng = np.random.default_rng(20240601)
+_A = _rng.integers(1, int(_PRIME), NUM_PERM, dtype=np.uint64)
+_B = _rng.integers(0, int(_PRIME), NUM_PERM, dtype=np.uint64)
+
+SOURCE_AI = "ai"
+
+
+def shingles(recipe: Dict[str, Any]) -> Set[str]:
+    """Name words and ingredient keys that define a recipe for deduplication"""
+    features = {f"n:{word}" for word in tokenize(recipe.get("name") or "")}
+    features.update(
+        f"i:{key}" for key in normalize_ingredients(recipe.get("ingredients") or [])
+    )
+    return features
+
+
+def minhash(features: Set[str]) -> np.ndarray:
+    """MinHash signature (NUM_PERM uint32 values) of a feature set"""
+    if not features:
+        return np.full(NUM_PERM, int(_PRIME), dtype=np.uint32)
+    hashes = np.array([zlib.crc32(f.encode()) for f in features], dtype=np.uint64)
+    # (a * h + b) mod p stays below 2**64 since a, b < 2**31 and h < 2**32
+    permuted = (hashes[:, None] * _A + _B) % _PRIME
+    return permuted.min(axis=0).astype(np.uint32)
+
+
+def band_keys(signature: np.ndarray) -> List[int]:
+    """One signed 64-bit key per LSH band (BSON stores int64)"""
+    keys = []
+    for band in range(BANDS):
+        rows = signature[band * ROWS : (band + 1) * ROWS].tobytes()
+        digest = hashlib.blake2b(rows + bytes([band]), digest_size=8).digest()
+        keys.append(int.from_bytes(digest, "big", signed=True))
+    return keys
+
+
+def fingerprint(recipe: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Fingerprint a recipe's name and ingredients
+
+    Returns:
+        {"minhash": signature bytes, "lsh": band keys}
+    """
+    signature = minhash(shingles(recipe))
+    return {"minhash": signature.tobytes(), "lsh": band_keys(signature)}
+
+
+def similarity(first: bytes, second: bytes) -> float:
+    """Estimated Jaccard similarity of two MinHash signatures"""
+    a = np.frombuffer(first, dtype=np.uint32)
+    b = np.frombuffer(second, dtype=np.uint32)
+    return float(np.mean(a == b))
+
+
+def save_fingerprint(recipe_id, fp: Dict[str, Any]):
+    """Store a recipe's fingerprint for later lookups"""
+    get_collection("recipe_fingerprints").update_one(
+        {"_id": ObjectId(str(recipe_id))},
+        {"$set": {**fp, "updatedAt": datetime.now()}},
+        upsert=True,
+    )
+
+
+def find_duplicate(
+    fp: Dict[str, Any],
+    before: Optional[ObjectId] = None,
+    threshold: float = DEDUP_THRESHOLD,
+) -> Optional[Tuple[str, float]]:
+    """
+    Find an existing recipe that is a near duplicate
+
+    Args:
+        fp: Fingerprint of the new recipe
+        before: Only consider recipes with a smaller (older) ID
+        threshold: Minimum estimated similarity
+
+    Returns:
+        (recipe ID, similarity) of the closest match, or None
+    """
+    fingerprints = get_collection("recipe_fingerprints")
+    query: Dict[str, Any] = {"lsh": {"$in": fp["lsh"]}}
+    if before is not None:
+        query["_id"] = {"$lt": before}
+
+    candidates = sorted(
+        (
+            (similarity(fp["minhash"], candidate["minhash"]), candidate)
+            for candidate in fingerprints.find(query).limit(CANDIDATE_LIMIT)
+        ),
+        key=lambda pair: pair[0],
+        reverse=True,
+    )
+
+    for estimate, candidate in candidates:
+        if estimate < threshold:
+            break
+
+        # The recipe may have been edited or deleted since it was fingerprinted
+        recipe = get_collection("recipes").find_one(
+            {"_id": candidate["_id"]}, {"name": 1, "ingredients": 1}
+        )
+        if recipe is None:
+            fingerprints.delete_one({"_id": candidate["_id"]})
+            continue
+        current = fingerprint(recipe)
+        if current["minhash"] != candidate["minhash"]:
+            save_fingerprint(candidate["_id"], current)
+            estimate = similarity(fp["minhash"], current["minhash"])
+            if estimate < threshold:
+                continue
+        return str(candidate["_id"]), estimate
+    return None
+
+
+def link_duplicate(recipe_id: str, user_ids: List[str]):
+    """Record that users generated (a duplicate of) an existing recipe"""
+    user_ids = [user_id for user_id in user_ids if user_id]
+    get_collection("recipes").update_one(
+        {"_id": ObjectId(recipe_id)},
+        {
+            "$addToSet": {"generatedFor": {"$each": user_ids}},
+            "$inc": {"duplicateCount": 1},
+        },
+    )
+    recipe_cache.delete(recipe_id)
+
+
+def _move_bookmarks(duplicate_id: str, canonical_id: str) -> Set[str]:
+    """Point bookmarks of a duplicate at the canonical recipe"""
+    bookmarks_collection = get_collection("bookmarks")
+    bookmarks = list(
+        bookmarks_collection.find(
+            {"recipeId": duplicate_id}, {"userId": 1, "createdAt": 1}
+        )
+    )
+    if not bookmarks:
+        return set()
+
+    # Upsert rather than update: the user may have saved both recipes
+    bookmarks_collection.bulk_write(
+        [
+            UpdateOne(
+                {"userId": bookmark["userId"], "recipeId": canonical_id},
+                {"$setOnInsert": {"createdAt": bookmark.get("createdAt")}},
+                upsert=True,
+            )
+            for bookmark in bookmarks
+        ],
+        ordered=False,
+    )
+    bookmarks_collection.delete_many({"recipeId": duplicate_id})
+    return {bookmark["userId"] for bookmark in bookmarks}
+
+
+def merge_duplicate(duplicate: Dict[str, Any], canonical_id: str) -> Set[str]:
+    """
+    Fold a duplicate recipe into the canonical one and delete it
+
+    Args:
+        duplicate: Duplicate recipe document (needs _id, createdBy,
+            generatedFor)
+        canonical_id: Recipe to keep
+
+    Returns:
+        IDs of users whose saved recipes changed
+    """
+    duplicate_id = str(duplicate["_id"])
+    creators = [duplicate.get("createdBy"), *duplicate.get("generatedFor", [])]
+    link_duplicate(canonical_id, creators)
+
+    users = _move_bookmarks(duplicate_id, canonical_id)
+    get_collection("recipes").delete_one({"_id": duplicate["_id"]})
+    get_collection("recipe_fingerprints").delete_one({"_id": duplicate["_id"]})
+    recipe_cache.delete(duplicate_id)
+    purge_recipe(duplicate_id)
+    purge_recipe(canonical_id)
+    return users
+
+
+def dedup_collection(
+    ai_only: bool = True,
+    dry_run: bool = False,
+    after: Optional[str] = None,
+    limit: int = 0,
+) -> Dict[str, Any]:
+    """
+    Fingerprint recipes and merge near duplicates into the oldest copy
+
+    Recipes are visited oldest first (by ObjectId), and each is compared
+    only with older ones, so the recipe kept is always the first of a group.
+
+    Args:
+        ai_only: Only merge away recipes marked as AI-generated; recipes
+            users wrote themselves are fingerprinted but never deleted
+        dry_run: Count duplicates without changing any recipe
+        after: Resume after this recipe ID
+        limit: Maximum number of recipes to visit (0 for all)
+
+    Returns:
+        Counts of recipes scanned, fingerprinted and merged (or mergeable),
+        and "lastId", the last recipe visited
+    """
+    fingerprints = get_collection("recipe_fingerprints")
+    stats: Dict[str, Any] = {"scanned": 0, "fingerprinted": 0, "merged": 0}
+    users: Set[str] = set()
+    pending: List[UpdateOne] = []
+
+    def flush():
+        # Fingerprints are written even in a dry run; they change no recipe
+        if pending:
+            fingerprints.bulk_write(pending, ordered=False)
+        pending.clear()
+
+    query = {"_id": {"$gt": ObjectId(after)}} if after else {}
+    cursor = get_collection("recipes").find(
+        query,
+        {"name": 1, "ingredients": 1, "createdBy": 1, "generatedFor": 1, "source": 1},
+        sort=[("_id", 1)],
+        limit=limit,
+    )
+    last_id = None
+    for recipe in cursor:
+        stats["scanned"] += 1
+        last_id = recipe["_id"]
+        fp = fingerprint(recipe)
+
+        if not ai_only or recipe.get("source") == SOURCE_AI:
+            # Earlier fingerprints must be written before they can match
+            flush()
+            duplicate = find_duplicate(fp, before=recipe["_id"])
+            if duplicate:
+                stats["merged"] += 1
+                if not dry_run:
+                    users |= merge_duplicate(recipe, duplicate[0])
+                continue
+
+        pending.append(
+            UpdateOne(
+                {"_id": recipe["_id"]},
+                {"$set": {**fp, "updatedAt": datetime.now()}},
+                upsert=True,
+            )
+        )
+        stats["fingerprinted"] += 1
+        if len(pending) >= BATCH_SIZE:
+            flush()
+    flush()
+
+    if stats["merged"] and not dry_run:
+        bump_versions(RECIPES, *(user_key(user_id, "saved") for user_id in users))
+    stats["lastId"] = str(last_id) if last_id else None
+    logger.info(f"Recipe dedup {'(dry run) ' if dry_run else ''}pass: {stats}")
+    return stats
@@ -0,0 +1,226 @@
+"""
+Recipe text embeddings for semantic search
+
+Two embedders share one interface:
+
+- ModelEmbedder runs a small sentence-transformers model on the CPU
+  (EMBEDDING_MODEL, e.g. "all-MiniLM-L6-v2") when the package is installed.
+- HashingEmbedder needs no model: words and word pairs from the name,
+  ingredients and instructions are weighted by TF-IDF and folded into
+  EMBEDDING_DIM dimensions with the hashing trick. Document frequencies are
+  counted in hashed buckets as recipes are added, so the vocabulary is
+  open-ended and new recipes can be added without refitting.
+
+Both return L2-normalized float32 vectors, so a dot product is the cosine
+similarity.
+"""
+
+import logging
+import math
+import re
+import zlib
+from functools import lru_cache
+from typing import Any, Dict, Iterable, List, Optional
+
+import numpy as np
+
+from config.settings import EMBEDDING_DIM, EMBEDDING_MODEL
+from utils.ingredients import normalize_ingredients, singularize
+
+logger = logging.getLogger(__name__)
+
+# Field weights for hashed embeddings: names say the most about a dish
+NAME_WEIGHT = 3.0
+INGREDIENT_WEIGHT = 2.0
+INSTRUCTION_WEIGHT = 0.5
+
+# Hashed document-frequency buckets (2**20 int32 counters = 4 MB), indexed
+# by the top bits of a feature's hash
+DF_BUCKET_BITS = 20
+DF_SHIFT = 32 - DF_BUCKET_BITS
+
+# Words that carry no meaning in recipe text or search queries
+STOPWORDS = {
+    "a", "about", "add", "an", "and", "any", "as", "at", "be", "bit", "but",
+    "by", "can", "dish", "for", "from", "has", "have", "in", "into", "is", "it",
+    "its", "like", "make", "me", "minute", "minutes", "my", "of", "on", "or",
+    "recipe", "recipes", "similar", "so", "some", "something", "step", "that",
+    "the", "then", "this", "to", "until", "up", "use", "want", "with", "you",
+    "your",
+}  # fmt: skip
+
+_WORD = re.compile(r"[a-z]+")
+
+
+def tokenize(text: str) -> List[str]:
+    """Lowercase content words of a text, singularized"""
+    return [
+        singularize(word)
+        for word in _WORD.findall(text.lower())
+        if len(word) > 1 and word not in STOPWORDS
+    ]
+
+
+@lru_cache(maxsize=1 << 18)
+def _feature_hash(feature: str) -> int:
+    return zlib.crc32(feature.encode())
+
+
+class HashingEmbedder:
+    """Hashed TF-IDF embeddings over words and adjacent word pairs"""
+
+    def __init__(self, dim: int = EMBEDDING_DIM):
+        self.dim = dim
+        self.name = f"hashing-tfidf-v1-{dim}"
+        self.doc_freq = np.zeros(1 << DF_BUCKET_BITS, dtype=np.int32)
+        self.docs = 0
+
+    @staticmethod
+    def _add_words(features: Dict[str, float], words: List[str], weight: float):
+        for index, word in enumerate(words):
+            features[word] = features.get(word, 0.0) + weight
+            if index:
+                pair = f"{words[index - 1]} {word}"
+                features[pair] = features.get(pair, 0.0) + weight
+
+    def recipe_features(self, recipe: Dict[str, Any]) -> Dict[str, float]:
+        """Weighted term counts for a recipe document"""
+        features: Dict[str, float] = {}
+        self._add_words(features, tokenize(recipe.get("name") or ""), NAME_WEIGHT)
+        for key in normalize_ingredients(recipe.get("ingredients") or []):
+            self._add_words(features, key.split(), INGREDIENT_WEIGHT)
+        instructions = recipe.get("instructions") or ""
+        if isinstance(instructions, list):
+            instructions = " ".join(map(str, instructions))
+        self._add_words(features, tokenize(instructions), INSTRUCTION_WEIGHT)
+        return features
+
+    def query_features(self, text: str) -> Dict[str, float]:
+        """Weighted term counts for a free-text query"""
+        features: Dict[str, float] = {}
+        self._add_words(features, tokenize(text), 1.0)
+        return features
+
+    def observe(self, recipes: Iterable[Dict[str, Any]]):
+        """Count recipes toward document frequencies"""
+        buckets = []
+        for recipe in recipes:
+            features = self.recipe_features(recipe)
+            buckets.extend({_feature_hash(feature) >> DF_SHIFT for feature in features})
+            self.docs += 1
+        np.add.at(self.doc_freq, np.asarray(buckets, dtype=np.int64), 1)
+
+    def _embed(self, feature_sets: List[Dict[str, float]]) -> np.ndarray:
+        cells, values = [], []
+        for row, features in enumerate(feature_sets):
+            for feature, count in features.items():
+                h = _feature_hash(feature)
+                df = self.doc_freq[h >> DF_SHIFT]
+                idf = math.log((1 + self.docs) / (1 + df)) + 1
+                cells.append(row * self.dim + h % self.dim)
+                # Signed hashing keeps collisions from adding up
+                sign = 1.0 if (h >> 8) & 1 else -1.0
+                values.append(sign * (1 + math.log(count)) * idf)
+
+        size = len(feature_sets) * self.dim
+        vectors = np.bincount(cells, weights=values, minlength=size)
+        return normalize(vectors.reshape(-1, self.dim).astype(np.float32))
+
+    def embed_recipes(self, recipes: List[Dict[str, Any]]) -> np.ndarray:
+        """Embed recipe documents (name, ingredients, instructions)"""
+        return self._embed([self.recipe_features(recipe) for recipe in recipes])
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query"""
+        return self._embed([self.query_features(text)])[0]
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Arrays to persist with a snapshot"""
+        return {"doc_freq": self.doc_freq, "docs": np.asarray(self.docs)}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        """Restore document frequencies saved by state()"""
+        self.doc_freq = np.array(state["doc_freq"], dtype=np.int32)
+        self.docs = int(state["docs"])
+
+
+@lru_cache(maxsize=None)
+def _load_model(model_name: str):
+    """
+    Load a sentence-transformers model
+
+    The package (and torch with it) is imported here, only when a model is
+    configured, since importing it takes seconds.
+
+    Raises:
+        ImportError: If sentence-transformers is not installed
+    """
+    from sentence_transformers import SentenceTransformer
+
+    logger.info(f"Loading embedding model {model_name}")
+    return SentenceTransformer(model_name, device="cpu")
+
+
+class ModelEmbedder:
+    """Embeddings from a local sentence-transformers model"""
+
+    def __init__(self, model_name: str):
+        self.model = _load_model(model_name)
+        self.dim = self.model.get_sentence_embedding_dimension()
+        self.name = f"model-{model_name}"
+
+    @staticmethod
+    def recipe_text(recipe: Dict[str, Any]) -> str:
+        ingredients = ", ".join(normalize_ingredients(recipe.get("ingredients") or []))
+        instructions = str(recipe.get("instructions") or "")[:500]
+        return f"{recipe.get('name') or ''}. {ingredients}. {instructions}"
+
+    def observe(self, recipes: Iterable[Dict[str, Any]]):
+        """Models need no corpus statistics"""
+
+    def embed_recipes(self, recipes: List[Dict[str, Any]]) -> np.ndarray:
+        """Embed recipe documents (name, ingredients, instructions)"""
+        return self._encode([self.recipe_text(recipe) for recipe in recipes])
+
+    def embed_query(self, text: str) -> np.ndarray:
+        """Embed a search query"""
+        return self._encode([text])[0]
+
+    def _encode(self, texts: List[str]) -> np.ndarray:
+        vectors = self.model.encode(
+            texts, batch_size=64, normalize_embeddings=True, convert_to_numpy=True
+        )
+        return vectors.astype(np.float32, copy=False)
+
+    def state(self) -> Dict[str, np.ndarray]:
+        """Models keep no corpus state"""
+        return {}
+
+    def load_state(self, state: Dict[str, np.ndarray]):
+        """Models keep no corpus state"""
+
+
+def normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale rows to unit length (zero rows stay zero)"""
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.maximum(norms, 1e-12)
+
+
+def make_embedder(model_name: Optional[str] = EMBEDDING_MODEL):
+    """
+    Create an embedder: the configured model if available, else hashing
+
+    Each index gets its own embedder, since hashed embeddings carry the
+    document frequencies of the recipes that index was built from.
+    """
+    if model_name:
+        try:
+            return ModelEmbedder(model_name)
+        except ImportError:
+            logger.warning(
+                "EMBEDDING_MODEL is set but sentence-transformers is not "
+                "installed; using hashed embeddings"
+            )
+        except Exception as e:
+            logger.error(f"Could not load embedding model {model_name}: {e}")
+    return HashingEmbedder()
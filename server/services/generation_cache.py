@@ -0,0 +1,481 @@
+"""
+Cache of AI recipe generations by pantry
+
+Users describe the same pantry in many ways ("chicken breast, rice, garlic
+cloves" and "chicken, white rice, garlic"), so generations are cached in two
+tiers in the **generation_cache** collection:
+
+1. Exact: the key is a hash of the normalized ingredient keys and the
+   preferences, so reordering, quantities and plurals still hit.
+2. Semantic: the normalized ingredient list is embedded and compared with
+   every cached pantry that has the same preferences, using a small vector
+   index kept in memory in each process. Candidates at or above
+   GENERATION_CACHE_THRESHOLD cosine similarity are re-ranked by how many
+   ingredients they share (counting "chicken" and "chicken breast" as the
+   same), and one is served only if that overlap is at least MIN_OVERLAP.
+
+Preferences are matched exactly rather than embedded: "vegan" and
+"vegetarian" are close in meaning but a recipe for one is not a safe answer
+for the other.
+
+A sample of semantic hits (GENERATION_CACHE_AUDIT_RATE) is written to
+**generation_cache_audit** with both pantries and scores, so false hits can
+be reviewed and the threshold tuned.
+
+When generation fails (OpenAI is down or its circuit breaker is open),
+generate_recipe_cached() falls back to the exact cache, then the semantic
+cache, then the best-covered existing recipe from the recommender.
+"""
+
+import asyncio
+import hashlib
+import logging
+import random
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+from bson import ObjectId
+
+from config.database import get_collection
+from config.settings import (
+    GENERATION_CACHE_AUDIT_RATE,
+    GENERATION_CACHE_MAX_ENTRIES,
+    GENERATION_CACHE_THRESHOLD,
+    GENERATION_CACHE_TTL,
+)
+from services import recommender
+from services.embeddings import make_embedder
+from services.recipe_service import generate_recipe
+from utils.ingredients import normalize_ingredients
+
+logger = logging.getLogger(__name__)
+
+# Shortest interval between syncs of the in-memory index (seconds)
+REFRESH_SECONDS = 5
+
+# Margin for clock differences between app servers when syncing by timestamp
+SYNC_SKEW = timedelta(seconds=5)
+
+# Semantic candidates re-ranked per lookup
+CANDIDATES = 10
+
+# Least share of ingredients two pantries must have in common
+MIN_OVERLAP = 0.75
+
+EXACT = "exact"
+SEMANTIC = "semantic"
+RECOMMENDER = "recommender"
+
+# Fields of an existing recipe served in place of a generation
+RECIPE_FIELDS = {"name": 1, "ingredients": 1, "instructions": 1, "estimatedCalories": 1}
+
+
+def pantry_keys(ingredients: List[str]) -> List[str]:
+    """Sorted, deduplicated ingredient keys of a pantry"""
+    return sorted(set(normalize_ingredients(ingredients)))
+
+
+def normalize_preferences(preferences: Optional[str]) -> str:
+    """Preferences compared case- and whitespace-insensitively"""
+    return " ".join((preferences or "").lower().split())
+
+
+def cache_key(keys: List[str], preferences: str) -> str:
+    """Exact-tier key of a normalized pantry"""
+    text = preferences + "\n" + "\n".join(keys)
+    return hashlib.sha1(text.encode()).hexdigest()
+
+
+def overlap(first: List[str], second: List[str]) -> float:
+    """
+    Jaccard similarity of two pantries, matching ingredients loosely
+
+    Two keys match when the words of one are contained in the other
+    ("chicken" and "chicken breast", "rice" and "white rice").
+    """
+    if not first or not second:
+        return 0.0
+    first_words = [set(key.split()) for key in first]
+    second_words = [set(key.split()) for key in second]
+
+    def matched(words, others):
+        return sum(
+            any(word <= other or other <= word for other in others) for word in words
+        )
+
+    common = min(
+        matched(first_words, second_words), matched(second_words, first_words)
+    )
+    return common / (len(first) + len(second) - common)
+
+
+class SemanticIndex:
+    """In-memory vectors of cached pantries, synced from the collection"""
+
+    def __init__(self):
+        self.embedder = make_embedder()
+        self.vectors = np.zeros((0, self.embedder.dim), dtype=np.float32)
+        self.ids: List[str] = []
+        self.keys: List[List[str]] = []
+        self.preferences: List[str] = []
+        self.created: List[datetime] = []
+        self.synced_at: Optional[datetime] = None
+        self.checked = 0.0
+        self.lock = threading.Lock()
+
+    def embed(self, keys: List[str]) -> np.ndarray:
+        """Vector of a normalized pantry"""
+        return self.embedder.embed_query(", ".join(keys))
+
+    def _append(self, entries: List[Dict[str, Any]]):
+        if not entries:
+            return
+        vectors = np.stack([self.embed(entry["keys"]) for entry in entries])
+        self.vectors = np.concatenate([self.vectors, vectors])
+        for entry in entries:
+            self.ids.append(entry["_id"])
+            self.keys.append(entry["keys"])
+            self.preferences.append(entry["preferences"])
+            self.created.append(entry["createdAt"])
+
+    def _trim(self):
+        """Drop expired entries and the oldest beyond the size limit"""
+        cutoff = datetime.now() - timedelta(seconds=GENERATION_CACHE_TTL)
+        keep = [
+            row for row, created in enumerate(self.created) if created >= cutoff
+        ][-GENERATION_CACHE_MAX_ENTRIES:]
+        if len(keep) == len(self.ids):
+            return
+        self.vectors = self.vectors[keep]
+        self.ids = [self.ids[row] for row in keep]
+        self.keys = [self.keys[row] for row in keep]
+        self.preferences = [self.preferences[row] for row in keep]
+        self.created = [self.created[row] for row in keep]
+
+    def sync(self):
+        """Add entries cached by any process since the last sync"""
+        if time.monotonic() - self.checked < REFRESH_SECONDS:
+            return
+        with self.lock:
+            if time.monotonic() - self.checked < REFRESH_SECONDS:
+                return
+            query = (
+                {"createdAt": {"$gt": self.synced_at - SYNC_SKEW}}
+                if self.synced_at
+                else {}
+            )
+            entries = list(
+                get_collection("generation_cache")
+                .find(query, {"keys": 1, "preferences": 1, "createdAt": 1})
+                .sort("createdAt", -1)
+                .limit(GENERATION_CACHE_MAX_ENTRIES)
+            )
+            entries.reverse()
+            known = set(self.ids)
+            self._append([entry for entry in entries if entry["_id"] not in known])
+            if entries:
+                self.synced_at = entries[-1]["createdAt"]
+            self._trim()
+            self.checked = time.monotonic()
+
+    def add(self, entry: Dict[str, Any]):
+        """Add an entry this process just cached"""
+        with self.lock:
+            if entry["_id"] not in self.ids:
+                self._append([entry])
+
+    def remove(self, entry_id: str):
+        """Forget an entry that no longer exists"""
+        with self.lock:
+            if entry_id in self.ids:
+                row = self.ids.index(entry_id)
+                keep = [index for index in range(len(self.ids)) if index != row]
+                self.vectors = self.vectors[keep]
+                self.ids = [self.ids[index] for index in keep]
+                self.keys = [self.keys[index] for index in keep]
+                self.preferences = [self.preferences[index] for index in keep]
+                self.created = [self.created[index] for index in keep]
+
+    def nearest(
+        self, keys: List[str], preferences: str
+    ) -> List[Tuple[str, List[str], float]]:
+        """
+        Cached pantries with the same preferences, most similar first
+
+        Returns:
+            Up to CANDIDATES (entry ID, keys, cosine similarity) at or above
+            GENERATION_CACHE_THRESHOLD
+        """
+        query = self.embed(keys)
+        with self.lock:
+            vectors, ids = self.vectors, list(self.ids)
+            entry_keys = list(self.keys)
+            other = np.array([p != preferences for p in self.preferences], dtype=bool)
+        if not ids:
+            return []
+
+        scores = vectors @ query
+        scores[other] = -1.0
+        top = np.argsort(-scores)[:CANDIDATES]
+        return [
+            (ids[row], entry_keys[row], float(scores[row]))
+            for row in top.tolist()
+            if scores[row] >= GENERATION_CACHE_THRESHOLD
+        ]
+
+
+_index: Optional[SemanticIndex] = None
+_index_lock = threading.Lock()
+_stats = {
+    "lookups": 0,
+    "exactHits": 0,
+    "semanticHits": 0,
+    "stored": 0,
+    "audited": 0,
+    "fallbacks": 0,
+}
+_stats_lock = threading.Lock()
+
+
+def _count(field: str):
+    with _stats_lock:
+        _stats[field] += 1
+
+
+def get_index() -> SemanticIndex:
+    """The process's semantic index, synced with the collection"""
+    global _index
+    if _index is None:
+        with _index_lock:
+            if _index is None:
+                _index = SemanticIndex()
+    _index.sync()
+    return _index
+
+
+def _load(entry_id: str, count: bool = True) -> Optional[Dict[str, Any]]:
+    """Cached recipe for an entry, counting the hit"""
+    entry = get_collection("generation_cache").find_one_and_update(
+        {"_id": entry_id}, {"$inc": {"hits": int(count)}}, {"recipe": 1}
+    )
+    return entry["recipe"] if entry else None
+
+
+def _audit(
+    keys: List[str],
+    preferences: str,
+    entry_id: str,
+    cached_keys: List[str],
+    similarity: float,
+    shared: float,
+):
+    """Record a semantic hit for review"""
+    try:
+        get_collection("generation_cache_audit").insert_one(
+            {
+                "keys": keys,
+                "preferences": preferences,
+                "entryId": entry_id,
+                "cachedKeys": cached_keys,
+                "similarity": similarity,
+                "overlap": shared,
+                "createdAt": datetime.now(),
+            }
+        )
+        _count("audited")
+    except Exception as e:
+        logger.error(f"Could not record generation cache audit sample: {e}")
+
+
+def lookup(
+    ingredients: List[str],
+    preferences: Optional[str] = None,
+    count: bool = True,
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Find a cached generation for a pantry
+
+    Args:
+        ingredients: Pantry as entered by the user
+        preferences: Dietary preferences or requirements
+        count: False for internal checks that should not count toward the
+            hit rate (or audit samples)
+
+    Returns:
+        (recipe data, {"tier": "exact" | "semantic", "similarity": float}),
+        or None on a miss
+    """
+    keys = pantry_keys(ingredients)
+    preferences = normalize_preferences(preferences)
+    if not keys:
+        return None
+    if count:
+        _count("lookups")
+
+    # Exact tier
+    recipe = _load(cache_key(keys, preferences), count)
+    if recipe is not None:
+        if count:
+            _count("exactHits")
+        return recipe, {"tier": EXACT, "similarity": 1.0}
+
+    # Semantic tier: re-rank by shared ingredients, best first
+    index = get_index()
+    candidates = sorted(
+        (
+            (overlap(keys, entry_keys), similarity, entry_id, entry_keys)
+            for entry_id, entry_keys, similarity in index.nearest(keys, preferences)
+        ),
+        reverse=True,
+    )
+    for shared, similarity, entry_id, entry_keys in candidates:
+        if shared < MIN_OVERLAP:
+            break
+        recipe = _load(entry_id, count)
+        if recipe is None:
+            # Expired since the last sync
+            index.remove(entry_id)
+            continue
+
+        if count:
+            _count("semanticHits")
+        if count and random.random() < GENERATION_CACHE_AUDIT_RATE:
+            _audit(keys, preferences, entry_id, entry_keys, similarity, shared)
+        return recipe, {"tier": SEMANTIC, "similarity": round(similarity, 4)}
+    return None
+
+
+def store(
+    ingredients: List[str], preferences: Optional[str], recipe: Dict[str, Any]
+):
+    """Cache a generated recipe for a pantry"""
+    keys = pantry_keys(ingredients)
+    preferences = normalize_preferences(preferences)
+    if not keys:
+        return
+
+    entry = {
+        "_id": cache_key(keys, preferences),
+        "keys": keys,
+        "preferences": preferences,
+        "createdAt": datetime.now(),
+    }
+    get_collection("generation_cache").update_one(
+        {"_id": entry["_id"]},
+        {"$set": {**entry, "recipe": recipe}, "$setOnInsert": {"hits": 0}},
+        upsert=True,
+    )
+    get_index().add(entry)
+    _count("stored")
+
+
+def existing_recipe(
+    ingredients: List[str],
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    The existing recipe the pantry covers best, as a last-resort answer
+
+    Returns:
+        (recipe data, {"tier": "recommender", "similarity": coverage}), or
+        None if no recipe uses any of the ingredients
+    """
+    for match in recommender.recommend(ingredients, limit=3):
+        if match["coverage"] <= 0:
+            break
+        recipe = get_collection("recipes").find_one(
+            {"_id": ObjectId(match["recipeId"])}, RECIPE_FIELDS
+        )
+        if recipe:
+            recipe.pop("_id")
+            return recipe, {"tier": RECOMMENDER, "similarity": match["coverage"]}
+    return None
+
+
+def fallback(
+    ingredients: List[str], preferences: Optional[str], tried_cache: bool
+) -> Optional[Tuple[Dict[str, Any], Dict[str, Any]]]:
+    """
+    Best available answer when generation is unavailable
+
+    Tries the exact and semantic cache tiers (unless already tried), then
+    the recommender. The recommender ignores dietary preferences, so it is
+    only used when there are none.
+    """
+    hit = None
+    if not tried_cache:
+        hit = lookup(ingredients, preferences, count=False)
+    if hit is None and not normalize_preferences(preferences):
+        hit = existing_recipe(ingredients)
+    if hit:
+        _count("fallbacks")
+        hit[1]["fallback"] = True
+    return hit
+
+
+async def generate_recipe_cached(
+    ingredients: List[str],
+    preferences: Optional[str] = None,
+    use_cache: bool = True,
+) -> Tuple[Dict[str, Any], Optional[Dict[str, Any]]]:
+    """
+    Generate a recipe, answering from the cache when possible
+
+    Args:
+        ingredients: Pantry as entered by the user
+        preferences: Dietary preferences or requirements
+        use_cache: False to generate even on a cache hit (the result is
+            still cached, and the cache is still a fallback)
+
+    Returns:
+        (recipe data, cache hit details or None if freshly generated); hit
+        details have "fallback": True when generation failed
+
+    Raises:
+        ValueError: If generation fails and there is no fallback
+        CircuitOpenError: If OpenAI is unavailable and there is no fallback
+    """
+    # lookup, fallback and store block on MongoDB and the semantic index;
+    # run them in threads so the shared event loop keeps serving
+    if use_cache:
+        try:
+            hit = await asyncio.to_thread(lookup, ingredients, preferences)
+        except Exception as e:
+            logger.error(f"Generation cache lookup failed: {e}")
+            hit = None
+        if hit:
+            return hit
+
+    try:
+        recipe = await generate_recipe(ingredients, preferences)
+    except Exception as e:
+        try:
+            hit = await asyncio.to_thread(
+                fallback, ingredients, preferences, tried_cache=use_cache
+            )
+        except Exception as fallback_error:
+            logger.error(f"Generation fallback failed: {fallback_error}")
+            hit = None
+        if hit is None:
+            raise
+        logger.warning(f"Generation failed ({e}); answering from {hit[1]['tier']}")
+        return hit
+
+    try:
+        await asyncio.to_thread(store, ingredients, preferences, recipe)
+    except Exception as e:
+        logger.error(f"Could not cache generated recipe: {e}")
+    return recipe, None
+
+
+def cache_stats() -> Dict[str, Any]:
+    """Hit counts and index size, for health checks"""
+    with _stats_lock:
+        stats = dict(_stats)
+    hits = stats["exactHits"] + stats["semanticHits"]
+    stats["hitRate"] = round(hits / max(stats["lookups"], 1), 4)
+    stats["entries"] = len(_index.ids) if _index else 0
+    stats["threshold"] = GENERATION_CACHE_THRESHOLD
+    return stats
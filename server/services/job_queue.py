@@ -0,0 +1,542 @@
+"""
+Background job queue backed by MongoDB
+
+Slow work (AI generation, calorie backfills, ...) is enqueued as a document
+in the `jobs` collection and run by worker threads, so request threads
+return immediately with a job ID. Any process that imports this module and
+calls start_workers() can run jobs, so throughput scales by adding worker
+threads or processes (see worker.py).
+
+Jobs are claimed atomically with find_one_and_update, highest priority
+first, and hold a lease while running. The worker renews the lease while
+the handler runs, so a long job keeps it however long it takes. A job that
+fails is retried with exponential backoff until it runs out of attempts. A
+job whose worker died mid-run stops being renewed and is requeued once its
+lease expires. Finished jobs are removed by a
+TTL index after JOB_RETENTION_SECONDS.
+
+Handlers are registered per job type with @job_handler and may be plain or
+async functions; async handlers run on the shared event loop.
+
+cancel_job() cancels a queued job outright. A running job is flagged, and
+its worker cancels the handler's coroutine (and any upstream request it is
+awaiting) the next time it checks; plain handlers run to completion.
+"""
+
+import asyncio
+import logging
+import os
+import random
+import socket
+import threading
+from contextlib import contextmanager
+from concurrent.futures import TimeoutError as FutureTimeoutError
+from dataclasses import dataclass
+from datetime import datetime, timedelta
+from typing import Any, Callable, Dict, List, Optional
+
+from bson import ObjectId
+from pymongo import ReturnDocument
+
+from config.database import get_collection
+from config.settings import (
+    JOB_LEASE_SECONDS,
+    JOB_MAX_ATTEMPTS,
+    JOB_POLL_INTERVAL,
+    JOB_RETENTION_SECONDS,
+    JOB_RETRY_BASE_SECONDS,
+)
+from utils import async_runner
+
+logger = logging.getLogger(__name__)
+
+# Job states
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+CANCELLED = "cancelled"
+TERMINAL_STATES = (SUCCEEDED, FAILED, CANCELLED)
+
+# Fields returned to clients
+PUBLIC_FIELDS = {
+    "type": 1,
+    "status": 1,
+    "priority": 1,
+    "attempts": 1,
+    "maxAttempts": 1,
+    "result": 1,
+    "error": 1,
+    "createdAt": 1,
+    "startedAt": 1,
+    "finishedAt": 1,
+    "cancelRequested": 1,
+}
+
+# How often (in polls) each worker looks for jobs with expired leases
+RECOVERY_EVERY_POLLS = 30
+
+# Lease renewals per JOB_LEASE_SECONDS while a job runs; more than one, so
+# a renewal that fails can be retried before the lease runs out
+LEASE_RENEWALS_PER_LEASE = 3
+
+
+class PermanentJobError(Exception):
+    """Raised by a handler for failures that retrying cannot fix"""
+
+
+class JobCancelled(Exception):
+    """Raised in the worker when a running job was cancelled"""
+
+
+@dataclass
+class JobHandler:
+    """A registered job type"""
+
+    func: Callable[[Dict[str, Any]], Any]
+    priority: int = 0
+    max_attempts: int = JOB_MAX_ATTEMPTS
+
+
+_handlers: Dict[str, JobHandler] = {}
+
+# Woken on enqueue so local workers pick up new jobs without waiting a poll
+_wakeup = threading.Event()
+
+# Per-job events set when a job finishes in this process
+_finished: Dict[str, threading.Event] = {}
+_finished_lock = threading.Lock()
+
+_workers: List[threading.Thread] = []
+_stop = threading.Event()
+
+
+def job_handler(job_type: str, priority: int = 0, max_attempts: int = JOB_MAX_ATTEMPTS):
+    """
+    Register a function as the handler for a job type
+
+    Args:
+        job_type: Name used when enqueueing
+        priority: Default priority (higher runs first)
+        max_attempts: Attempts before the job is marked failed
+    """
+
+    def decorator(func):
+        _handlers[job_type] = JobHandler(func, priority, max_attempts)
+        return func
+
+    return decorator
+
+
+def enqueue(
+    job_type: str,
+    payload: Dict[str, Any],
+    user_id: Optional[str] = None,
+    priority: Optional[int] = None,
+    delay: float = 0,
+) -> str:
+    """
+    Add a job to the queue
+
+    Args:
+        job_type: Registered job type
+        payload: JSON-compatible handler input
+        user_id: Owner of the job (only they can read its status)
+        priority: Overrides the job type's default priority
+        delay: Seconds before the job may run
+
+    Returns:
+        The job ID
+
+    Raises:
+        KeyError: If no handler is registered for job_type
+    """
+    handler = _handlers[job_type]
+    now = datetime.now()
+
+    result = get_collection("jobs").insert_one(
+        {
+            "type": job_type,
+            "payload": payload,
+            "userId": user_id,
+            "status": QUEUED,
+            "priority": handler.priority if priority is None else priority,
+            "attempts": 0,
+            "maxAttempts": handler.max_attempts,
+            "runAt": now + timedelta(seconds=delay),
+            "createdAt": now,
+        }
+    )
+    _wakeup.set()
+    return str(result.inserted_id)
+
+
+def get_job(job_id: str, user_id: Optional[str] = None) -> Optional[Dict[str, Any]]:
+    """
+    Get a job's public status
+
+    Args:
+        job_id: Job ID
+        user_id: If given, only return the job if this user owns it
+
+    Returns:
+        Job document without its payload, or None if not found
+    """
+    if not ObjectId.is_valid(job_id):
+        return None
+
+    query = {"_id": ObjectId(job_id)}
+    if user_id is not None:
+        query["userId"] = user_id
+    return get_collection("jobs").find_one(query, PUBLIC_FIELDS)
+
+
+def wait_for_job(
+    job_id: str, timeout: float, user_id: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Block until a job finishes or the timeout expires
+
+    Jobs run in this process wake the waiter immediately; jobs run by other
+    processes are picked up by re-reading the job every poll interval.
+
+    Returns:
+        The job as last read (check its status), or None if not found
+    """
+    with _finished_lock:
+        event = _finished.setdefault(job_id, threading.Event())
+
+    deadline = datetime.now() + timedelta(seconds=timeout)
+    try:
+        while True:
+            job = get_job(job_id, user_id)
+            if job is None or job["status"] in TERMINAL_STATES:
+                return job
+            remaining = (deadline - datetime.now()).total_seconds()
+            if remaining <= 0:
+                return job
+            event.wait(min(JOB_POLL_INTERVAL, remaining))
+    finally:
+        with _finished_lock:
+            _finished.pop(job_id, None)
+
+
+def cancel_job(
+    job_id: str, user_id: Optional[str] = None
+) -> Optional[Dict[str, Any]]:
+    """
+    Cancel a job that has not finished
+
+    A queued job is cancelled immediately; a running one is flagged with
+    cancelRequested and cancelled by its worker within a poll interval.
+    Finished jobs are left as they are.
+
+    Args:
+        job_id: Job ID
+        user_id: If given, only cancel the job if this user owns it
+
+    Returns:
+        The job's public status after the request, or None if not found
+    """
+    if not ObjectId.is_valid(job_id):
+        return None
+
+    query = {"_id": ObjectId(job_id)}
+    if user_id is not None:
+        query["userId"] = user_id
+    jobs_collection = get_collection("jobs")
+
+    job = jobs_collection.find_one_and_update(
+        {**query, "status": QUEUED},
+        {
+            "$set": {
+                "status": CANCELLED,
+                "error": "Cancelled",
+                "finishedAt": datetime.now(),
+            }
+        },
+        projection=PUBLIC_FIELDS,
+        return_document=ReturnDocument.AFTER,
+    )
+    if job is not None:
+        with _finished_lock:
+            event = _finished.get(job_id)
+        if event is not None:
+            event.set()
+        return job
+
+    job = jobs_collection.find_one_and_update(
+        {**query, "status": RUNNING},
+        {"$set": {"cancelRequested": True}},
+        projection=PUBLIC_FIELDS,
+        return_document=ReturnDocument.AFTER,
+    )
+    return job or jobs_collection.find_one(query, PUBLIC_FIELDS)
+
+
+def _cancel_requested(job: Dict[str, Any]) -> bool:
+    return bool(
+        get_collection("jobs").count_documents(
+            {"_id": job["_id"], "cancelRequested": True}, limit=1
+        )
+    )
+
+
+def claim_job(worker_id: str) -> Optional[Dict[str, Any]]:
+    """Atomically claim the highest-priority job that is ready to run"""
+    now = datetime.now()
+    return get_collection("jobs").find_one_and_update(
+        {"status": QUEUED, "runAt": {"$lte": now}, "type": {"$in": list(_handlers)}},
+        {
+            "$set": {
+                "status": RUNNING,
+                "startedAt": now,
+                "lockedBy": worker_id,
+                "lockedUntil": now + timedelta(seconds=JOB_LEASE_SECONDS),
+            },
+            "$inc": {"attempts": 1},
+        },
+        sort=[("priority", -1), ("runAt", 1)],
+        return_document=ReturnDocument.AFTER,
+    )
+
+
+def recover_stale_jobs() -> int:
+    """
+    Requeue running jobs whose lease has expired (their worker died)
+
+    Jobs that have used all their attempts are marked failed instead, so a
+    job that keeps crashing its worker does not loop forever.
+
+    Returns:
+        Number of jobs requeued
+    """
+    now = datetime.now()
+    stale = {"status": RUNNING, "lockedUntil": {"$lt": now}}
+    unlock = {"lockedBy": "", "lockedUntil": ""}
+    jobs_collection = get_collection("jobs")
+
+    jobs_collection.update_many(
+        {**stale, "cancelRequested": True},
+        {
+            "$set": {"status": CANCELLED, "error": "Cancelled", "finishedAt": now},
+            "$unset": unlock,
+        },
+    )
+    jobs_collection.update_many(
+        {**stale, "$expr": {"$gte": ["$attempts", "$maxAttempts"]}},
+        {
+            "$set": {"status": FAILED, "error": "Lease expired", "finishedAt": now},
+            "$unset": unlock,
+        },
+    )
+    result = jobs_collection.update_many(
+        stale, {"$set": {"status": QUEUED, "runAt": now}, "$unset": unlock}
+    )
+    if result.modified_count:
+        logger.warning(f"Requeued {result.modified_count} jobs with expired leases")
+    return result.modified_count
+
+
+def _renew_lease(job: Dict[str, Any], stop: threading.Event):
+    """Keep extending a running job's lease until stop is set"""
+    while not stop.wait(JOB_LEASE_SECONDS / LEASE_RENEWALS_PER_LEASE):
+        try:
+            result = get_collection("jobs").update_one(
+                {"_id": job["_id"], "status": RUNNING, "lockedBy": job["lockedBy"]},
+                {
+                    "$set": {
+                        "lockedUntil": datetime.now()
+                        + timedelta(seconds=JOB_LEASE_SECONDS)
+                    }
+                },
+            )
+        except Exception as e:
+            logger.warning(f"Could not renew the lease of job {job['_id']}: {e}")
+            continue
+        if not result.matched_count:
+            # Finished meanwhile, or the lease expired and it was requeued
+            logger.warning(f"Job {job['_id']} ({job['type']}) lost its lease")
+            return
+
+
+@contextmanager
+def _lease_heartbeat(job: Dict[str, Any]):
+    """Renew a job's lease from a background thread while the block runs"""
+    stop = threading.Event()
+    heartbeat = threading.Thread(
+        target=_renew_lease,
+        args=(job, stop),
+        name=f"job-lease-{job['_id']}",
+        daemon=True,
+    )
+    heartbeat.start()
+    try:
+        yield
+    finally:
+        stop.set()
+
+
+def _finish(job: Dict[str, Any], update: Dict[str, Any]):
+    get_collection("jobs").update_one(
+        {"_id": job["_id"], "lockedBy": job["lockedBy"]},
+        {"$set": update, "$unset": {"lockedBy": "", "lockedUntil": ""}},
+    )
+    with _finished_lock:
+        event = _finished.get(str(job["_id"]))
+    if event is not None:
+        event.set()
+
+
+def _run_async(job: Dict[str, Any], coro) -> Any:
+    """
+    Run an async handler's coroutine on the shared loop
+
+    Raises:
+        JobCancelled: If the job was cancelled (the coroutine is cancelled)
+        TimeoutError: If it runs longer than JOB_LEASE_SECONDS
+    """
+    future = async_runner.submit(coro)
+    waited = 0.0
+    while True:
+        try:
+            return future.result(JOB_POLL_INTERVAL)
+        except FutureTimeoutError:
+            waited += JOB_POLL_INTERVAL
+            if waited >= JOB_LEASE_SECONDS:
+                future.cancel()
+                raise TimeoutError(f"Job ran longer than {JOB_LEASE_SECONDS}s")
+            if _cancel_requested(job):
+                future.cancel()
+                raise JobCancelled()
+
+
+def run_job(job: Dict[str, Any]):
+    """Run a claimed job and record its outcome"""
+    handler = _handlers[job["type"]]
+    now = datetime.now()
+
+    try:
+        with _lease_heartbeat(job):
+            result = handler.func(job["payload"])
+            if asyncio.iscoroutine(result):
+                result = _run_async(job, result)
+    except JobCancelled:
+        logger.info(f"Job {job['_id']} ({job['type']}) cancelled")
+        _finish(
+            job,
+            {"status": CANCELLED, "error": "Cancelled", "finishedAt": datetime.now()},
+        )
+        return
+    except Exception as e:
+        error = f"{type(e).__name__}: {e}"
+        retry = (
+            not isinstance(e, PermanentJobError)
+            and job["attempts"] < job["maxAttempts"]
+            and not _cancel_requested(job)
+        )
+
+        if retry:
+            # Exponential backoff with jitter
+            backoff = JOB_RETRY_BASE_SECONDS * 2 ** (job["attempts"] - 1)
+            backoff *= random.uniform(0.5, 1.5)
+            logger.warning(
+                f"Job {job['_id']} ({job['type']}) failed, retrying in "
+                f"{backoff:.1f}s: {error}"
+            )
+            _finish(
+                job,
+                {
+                    "status": QUEUED,
+                    "error": error,
+                    "runAt": now + timedelta(seconds=backoff),
+                },
+            )
+        else:
+            logger.error(f"Job {job['_id']} ({job['type']}) failed: {error}")
+            _finish(
+                job, {"status": FAILED, "error": error, "finishedAt": datetime.now()}
+            )
+        return
+
+    _finish(
+        job,
+        {
+            "status": SUCCEEDED,
+            "result": result,
+            "error": None,
+            "finishedAt": datetime.now(),
+        },
+    )
+
+
+def _worker_loop(worker_id: str):
+    polls = 0
+    while not _stop.is_set():
+        try:
+            if polls % RECOVERY_EVERY_POLLS == 0:
+                recover_stale_jobs()
+            polls += 1
+
+            job = claim_job(worker_id)
+            if job is None:
+                _wakeup.wait(JOB_POLL_INTERVAL)
+                _wakeup.clear()
+                continue
+
+            run_job(job)
+        except Exception as e:
+            logger.error(f"Job worker {worker_id} error: {e}")
+            _stop.wait(JOB_POLL_INTERVAL)
+
+
+def start_workers(count: int) -> List[threading.Thread]:
+    """
+    Start worker threads in this process
+
+    Args:
+        count: Number of workers to start
+
+    Returns:
+        The running worker threads
+    """
+    _stop.clear()
+    prefix = f"{socket.gethostname()}:{os.getpid()}"
+    for index in range(len(_workers), len(_workers) + count):
+        worker = threading.Thread(
+            target=_worker_loop,
+            args=(f"{prefix}:{index}",),
+            name=f"job-worker-{index}",
+            daemon=True,
+        )
+        worker.start()
+        _workers.append(worker)
+
+    if count:
+        logger.info(f"Started {count} job workers")
+    return list(_workers)
+
+
+def stop_workers(timeout: float = 10):
+    """Stop workers after their current job; unfinished jobs are requeued later"""
+    _stop.set()
+    _wakeup.set()
+    for worker in _workers:
+        worker.join(timeout)
+    _workers.clear()
+
+
+def queue_stats() -> Dict[str, Any]:
+    """Job counts by status, for health checks"""
+    counts = {
+        doc["_id"]: doc["count"]
+        for doc in get_collection("jobs").aggregate(
+            [{"$group": {"_id": "$status", "count": {"$sum": 1}}}]
+        )
+    }
+    return {
+        "workers": sum(worker.is_alive() for worker in _workers),
+        "handlers": sorted(_handlers),
+        "counts": counts,
+        "retentionSeconds": JOB_RETENTION_SECONDS,
+    }
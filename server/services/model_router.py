@@ -0,0 +1,172 @@
+"""
+Per-task model routing for LLM calls
+
+Each kind of LLM work has a route: the model, max_tokens and temperature it
+is sent with. Full recipes go to OPENAI_RECIPE_MODEL. Calorie estimates,
+which come back as a single number, go to the small and fast
+OPENAI_CALORIE_MODEL with a handful of output tokens, and are computed
+locally from the ingredient lines (utils.nutrition) instead whenever that
+is possible, see services.recipe_service.estimate_calories().
+
+Every routed call is timed and its token usage priced with MODEL_PRICES,
+per route, for GET /health/llm.
+"""
+
+import logging
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from dataclasses import dataclass
+from typing import Any, Dict, Iterator, Optional, Tuple
+
+from config.settings import OPENAI_CALORIE_MODEL, OPENAI_RECIPE_MODEL
+from services.structured_output import token_meter
+
+logger = logging.getLogger(__name__)
+
+# Latencies kept per route
+LATENCY_SAMPLES = 500
+
+# USD per million (prompt, completion) tokens, matched by model name prefix
+MODEL_PRICES = {
+    "gpt-3.5-turbo": (0.50, 1.50),
+    "gpt-4o-mini": (0.15, 0.60),
+    "gpt-4o": (2.50, 10.00),
+    "gpt-4.1-nano": (0.10, 0.40),
+    "gpt-4.1-mini": (0.40, 1.60),
+    "gpt-4.1": (2.00, 8.00),
+}
+
+
+@dataclass(frozen=True)
+class Route:
+    """How one kind of task is sent to the API"""
+
+    model: str
+    max_tokens: int
+    temperature: float
+
+
+ROUTES: Dict[str, Route] = {
+    "recipe": Route(OPENAI_RECIPE_MODEL, max_tokens=1000, temperature=0.7),
+    # A number needs few tokens and no creativity
+    "calories": Route(OPENAI_CALORIE_MODEL, max_tokens=20, temperature=0),
+}
+
+
+class RouteMetrics:
+    """Call counts, latencies, tokens and cost of one route"""
+
+    def __init__(self, model: str):
+        self.model = model
+        self.calls = 0
+        self.errors = 0
+        self.prompt_tokens = 0
+        self.completion_tokens = 0
+        self.cost = 0.0
+        self.latencies = deque(maxlen=LATENCY_SAMPLES)
+
+    def stats(self) -> Dict[str, Any]:
+        samples = sorted(self.latencies)
+
+        def percentile(p):
+            if not samples:
+                return 0.0
+            return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+        return {
+            "model": self.model,
+            "calls": self.calls,
+            "errors": self.errors,
+            "latencyMs": {"p50": percentile(0.50), "p95": percentile(0.95)},
+            "promptTokens": self.prompt_tokens,
+            "completionTokens": self.completion_tokens,
+            "costUsd": round(self.cost, 6),
+        }
+
+
+_metrics: Dict[str, RouteMetrics] = {}
+_metrics_lock = threading.Lock()
+
+
+def route(task: str) -> Route:
+    """
+    Get the route of a task
+
+    Raises:
+        KeyError: If the task has no route
+    """
+    return ROUTES[task]
+
+
+def params(task: str, **overrides) -> Dict[str, Any]:
+    """Completion parameters (model, max_tokens, temperature) for a task"""
+    chosen = ROUTES[task]
+    return {
+        "model": chosen.model,
+        "max_tokens": chosen.max_tokens,
+        "temperature": chosen.temperature,
+        **overrides,
+    }
+
+
+def price(model: str) -> Optional[Tuple[float, float]]:
+    """(prompt, completion) USD per million tokens, or None if unknown"""
+    matches = [name for name in MODEL_PRICES if model.startswith(name)]
+    return MODEL_PRICES[max(matches, key=len)] if matches else None
+
+
+@contextmanager
+def track(
+    task: str, local: bool = False, estimated_prompt: Optional[int] = None
+) -> Iterator[None]:
+    """
+    Time a routed call and charge its tokens to the task's route
+
+    Token use of each API call is logged, next to the locally counted
+    prompt size when given (see services.prompts).
+
+    Args:
+        task: Route name
+        local: The task was answered by a local estimator (reported as its
+            own route, "<task>:local")
+        estimated_prompt: Prompt tokens counted before sending
+    """
+    label = f"{task}:local" if local else task
+    model = "local" if local else ROUTES[task].model
+    started = time.monotonic()
+    failed = True
+    with token_meter() as meter:
+        try:
+            yield
+            failed = False
+        finally:
+            seconds = time.monotonic() - started
+            _, prompt, completion = meter
+            rates = None if local else price(model)
+            if not local:
+                estimate = (
+                    f" (counted {estimated_prompt})" if estimated_prompt else ""
+                )
+                logger.info(
+                    f"{task} on {model}: {prompt} prompt{estimate} + "
+                    f"{completion} completion tokens in {seconds * 1000:.0f} ms"
+                )
+            with _metrics_lock:
+                metrics = _metrics.get(label)
+                if metrics is None:
+                    metrics = _metrics[label] = RouteMetrics(model)
+                metrics.calls += 1
+                metrics.errors += failed
+                metrics.latencies.append(seconds)
+                metrics.prompt_tokens += prompt
+                metrics.completion_tokens += completion
+                if rates:
+                    metrics.cost += (prompt * rates[0] + completion * rates[1]) / 1e6
+
+
+def router_stats() -> Dict[str, Dict[str, Any]]:
+    """Metrics of every route used so far, for health checks"""
+    with _metrics_lock:
+        return {label: metrics.stats() for label, metrics in _metrics.items()}
@@ -0,0 +1,211 @@
+"""
+Chat prompt templates with local token accounting
+
+Templates are compiled once, at import. The system message (instructions and
+the expected JSON shape) is a constant sent byte-identical on every request,
+so the provider's prompt cache can reuse it, and everything that varies goes
+in a short user message after it. Variable parts are fitted to token budgets
+before they are sent: ingredient lists are tidied, de-duplicated and cut to
+PROMPT_INGREDIENT_TOKENS, free text such as dietary preferences to
+PROMPT_PREFERENCES_TOKENS.
+
+Tokens are counted with tiktoken when it is installed and its encodings can
+be loaded, and estimated from the text length otherwise.
+"""
+
+import functools
+import json
+import logging
+import re
+import string
+from typing import Any, Dict, List, Tuple
+
+from config.settings import OPENAI_MODEL
+
+try:
+    import tiktoken
+except ImportError:  # pragma: no cover - optional dependency
+    tiktoken = None
+
+logger = logging.getLogger(__name__)
+
+# Characters per token of English text, when tiktoken is not installed or
+# cannot load its encodings
+CHARS_PER_TOKEN = 4
+
+# Set once an encoding failed to load; every count is estimated after that
+_estimate_only = False
+
+# Tokens the chat format adds per message, and once per request
+MESSAGE_OVERHEAD = 4
+REQUEST_OVERHEAD = 3
+
+# Room kept for the "(and N more)" note after a cut list
+CUT_NOTE_TOKENS = 6
+
+
+@functools.lru_cache(maxsize=16)
+def _encoding(model: str):
+    """
+    The model's tiktoken encoding, or None to estimate from length
+
+    tiktoken downloads encodings on first use; without network access (and
+    no TIKTOKEN_CACHE_DIR copy) that fails, and the estimate is used for the
+    rest of the process instead of failing every prompt.
+    """
+    global _estimate_only
+    if tiktoken is None or _estimate_only:
+        return None
+    try:
+        try:
+            return tiktoken.encoding_for_model(model)
+        except KeyError:
+            return tiktoken.get_encoding("cl100k_base")
+    except Exception as e:
+        _estimate_only = True
+        logger.warning(f"tiktoken encoding unavailable, estimating tokens: {e}")
+        return None
+
+
+def count_tokens(text: str, model: str = OPENAI_MODEL) -> int:
+    """Number of tokens text takes for a model (estimated without tiktoken)"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return -(-len(text) // CHARS_PER_TOKEN)
+    return len(encoding.encode(text))
+
+
+def count_message_tokens(
+    messages: List[Dict[str, str]], model: str = OPENAI_MODEL
+) -> int:
+    """Prompt tokens a list of chat messages takes"""
+    return REQUEST_OVERHEAD + sum(
+        count_tokens(message["content"], model) + MESSAGE_OVERHEAD
+        for message in messages
+    )
+
+
+def truncate(text: str, budget: int, model: str = OPENAI_MODEL) -> str:
+    """Cut text to at most budget tokens"""
+    encoding = _encoding(model)
+    if encoding is None:
+        return text[: budget * CHARS_PER_TOKEN]
+    tokens = encoding.encode(text)
+    if len(tokens) <= budget:
+        return text
+    return encoding.decode(tokens[:budget])
+
+
+def tidy_ingredients(ingredients: List[Any]) -> List[str]:
+    """Drop notes in parentheses, extra whitespace, and empty or repeated items"""
+    seen = set()
+    tidy = []
+    for item in ingredients:
+        text = " ".join(re.sub(r"\([^)]*\)", " ", str(item)).split())
+        key = text.lower()
+        if text and key not in seen:
+            seen.add(key)
+            tidy.append(text)
+    return tidy
+
+
+def fit_ingredients(
+    ingredients: List[Any], budget: int, model: str = OPENAI_MODEL
+) -> Tuple[str, int]:
+    """
+    Join ingredients into a comma-separated list of at most budget tokens
+
+    Ingredients are kept in the order given (users list what matters
+    first); those that do not fit are left out and counted.
+
+    Returns:
+        (list text, number of ingredients left out)
+    """
+    items = tidy_ingredients(ingredients)
+    text = ", ".join(items)
+    if count_tokens(text, model) <= budget:
+        return text, 0
+
+    kept = []
+    used = 0
+    for item in items:
+        cost = count_tokens(item, model) + 1  # the separator
+        if used + cost > budget - CUT_NOTE_TOKENS:
+            break
+        kept.append(item)
+        used += cost
+
+    if not kept:
+        # One ingredient longer than the whole budget
+        if len(items) == 1:
+            return truncate(items[0], budget, model), 0
+        kept = [truncate(items[0], budget - CUT_NOTE_TOKENS, model)]
+    left_out = len(items) - len(kept)
+    return f"{', '.join(kept)} (and {left_out} more)", left_out
+
+
+def schema_example(schema: Dict[str, Any]) -> str:
+    """
+    Compact JSON showing the shape of an object schema
+
+    Each property is shown with its description as the value, and the type
+    when it is not a string, e.g. {"name":"Recipe name","servings":"Servings
+    (number)","ingredients":["Ingredients with amounts"]}.
+    """
+
+    def example(field_schema):
+        if field_schema.get("type") == "object":
+            return {
+                key: example(value)
+                for key, value in field_schema.get("properties", {}).items()
+            }
+        if field_schema.get("type") == "array":
+            items = dict(field_schema.get("items", {}))
+            items.setdefault("description", field_schema.get("description"))
+            return [example(items)]
+        kind = field_schema.get("type", "string")
+        description = field_schema.get("description") or kind
+        return description if kind == "string" else f"{description} ({kind})"
+
+    return json.dumps(example(schema), separators=(",", ":"), ensure_ascii=False)
+
+
+class PromptTemplate:
+    """
+    A chat prompt: a constant system message and a user message template
+
+    The user template uses str.format fields ("{ingredients}") and is parsed
+    once here, so rendering only joins strings.
+
+    Args:
+        name: Used in logs
+        system: System message, sent unchanged on every call
+        user: Template of the user message
+    """
+
+    def __init__(self, name: str, system: str, user: str):
+        self.name = name
+        self.system = system
+        self._parts = list(string.Formatter().parse(user))
+        self.fields = {field for _, field, _, _ in self._parts if field}
+
+    def render(self, **values) -> str:
+        """
+        Fill in the user message
+
+        Raises:
+            KeyError: If a field has no value
+        """
+        parts = []
+        for literal, field, spec, _ in self._parts:
+            parts.append(literal)
+            if field is not None:
+                parts.append(format(values[field], spec or ""))
+        return "".join(parts)
+
+    def messages(self, **values) -> List[Dict[str, str]]:
+        """System and user messages, ready to send"""
+        return [
+            {"role": "system", "content": self.system},
+            {"role": "user", "content": self.render(**values)},
+        ]
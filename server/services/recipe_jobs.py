@@ -0,0 +1,334 @@
+"""
+Background job handlers for recipes
+
+Importing this module registers the handlers with the job queue. The async
+handlers share one event loop, so their MongoDB calls run in threads.
+"""
+
+import asyncio
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+from bson import ObjectId
+
+from config.database import get_collection
+from config.settings import WARM_CACHE_TOKEN_BUDGET, WARM_CACHE_TOP_PANTRIES
+from services.cache_warming import (
+    in_window,
+    next_window_start,
+    off_peak_window,
+    top_pantries,
+    warm_pantry,
+)
+from services.dedup import (
+    SOURCE_AI,
+    dedup_collection,
+    find_duplicate,
+    fingerprint,
+    link_duplicate,
+    save_fingerprint,
+)
+from services.generation_cache import generate_recipe_cached
+from services.job_queue import QUEUED, PermanentJobError, enqueue, job_handler
+from services.recipe_service import estimate_calories
+from services.structured_output import token_meter
+from services.version_service import RECIPES, bump_versions
+from utils.cache import recipe_cache
+from utils.cdn import RECIPES_KEY, purge, purge_recipe
+from utils.deadline import DeadlineExceeded, deadline, remaining
+
+# Interactive generations jump ahead of maintenance work
+GENERATE_PRIORITY = 10
+BACKFILL_PRIORITY = 0
+MAINTENANCE_PRIORITY = -10
+
+# Recipes visited per dedup job
+DEDUP_CHUNK = 20000
+
+# Pantries warmed per warm_caches job (each may take a generation)
+WARM_CHUNK = 10
+
+
+@job_handler("generate_recipe", priority=GENERATE_PRIORITY)
+async def generate_recipe_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Generate a recipe with AI and save it for the requesting user
+
+    Args:
+        payload: {"ingredients": [...], "preferences": str, "userId": str,
+            "useCache": bool, "deadline": epoch seconds or None}
+
+    Returns:
+        {"recipeId": ID of the saved recipe}, with "duplicate": True and the
+        similarity when an existing recipe was reused, and "cached" (the
+        cache tier, or "recommender") when the generation came from the
+        generation cache or a fallback
+
+    Raises:
+        PermanentJobError: If the deadline passed (the client has given up,
+            so retrying would only spend tokens)
+    """
+    with deadline(at=payload.get("deadline")):
+        left = remaining()
+        if left is not None and left <= 0:
+            raise PermanentJobError("Deadline passed before the job started")
+        try:
+            recipe_data, cache_hit = await generate_recipe_cached(
+                payload["ingredients"],
+                payload.get("preferences"),
+                use_cache=payload.get("useCache", True),
+            )
+        except DeadlineExceeded as e:
+            raise PermanentJobError(str(e)) from e
+    cached = {}
+    if cache_hit:
+        # "fallback" marks a stand-in served while generation was failing
+        cached = {"cached": cache_hit["tier"], "fallback": cache_hit.get("fallback")}
+
+    saved = await asyncio.to_thread(
+        save_generated_recipe, recipe_data, payload["userId"]
+    )
+    return {**saved, **cached}
+
+
+def save_generated_recipe(recipe_data: Dict[str, Any], user_id: str) -> Dict[str, Any]:
+    """
+    Save a generated recipe for a user, or link them to a near-identical one
+
+    Blocking (MongoDB); generate_recipe_job runs it in a thread.
+
+    Returns:
+        {"recipeId": str}, with "duplicate": True and the similarity when an
+        existing recipe was reused
+    """
+    # Reuse a near-identical existing recipe instead of saving a clone
+    fp = fingerprint(recipe_data)
+    duplicate = find_duplicate(fp)
+    if duplicate:
+        recipe_id, similarity = duplicate
+        link_duplicate(recipe_id, [user_id])
+        return {"recipeId": recipe_id, "duplicate": True, "similarity": similarity}
+
+    recipe = {
+        "name": recipe_data["name"],
+        "ingredients": recipe_data["ingredients"],
+        "instructions": recipe_data["instructions"],
+        "estimatedCalories": recipe_data.get("estimatedCalories"),
+        "createdBy": user_id,
+        "createdAt": datetime.now(),
+        "source": SOURCE_AI,
+    }
+
+    result = get_collection("recipes").insert_one(recipe)
+    save_fingerprint(result.inserted_id, fp)
+    bump_versions(RECIPES)
+    purge(RECIPES_KEY)
+
+    # Fill in calories separately rather than holding up the result
+    if recipe["estimatedCalories"] is None:
+        enqueue_calorie_backfill(str(result.inserted_id))
+
+    return {"recipeId": str(result.inserted_id)}
+
+
+@job_handler("backfill_calories", priority=BACKFILL_PRIORITY)
+async def backfill_calories_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Estimate and store calories for a recipe that has none
+
+    Args:
+        payload: {"recipeId": str}
+
+    Returns:
+        {"recipeId": str, "estimatedCalories": float}
+    """
+    recipe_id = payload["recipeId"]
+    recipe = await asyncio.to_thread(
+        get_collection("recipes").find_one,
+        {"_id": ObjectId(recipe_id)},
+        {"name": 1, "ingredients": 1},
+    )
+    if not recipe:
+        raise PermanentJobError(f"Recipe {recipe_id} not found")
+
+    calories = await estimate_calories(recipe["name"], recipe["ingredients"])
+    if not calories:
+        # estimate_calories returns 0 when the API call fails
+        raise ValueError("Calorie estimate unavailable")
+
+    await asyncio.to_thread(store_calories, recipe_id, calories)
+    return {"recipeId": recipe_id, "estimatedCalories": calories}
+
+
+def store_calories(recipe_id: str, calories: float) -> None:
+    """Save a calorie estimate and invalidate the recipe's cached copies"""
+    get_collection("recipes").update_one(
+        {"_id": ObjectId(recipe_id)},
+        {"$set": {"estimatedCalories": calories, "updatedAt": datetime.now()}},
+    )
+    recipe_cache.delete(recipe_id)
+    bump_versions(RECIPES)
+    purge_recipe(recipe_id)
+
+
+@job_handler("dedup_recipes", priority=MAINTENANCE_PRIORITY)
+def dedup_recipes_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Merge near-duplicate recipes, DEDUP_CHUNK recipes per job
+
+    Each job resumes after the last recipe of the previous one and queues
+    the next, so a large collection is worked through in bounded steps and
+    a restart or failure repeats at most one of them.
+
+    Args:
+        payload: {"aiOnly": bool, "dryRun": bool, "after": recipe ID or None,
+            "totals": counts from earlier chunks}
+
+    Returns:
+        Running totals, and the ID of the next chunk's job if there is one
+    """
+    stats = dedup_collection(
+        ai_only=payload.get("aiOnly", True),
+        dry_run=payload.get("dryRun", False),
+        after=payload.get("after"),
+        limit=DEDUP_CHUNK,
+    )
+
+    earlier = payload.get("totals") or {}
+    totals = {
+        key: earlier.get(key, 0) + stats[key]
+        for key in ("scanned", "fingerprinted", "merged")
+    }
+
+    if stats["scanned"] == DEDUP_CHUNK:
+        totals["nextJobId"] = enqueue(
+            "dedup_recipes",
+            {**payload, "after": stats["lastId"], "totals": totals},
+        )
+    return totals
+
+
+@job_handler("warm_caches", priority=MAINTENANCE_PRIORITY)
+async def warm_caches_job(payload: Dict[str, Any]) -> Dict[str, Any]:
+    """
+    Pre-generate recipes for the most requested pantries, WARM_CHUNK per job
+
+    Each job continues where the previous one stopped and queues the next,
+    until WARM_CACHE_TOP_PANTRIES pantries are warm, the token budget is
+    spent or the off-peak window closes. The run after that is scheduled
+    for the start of the next window.
+
+    Args:
+        payload: {"offset": pantries done so far, "totals": counts from
+            earlier chunks, "now": True to run outside the window}
+
+    Returns:
+        Running totals (cached, generated, tokens), and the ID of the next
+        job if there is one
+    """
+    # Runs queued with enqueue_warming() ignore the window
+    window = None if payload.get("now") else off_peak_window()
+    earlier = payload.get("totals") or {}
+    totals = {key: earlier.get(key, 0) for key in ("cached", "generated", "tokens")}
+    offset = payload.get("offset", 0)
+
+    if window and not in_window(datetime.now(), window):
+        # Queued outside the window (or ran past it): wait for the next one
+        totals["nextJobId"] = await asyncio.to_thread(schedule_warming, force=True)
+        return totals
+
+    ranked = await asyncio.to_thread(top_pantries, WARM_CACHE_TOP_PANTRIES)
+    pantries = ranked[offset : offset + WARM_CHUNK]
+    with token_meter() as meter:
+        for keys, preferences, _ in pantries:
+            if totals["tokens"] + meter[0] >= WARM_CACHE_TOKEN_BUDGET:
+                break
+            totals[await warm_pantry(keys, preferences)] += 1
+            offset += 1
+    totals["tokens"] += meter[0]
+
+    if (
+        len(pantries) == WARM_CHUNK
+        and offset < WARM_CACHE_TOP_PANTRIES
+        and totals["tokens"] < WARM_CACHE_TOKEN_BUDGET
+    ):
+        totals["nextJobId"] = await asyncio.to_thread(
+            enqueue,
+            "warm_caches",
+            {**payload, "offset": offset, "totals": dict(totals)},
+        )
+    elif window:
+        totals["nextJobId"] = await asyncio.to_thread(
+            schedule_warming, force=True, next_window=True
+        )
+    return totals
+
+
+def enqueue_recipe_generation(
+    user_id: str,
+    ingredients: List[str],
+    preferences: Optional[str] = None,
+    use_cache: bool = True,
+    deadline: Optional[float] = None,
+) -> str:
+    """
+    Queue an AI recipe generation for a user and return the job ID
+
+    Args:
+        deadline: Time (epoch seconds) after which the result is no longer
+            wanted; generation is abandoned then
+    """
+    return enqueue(
+        "generate_recipe",
+        {
+            "ingredients": ingredients,
+            "preferences": preferences,
+            "userId": user_id,
+            "useCache": use_cache,
+            "deadline": deadline,
+        },
+        user_id=user_id,
+    )
+
+
+def enqueue_calorie_backfill(recipe_id: str) -> str:
+    """Queue a calorie estimate for a recipe and return the job ID"""
+    return enqueue("backfill_calories", {"recipeId": recipe_id})
+
+
+def enqueue_dedup(ai_only: bool = True, dry_run: bool = False) -> str:
+    """Queue a collection-wide duplicate merge and return the job ID"""
+    return enqueue("dedup_recipes", {"aiOnly": ai_only, "dryRun": dry_run})
+
+
+def enqueue_warming() -> str:
+    """Queue a cache warming run now and return the job ID"""
+    return enqueue("warm_caches", {"now": True})
+
+
+def schedule_warming(force: bool = False, next_window: bool = False) -> Optional[str]:
+    """
+    Queue a cache warming run for the off-peak window
+
+    The run starts now if no window is configured or the window is open,
+    else when it next opens.
+
+    Args:
+        force: Queue even if a run is already queued (used by the run
+            itself, whose job is still marked as running)
+        next_window: Wait for the next window even if this one is open
+
+    Returns:
+        The job ID, or None if a run was already queued
+    """
+    if not force and get_collection("jobs").find_one(
+        {"type": "warm_caches", "status": QUEUED}, {"_id": 1}
+    ):
+        return None
+
+    window = off_peak_window()
+    now = datetime.now()
+    delay = 0.0
+    if window and (next_window or not in_window(now, window)):
+        delay = (next_window_start(now, window) - now).total_seconds()
+    return enqueue("warm_caches", {}, delay=delay)
@@ -2,17 +2,80 @@
 Service for generating recipes using OpenAI's API
 """
 
-import json
-import openai
+import logging
+import re
 from typing import List, Dict, Any, Optional
 
-import os
-
-OPENAI_API_KEY = os.getenv("OPENAI_API_KEY", "your-default-api-key")
-OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
-
-# Set up OpenAI API
-openai.api_key = OPENAI_API_KEY
+from config.settings import (
+    CALORIE_ESTIMATOR,
+    CALORIE_LOCAL_MIN_COVERAGE,
+    PROMPT_INGREDIENT_TOKENS,
+    PROMPT_PREFERENCES_TOKENS,
+)
+from services import model_router
+from services.prompts import (
+    PromptTemplate,
+    count_message_tokens,
+    fit_ingredients,
+    schema_example,
+    truncate,
+)
+from services.structured_output import complete_json, create_completion
+from utils import nutrition
+from utils.circuit_breaker import CircuitOpenError
+from utils.deadline import DeadlineExceeded
+
+logger = logging.getLogger(__name__)
+
+# Shape of a generated recipe (also sent as the function schema)
+RECIPE_SCHEMA = {
+    "type": "object",
+    "properties": {
+        "name": {"type": "string", "description": "Recipe name"},
+        "ingredients": {
+            "type": "array",
+            "items": {"type": "string"},
+            "description": "Ingredients with amounts",
+        },
+        "instructions": {
+            "type": "string",
+            "description": "Step-by-step instructions",
+        },
+        "estimatedCalories": {
+            "type": "number",
+            "description": "Approximate total calories",
+        },
+        "estimatedTime": {
+            "type": "number",
+            "description": "Cooking time in minutes",
+        },
+        "servings": {"type": "number", "description": "Number of servings"},
+    },
+    "required": ["name", "ingredients", "instructions"],
+}
+
+# Longest recipe name sent in a calorie prompt (tokens)
+RECIPE_NAME_TOKENS = 30
+
+# The system messages never change, so the provider can cache them
+RECIPE_PROMPT = PromptTemplate(
+    "recipe",
+    system=(
+        "You are a professional chef providing detailed, accurate recipes. "
+        "Reply with only a JSON object of this shape: "
+        + schema_example(RECIPE_SCHEMA)
+    ),
+    user="Create a recipe using these ingredients: {ingredients}{preferences}",
+)
+
+CALORIE_PROMPT = PromptTemplate(
+    "calories",
+    system=(
+        "You are a nutrition expert providing accurate calorie estimations. "
+        "Reply with only the total calories of the recipe, as a number."
+    ),
+    user="Recipe: {name}\nIngredients: {ingredients}",
+)
 
 
 async def generate_recipe(
@@ -27,98 +90,82 @@ async def generate_recipe(
 
     Returns:
         Dictionary containing the generated recipe details
-    """
-    # Construct the prompt
-    prompt = "Generate a recipe using these ingredients: " + ", ".join(ingredients)
 
+    Raises:
+        ValueError: If no valid recipe could be generated
+        CircuitOpenError: If OpenAI is failing and calls are suspended
+    """
+    # Fit the variable parts of the prompt to their token budgets
+    params = model_router.params("recipe")
+    pantry, left_out = fit_ingredients(
+        ingredients, PROMPT_INGREDIENT_TOKENS, params["model"]
+    )
+    if left_out:
+        logger.info(f"Left {left_out} ingredients out of the recipe prompt")
     if preferences:
-        prompt += f"\nDietary preferences/requirements: {preferences}"
-
-    prompt += '\nFormat the response as a JSON object with the following structure: {"name": "Recipe Name", "ingredients": ["ingredient 1", "ingredient 2", ...], "instructions": "Step-by-step instructions", "estimatedCalories": approximate_calories_as_number}'
+        preferences = truncate(preferences, PROMPT_PREFERENCES_TOKENS, params["model"])
+    messages = RECIPE_PROMPT.messages(
+        ingredients=pantry,
+        preferences=f"\nDietary preferences: {preferences}" if preferences else "",
+    )
 
     try:
-        # Call OpenAI API
-        response = await openai.ChatCompletion.acreate(
-            model=OPENAI_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a professional chef providing detailed, accurate recipes.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.7,
-            max_tokens=1000,
-        )
-
-        # Extract and parse the response
-        recipe_json_str = response.choices[0].message.content.strip()
-
-        # Extract the JSON part (in case there's extra text)
-        try:
-            # Try to parse the entire response
-            recipe_data = json.loads(recipe_json_str)
-        except json.JSONDecodeError:
-            # If that fails, try to extract the JSON part using brackets
-            start_idx = recipe_json_str.find("{")
-            end_idx = recipe_json_str.rfind("}") + 1
-
-            if start_idx >= 0 and end_idx > start_idx:
-                json_part = recipe_json_str[start_idx:end_idx]
-                recipe_data = json.loads(json_part)
-            else:
-                raise ValueError("Failed to extract JSON from the response")
-
-        # Validate required fields
-        if not all(
-            key in recipe_data for key in ["name", "ingredients", "instructions"]
+        # Request the recipe as a JSON object (parsed, repaired and validated)
+        with model_router.track(
+            "recipe", estimated_prompt=count_message_tokens(messages, params["model"])
         ):
-            raise ValueError("Generated recipe is missing required fields")
-
-        return recipe_data
+            return await complete_json(
+                messages, RECIPE_SCHEMA, name="save_recipe", **params
+            )
 
+    except (CircuitOpenError, DeadlineExceeded):
+        raise
     except Exception as e:
-        # Log the error
-        print(f"Error generating recipe: {str(e)}")
+        logger.error(f"Error generating recipe: {str(e)}")
         raise ValueError(f"Failed to generate recipe: {str(e)}")
 
 
 async def estimate_calories(recipe_name: str, ingredients: List[str]) -> float:
     """
-    Estimate calories for a recipe using OpenAI (simplified version)
+    Estimate calories for a recipe
 
-    In a production app, you would use a nutrition API like Nutritionix
-    but this simplified version uses AI to estimate
+    Computed locally from the ingredient lines (utils.nutrition) when enough
+    of them are recognized, else asked of the small calorie model; see
+    CALORIE_ESTIMATOR. In a production app, you would use a nutrition API
+    like Nutritionix for the foods the local table does not know.
 
     Args:
         recipe_name: Name of the recipe
         ingredients: List of ingredients with amounts
 
     Returns:
-        Estimated calories as a float
+        Estimated calories as a float (0 if no estimate could be made)
     """
-    prompt = f"Estimate the total calories in this recipe called '{recipe_name}' with these ingredients: {', '.join(ingredients)}. Return only a number representing the total calories."
+    if CALORIE_ESTIMATOR != "model":
+        with model_router.track("calories", local=True):
+            calories, coverage = nutrition.estimate_calories(ingredients)
+        if coverage >= CALORIE_LOCAL_MIN_COVERAGE or CALORIE_ESTIMATOR == "local":
+            return float(calories)
+
+    params = model_router.params("calories")
+    messages = CALORIE_PROMPT.messages(
+        name=truncate(recipe_name, RECIPE_NAME_TOKENS, params["model"]),
+        ingredients=fit_ingredients(
+            ingredients, PROMPT_INGREDIENT_TOKENS, params["model"]
+        )[0],
+    )
 
     try:
-        response = await openai.ChatCompletion.acreate(
-            model=OPENAI_MODEL,
-            messages=[
-                {
-                    "role": "system",
-                    "content": "You are a nutrition expert providing accurate calorie estimations.",
-                },
-                {"role": "user", "content": prompt},
-            ],
-            temperature=0.3,
-            max_tokens=50,
-        )
+        with model_router.track(
+            "calories",
+            estimated_prompt=count_message_tokens(messages, params["model"]),
+        ):
+            response = await create_completion(messages=messages, **params)
 
         # Extract the estimated calories
         calories_text = response.choices[0].message.content.strip()
 
         # Try to extract just the number
-        import re
-
         calories_match = re.search(r"\d+", calories_text)
 
         if calories_match:
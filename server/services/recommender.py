@@ -0,0 +1,462 @@
+"""
+Pantry-aware recipe recommender
+
+Scores every recipe in the collection against a pantry (a list of
+ingredients the user has) and, for signed-in users, their saved-recipe
+history. Recipes are rows of a sparse binary recipe x ingredient matrix
+(SciPy CSR) over normalized ingredient keys, so a whole-collection score is
+a couple of sparse matrix-vector products:
+
+    coverage = |recipe & pantry| / |recipe|            (can I cook it?)
+    jaccard  = |recipe & pantry| / |recipe | pantry|   (does it use my pantry?)
+    history  = similarity to the ingredients of saved recipes
+
+The index is built once and then kept current incrementally: when the
+recipes version counter moves, only recipes created or updated since the
+last sync are (re)added as new rows, with replaced rows masked out. A full
+rebuild compacts it periodically and picks up deletions.
+
+Each user's top candidates are cached together with the index generation
+they were computed at. When the index advances, only the changed rows are
+scored and merged into the cached list, so repeat requests stay cheap as
+the collection changes.
+"""
+
+import itertools
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+import numpy as np
+from scipy import sparse
+
+from config.database import get_collection
+from config.settings import RECOMMENDER_REBUILD_SECONDS, RECOMMENDER_REFRESH_SECONDS
+from services.version_service import RECIPES, get_versions, user_key
+from utils.cache import TTLCache
+from utils.ingredients import normalize_ingredients
+
+logger = logging.getLogger(__name__)
+
+# Score weights (sum to 1)
+COVERAGE_WEIGHT = 0.6
+JACCARD_WEIGHT = 0.25
+HISTORY_WEIGHT = 0.15
+
+# Candidates kept per cached user/pantry
+CANDIDATES_PER_USER = 200
+
+# Saved recipes that make up a user's taste profile
+HISTORY_LIMIT = 100
+
+# Margin for clock differences between app servers when syncing by timestamp
+SYNC_SKEW = timedelta(seconds=5)
+
+
+class RecipeIndex:
+    """Sparse recipe x ingredient matrix, kept current incrementally"""
+
+    def __init__(self):
+        self.epoch = next(_epochs)  # Row numbers are only valid within an epoch
+        self.generation = 0  # Bumped on every incremental sync with changes
+        self.version = None  # Recipes version counter the index reflects
+        self.built_at = time.monotonic()
+        self.terms: List[str] = []
+        self.vocab: Dict[str, int] = {}
+        self.recipe_ids: List[str] = []
+        self.row_of: Dict[str, int] = {}
+        self.lock = threading.RLock()
+        self._indices: List[int] = []
+        self._indptr: List[int] = [0]
+        self._alive: List[bool] = []
+        self._changes: List[Tuple[int, int]] = []  # (generation, first new row)
+        self._matrix = None
+        self._synced_at: Optional[datetime] = None
+
+    def __len__(self):
+        return len(self.recipe_ids)
+
+    def _add(self, recipe_id: str, ingredients: Iterable[str]) -> bool:
+        """Add or replace a recipe's row; returns False if it was unchanged"""
+        columns = set()
+        for key in normalize_ingredients(ingredients or []):
+            if key not in self.vocab:
+                self.vocab[key] = len(self.terms)
+                self.terms.append(key)
+            columns.add(self.vocab[key])
+        columns = sorted(columns)
+
+        old_row = self.row_of.get(recipe_id)
+        if old_row is not None:
+            start, end = self._indptr[old_row], self._indptr[old_row + 1]
+            if self._indices[start:end] == columns:
+                return False
+            self._alive[old_row] = False
+
+        self.row_of[recipe_id] = len(self.recipe_ids)
+        self.recipe_ids.append(recipe_id)
+        self._indices.extend(columns)
+        self._indptr.append(len(self._indices))
+        self._alive.append(True)
+        self._matrix = None
+        return True
+
+    def load(self):
+        """Load every recipe in the collection"""
+        started = datetime.now()
+        for recipe in get_collection("recipes").find({}, {"ingredients": 1}):
+            self._add(str(recipe["_id"]), recipe.get("ingredients"))
+        self._synced_at = started
+        self.built_at = time.monotonic()
+        logger.info(
+            f"Recommender index built: {len(self)} recipes, "
+            f"{len(self.vocab)} ingredients"
+        )
+
+    def sync(self) -> int:
+        """
+        Add recipes created or updated since the last sync
+
+        Returns:
+            Number of rows added or replaced
+        """
+        since = self._synced_at - SYNC_SKEW
+        started = datetime.now()
+        query = {
+            "$or": [{"createdAt": {"$gte": since}}, {"updatedAt": {"$gte": since}}]
+        }
+        recipes = list(get_collection("recipes").find(query, {"ingredients": 1}))
+
+        with self.lock:
+            first_row = len(self)
+            changed = 0
+            for recipe in recipes:
+                changed += self._add(str(recipe["_id"]), recipe.get("ingredients"))
+            self._synced_at = started
+            if changed:
+                self.generation += 1
+                self._changes.append((self.generation, first_row))
+        return changed
+
+    def matrix(self) -> Tuple[sparse.csr_matrix, np.ndarray, np.ndarray]:
+        """The CSR matrix with per-row ingredient counts and live-row mask"""
+        with self.lock:
+            if self._matrix is None:
+                indices = np.asarray(self._indices, dtype=np.int32)
+                indptr = np.asarray(self._indptr, dtype=np.int64)
+                matrix = sparse.csr_matrix(
+                    (np.ones(len(indices), dtype=np.float32), indices, indptr),
+                    shape=(len(self), max(len(self.vocab), 1)),
+                )
+                sizes = np.diff(indptr).astype(np.float32)
+                self._matrix = (matrix, sizes, np.asarray(self._alive, dtype=bool))
+            return self._matrix
+
+    def rows_since(self, generation: int) -> Optional[np.ndarray]:
+        """Rows added after a generation, or None if that is unknown"""
+        with self.lock:
+            for changed_at, first_row in self._changes:
+                if changed_at > generation:
+                    return np.arange(first_row, len(self))
+            return np.arange(0) if generation == self.generation else None
+
+    def term_vector(self, keys: Iterable[str]) -> np.ndarray:
+        """Dense 0/1 vector over the vocabulary for the given keys"""
+        vector = np.zeros(max(len(self.vocab), 1), dtype=np.float32)
+        vector[[self.vocab[key] for key in keys if key in self.vocab]] = 1
+        return vector
+
+    def row_terms(self, row: int) -> List[str]:
+        """Ingredient keys of one row"""
+        start, end = self._indptr[row], self._indptr[row + 1]
+        return [self.terms[column] for column in self._indices[start:end]]
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and freshness"""
+        return {
+            "recipes": len(self),
+            "live": sum(self._alive),
+            "ingredients": len(self.vocab),
+            "epoch": self.epoch,
+            "generation": self.generation,
+        }
+
+
+_epochs = itertools.count(1)
+_index: Optional[RecipeIndex] = None
+_refresh_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+_checked_at = 0.0
+
+# Top candidates by user (or by pantry for anonymous requests)
+_candidates = TTLCache(maxsize=10000, ttl=900)
+
+
+def _rebuild():
+    """Load a fresh index, catch it up, and swap it in"""
+    global _index
+    if not _rebuild_lock.acquire(blocking=False):
+        return
+    try:
+        version = get_versions([RECIPES])[RECIPES]
+        index = RecipeIndex()
+        index.load()
+        with _refresh_lock:
+            index.sync()
+            index.version = version
+            _index = index
+    except Exception as e:
+        logger.error(f"Recommender index rebuild failed: {e}")
+    finally:
+        _rebuild_lock.release()
+
+
+def get_index(version: Optional[int] = None) -> RecipeIndex:
+    """
+    Get the shared index, bringing it up to date if a check is due
+
+    Checks the recipes version counter at most every
+    RECOMMENDER_REFRESH_SECONDS and syncs only when it moved. Periodic full
+    rebuilds run in a background thread while the current index keeps
+    serving.
+
+    Args:
+        version: Recipes version the caller has already read. If the index
+            is behind it, it is synced before returning, so responses
+            tagged with that version never carry older results.
+    """
+    global _index, _checked_at
+
+    def current() -> bool:
+        if _index is None:
+            return False
+        if version is not None:
+            return version == _index.version
+        return time.monotonic() - _checked_at < RECOMMENDER_REFRESH_SECONDS
+
+    if current():
+        return _index
+
+    # Only the first build (or a caller that needs a newer index) waits
+    if not _refresh_lock.acquire(blocking=_index is None or version is not None):
+        return _index
+    try:
+        if current():
+            return _index
+
+        now = time.monotonic()
+        if version is None:
+            version = get_versions([RECIPES])[RECIPES]
+        if _index is None:
+            index = RecipeIndex()
+            index.load()
+            _index = index
+        elif version != _index.version:
+            _index.sync()
+        _index.version = version
+        _checked_at = now
+
+        if now - _index.built_at > RECOMMENDER_REBUILD_SECONDS:
+            threading.Thread(
+                target=_rebuild, name="recommender-rebuild", daemon=True
+            ).start()
+        return _index
+    finally:
+        _refresh_lock.release()
+
+
+def warm_up_in_background() -> threading.Thread:
+    """Build the index in a daemon thread so the first request is fast"""
+    thread = threading.Thread(target=get_index, name="recommender-warmup", daemon=True)
+    thread.start()
+    return thread
+
+
+def _history_vector(index: RecipeIndex, user_id: str) -> Optional[np.ndarray]:
+    """Normalized ingredient profile of a user's recently saved recipes"""
+    bookmarks = (
+        get_collection("bookmarks")
+        .find({"userId": user_id}, {"_id": 0, "recipeId": 1})
+        .sort("createdAt", -1)
+        .limit(HISTORY_LIMIT)
+    )
+    rows = [
+        index.row_of[bookmark["recipeId"]]
+        for bookmark in bookmarks
+        if bookmark["recipeId"] in index.row_of
+    ]
+    if not rows:
+        return None
+
+    matrix, _, _ = index.matrix()
+    profile = np.asarray(matrix[rows].sum(axis=0)).ravel()
+    return profile / profile.max()
+
+
+def score_rows(
+    index: RecipeIndex,
+    pantry: np.ndarray,
+    pantry_size: int,
+    history: Optional[np.ndarray],
+    rows: Optional[np.ndarray] = None,
+) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Score recipes against a pantry in one vectorized pass
+
+    Args:
+        index: Recipe index
+        pantry: Pantry term vector (from term_vector)
+        pantry_size: Number of pantry items, including unknown ones
+        history: Normalized history profile, or None
+        rows: Rows to score, or None for all
+
+    Returns:
+        Tuple of (rows, scores) for live rows that share an ingredient
+        with the pantry
+    """
+    matrix, sizes, alive = index.matrix()
+    if rows is None:
+        rows = np.arange(matrix.shape[0])
+    if len(rows) == 0:
+        return rows, np.zeros(0, dtype=np.float32)
+
+    subset = matrix[rows] if len(rows) < matrix.shape[0] else matrix
+    sizes = np.maximum(sizes[rows], 1)
+
+    overlap = subset @ pantry
+    coverage = overlap / sizes
+    jaccard = overlap / np.maximum(sizes + pantry_size - overlap, 1)
+    scores = COVERAGE_WEIGHT * coverage + JACCARD_WEIGHT * jaccard
+    if history is not None:
+        scores += HISTORY_WEIGHT * (subset @ history) / sizes
+
+    keep = alive[rows] & (overlap > 0)
+    return rows[keep], scores[keep].astype(np.float32)
+
+
+def _top(
+    rows: np.ndarray, scores: np.ndarray, k: int
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Best k rows by score, highest first"""
+    if len(rows) > k:
+        best = np.argpartition(-scores, k - 1)[:k]
+        rows, scores = rows[best], scores[best]
+    order = np.argsort(-scores, kind="stable")
+    return rows[order], scores[order]
+
+
+def _candidates_for(
+    index: RecipeIndex, pantry_keys: List[str], user_id: Optional[str]
+) -> Tuple[np.ndarray, np.ndarray]:
+    """Cached top candidates, refreshed incrementally as the index changes"""
+    pantry_key = tuple(sorted(pantry_keys))
+    history_version = None
+    if user_id:
+        saved = user_key(user_id, "saved")
+        history_version = get_versions([saved])[saved]
+
+    cache_key = user_id or pantry_key
+    entry = _candidates.get(cache_key)
+    pantry = index.term_vector(pantry_keys)
+
+    reusable = (
+        entry is not None
+        and entry["epoch"] == index.epoch
+        and entry["pantry"] == pantry_key
+        and entry["history"] == history_version
+    )
+    changed_rows = index.rows_since(entry["generation"]) if reusable else None
+
+    if changed_rows is not None and len(changed_rows) == 0:
+        return entry["rows"], entry["scores"]
+
+    history = _history_vector(index, user_id) if user_id else None
+
+    if changed_rows is not None:
+        # Score only new rows and merge them with the surviving candidates
+        _, _, alive = index.matrix()
+        keep = alive[entry["rows"]]
+        new_rows, new_scores = score_rows(
+            index, pantry, len(pantry_keys), history, changed_rows
+        )
+        rows = np.concatenate([entry["rows"][keep], new_rows])
+        scores = np.concatenate([entry["scores"][keep], new_scores])
+        if len(entry["rows"]) >= CANDIDATES_PER_USER > len(rows):
+            # Replaced rows pushed out candidates that were never kept
+            rows, scores = score_rows(index, pantry, len(pantry_keys), history)
+    else:
+        rows, scores = score_rows(index, pantry, len(pantry_keys), history)
+
+    rows, scores = _top(rows, scores, CANDIDATES_PER_USER)
+    _candidates.set(
+        cache_key,
+        {
+            "epoch": index.epoch,
+            "generation": index.generation,
+            "pantry": pantry_key,
+            "history": history_version,
+            "rows": rows,
+            "scores": scores,
+        },
+    )
+    return rows, scores
+
+
+def recommend(
+    pantry: Iterable[str],
+    user_id: Optional[str] = None,
+    limit: int = 20,
+    min_coverage: float = 0.0,
+    version: Optional[int] = None,
+) -> List[Dict[str, Any]]:
+    """
+    Rank existing recipes for a pantry
+
+    Args:
+        pantry: Ingredients the user has (free text)
+        user_id: Signed-in user, to personalize with saved-recipe history
+        limit: Maximum number of recommendations
+        min_coverage: Only return recipes where at least this share of the
+            ingredients is in the pantry
+        version: Recipes version the caller has read (see get_index)
+
+    Returns:
+        List of {"recipeId", "score", "coverage", "missing"} dicts, best
+        first; "missing" lists the recipe's ingredients not in the pantry
+    """
+    pantry_keys = normalize_ingredients(pantry)
+    if not pantry_keys:
+        return []
+
+    index = get_index(version)
+    with index.lock:
+        rows, scores = _candidates_for(index, pantry_keys, user_id)
+
+    have = set(pantry_keys)
+    results = []
+    for row, score in zip(rows.tolist(), scores.tolist()):
+        terms = index.row_terms(row)
+        missing = [term for term in terms if term not in have]
+        coverage = 1 - len(missing) / max(len(terms), 1)
+        if coverage < min_coverage:
+            continue
+        results.append(
+            {
+                "recipeId": index.recipe_ids[row],
+                "score": round(score, 4),
+                "coverage": round(coverage, 4),
+                "missing": missing,
+            }
+        )
+        if len(results) >= limit:
+            break
+    return results
+
+
+def index_stats() -> Dict[str, Any]:
+    """Index size and freshness, for health checks"""
+    if _index is None:
+        return {"built": False}
+    return {"built": True, **_index.stats(), "cachedCandidates": len(_candidates)}
@@ -0,0 +1,610 @@
+"""
+Structured (JSON) output from the chat completion API
+
+complete_json() asks the model for a JSON object matching a schema and
+makes sure a paid call is not thrown away over a formatting slip:
+
+1. The schema is enforced at decode time where the model supports it, with
+   function calling ("functions") or JSON mode ("json"). Models that reject
+   those parameters fall back to plain prompting ("prompt"), and the mode is
+   remembered (per model) for the rest of the process.
+2. The reply is parsed with json.loads, then with repair_json(), a tolerant
+   single-pass parser for the usual defects (surrounding prose, code fences,
+   trailing commas, comments, single quotes, raw newlines in strings, Python
+   literals, and output truncated mid-object).
+3. Values are coerced to the schema's types where that is unambiguous
+   ("450 kcal" -> 450, a list of steps -> one string).
+4. Only if that still fails, one short repair request sends the broken
+   output and the specific problems back at temperature 0, instead of
+   regenerating the recipe from scratch.
+
+Every API call goes through create_completion(), which applies the OpenAI
+circuit breaker, stops at the current deadline (utils.deadline) and hedges
+calls that run past the usual latency with a duplicate request.
+
+Outcomes are counted for structured_output_stats().
+"""
+
+import asyncio
+import json
+import logging
+import re
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from config import registry
+from config.settings import (
+    OPENAI_HEDGE,
+    OPENAI_HEDGE_MAX_RATE,
+    OPENAI_HEDGE_MIN_DELAY,
+    OPENAI_HEDGE_PERCENTILE,
+    OPENAI_MODEL,
+    OPENAI_SLOW_SECONDS,
+    OPENAI_STRUCTURED_OUTPUT,
+)
+from utils.circuit_breaker import CLOSED, get_breaker
+from utils.deadline import check as check_deadline
+from utils.deadline import remaining, within_deadline
+
+logger = logging.getLogger(__name__)
+
+# Longest broken reply sent back in a repair request (characters)
+MAX_REPAIR_INPUT = 6000
+
+# Latencies kept per kind of call, and how many are needed before hedging
+LATENCY_SAMPLES = 200
+MIN_HEDGE_SAMPLES = 20
+
+# Opening quote -> closing quote, including typographic quotes
+QUOTES = {'"': '"', "'": "'", "“": "”", "‘": "’"}
+
+# Bare words a model may emit instead of JSON literals
+LITERALS = {
+    "true": "true",
+    "True": "true",
+    "false": "false",
+    "False": "false",
+    "null": "null",
+    "None": "null",
+    "NaN": "null",
+    "undefined": "null",
+}
+
+_NUMBER = re.compile(r"-?\d+(?:\.\d+)?(?:[eE][+-]?\d+)?$")
+_FIRST_NUMBER = re.compile(r"-?\d+(?:\.\d+)?")
+_BARE_WORD = re.compile(r"[A-Za-z0-9_.+\-]")
+_ESCAPES = set('"\\/bfnrtu')
+
+_stats = {
+    "requests": 0,
+    "parsed": 0,  # valid as returned
+    "repaired": 0,  # fixed locally by repair_json() / type coercion
+    "reprompted": 0,  # fixed by the repair request
+    "failed": 0,
+    "truncated": 0,  # hit max_tokens
+    "tokens": 0,
+    "hedged": 0,  # a second request was sent
+    "hedgeWins": 0,  # ...and answered first
+}
+_stats_lock = threading.Lock()
+_unsupported_modes = set()
+
+# Trips when OpenAI errors or slows down, so callers fall back at once
+openai_breaker = get_breaker("openai", OPENAI_SLOW_SECONDS)
+
+# Token counters open in the current task, see token_meter()
+_meters: ContextVar[Tuple[List[int], ...]] = ContextVar("token_meters", default=())
+
+
+class StructuredOutputError(ValueError):
+    """Raised when a reply cannot be turned into a valid object"""
+
+
+class LatencyTracker:
+    """Recent latencies of one kind of call, and how often it was hedged"""
+
+    def __init__(self, size: int = LATENCY_SAMPLES):
+        self.latencies = deque(maxlen=size)
+        self.hedged = deque(maxlen=size)
+        self.lock = threading.Lock()
+
+    def record(self, seconds: float):
+        with self.lock:
+            self.latencies.append(seconds)
+
+    def hedge_delay(self) -> Optional[float]:
+        """
+        Seconds to wait before hedging a new call, or None not to hedge
+
+        No hedging until enough latencies are known, nor once hedges make up
+        OPENAI_HEDGE_MAX_RATE of the recent calls (so a slow upstream is not
+        sent twice the load).
+        """
+        with self.lock:
+            if len(self.latencies) < MIN_HEDGE_SAMPLES:
+                return None
+            if sum(self.hedged) >= OPENAI_HEDGE_MAX_RATE * self.hedged.maxlen:
+                return None
+            ordered = sorted(self.latencies)
+        rank = int(len(ordered) * OPENAI_HEDGE_PERCENTILE / 100)
+        return max(ordered[min(rank, len(ordered) - 1)], OPENAI_HEDGE_MIN_DELAY)
+
+    def count_call(self, hedged: bool):
+        with self.lock:
+            self.hedged.append(hedged)
+
+
+# Keyed by (model, max_tokens): each kind of call has its own latency profile
+_latency: Dict[Any, LatencyTracker] = {}
+
+
+def _count(outcome: str, amount: int = 1):
+    with _stats_lock:
+        _stats[outcome] += amount
+
+
+def record_usage(response):
+    """Count the tokens a completion used, globally and on the open meters"""
+    usage = response.usage
+    counts = [
+        getattr(usage, field, 0) or 0
+        for field in ("total_tokens", "prompt_tokens", "completion_tokens")
+    ]
+    _count("tokens", counts[0])
+    for meter in _meters.get():
+        for index, count in enumerate(counts):
+            meter[index] += count
+
+
+@contextmanager
+def token_meter() -> Iterator[List[int]]:
+    """
+    Count tokens used by completions inside the block
+
+    Meters nest: a completion counts toward every meter open around it.
+
+    Yields:
+        List holding the running [total, prompt, completion] token counts
+    """
+    meter = [0, 0, 0]
+    token = _meters.set(_meters.get() + (meter,))
+    try:
+        yield meter
+    finally:
+        _meters.reset(token)
+
+
+def _ends_string(text: str, index: int) -> bool:
+    """
+    Whether a quote followed by text[index:] closes a string
+
+    A quote followed by anything but a delimiter is an unescaped quote
+    inside the string (`"he said "hi""`).
+    """
+    rest = text[index:].lstrip()
+    return not rest or rest[0] in ",:}]" or rest.startswith("//")
+
+
+def repair_json(text: str) -> Any:
+    """
+    Parse the first JSON object or array in text, repairing common defects
+
+    Args:
+        text: Model output
+
+    Returns:
+        The parsed value
+
+    Raises:
+        ValueError: If there is no object or array to recover
+    """
+    starts = [index for index in (text.find("{"), text.find("[")) if index >= 0]
+    if not starts:
+        raise ValueError("No JSON object in the response")
+
+    out: List[str] = []
+    # One frame per open container: [closer, expecting_key, key_pending]
+    stack: List[list] = []
+    closing_quote = None
+    escaped = False
+    i = min(starts)
+
+    def strip_trailing_comma():
+        while out and out[-1].isspace():
+            out.pop()
+        if out and out[-1] == ",":
+            out.pop()
+
+    def string_done():
+        # A finished string in key position is a key awaiting its colon
+        if stack and stack[-1][1]:
+            stack[-1][2] = True
+
+    while i < len(text):
+        char = text[i]
+
+        if closing_quote is not None:
+            if escaped:
+                if char not in _ESCAPES:
+                    # JSON has no \' (or \x...): keep the character only
+                    out.pop()
+                out.append(char)
+                escaped = False
+            elif char == "\\":
+                out.append(char)
+                escaped = True
+            elif char == closing_quote and _ends_string(text, i + 1):
+                out.append('"')
+                closing_quote = None
+                string_done()
+            elif char == '"':
+                out.append('\\"')
+            elif char in "\n\r\t":
+                out.append({"\n": "\\n", "\r": "\\r", "\t": "\\t"}[char])
+            else:
+                out.append(char)
+            i += 1
+            continue
+
+        if char in "{[":
+            out.append(char)
+            stack.append(["}" if char == "{" else "]", char == "{", False])
+        elif char in "}]":
+            strip_trailing_comma()
+            if stack[-1][2]:
+                out.append(":null")
+            out.append(stack.pop()[0])
+            if not stack:
+                break
+        elif char == ",":
+            out.append(char)
+            if stack[-1][0] == "}":
+                stack[-1][1:] = [True, False]
+        elif char == ":":
+            out.append(char)
+            stack[-1][1:] = [False, False]
+        elif char in QUOTES:
+            out.append('"')
+            closing_quote = QUOTES[char]
+        elif text.startswith("//", i):
+            end = text.find("\n", i)
+            i = len(text) if end < 0 else end
+            continue
+        elif text.startswith("/*", i):
+            end = text.find("*/", i)
+            i = len(text) if end < 0 else end + 2
+            continue
+        elif _BARE_WORD.match(char):
+            end = i
+            while end < len(text) and _BARE_WORD.match(text[end]):
+                end += 1
+            word = text[i:end]
+            if stack[-1][1]:
+                # Unquoted key
+                out.append(json.dumps(word))
+                string_done()
+            elif word in LITERALS:
+                out.append(LITERALS[word])
+            elif _NUMBER.match(word):
+                out.append(word)
+            else:
+                out.append(json.dumps(word))
+            i = end
+            continue
+        elif char.isspace():
+            out.append(char)
+        # Anything else outside a string is noise and dropped
+        i += 1
+
+    # Output cut off mid-value: close what is open
+    if closing_quote is not None:
+        if escaped:
+            out.pop()
+        out.append('"')
+        string_done()
+    if stack:
+        strip_trailing_comma()
+        if out and out[-1] == ":":
+            out.append("null")
+        elif stack[-1][2]:
+            out.append(":null")
+        out.extend(frame[0] for frame in reversed(stack))
+
+    return json.loads("".join(out))
+
+
+def coerce(data: Any, schema: Dict[str, Any]) -> Tuple[Any, List[str]]:
+    """
+    Check a value against a (simple) JSON schema, coercing obvious mismatches
+
+    Supports object/array/string/number/integer types, `properties`,
+    `required` and array `items`.
+
+    Returns:
+        Tuple of (coerced value, list of problems; empty if valid)
+    """
+    expected = schema.get("type")
+
+    if expected == "object":
+        if not isinstance(data, dict):
+            return data, ["expected a JSON object"]
+        result, problems = dict(data), []
+        for field in schema.get("required", []):
+            if result.get(field) in (None, "", []):
+                problems.append(f"missing required field '{field}'")
+        for field, field_schema in schema.get("properties", {}).items():
+            if result.get(field) is None:
+                continue
+            value, field_problems = coerce(result[field], field_schema)
+            result[field] = value
+            problems.extend(f"{field}: {problem}" for problem in field_problems)
+        return result, problems
+
+    if expected == "array":
+        if isinstance(data, str):
+            data = [line.strip(" -*\t") for line in data.splitlines() if line.strip()]
+        if not isinstance(data, list):
+            return data, ["expected a list"]
+        items = [coerce(item, schema.get("items", {})) for item in data]
+        return [item for item, _ in items], [p for _, ps in items for p in ps]
+
+    if expected == "string":
+        if isinstance(data, list):
+            return "\n".join(str(item) for item in data), []
+        if isinstance(data, (int, float)):
+            return str(data), []
+        return data, [] if isinstance(data, str) else ["expected a string"]
+
+    if expected in ("number", "integer"):
+        if isinstance(data, str):
+            match = _FIRST_NUMBER.search(data.replace(",", ""))
+            if not match:
+                return data, [f"expected a number, got {data!r}"]
+            data = float(match.group())
+        if isinstance(data, bool) or not isinstance(data, (int, float)):
+            return data, ["expected a number"]
+        return (int(data) if expected == "integer" else data), []
+
+    return data, []
+
+
+def parse_reply(text: str, schema: Dict[str, Any]) -> Tuple[Any, List[str], bool]:
+    """
+    Parse and check a model reply
+
+    Returns:
+        Tuple of (value, problems, whether it needed repair or coercion)
+    """
+    repaired = False
+    try:
+        data = json.loads(text)
+    except (json.JSONDecodeError, TypeError):
+        try:
+            data = repair_json(text or "")
+            repaired = True
+        except ValueError as e:
+            return None, [f"invalid JSON: {e}"], True
+
+    coerced, problems = coerce(data, schema)
+    return coerced, problems, repaired or coerced != data
+
+
+def _compact(value) -> str:
+    return json.dumps(value, separators=(",", ":"), ensure_ascii=False)
+
+
+def _mode_params(mode: str, name: str, schema: Dict[str, Any]) -> Dict[str, Any]:
+    if mode == "functions":
+        return {
+            "functions": [{"name": name, "parameters": schema}],
+            "function_call": {"name": name},
+        }
+    if mode == "json":
+        return {"response_format": {"type": "json_object"}}
+    return {}
+
+
+def _reply_text(response) -> str:
+    message = response.choices[0].message
+    if message.function_call:
+        return message.function_call.arguments or ""
+    return message.content or ""
+
+
+async def _attempt(llm, params: Dict[str, Any], tracker: LatencyTracker):
+    """One API request through the OpenAI circuit breaker"""
+    probe = openai_breaker.before_call()
+    started = time.monotonic()
+    failed = True
+    cancelled = False
+    try:
+        response = await llm.client.chat.completions.create(**params)
+        failed = False
+    except llm.BadRequestError:
+        # Rejected: the caller's fault, not an outage
+        failed = False
+        raise
+    except asyncio.CancelledError:
+        # Lost a hedge, deadline, job cancelled: no outcome to record
+        cancelled = True
+        raise
+    finally:
+        openai_breaker.after_call(
+            failed, time.monotonic() - started, probe, cancelled=cancelled
+        )
+
+    tracker.record(time.monotonic() - started)
+    return response
+
+
+async def _hedged(request, delay: Optional[float], tracker: LatencyTracker):
+    """
+    Run request(), starting an identical one if the first takes over delay
+
+    The first successful response wins and the other request is cancelled.
+    """
+    tasks = {asyncio.ensure_future(request())}
+    first = next(iter(tasks))
+    try:
+        if delay is not None:
+            done, _ = await asyncio.wait(tasks, timeout=delay)
+            if not done and openai_breaker.state == CLOSED:
+                _count("hedged")
+                tasks.add(asyncio.ensure_future(request()))
+        tracker.count_call(len(tasks) > 1)
+
+        error = None
+        while tasks:
+            done, tasks = await asyncio.wait(
+                tasks, return_when=asyncio.FIRST_COMPLETED
+            )
+            for task in done:
+                if task.exception() is None:
+                    if task is not first:
+                        _count("hedgeWins")
+                    return task.result()
+                error = task.exception()
+        raise error
+    finally:
+        for task in tasks:
+            task.cancel()
+
+
+async def create_completion(hedge: bool = True, **params):
+    """
+    Call the chat completion API, within the current deadline
+
+    Requests go through the OpenAI circuit breaker. A call still running
+    after the usual (OPENAI_HEDGE_PERCENTILE) latency for its kind is
+    hedged with a duplicate request, whichever answers first wins.
+
+    Args:
+        hedge: Whether the call may be hedged
+        **params: chat.completions.create parameters
+
+    Returns:
+        The API response (token usage is recorded)
+
+    Raises:
+        CircuitOpenError: If OpenAI is failing and the breaker is open
+        DeadlineExceeded: If the current deadline passes first
+    """
+    llm = registry.get("openai")
+    check_deadline()
+    left = remaining()
+    if left is not None:
+        params.setdefault("timeout", left)
+
+    kind = (params.get("model"), params.get("max_tokens"))
+    tracker = _latency.setdefault(kind, LatencyTracker())
+    delay = tracker.hedge_delay() if hedge and OPENAI_HEDGE else None
+    response = await within_deadline(
+        _hedged(lambda: _attempt(llm, params, tracker), delay, tracker)
+    )
+    record_usage(response)
+    return response
+
+
+async def _create(llm, params: Dict[str, Any], name: str, schema: Dict[str, Any]):
+    """Call the API in the configured mode, falling back to plain prompting"""
+    model = params["model"]
+    mode = OPENAI_STRUCTURED_OUTPUT
+    if f"{model}:{mode}" in _unsupported_modes:
+        mode = "prompt"
+
+    try:
+        return await create_completion(**params, **_mode_params(mode, name, schema))
+    except llm.BadRequestError as e:
+        if mode == "prompt":
+            raise
+        logger.warning(f"{model} rejected {mode} output, prompting instead: {e}")
+        _unsupported_modes.add(f"{model}:{mode}")
+        return await create_completion(**params)
+
+
+async def complete_json(
+    messages: List[Dict[str, str]],
+    schema: Dict[str, Any],
+    name: str = "result",
+    model: Optional[str] = None,
+    **params,
+) -> Dict[str, Any]:
+    """
+    Get a JSON object matching a schema from the chat completion API
+
+    Args:
+        messages: Chat messages; they should describe the expected JSON so
+            the plain-prompt fallback works too
+        schema: JSON schema of the result (object type)
+        name: Function name used in function-calling mode
+        model: Model name (OPENAI_MODEL by default)
+        **params: Other completion parameters (temperature, max_tokens, ...)
+
+    Returns:
+        The parsed and coerced object
+
+    Raises:
+        StructuredOutputError: If neither parsing nor the repair request
+            produced a valid object
+    """
+    llm = registry.get("openai")
+    params = {"model": model or OPENAI_MODEL, **params}
+    _count("requests")
+
+    response = await _create(llm, {**params, "messages": messages}, name, schema)
+    if response.choices[0].finish_reason == "length":
+        _count("truncated")
+        logger.warning(f"{name} output hit max_tokens; closing it off")
+
+    reply = _reply_text(response)
+    data, problems, repaired = parse_reply(reply, schema)
+    if not problems:
+        _count("repaired" if repaired else "parsed")
+        return data
+
+    # One targeted repair instead of a whole new generation
+    logger.warning(f"{name} output invalid ({'; '.join(problems)}), asking for a fix")
+    repair_messages = [
+        {
+            "role": "system",
+            "content": "You correct JSON. Reply with only the corrected JSON object.",
+        },
+        {
+            "role": "user",
+            "content": (
+                f"This JSON should match the schema {_compact(schema)} but has "
+                f"these problems: {'; '.join(problems)}. Fix only those problems "
+                f"and keep everything else.\n\n{reply[:MAX_REPAIR_INPUT]}"
+            ),
+        },
+    ]
+    response = await _create(
+        llm,
+        {**params, "messages": repair_messages, "temperature": 0},
+        name,
+        schema,
+    )
+    data, problems, _ = parse_reply(_reply_text(response), schema)
+    if problems:
+        _count("failed")
+        raise StructuredOutputError(f"Invalid {name}: {'; '.join(problems)}")
+
+    _count("reprompted")
+    return data
+
+
+def structured_output_stats() -> Dict[str, Any]:
+    """Parse outcome counts and failure rate, for health checks"""
+    with _stats_lock:
+        stats = dict(_stats)
+    stats["failureRate"] = round(stats["failed"] / max(stats["requests"], 1), 4)
+    stats["repairRate"] = round(
+        (stats["repaired"] + stats["reprompted"]) / max(stats["requests"], 1), 4
+    )
+    stats["mode"] = OPENAI_STRUCTURED_OUTPUT
+    stats["unsupportedModes"] = sorted(_unsupported_modes)
+    return stats
@@ -0,0 +1,645 @@
+"""
+Approximate nearest-neighbor index over recipe embeddings
+
+Recipe vectors (see services.embeddings) are searched with an inverted-file
+(IVF) index: k-means splits the vectors into about sqrt(n) lists, and a
+query scans only the VECTOR_NPROBE lists whose centroids are nearest. At a
+million recipes that is ~1,000 lists of ~1,000 vectors, so a query scores
+~16,000 vectors instead of a million. Below IVF_MIN_ROWS the index is a
+single list, i.e. exact search.
+
+A full build writes a snapshot to VECTOR_INDEX_DIR: the vectors as a raw
+float32 matrix grouped by list (so each probe reads one contiguous slice)
+plus the centroids, list offsets, recipe IDs and content digests. Snapshots
+are memory-mapped read-only, so the vectors live in the OS page cache,
+shared by every process on the host, and survive restarts. Processes
+publish a snapshot by atomically replacing the CURRENT file, and pick up a
+newer one instead of rebuilding themselves.
+
+Between builds the index is updated incrementally: recipes created or
+changed since the last sync are embedded, assigned to their nearest list
+and appended in memory, and their old rows are masked out. Deleted recipes
+are dropped when results are loaded, and from the index at the next build.
+"""
+
+import logging
+import os
+import shutil
+import threading
+import time
+import zlib
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from config.database import get_collection
+from config.settings import (
+    VECTOR_INDEX_DIR,
+    VECTOR_NPROBE,
+    VECTOR_REBUILD_SECONDS,
+    VECTOR_REFRESH_SECONDS,
+)
+from services.embeddings import make_embedder
+from services.version_service import RECIPES, get_versions
+
+logger = logging.getLogger(__name__)
+
+# Fields that make up a recipe's embedding
+EMBEDDED_FIELDS = {"name": 1, "ingredients": 1, "instructions": 1}
+
+# Below this many recipes, search is exact (one list)
+IVF_MIN_ROWS = 4096
+
+# k-means training: sample size per list and Lloyd iterations
+KMEANS_SAMPLE_PER_LIST = 64
+KMEANS_ITERATIONS = 10
+
+# Rows per batch when embedding and when assigning rows to lists
+BATCH_SIZE = 1024
+ASSIGN_CHUNK = 65536
+
+# How long the first search waits for the initial build before giving up
+FIRST_BUILD_WAIT_SECONDS = 2.0
+
+# Snapshots kept on disk (older ones may still be mapped by other processes)
+SNAPSHOTS_KEPT = 3
+
+# Margin for clock differences between app servers when syncing by timestamp
+SYNC_SKEW = timedelta(seconds=5)
+
+
+class IndexNotReady(Exception):
+    """Raised while the first index build is still running"""
+
+
+def recipe_digest(recipe: Dict[str, Any]) -> int:
+    """Checksum of the embedded fields, to skip re-embedding unchanged recipes"""
+    content = repr([recipe.get(field) for field in EMBEDDED_FIELDS])
+    return zlib.crc32(content.encode())
+
+
+def _iter_batches(query: Dict[str, Any]):
+    batch = []
+    for recipe in get_collection("recipes").find(query, EMBEDDED_FIELDS):
+        batch.append(recipe)
+        if len(batch) == BATCH_SIZE:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+def train_centroids(vectors: np.ndarray, n_lists: int, seed: int = 0) -> np.ndarray:
+    """
+    Spherical k-means over a sample of the vectors
+
+    Args:
+        vectors: Unit-length row vectors (may be a memory map)
+        n_lists: Number of centroids
+        seed: Random seed, for reproducible builds
+
+    Returns:
+        Unit-length centroids, shape (n_lists, dim)
+    """
+    rng = np.random.default_rng(seed)
+    size = min(len(vectors), n_lists * KMEANS_SAMPLE_PER_LIST)
+    sample = np.asarray(vectors[np.sort(rng.choice(len(vectors), size, False))])
+    centroids = sample[rng.choice(size, n_lists, replace=False)].copy()
+
+    for _ in range(KMEANS_ITERATIONS):
+        assign = np.argmax(sample @ centroids.T, axis=1)
+
+        # Sum each list's members: sort by list, then add up each run
+        counts = np.bincount(assign, minlength=n_lists)
+        starts = np.cumsum(counts) - counts
+        filled = counts > 0
+        sums = np.zeros_like(centroids)
+        sums[filled] = np.add.reduceat(
+            sample[np.argsort(assign, kind="stable")], starts[filled], axis=0
+        )
+        norms = np.linalg.norm(sums, axis=1, keepdims=True)
+        # Empty lists keep their old centroid
+        centroids = np.where(norms > 0, sums / np.maximum(norms, 1e-12), centroids)
+    return centroids.astype(np.float32)
+
+
+def assign_lists(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Nearest centroid for each row, computed in chunks"""
+    assign = np.empty(len(vectors), dtype=np.int32)
+    for start in range(0, len(vectors), ASSIGN_CHUNK):
+        chunk = np.asarray(vectors[start : start + ASSIGN_CHUNK])
+        assign[start : start + len(chunk)] = np.argmax(chunk @ centroids.T, axis=1)
+    return assign
+
+
+class VectorIndex:
+    """A memory-mapped IVF snapshot plus in-memory incremental rows"""
+
+    def __init__(self, path: str, embedder):
+        self.path = path
+        self.embedder = embedder
+        self.version = None  # Recipes version counter the index reflects
+        self.built_at = time.monotonic()
+        self.lock = threading.RLock()
+
+        with np.load(os.path.join(path, "index.npz")) as data:
+            if str(data["embedder"]) != embedder.name:
+                raise ValueError(f"Snapshot was built with {data['embedder']}")
+            self.centroids = data["centroids"]
+            self.offsets = data["offsets"]
+            self.base_ids = data["ids"]
+            self.base_digests = data["digests"]
+            self.synced_at = datetime.fromtimestamp(float(data["synced_at"]))
+            embedder.load_state(
+                {
+                    key[len("embedder_") :]: data[key]
+                    for key in data.files
+                    if key.startswith("embedder_")
+                }
+            )
+
+        self.n_base = len(self.base_ids)
+        dim = embedder.dim
+        if self.n_base:
+            self.base = np.memmap(
+                os.path.join(path, "vectors.f32"),
+                dtype=np.float32,
+                mode="r",
+                shape=(self.n_base, dim),
+            )
+        else:
+            self.base = np.zeros((0, dim), dtype=np.float32)
+
+        # Base IDs are looked up by binary search to avoid a million-key dict
+        self._id_order = np.argsort(self.base_ids)
+        self._sorted_ids = self.base_ids[self._id_order]
+
+        # Incremental rows: row numbers continue after the base rows
+        self.delta = np.zeros((0, dim), dtype=np.float32)
+        self.delta_ids: List[str] = []
+        self.delta_digests: List[int] = []
+        self.delta_lists: List[List[int]] = [[] for _ in range(len(self.centroids))]
+        self.delta_row_of: Dict[str, int] = {}
+        self.alive = np.ones(self.n_base, dtype=bool)
+
+    def __len__(self):
+        return self.n_base + len(self.delta_ids)
+
+    @property
+    def n_lists(self) -> int:
+        return len(self.centroids)
+
+    def row_of(self, recipe_id: str) -> Optional[int]:
+        """Current row of a recipe, or None if it is not indexed"""
+        row = self.delta_row_of.get(recipe_id)
+        if row is not None:
+            return row
+
+        key = recipe_id.encode()
+        position = np.searchsorted(self._sorted_ids, key)
+        if position < self.n_base and self._sorted_ids[position] == key:
+            row = int(self._id_order[position])
+            if self.alive[row]:
+                return row
+        return None
+
+    def recipe_id(self, row: int) -> str:
+        """Recipe ID of a row"""
+        if row < self.n_base:
+            return self.base_ids[row].decode()
+        return self.delta_ids[row - self.n_base]
+
+    def digest(self, row: int) -> int:
+        """Content digest of a row"""
+        if row < self.n_base:
+            return int(self.base_digests[row])
+        return self.delta_digests[row - self.n_base]
+
+    def vector(self, row: int) -> np.ndarray:
+        """Embedding of a row"""
+        if row < self.n_base:
+            return np.asarray(self.base[row])
+        return self.delta[row - self.n_base]
+
+    def _append(self, recipe_ids: List[str], digests: List[int], vectors: np.ndarray):
+        first_row = len(self)
+        used = len(self.delta_ids)
+
+        # Grow the in-memory arrays by doubling
+        if used + len(vectors) > len(self.delta):
+            capacity = max(2 * len(self.delta), used + len(vectors), BATCH_SIZE)
+            delta = np.zeros((capacity, self.embedder.dim), dtype=np.float32)
+            delta[:used] = self.delta[:used]
+            self.delta = delta
+        self.delta[used : used + len(vectors)] = vectors
+        self.alive = np.concatenate([self.alive, np.ones(len(vectors), dtype=bool)])
+
+        lists = (
+            np.argmax(vectors @ self.centroids.T, axis=1)
+            if self.n_lists > 1
+            else np.zeros(len(vectors), dtype=np.int64)
+        )
+        for offset, (recipe_id, digest, list_no) in enumerate(
+            zip(recipe_ids, digests, lists.tolist())
+        ):
+            row = first_row + offset
+            self.delta_ids.append(recipe_id)
+            self.delta_digests.append(digest)
+            self.delta_lists[list_no].append(row)
+            self.delta_row_of[recipe_id] = row
+
+    def sync(self) -> int:
+        """
+        Embed and add recipes created or updated since the last sync
+
+        Returns:
+            Number of rows added or replaced
+        """
+        since = self.synced_at - SYNC_SKEW
+        started = datetime.now()
+        query = {
+            "$or": [{"createdAt": {"$gte": since}}, {"updatedAt": {"$gte": since}}]
+        }
+
+        changed = 0
+        for batch in _iter_batches(query):
+            recipes, digests, replaced = [], [], []
+            for recipe in batch:
+                recipe_id = str(recipe["_id"])
+                digest = recipe_digest(recipe)
+                row = self.row_of(recipe_id)
+                if row is not None and self.digest(row) == digest:
+                    continue
+                if row is None:
+                    # Only new recipes count toward document frequencies
+                    self.embedder.observe([recipe])
+                recipes.append(recipe)
+                digests.append(digest)
+                replaced.append(row)
+
+            if not recipes:
+                continue
+
+            vectors = self.embedder.embed_recipes(recipes)
+            with self.lock:
+                for row in replaced:
+                    if row is not None:
+                        self.alive[row] = False
+                self._append(
+                    [str(recipe["_id"]) for recipe in recipes], digests, vectors
+                )
+            changed += len(recipes)
+
+        self.synced_at = started
+        return changed
+
+    def search(
+        self,
+        query: np.ndarray,
+        limit: int,
+        nprobe: int = VECTOR_NPROBE,
+        exclude: Optional[int] = None,
+    ) -> List[Tuple[str, float]]:
+        """
+        Find the recipes whose vectors are most similar to a query vector
+
+        Args:
+            query: Unit-length query vector
+            limit: Maximum number of results
+            nprobe: Lists to scan (more is slower but finds more neighbors)
+            exclude: Row to leave out (the recipe a similarity search is for)
+
+        Returns:
+            List of (recipe ID, cosine similarity), most similar first
+        """
+        # Searches do not lock: writers publish new rows to the lists last,
+        # after their vectors and alive flags are in place
+        if self.n_lists > 1:
+            nprobe = min(nprobe, self.n_lists)
+            closeness = self.centroids @ query
+            probe = np.argpartition(-closeness, nprobe - 1)[:nprobe]
+        else:
+            probe = np.arange(self.n_lists)
+
+        rows, scores = [], []
+        for list_no in probe.tolist():
+            # Base rows of a list are one contiguous slice of the file
+            start, end = int(self.offsets[list_no]), int(self.offsets[list_no + 1])
+            if end > start:
+                rows.append(np.arange(start, end))
+                scores.append(np.asarray(self.base[start:end]) @ query)
+
+            delta_rows = np.asarray(self.delta_lists[list_no], dtype=np.int64)
+            if len(delta_rows):
+                rows.append(delta_rows)
+                scores.append(self.delta[delta_rows - self.n_base] @ query)
+
+        if not rows:
+            return []
+        rows = np.concatenate(rows)
+        scores = np.concatenate(scores)
+
+        live = self.alive[rows]
+        if exclude is not None:
+            live &= rows != exclude
+        # Vectors sharing no terms with the query are not matches
+        live &= scores > 0
+        rows, scores = rows[live], scores[live]
+
+        if len(rows) > limit:
+            top = np.argpartition(-scores, limit - 1)[:limit]
+            rows, scores = rows[top], scores[top]
+        order = np.argsort(-scores, kind="stable")
+        return [
+            (self.recipe_id(row), round(float(score), 4))
+            for row, score in zip(rows[order].tolist(), scores[order].tolist())
+        ]
+
+    def stats(self) -> Dict[str, Any]:
+        """Index size and layout"""
+        return {
+            "snapshot": os.path.basename(self.path),
+            "embedder": self.embedder.name,
+            "dim": self.embedder.dim,
+            "recipes": len(self),
+            "live": int(self.alive.sum()),
+            "baseRows": self.n_base,
+            "deltaRows": len(self.delta_ids),
+            "lists": self.n_lists,
+            "nprobe": min(VECTOR_NPROBE, self.n_lists),
+        }
+
+
+def _current_snapshot(directory: str) -> Optional[str]:
+    try:
+        with open(os.path.join(directory, "CURRENT")) as f:
+            name = f.read().strip()
+    except FileNotFoundError:
+        return None
+    path = os.path.join(directory, name)
+    return path if name and os.path.isdir(path) else None
+
+
+def _publish(directory: str, path: str):
+    """Point CURRENT at a snapshot and remove all but the newest few"""
+    pointer = os.path.join(directory, f"CURRENT.{os.getpid()}.tmp")
+    with open(pointer, "w") as f:
+        f.write(os.path.basename(path))
+    os.replace(pointer, os.path.join(directory, "CURRENT"))
+
+    snapshots = sorted(
+        name for name in os.listdir(directory) if name.startswith("snapshot-")
+    )
+    for name in snapshots[:-SNAPSHOTS_KEPT]:
+        # Processes still mapping an old snapshot keep their open files
+        shutil.rmtree(os.path.join(directory, name), ignore_errors=True)
+
+
+def write_snapshot(
+    path: str,
+    ids: List[str],
+    digests: List[int],
+    vectors: np.ndarray,
+    embedder,
+    synced_at: datetime,
+):
+    """
+    Cluster vectors into IVF lists and write them as a snapshot
+
+    Args:
+        path: New snapshot directory
+        ids: Recipe ID of each row
+        digests: Content digest of each row
+        vectors: Unit-length row vectors (may be a memory map)
+        embedder: Embedder the vectors came from
+        synced_at: When the recipes were read (incremental syncs start here)
+    """
+    n = len(ids)
+    if n >= IVF_MIN_ROWS:
+        centroids = train_centroids(vectors, int(np.sqrt(n)))
+        assign = assign_lists(vectors, centroids)
+    else:
+        centroids = np.zeros((1, embedder.dim), dtype=np.float32)
+        assign = np.zeros(n, dtype=np.int32)
+
+    order = np.argsort(assign, kind="stable")
+    offsets = np.zeros(len(centroids) + 1, dtype=np.int64)
+    offsets[1:] = np.cumsum(np.bincount(assign, minlength=len(centroids)))
+
+    with open(os.path.join(path, "vectors.f32"), "wb") as f:
+        for start in range(0, n, ASSIGN_CHUNK):
+            f.write(np.asarray(vectors[order[start : start + ASSIGN_CHUNK]]).tobytes())
+
+    np.savez(
+        os.path.join(path, "index.npz"),
+        ids=np.array(ids, dtype="S")[order] if n else np.array([], dtype="S24"),
+        digests=np.array(digests, dtype=np.int64)[order],
+        centroids=centroids,
+        offsets=offsets,
+        embedder=np.str_(embedder.name),
+        synced_at=np.float64(synced_at.timestamp()),
+        **{f"embedder_{key}": value for key, value in embedder.state().items()},
+    )
+
+
+def new_snapshot_path(directory: str) -> str:
+    """Create a directory for a new snapshot (names sort by age)"""
+    path = os.path.join(directory, f"snapshot-{time.time_ns()}-{os.getpid()}")
+    os.makedirs(path)
+    return path
+
+
+def build_snapshot(directory: str = VECTOR_INDEX_DIR, embedder=None) -> str:
+    """
+    Embed every recipe and publish a new snapshot
+
+    Args:
+        directory: Snapshot directory
+        embedder: Embedder to use (a new one by default)
+
+    Returns:
+        Path of the published snapshot
+    """
+    embedder = embedder or make_embedder()
+    started = datetime.now()
+    path = new_snapshot_path(directory)
+
+    # Hashed embeddings need document frequencies before the first vector
+    for batch in _iter_batches({}):
+        embedder.observe(batch)
+
+    # Write vectors in collection order; write_snapshot regroups them by list
+    ids, digests = [], []
+    unordered_path = os.path.join(path, "unordered.f32")
+    with open(unordered_path, "wb") as f:
+        for batch in _iter_batches({}):
+            f.write(embedder.embed_recipes(batch).tobytes())
+            ids.extend(str(recipe["_id"]) for recipe in batch)
+            digests.extend(recipe_digest(recipe) for recipe in batch)
+
+    if ids:
+        vectors = np.memmap(
+            unordered_path, dtype=np.float32, mode="r", shape=(len(ids), embedder.dim)
+        )
+    else:
+        vectors = np.zeros((0, embedder.dim), dtype=np.float32)
+    write_snapshot(path, ids, digests, vectors, embedder, started)
+    del vectors
+    os.remove(unordered_path)
+
+    _publish(directory, path)
+    logger.info(f"Vector index snapshot built: {len(ids)} recipes, {embedder.name}")
+    return path
+
+
+def open_index(directory: str = VECTOR_INDEX_DIR, rebuild: bool = False) -> VectorIndex:
+    """
+    Open the current snapshot, building one if there is none
+
+    Args:
+        directory: Snapshot directory
+        rebuild: Build a new snapshot even if one exists
+
+    Returns:
+        The index, synced with recipes changed since the snapshot
+    """
+    os.makedirs(directory, exist_ok=True)
+    embedder = make_embedder()
+
+    path = None if rebuild else _current_snapshot(directory)
+    index = None
+    if path:
+        try:
+            index = VectorIndex(path, embedder)
+        except Exception as e:
+            # E.g. built with another embedder, whose vectors cannot be reused
+            logger.warning(f"Not using vector snapshot {path}: {e}")
+
+    if index is None:
+        index = VectorIndex(build_snapshot(directory, embedder), embedder)
+    index.sync()
+    return index
+
+
+# The shared index, replaced by a background rebuild
+_index: Optional[VectorIndex] = None
+_refresh_lock = threading.Lock()
+_rebuild_lock = threading.Lock()
+_checked_at = 0.0
+
+
+def _rebuild():
+    """Open (or build) a fresh snapshot, catch it up, and swap it in"""
+    global _index
+    if not _rebuild_lock.acquire(blocking=False):
+        return
+    try:
+        current = _current_snapshot(VECTOR_INDEX_DIR)
+        # Another process may already have built a newer snapshot
+        stale = _index is None or current == _index.path
+        version = get_versions([RECIPES])[RECIPES]
+        index = open_index(VECTOR_INDEX_DIR, rebuild=_index is not None and stale)
+        with _refresh_lock:
+            index.sync()
+            index.version = version
+            _index = index
+    except Exception as e:
+        logger.error(f"Vector index build failed: {e}")
+    finally:
+        _rebuild_lock.release()
+
+
+def start_rebuild() -> threading.Thread:
+    """Build or refresh the index in a daemon thread"""
+    thread = threading.Thread(target=_rebuild, name="vector-index-build", daemon=True)
+    thread.start()
+    return thread
+
+
+def get_index(version: Optional[int] = None) -> VectorIndex:
+    """
+    Get the shared index, syncing it if a check is due
+
+    Checks the recipes version counter at most every VECTOR_REFRESH_SECONDS
+    and syncs only when it moved. Full rebuilds run in the background while
+    the current index keeps serving.
+
+    Args:
+        version: Recipes version the caller has already read. If the index
+            is behind it, it is synced before returning.
+
+    Raises:
+        IndexNotReady: If the first build has not finished
+    """
+    global _checked_at
+
+    if _index is None:
+        start_rebuild().join(FIRST_BUILD_WAIT_SECONDS)
+        if _index is None:
+            raise IndexNotReady("Vector index is still being built")
+
+    def current() -> bool:
+        if version is not None:
+            return version == _index.version
+        return time.monotonic() - _checked_at < VECTOR_REFRESH_SECONDS
+
+    if current():
+        return _index
+
+    if not _refresh_lock.acquire(blocking=version is not None):
+        return _index
+    try:
+        if current():
+            return _index
+
+        now = time.monotonic()
+        if version is None:
+            version = get_versions([RECIPES])[RECIPES]
+        if version != _index.version:
+            _index.sync()
+            _index.version = version
+        _checked_at = now
+
+        if now - _index.built_at > VECTOR_REBUILD_SECONDS:
+            start_rebuild()
+        return _index
+    finally:
+        _refresh_lock.release()
+
+
+def search_text(
+    text: str, limit: int = 10, version: Optional[int] = None
+) -> List[Tuple[str, float]]:
+    """
+    Semantic search for a free-text query
+
+    Returns:
+        List of (recipe ID, similarity), most similar first
+    """
+    index = get_index(version)
+    return index.search(index.embedder.embed_query(text), limit)
+
+
+def similar_to(
+    recipe_id: str, limit: int = 10, version: Optional[int] = None
+) -> Optional[List[Tuple[str, float]]]:
+    """
+    Recipes most similar to a given recipe
+
+    Returns:
+        List of (recipe ID, similarity), most similar first, or None if the
+        recipe is not indexed
+    """
+    index = get_index(version)
+    row = index.row_of(recipe_id)
+    if row is None:
+        return None
+    return index.search(index.vector(row), limit, exclude=row)
+
+
+def index_stats() -> Dict[str, Any]:
+    """Index size and layout, for health checks"""
+    if _index is None:
+        return {"built": False, "building": _rebuild_lock.locked()}
+    return {"built": True, "building": _rebuild_lock.locked(), **_index.stats()}
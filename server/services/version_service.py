@@ -0,0 +1,73 @@
+"""
+Service for data version counters
+
+Each counter is a small document in the `versions` collection, keyed by
+name, whose `version` is incremented whenever the data it covers changes.
+Conditional GETs read the counters (one _id lookup) to build ETags, so a
+client polling unchanged data gets a 304 without the data being fetched.
+
+Counters:
+    recipes                  Any recipe created, updated or deleted
+    user:<id>:profile        The user's profile
+    user:<id>:saved          The user's bookmarks
+    user:<id>:calories       The user's calorie log
+"""
+
+import logging
+from typing import Dict, Iterable
+
+from pymongo import UpdateOne
+
+from config.database import get_collection
+
+logger = logging.getLogger(__name__)
+
+RECIPES = "recipes"
+
+
+def user_key(user_id: str, scope: str) -> str:
+    """Counter name for one of a user's data scopes"""
+    return f"user:{user_id}:{scope}"
+
+
+def get_versions(keys: Iterable[str]) -> Dict[str, int]:
+    """
+    Read several counters in one query
+
+    Args:
+        keys: Counter names
+
+    Returns:
+        Dictionary of counter name to version (0 if never bumped)
+    """
+    keys = list(keys)
+    versions = dict.fromkeys(keys, 0)
+    for doc in get_collection("versions").find({"_id": {"$in": keys}}):
+        versions[doc["_id"]] = doc["version"]
+    return versions
+
+
+def bump_versions(*keys: str):
+    """
+    Increment one or more counters after a write
+
+    Failures are logged rather than raised: the write itself has succeeded,
+    and a missed bump only means a client may keep a stale copy until the
+    next change.
+
+    Args:
+        keys: Counter names
+    """
+    if not keys:
+        return
+
+    try:
+        get_collection("versions").bulk_write(
+            [
+                UpdateOne({"_id": key}, {"$inc": {"version": 1}}, upsert=True)
+                for key in keys
+            ],
+            ordered=False,
+        )
+    except Exception as e:
+        logger.warning(f"Could not bump versions {keys}: {e}")
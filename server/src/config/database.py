@@ -1,13 +1,276 @@
 """
 Database configuration and utilities for MongoDB
+
+A single MongoConnectionManager owns the MongoClient for the current
+process. Every module (Flask routes, controllers, seed script) goes through
+it so pool settings, compression and read preference are configured once.
 """
 
-from flask import current_app
+import os
+import threading
+import time
 import logging
+from collections import deque
+from concurrent.futures import ThreadPoolExecutor
+from typing import Any, Dict, Optional
+
+from pymongo import MongoClient, monitoring
+
+from config.settings import (
+    MONGODB_URI,
+    DATABASE_NAME,
+    MONGO_MAX_POOL_SIZE,
+    MONGO_MIN_POOL_SIZE,
+    MONGO_MAX_IDLE_TIME_MS,
+    MONGO_WAIT_QUEUE_TIMEOUT_MS,
+    MONGO_SERVER_SELECTION_TIMEOUT_MS,
+    MONGO_COMPRESSORS,
+    MONGO_READ_PREFERENCE,
+)
 
 logger = logging.getLogger(__name__)
 
 
+class PoolMetricsListener(monitoring.ConnectionPoolListener):
+    """
+    Collects connection pool checkout wait metrics from PyMongo events
+    """
+
+    def __init__(self, sample_size: int = 1000):
+        self._lock = threading.Lock()
+        self._wait_samples = deque(maxlen=sample_size)
+        self.reset()
+
+    def reset(self):
+        """Reset all counters (used after a fork)"""
+        with self._lock:
+            self.checkouts = 0
+            self.checkout_failures = 0
+            self.checked_in = 0
+            self.connections_created = 0
+            self.connections_closed = 0
+            self.pools_cleared = 0
+            self.total_wait = 0.0
+            self.max_wait = 0.0
+            self._wait_samples.clear()
+
+    def _record_wait(self, duration: Optional[float]):
+        if duration is None:
+            return
+        self.total_wait += duration
+        self.max_wait = max(self.max_wait, duration)
+        self._wait_samples.append(duration)
+
+    def pool_created(self, event):
+        pass
+
+    def pool_ready(self, event):
+        pass
+
+    def pool_cleared(self, event):
+        with self._lock:
+            self.pools_cleared += 1
+
+    def pool_closed(self, event):
+        pass
+
+    def connection_created(self, event):
+        with self._lock:
+            self.connections_created += 1
+
+    def connection_ready(self, event):
+        pass
+
+    def connection_closed(self, event):
+        with self._lock:
+            self.connections_closed += 1
+
+    def connection_check_out_started(self, event):
+        pass
+
+    def connection_check_out_failed(self, event):
+        with self._lock:
+            self.checkout_failures += 1
+            self._record_wait(getattr(event, "duration", None))
+
+    def connection_checked_out(self, event):
+        with self._lock:
+            self.checkouts += 1
+            self._record_wait(getattr(event, "duration", None))
+
+    def connection_checked_in(self, event):
+        with self._lock:
+            self.checked_in += 1
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Get a point-in-time view of the pool metrics
+
+        Returns:
+            Dictionary of counters and checkout wait times in milliseconds
+        """
+        with self._lock:
+            samples = sorted(self._wait_samples)
+            attempts = self.checkouts + self.checkout_failures
+
+            def percentile(p):
+                if not samples:
+                    return 0.0
+                return samples[min(len(samples) - 1, int(p * len(samples)))] * 1000
+
+            return {
+                "checkouts": self.checkouts,
+                "checkoutFailures": self.checkout_failures,
+                "inUse": self.checkouts - self.checked_in,
+                "openConnections": self.connections_created - self.connections_closed,
+                "poolsCleared": self.pools_cleared,
+                "waitMs": {
+                    "avg": (self.total_wait / attempts * 1000) if attempts else 0.0,
+                    "p50": percentile(0.50),
+                    "p95": percentile(0.95),
+                    "p99": percentile(0.99),
+                    "max": self.max_wait * 1000,
+                },
+            }
+
+
+class MongoConnectionManager:
+    """
+    Owns one MongoClient per process
+
+    The client is created lazily on first use and re-created in a forked
+    child (pre-fork servers like gunicorn fork after the parent may have
+    connected, and PyMongo clients must not be shared across a fork).
+    """
+
+    def __init__(self, uri: Optional[str] = None, **client_options):
+        self.uri = uri or MONGODB_URI
+        self.client_options = {
+            "maxPoolSize": MONGO_MAX_POOL_SIZE,
+            "minPoolSize": MONGO_MIN_POOL_SIZE,
+            "maxIdleTimeMS": MONGO_MAX_IDLE_TIME_MS,
+            "waitQueueTimeoutMS": MONGO_WAIT_QUEUE_TIMEOUT_MS,
+            "serverSelectionTimeoutMS": MONGO_SERVER_SELECTION_TIMEOUT_MS,
+            "readPreference": MONGO_READ_PREFERENCE,
+        }
+        if MONGO_COMPRESSORS:
+            self.client_options["compressors"] = MONGO_COMPRESSORS
+        self.client_options.update(client_options)
+
+        self.metrics = PoolMetricsListener()
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+
+        # Drop the inherited client in forked children
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        """Forget the parent's client; the child builds its own on next use"""
+        self._client = None
+        self._pid = None
+        self._lock = threading.Lock()
+        self.metrics.reset()
+
+    @property
+    def client(self) -> MongoClient:
+        """Get the process-wide MongoClient, creating it if needed"""
+        if self._client is None or self._pid != os.getpid():
+            with self._lock:
+                if self._client is None or self._pid != os.getpid():
+                    if not self.uri:
+                        raise ValueError(
+                            "MONGODB_URI is not set in the environment variables."
+                        )
+                    self._client = MongoClient(
+                        self.uri,
+                        event_listeners=[self.metrics],
+                        **self.client_options,
+                    )
+                    self._pid = os.getpid()
+        return self._client
+
+    def get_database(self):
+        """Get the application database (from the URI, else DATABASE_NAME)"""
+        return self.client.get_default_database(default=DATABASE_NAME)
+
+    def get_collection(self, collection_name: str):
+        """Get a collection from the application database"""
+        return self.get_database()[collection_name]
+
+    def warm_up(self, retries: int = 5) -> bool:
+        """
+        Verify connectivity and open the minimum pool before serving traffic
+
+        Args:
+            retries: Number of connection attempts before giving up
+
+        Returns:
+            True if the database is reachable
+        """
+        for attempt in range(retries):
+            try:
+                self.client.admin.command("ping")
+                break
+            except Exception as e:
+                logger.error(f"MongoDB connection error on attempt {attempt + 1}: {e}")
+                if attempt == retries - 1:
+                    return False
+                time.sleep(min(2**attempt, 10))
+
+        # Run concurrent pings so minPoolSize connections exist up front
+        # instead of being opened by the first burst of requests
+        warm = self.client_options.get("minPoolSize", 0)
+        if warm > 1:
+            with ThreadPoolExecutor(max_workers=warm) as pool:
+                list(
+                    pool.map(lambda _: self.client.admin.command("ping"), range(warm))
+                )
+
+        logger.info("MongoDB connection pool warmed up")
+        return True
+
+    def pool_stats(self) -> Dict[str, Any]:
+        """
+        Get pool configuration and checkout wait metrics
+
+        Returns:
+            Dictionary suitable for a health check response
+        """
+        return {
+            "connected": self._client is not None and self._pid == os.getpid(),
+            "pid": os.getpid(),
+            "maxPoolSize": self.client_options.get("maxPoolSize"),
+            "minPoolSize": self.client_options.get("minPoolSize"),
+            "readPreference": self.client_options.get("readPreference"),
+            "compressors": self.client_options.get("compressors"),
+            **self.metrics.snapshot(),
+        }
+
+    def close(self):
+        """Close the client owned by this process"""
+        with self._lock:
+            if self._client is not None and self._pid == os.getpid():
+                self._client.close()
+            self._client = None
+            self._pid = None
+
+
+# Process-wide connection manager
+manager = MongoConnectionManager()
+
+
+def get_database():
+    """
+    Get the application database
+
+    Returns:
+        MongoDB database
+    """
+    return manager.get_database()
+
+
 def get_collection(collection_name):
     """
     Get a MongoDB collection
@@ -18,14 +281,23 @@ def get_collection(collection_name):
     Returns:
         MongoDB collection
     """
-    return current_app.mongo.db[collection_name]
+    return manager.get_collection(collection_name)
 
 
-def init_db():
+def init_db(retries: int = 5):
     """
     Initialize database connections and create indexes
+
+    Args:
+        retries: Number of connection attempts before giving up
+
+    Returns:
+        True if initialization succeeded
     """
     try:
+        if not manager.warm_up(retries):
+            return False
+
         # Create indexes
         create_indexes()
         logger.info("Database indexes created successfully")
@@ -37,20 +309,12 @@ def init_db():
 
 def create_indexes():
     """
-    Create database indexes for optimized queries
-    """
-    # Get collections
-    users = get_collection("users")
-    recipes = get_collection("recipes")
+    Create database indexes from the declarative registry in config.indexes
 
-    # Create indexes for users collection
-    users.create_index("username", unique=True)
-    users.create_index("email", unique=True)
+    Returns:
+        Per-collection reconciliation results
+    """
+    # Imported here because config.indexes depends on this module
+    from config.indexes import reconcile_indexes
 
-    # Create indexes for recipes collection
-    recipes.create_index("name")
-    recipes.create_index("user_id")
-    recipes.create_index("ingredients")
-    recipes.create_index("estimatedCalories")
-    recipes.create_index("created_at")
-    recipes.create_index("updated_at")
+    return reconcile_indexes()
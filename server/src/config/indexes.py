@@ -0,0 +1,288 @@
+"""
+Declarative index registry for MongoDB collections
+
+INDEX_SPECS is the single source of truth for indexes. At startup the app
+factory reconciles it against the live database in a background thread, so
+missing indexes are built without delaying the first request. index_report()
+uses $indexStats to flag missing and unused indexes.
+"""
+
+import logging
+import threading
+from dataclasses import dataclass, field
+from typing import Any, Dict, List, Optional, Tuple
+
+from config.database import get_collection
+from config.settings import (
+    GENERATION_CACHE_TTL,
+    IDEMPOTENCY_TTL_SECONDS,
+    JOB_RETENTION_SECONDS,
+    WARM_CACHE_LOOKBACK_DAYS,
+)
+
+logger = logging.getLogger(__name__)
+
+
+@dataclass(frozen=True)
+class IndexSpec:
+    """Declarative description of one index"""
+
+    keys: Tuple[Tuple[str, Any], ...]
+    name: Optional[str] = None
+    unique: bool = False
+    expire_after_seconds: Optional[int] = None
+    partial_filter: Optional[Dict[str, Any]] = None
+    weights: Optional[Dict[str, int]] = None
+    options: Dict[str, Any] = field(default_factory=dict)
+
+    @property
+    def index_name(self) -> str:
+        """Explicit name, or the default name MongoDB would generate"""
+        if self.name:
+            return self.name
+        return "_".join(f"{key}_{direction}" for key, direction in self.keys)
+
+    def create_options(self) -> Dict[str, Any]:
+        """Keyword arguments for Collection.create_index"""
+        kwargs = {"name": self.index_name, **self.options}
+        if self.unique:
+            kwargs["unique"] = True
+        if self.expire_after_seconds is not None:
+            kwargs["expireAfterSeconds"] = self.expire_after_seconds
+        if self.partial_filter:
+            kwargs["partialFilterExpression"] = self.partial_filter
+        if self.weights:
+            kwargs["weights"] = self.weights
+        return kwargs
+
+    def matches(self, existing: Dict[str, Any]) -> bool:
+        """Check whether a live index (from list_indexes) matches this spec"""
+        if self.is_text:
+            # Text indexes are stored as _fts/_ftsx; compare fields via weights
+            fields = {key for key, direction in self.keys if direction == "text"}
+            if set(existing.get("weights", {})) != fields:
+                return False
+        elif list(existing["key"].items()) != [tuple(k) for k in self.keys]:
+            return False
+
+        return (
+            bool(existing.get("unique", False)) == self.unique
+            and existing.get("expireAfterSeconds") == self.expire_after_seconds
+            and existing.get("partialFilterExpression") == self.partial_filter
+        )
+
+    @property
+    def is_text(self) -> bool:
+        return any(direction == "text" for _, direction in self.keys)
+
+
+# Index definitions per collection. Every hot query should be covered here.
+INDEX_SPECS: Dict[str, List[IndexSpec]] = {
+    "users": [
+        IndexSpec(keys=(("username", 1),), unique=True),
+        IndexSpec(keys=(("email", 1),), unique=True),
+    ],
+    "recipes": [
+        # "My recipes" listing: filter by creator, newest first
+        IndexSpec(keys=(("createdBy", 1), ("createdAt", -1))),
+        # ...plus recipes a user generated that matched an existing one
+        IndexSpec(keys=(("generatedFor", 1), ("createdAt", -1))),
+        # Public listing sorted by newest
+        IndexSpec(keys=(("createdAt", -1),)),
+        # Recommender sync: recipes edited since the last sync
+        IndexSpec(keys=(("updatedAt", 1),)),
+        # Name lookups and prefix searches
+        IndexSpec(keys=(("name", 1),)),
+        # Ingredient search ($in / $elemMatch on a multikey index)
+        IndexSpec(keys=(("ingredients", 1),)),
+        # Free-text search across name and ingredients
+        IndexSpec(
+            keys=(("name", "text"), ("ingredients", "text")),
+            name="recipe_text",
+            weights={"name": 10, "ingredients": 2},
+        ),
+    ],
+    "bookmarks": [
+        # One bookmark per (user, recipe); membership checks are index-only
+        IndexSpec(keys=(("userId", 1), ("recipeId", 1)), unique=True),
+        # Saved recipes in saved order (keyset pagination on createdAt, _id)
+        IndexSpec(keys=(("userId", 1), ("createdAt", -1), ("_id", -1))),
+        # Bookmarks of one recipe (moved when duplicates are merged)
+        IndexSpec(keys=(("recipeId", 1),)),
+    ],
+    "recipe_fingerprints": [
+        # Near-duplicate candidates: recipes sharing an LSH band
+        IndexSpec(keys=(("lsh", 1),)),
+    ],
+    "generation_cache": [
+        # Semantic index sync; cached generations expire
+        IndexSpec(keys=(("createdAt", 1),), expire_after_seconds=GENERATION_CACHE_TTL),
+    ],
+    "generation_cache_audit": [
+        IndexSpec(keys=(("createdAt", 1),), expire_after_seconds=30 * 24 * 3600),
+    ],
+    "pantry_counts": [
+        # Cache warming sums recent days
+        IndexSpec(keys=(("day", 1),)),
+        IndexSpec(
+            keys=(("updatedAt", 1),),
+            expire_after_seconds=(WARM_CACHE_LOOKBACK_DAYS + 1) * 24 * 3600,
+        ),
+    ],
+    "calorie_logs": [
+        # Per-user log, newest first, with optional date range
+        IndexSpec(keys=(("userId", 1), ("date", -1))),
+    ],
+    "jobs": [
+        # Workers claim the highest-priority ready job
+        IndexSpec(keys=(("status", 1), ("priority", -1), ("runAt", 1))),
+        # A user's recent jobs
+        IndexSpec(keys=(("userId", 1), ("createdAt", -1))),
+        # Finished jobs expire; queued and running jobs have no finishedAt
+        IndexSpec(
+            keys=(("finishedAt", 1),), expire_after_seconds=JOB_RETENTION_SECONDS
+        ),
+    ],
+    "idempotency_keys": [
+        # Stored responses are replayed to retries until they expire
+        IndexSpec(
+            keys=(("createdAt", 1),), expire_after_seconds=IDEMPOTENCY_TTL_SECONDS
+        ),
+    ],
+}
+
+
+def reconcile_collection(collection_name: str, specs: List[IndexSpec]) -> Dict[str, Any]:
+    """
+    Bring one collection's indexes in line with its specs
+
+    Missing indexes are created. TTL changes are applied in place with
+    collMod. Any other mismatch is only reported: rebuilding means dropping
+    the live index first, which would leave the collection without it if the
+    new build failed, so that is left to an operator. Indexes not in the
+    registry are reported but never dropped automatically.
+
+    Args:
+        collection_name: Collection to reconcile
+        specs: Desired indexes for the collection
+
+    Returns:
+        Dictionary of created, modified, mismatched and unmanaged index names
+    """
+    collection = get_collection(collection_name)
+    existing = {index["name"]: index for index in collection.list_indexes()}
+    result = {"created": [], "modified": [], "mismatched": [], "unmanaged": []}
+
+    for spec in specs:
+        name = spec.index_name
+        live = existing.get(name)
+
+        if live is None:
+            collection.create_index(list(spec.keys), **spec.create_options())
+            result["created"].append(name)
+        elif spec.matches(live):
+            continue
+        elif (
+            live.get("expireAfterSeconds") is not None
+            and spec.expire_after_seconds is not None
+        ):
+            # Only the TTL differs: change it without rebuilding
+            collection.database.command(
+                "collMod",
+                collection_name,
+                index={"name": name, "expireAfterSeconds": spec.expire_after_seconds},
+            )
+            result["modified"].append(name)
+        else:
+            result["mismatched"].append(name)
+
+    managed = {spec.index_name for spec in specs} | {"_id_"}
+    result["unmanaged"] = sorted(set(existing) - managed)
+    return result
+
+
+def reconcile_indexes() -> Dict[str, Dict[str, Any]]:
+    """
+    Reconcile every collection in the registry
+
+    Returns:
+        Per-collection reconciliation results
+    """
+    results = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        try:
+            results[collection_name] = reconcile_collection(collection_name, specs)
+        except Exception as e:
+            logger.error(f"Index reconciliation failed for {collection_name}: {e}")
+            results[collection_name] = {"error": str(e)}
+
+    for collection_name, result in results.items():
+        for action in ("created", "modified"):
+            for name in result.get(action, []):
+                logger.info(f"Index {collection_name}.{name} {action}")
+        for name in result.get("mismatched", []):
+            logger.warning(
+                f"Index {collection_name}.{name} differs from the registry; "
+                "drop it to have it rebuilt"
+            )
+        for name in result.get("unmanaged", []):
+            logger.warning(f"Index {collection_name}.{name} is not in the registry")
+
+    return results
+
+
+def start_background_index_build() -> threading.Thread:
+    """
+    Reconcile indexes in a daemon thread so startup is not blocked
+
+    Returns:
+        The started thread
+    """
+    thread = threading.Thread(
+        target=reconcile_indexes, name="index-reconciler", daemon=True
+    )
+    thread.start()
+    return thread
+
+
+def index_report() -> Dict[str, Dict[str, Any]]:
+    """
+    Report missing, mismatched and unused indexes using $indexStats
+
+    Usage counters reset when mongod restarts, so "unused" means unused since
+    the reported `since` time.
+
+    Returns:
+        Per-collection dictionary of missing, mismatched, unused and
+        per-index usage
+    """
+    report = {}
+    for collection_name, specs in INDEX_SPECS.items():
+        collection = get_collection(collection_name)
+        try:
+            stats = list(collection.aggregate([{"$indexStats": {}}]))
+        except Exception as e:
+            report[collection_name] = {"error": str(e)}
+            continue
+
+        usage = {
+            stat["name"]: {
+                "ops": stat["accesses"]["ops"],
+                "since": stat["accesses"]["since"].isoformat(),
+            }
+            for stat in stats
+        }
+        live = {stat["name"]: stat["spec"] for stat in stats if "spec" in stat}
+        report[collection_name] = {
+            "missing": [spec.index_name for spec in specs if spec.index_name not in usage],
+            "mismatched": [
+                spec.index_name
+                for spec in specs
+                if spec.index_name in live and not spec.matches(live[spec.index_name])
+            ],
+            "unused": sorted(
+                name for name, stat in usage.items() if stat["ops"] == 0 and name != "_id_"
+            ),
+            "usage": usage,
+        }
+    return report
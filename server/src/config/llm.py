@@ -0,0 +1,159 @@
+"""
+OpenAI client configuration
+
+A single LLMClientManager owns the AsyncOpenAI client for the current
+process, on one shared httpx connection pool: HTTP/2 (when the h2 package is
+installed) multiplexes concurrent completions over a few kept-alive
+connections, so a generation no longer pays for DNS, TCP and TLS setup.
+Pool limits, timeouts and retries come from settings. Services get it from
+the client registry (registry.get("openai")) and it is closed with the other
+shared clients at shutdown (registry.close_all()).
+
+httpx connections belong to the event loop that opened them, so the manager
+keeps one client per loop. In practice every completion runs on the shared
+loop of utils.async_runner and there is only one.
+"""
+
+import asyncio
+import logging
+import os
+import threading
+from typing import Any, Dict, Optional
+
+import httpx
+import openai
+
+from config.settings import (
+    OPENAI_API_KEY,
+    OPENAI_BASE_URL,
+    OPENAI_CONNECT_TIMEOUT,
+    OPENAI_HTTP2,
+    OPENAI_KEEPALIVE_EXPIRY,
+    OPENAI_MAX_CONNECTIONS,
+    OPENAI_MAX_KEEPALIVE,
+    OPENAI_MAX_RETRIES,
+    OPENAI_TIMEOUT,
+)
+
+try:
+    import h2  # noqa: F401  (lets httpx speak HTTP/2)
+except ImportError:  # pragma: no cover - optional dependency
+    h2 = None
+
+logger = logging.getLogger(__name__)
+
+
+class LLMClientManager:
+    """
+    Owns one AsyncOpenAI client per process (and event loop)
+
+    Clients are created lazily on first use and re-created in a forked
+    child, like the MongoDB connection manager.
+
+    Args:
+        api_key: OpenAI API key (OPENAI_API_KEY by default)
+        **client_options: Extra AsyncOpenAI arguments
+    """
+
+    # Raised for requests the API rejects (not an outage)
+    BadRequestError = openai.BadRequestError
+
+    def __init__(self, api_key: Optional[str] = None, **client_options):
+        self.api_key = api_key or OPENAI_API_KEY
+        self.client_options = {"max_retries": OPENAI_MAX_RETRIES}
+        if OPENAI_BASE_URL:
+            self.client_options["base_url"] = OPENAI_BASE_URL
+        self.client_options.update(client_options)
+        self.http2 = OPENAI_HTTP2 and h2 is not None
+        if OPENAI_HTTP2 and h2 is None:
+            logger.warning("h2 is not installed; OpenAI requests use HTTP/1.1")
+
+        self.timeout = httpx.Timeout(OPENAI_TIMEOUT, connect=OPENAI_CONNECT_TIMEOUT)
+        self.limits = httpx.Limits(
+            max_connections=OPENAI_MAX_CONNECTIONS,
+            max_keepalive_connections=OPENAI_MAX_KEEPALIVE,
+            keepalive_expiry=OPENAI_KEEPALIVE_EXPIRY,
+        )
+        self._clients: Dict[asyncio.AbstractEventLoop, openai.AsyncOpenAI] = {}
+        self._lock = threading.Lock()
+        self.created = 0
+
+        # Drop the inherited clients in forked children
+        if hasattr(os, "register_at_fork"):
+            os.register_at_fork(after_in_child=self._reset_after_fork)
+
+    def _reset_after_fork(self):
+        """Forget the parent's clients; the child builds its own on next use"""
+        self._clients = {}
+        self._lock = threading.Lock()
+
+    def _build(self) -> openai.AsyncOpenAI:
+        http_client = httpx.AsyncClient(
+            http2=self.http2, limits=self.limits, timeout=self.timeout
+        )
+        return openai.AsyncOpenAI(
+            api_key=self.api_key,
+            http_client=http_client,
+            timeout=self.timeout,
+            **self.client_options,
+        )
+
+    @property
+    def client(self) -> openai.AsyncOpenAI:
+        """
+        Get the client for the running event loop, creating it if needed
+
+        Raises:
+            RuntimeError: If called outside a running event loop
+        """
+        loop = asyncio.get_running_loop()
+        client = self._clients.get(loop)
+        if client is None:
+            with self._lock:
+                # Clients of closed loops cannot be used (or closed) again
+                self._clients = {
+                    key: value
+                    for key, value in self._clients.items()
+                    if not key.is_closed()
+                }
+                client = self._clients.get(loop)
+                if client is None:
+                    client = self._clients[loop] = self._build()
+                    self.created += 1
+        return client
+
+    def close(self, timeout: float = 5):
+        """Close every client's connection pool on its own event loop"""
+        with self._lock:
+            clients, self._clients = self._clients, {}
+
+        try:
+            current = asyncio.get_running_loop()
+        except RuntimeError:
+            current = None
+
+        for loop, client in clients.items():
+            try:
+                if loop is current:
+                    loop.create_task(client.close())
+                elif loop.is_running():
+                    asyncio.run_coroutine_threadsafe(client.close(), loop).result(
+                        timeout
+                    )
+                elif not loop.is_closed():
+                    loop.run_until_complete(client.close())
+            except Exception as e:
+                logger.warning(f"Could not close OpenAI client: {e}")
+
+    def stats(self) -> Dict[str, Any]:
+        """Pool configuration and client count, for health checks"""
+        return {
+            "http2": self.http2,
+            "clients": len(self._clients),
+            "created": self.created,
+            "maxConnections": OPENAI_MAX_CONNECTIONS,
+            "maxKeepalive": OPENAI_MAX_KEEPALIVE,
+            "timeout": OPENAI_TIMEOUT,
+            "maxRetries": self.client_options["max_retries"],
+            "baseUrl": self.client_options.get("base_url"),
+        }
@@ -0,0 +1,110 @@
+"""
+Lazily built registry of shared clients
+
+Clients (MongoDB, OpenAI, password hashing, ...) are registered as factories
+and only built the first time they are requested, so importing a route or
+controller module does not pay for SDK imports or connection setup.
+"""
+
+import threading
+from typing import Any, Callable, Dict
+
+_factories: Dict[str, Callable[[], Any]] = {}
+_instances: Dict[str, Any] = {}
+_lock = threading.Lock()
+
+
+def register(name: str, factory: Callable[[], Any]):
+    """
+    Register a factory for a shared client
+
+    Args:
+        name: Registry key for the client
+        factory: Zero-argument callable that builds the client
+    """
+    with _lock:
+        _factories[name] = factory
+        _instances.pop(name, None)
+
+
+def get(name: str) -> Any:
+    """
+    Get a shared client, building it on first use
+
+    Args:
+        name: Registry key for the client
+
+    Returns:
+        The client instance
+
+    Raises:
+        KeyError: If no factory is registered under that name
+    """
+    instance = _instances.get(name)
+    if instance is not None:
+        return instance
+
+    with _lock:
+        if name not in _instances:
+            _instances[name] = _factories[name]()
+        return _instances[name]
+
+
+def is_built(name: str) -> bool:
+    """Check whether a client has been built yet"""
+    return name in _instances
+
+
+def reset(name: str = None):
+    """
+    Drop built clients so the next get() rebuilds them
+
+    Args:
+        name: Client to drop, or None to drop all of them
+    """
+    with _lock:
+        if name is None:
+            _instances.clear()
+        else:
+            _instances.pop(name, None)
+
+
+def close_all():
+    """Close every built client that exposes a close() method"""
+    with _lock:
+        instances = list(_instances.values())
+        _instances.clear()
+
+    for instance in instances:
+        close = getattr(instance, "close", None)
+        if callable(close):
+            try:
+                close()
+            except Exception:
+                pass
+
+
+def _build_mongo():
+    # The manager itself handles lazy, fork-safe client creation
+    from config.database import manager
+
+    return manager
+
+
+def _build_openai():
+    # One pooled AsyncOpenAI client per process (see config.llm)
+    from config.llm import LLMClientManager
+
+    return LLMClientManager()
+
+
+def _build_password_context():
+    from passlib.context import CryptContext
+
+    return CryptContext(schemes=["bcrypt"], deprecated="auto")
+
+
+# Default clients
+register("mongo", _build_mongo)
+register("openai", _build_openai)
+register("password_context", _build_password_context)
@@ -3,6 +3,7 @@ Application settings loaded from environment variables
 """
 
 import os
+import tempfile
 from typing import Optional
 from dotenv import load_dotenv
 
@@ -18,6 +19,97 @@ PORT = int(os.getenv("PORT", "8000"))
 MONGODB_URI = os.getenv("MONGODB_URI")
 DATABASE_NAME = os.getenv("DATABASE_NAME", "recipe_app")
 
+# MongoDB connection pool settings
+MONGO_MAX_POOL_SIZE = int(os.getenv("MONGO_MAX_POOL_SIZE", "50"))
+MONGO_MIN_POOL_SIZE = int(os.getenv("MONGO_MIN_POOL_SIZE", "5"))
+MONGO_MAX_IDLE_TIME_MS = int(os.getenv("MONGO_MAX_IDLE_TIME_MS", "300000"))
+MONGO_WAIT_QUEUE_TIMEOUT_MS = int(os.getenv("MONGO_WAIT_QUEUE_TIMEOUT_MS", "2000"))
+MONGO_SERVER_SELECTION_TIMEOUT_MS = int(
+    os.getenv("MONGO_SERVER_SELECTION_TIMEOUT_MS", "5000")
+)
+MONGO_COMPRESSORS = os.getenv("MONGO_COMPRESSORS", "zstd,snappy,zlib")
+MONGO_READ_PREFERENCE = os.getenv("MONGO_READ_PREFERENCE", "primaryPreferred")
+
+# Response compression settings
+COMPRESS_MIN_SIZE = int(os.getenv("COMPRESS_MIN_SIZE", "1024"))  # bytes
+COMPRESS_GZIP_LEVEL = int(os.getenv("COMPRESS_GZIP_LEVEL", "6"))
+COMPRESS_BROTLI_QUALITY = int(os.getenv("COMPRESS_BROTLI_QUALITY", "4"))
+
+# HTTP caching for public reads (seconds)
+PUBLIC_MAX_AGE = int(os.getenv("PUBLIC_MAX_AGE", "60"))
+PUBLIC_S_MAXAGE = int(os.getenv("PUBLIC_S_MAXAGE", "600"))
+PUBLIC_STALE_WHILE_REVALIDATE = int(os.getenv("PUBLIC_STALE_WHILE_REVALIDATE", "60"))
+
+# CDN / caching proxy purge endpoint (purging is disabled when unset)
+CDN_PURGE_URL = os.getenv("CDN_PURGE_URL")
+CDN_PURGE_METHOD = os.getenv("CDN_PURGE_METHOD", "PURGE")
+CDN_PURGE_TOKEN = os.getenv("CDN_PURGE_TOKEN")  # sent verbatim
+CDN_PURGE_TOKEN_HEADER = os.getenv("CDN_PURGE_TOKEN_HEADER", "Authorization")
+
+# Background job queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))  # per process; 0 disables
+JOB_POLL_INTERVAL = float(os.getenv("JOB_POLL_INTERVAL", "1.0"))  # seconds
+JOB_LEASE_SECONDS = int(os.getenv("JOB_LEASE_SECONDS", "300"))
+JOB_MAX_ATTEMPTS = int(os.getenv("JOB_MAX_ATTEMPTS", "3"))
+JOB_RETRY_BASE_SECONDS = float(os.getenv("JOB_RETRY_BASE_SECONDS", "5"))
+JOB_RETENTION_SECONDS = int(os.getenv("JOB_RETENTION_SECONDS", str(7 * 24 * 3600)))
+
+# Idempotency-Key handling for POST endpoints (see middleware.idempotency)
+IDEMPOTENCY_TTL_SECONDS = int(os.getenv("IDEMPOTENCY_TTL_SECONDS", str(24 * 3600)))
+# How long a claimed key is held by a request before a retry may take it over
+IDEMPOTENCY_LOCK_SECONDS = int(os.getenv("IDEMPOTENCY_LOCK_SECONDS", "60"))
+# How long a retry waits for the original request to finish
+IDEMPOTENCY_WAIT_SECONDS = float(os.getenv("IDEMPOTENCY_WAIT_SECONDS", "10"))
+
+# Recipe recommender
+RECOMMENDER_REFRESH_SECONDS = float(os.getenv("RECOMMENDER_REFRESH_SECONDS", "10"))
+RECOMMENDER_REBUILD_SECONDS = float(os.getenv("RECOMMENDER_REBUILD_SECONDS", "3600"))
+
+# Semantic search (EMBEDDING_MODEL is a sentence-transformers model name; when
+# unset, recipes are embedded with hashed TF-IDF features)
+EMBEDDING_MODEL = os.getenv("EMBEDDING_MODEL", "")
+EMBEDDING_DIM = int(os.getenv("EMBEDDING_DIM", "256"))  # hashed embeddings only
+VECTOR_INDEX_DIR = os.getenv(
+    "VECTOR_INDEX_DIR", os.path.join(tempfile.gettempdir(), "recipe-vectors")
+)
+VECTOR_NPROBE = int(os.getenv("VECTOR_NPROBE", "16"))  # IVF lists scanned per query
+VECTOR_REFRESH_SECONDS = float(os.getenv("VECTOR_REFRESH_SECONDS", "10"))
+VECTOR_REBUILD_SECONDS = float(os.getenv("VECTOR_REBUILD_SECONDS", str(6 * 3600)))
+
+# Generated recipes at least this similar (estimated Jaccard of name words and
+# ingredients) to an existing recipe reuse it instead of being inserted
+DEDUP_THRESHOLD = float(os.getenv("DEDUP_THRESHOLD", "0.8"))
+
+# Generation cache: pantries at least this similar (cosine of embedded
+# ingredient lists; raise to ~0.8 with an EMBEDDING_MODEL) reuse a generation
+GENERATION_CACHE_THRESHOLD = float(os.getenv("GENERATION_CACHE_THRESHOLD", "0.4"))
+GENERATION_CACHE_TTL = int(os.getenv("GENERATION_CACHE_TTL", str(7 * 24 * 3600)))
+GENERATION_CACHE_MAX_ENTRIES = int(os.getenv("GENERATION_CACHE_MAX_ENTRIES", "50000"))
+# Share of semantic hits recorded for review
+GENERATION_CACHE_AUDIT_RATE = float(os.getenv("GENERATION_CACHE_AUDIT_RATE", "0.05"))
+
+# Cache warming: pre-generate recipes for the most requested pantries during
+# off-peak hours (local "start-end", e.g. "2-6"; unset disables scheduling)
+WARM_CACHE_HOURS = os.getenv("WARM_CACHE_HOURS", "")
+WARM_CACHE_TOP_PANTRIES = int(os.getenv("WARM_CACHE_TOP_PANTRIES", "200"))
+WARM_CACHE_TOKEN_BUDGET = int(os.getenv("WARM_CACHE_TOKEN_BUDGET", "300000"))  # per run
+WARM_CACHE_LOOKBACK_DAYS = int(os.getenv("WARM_CACHE_LOOKBACK_DAYS", "7"))
+PANTRY_SKETCH_SIZE = int(os.getenv("PANTRY_SKETCH_SIZE", "2000"))  # per process
+
+# Circuit breakers for OpenAI and Spoonacular: open when, among the last
+# BREAKER_WINDOW calls (at least BREAKER_MIN_CALLS), this share failed or was
+# slow; probe again after BREAKER_OPEN_SECONDS
+BREAKER_WINDOW = int(os.getenv("BREAKER_WINDOW", "20"))
+BREAKER_MIN_CALLS = int(os.getenv("BREAKER_MIN_CALLS", "10"))
+BREAKER_FAILURE_RATE = float(os.getenv("BREAKER_FAILURE_RATE", "0.5"))
+BREAKER_SLOW_RATE = float(os.getenv("BREAKER_SLOW_RATE", "0.8"))
+BREAKER_OPEN_SECONDS = float(os.getenv("BREAKER_OPEN_SECONDS", "30"))
+OPENAI_SLOW_SECONDS = float(os.getenv("OPENAI_SLOW_SECONDS", "30"))
+SPOONACULAR_SLOW_SECONDS = float(os.getenv("SPOONACULAR_SLOW_SECONDS", "5"))
+
+# Spoonacular API root (point it at benchmarks/fake_upstreams.py offline)
+SPOONACULAR_BASE_URL = os.getenv("SPOONACULAR_BASE_URL", "https://api.spoonacular.com")
+
 # Authentication settings
 JWT_SECRET = os.getenv("JWT_SECRET")
 JWT_ALGORITHM = os.getenv("JWT_ALGORITHM", "HS256")
@@ -25,11 +117,59 @@ JWT_EXPIRATION = int(os.getenv("JWT_EXPIRATION", "3600"))  # 1 hour by default
 
 # OpenAI API settings
 OPENAI_API_KEY = os.getenv("OPENAI_API_KEY")
+# API root of OpenAI or a compatible server, e.g. benchmarks/fake_upstreams.py
+# at http://127.0.0.1:8100/v1 (the SDK default when unset)
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL")
 OPENAI_MODEL = os.getenv("OPENAI_MODEL", "gpt-3.5-turbo")
+# Models per task (see services/model_router.py)
+OPENAI_RECIPE_MODEL = os.getenv("OPENAI_RECIPE_MODEL", OPENAI_MODEL)
+OPENAI_CALORIE_MODEL = os.getenv("OPENAI_CALORIE_MODEL", "gpt-4o-mini")
+# Calorie estimates: "auto" computes them locally when at least
+# CALORIE_LOCAL_MIN_COVERAGE of the ingredient lines are recognized and asks
+# the calorie model otherwise; "local" and "model" use only one of the two
+CALORIE_ESTIMATOR = os.getenv("CALORIE_ESTIMATOR", "auto")
+CALORIE_LOCAL_MIN_COVERAGE = float(os.getenv("CALORIE_LOCAL_MIN_COVERAGE", "0.8"))
+# Token budgets of the variable parts of prompts (see services/prompts.py)
+PROMPT_INGREDIENT_TOKENS = int(os.getenv("PROMPT_INGREDIENT_TOKENS", "200"))
+PROMPT_PREFERENCES_TOKENS = int(os.getenv("PROMPT_PREFERENCES_TOKENS", "50"))
+# Shared HTTP connection pool of the OpenAI client (timeouts in seconds)
+OPENAI_TIMEOUT = float(os.getenv("OPENAI_TIMEOUT", "60"))
+OPENAI_CONNECT_TIMEOUT = float(os.getenv("OPENAI_CONNECT_TIMEOUT", "5"))
+OPENAI_MAX_RETRIES = int(os.getenv("OPENAI_MAX_RETRIES", "2"))
+OPENAI_MAX_CONNECTIONS = int(os.getenv("OPENAI_MAX_CONNECTIONS", "100"))
+OPENAI_MAX_KEEPALIVE = int(os.getenv("OPENAI_MAX_KEEPALIVE", "20"))
+OPENAI_KEEPALIVE_EXPIRY = float(os.getenv("OPENAI_KEEPALIVE_EXPIRY", "60"))
+OPENAI_HTTP2 = os.getenv("OPENAI_HTTP2", "true").lower() == "true"
+# Hedging: when a completion takes longer than the OPENAI_HEDGE_PERCENTILE
+# latency of recent ones (at least OPENAI_HEDGE_MIN_DELAY seconds), a second
+# identical request is sent and the slower one cancelled; at most
+# OPENAI_HEDGE_MAX_RATE of calls are hedged
+OPENAI_HEDGE = os.getenv("OPENAI_HEDGE", "true").lower() == "true"
+OPENAI_HEDGE_PERCENTILE = float(os.getenv("OPENAI_HEDGE_PERCENTILE", "95"))
+OPENAI_HEDGE_MIN_DELAY = float(os.getenv("OPENAI_HEDGE_MIN_DELAY", "2"))
+OPENAI_HEDGE_MAX_RATE = float(os.getenv("OPENAI_HEDGE_MAX_RATE", "0.1"))
+# Time budget of a recipe generation request, from the moment it is queued
+GENERATE_DEADLINE_SECONDS = float(os.getenv("GENERATE_DEADLINE_SECONDS", "120"))
+# How JSON replies are requested: "functions" (function calling), "json" (JSON
+# mode) or "prompt" (instructions only); unsupported modes fall back to prompt
+OPENAI_STRUCTURED_OUTPUT = os.getenv("OPENAI_STRUCTURED_OUTPUT", "functions")
+
+
+def validate_settings(require_openai: bool = True):
+    """
+    Validate required environment variables
+
+    Called by the app factory at startup instead of at import time, so
+    tooling and CLI entry points can import settings without a full env.
+
+    Args:
+        require_openai: Whether OPENAI_API_KEY must be set
 
-# Validate required environment variables
-if not JWT_SECRET:
-    raise ValueError("JWT_SECRET environment variable is required")
+    Raises:
+        ValueError: If a required variable is missing
+    """
+    if not JWT_SECRET:
+        raise ValueError("JWT_SECRET environment variable is required")
 
-if not OPENAI_API_KEY:
-    raise ValueError("OPENAI_API_KEY environment variable is required")
+    if require_openai and not OPENAI_API_KEY:
+        raise ValueError("OPENAI_API_KEY environment variable is required")
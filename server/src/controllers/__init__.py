@@ -1,15 +1,28 @@
-from fastapi import APIRouter
-from .authController import router as auth_router
-from .recipeController import router as recipe_router
-from .userController import router as user_router
+# The combined FastAPI router is built on first access (PEP 562), so importing
+# one controller does not import FastAPI routers for all of them.
 
-# Create main router
-api_router = APIRouter()
+__all__ = ["api_router"]
 
-# Include all routers with their prefixes
-api_router.include_router(auth_router, prefix="/auth", tags=["authentication"])
-api_router.include_router(recipe_router, prefix="/recipes", tags=["recipes"])
-api_router.include_router(user_router, prefix="/users", tags=["users"])
 
-# Export all controllers
-__all__ = ["api_router"]
+def _build_api_router():
+    from fastapi import APIRouter
+    from .authController import router as auth_router
+    from .recipeController import router as recipe_router
+    from .userController import router as user_router
+
+    # Create main router
+    api_router = APIRouter()
+
+    # Include all routers with their prefixes
+    api_router.include_router(auth_router, prefix="/auth", tags=["authentication"])
+    api_router.include_router(recipe_router, prefix="/recipes", tags=["recipes"])
+    api_router.include_router(user_router, prefix="/users", tags=["users"])
+
+    return api_router
+
+
+def __getattr__(name):
+    if name == "api_router":
+        globals()["api_router"] = _build_api_router()
+        return globals()["api_router"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
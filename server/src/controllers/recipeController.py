@@ -2,11 +2,14 @@
 Controller handling recipe-related operations
 """
 
+import time
+from datetime import datetime
 from typing import Dict, Any, List, Optional
 from bson import ObjectId
 from fastapi import HTTPException, status
 
 from config.database import get_collection
+from config.settings import GENERATE_DEADLINE_SECONDS
 from models.recipe import (
     RecipeCreate,
     RecipeUpdate,
@@ -15,16 +18,38 @@ from models.recipe import (
     db_to_recipe,
     RecipeGenerateRequest,
 )
-from services.recipe_service import generate_recipe, estimate_calories
+from services.recipe_service import estimate_calories
+from services.generation_cache import generate_recipe_cached
+from services.dedup import (
+    SOURCE_AI,
+    find_duplicate,
+    fingerprint,
+    link_duplicate,
+    save_fingerprint,
+)
+from services.recipe_jobs import enqueue_recipe_generation
+from services.bookmark_service import (
+    DEFAULT_PAGE_SIZE,
+    get_saved_recipes_page,
+    migrate_legacy_bookmarks,
+)
+from services.version_service import RECIPES, bump_versions
+from utils.cache import recipe_cache
+from utils.cdn import RECIPES_KEY, purge, purge_recipe
+from utils.circuit_breaker import CircuitOpenError
+from utils.deadline import DeadlineExceeded, deadline
 
 
-async def create_recipe(recipe: RecipeCreate, user_id: str) -> Dict[str, Any]:
+async def create_recipe(
+    recipe: RecipeCreate, user_id: str, source: Optional[str] = None
+) -> Dict[str, Any]:
     """
     Create a new recipe in the database
 
     Args:
         recipe: Recipe data from request
         user_id: ID of user creating the recipe
+        source: Where the recipe came from ("ai" for generated recipes)
 
     Returns:
         Created recipe document
@@ -36,6 +61,8 @@ async def create_recipe(recipe: RecipeCreate, user_id: str) -> Dict[str, Any]:
 
     # Convert to database model
     recipe_db = recipe_to_db(recipe, user_id)
+    if source:
+        recipe_db["source"] = source
 
     # If no estimated calories provided, try to estimate
     if recipe.estimatedCalories is None:
@@ -48,6 +75,8 @@ async def create_recipe(recipe: RecipeCreate, user_id: str) -> Dict[str, Any]:
 
     # Insert into database
     result = recipes_collection.insert_one(recipe_db)
+    bump_versions(RECIPES)
+    purge(RECIPES_KEY)
 
     # Get the created recipe
     created_recipe = recipes_collection.find_one({"_id": result.inserted_id})
@@ -139,6 +168,9 @@ async def update_recipe(
     if not update_doc:
         return current_recipe
 
+    # Version the change for conditional GETs
+    update_doc["updatedAt"] = datetime.now()
+
     # Update recipe in database
     result = recipes_collection.update_one(
         {"_id": ObjectId(recipe_id)}, {"$set": update_doc}
@@ -149,6 +181,10 @@ async def update_recipe(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Recipe update failed"
         )
 
+    recipe_cache.delete(recipe_id)
+    bump_versions(RECIPES)
+    purge_recipe(recipe_id)
+
     # Get updated recipe
     updated_recipe = await get_recipe(recipe_id)
 
@@ -189,6 +225,10 @@ async def delete_recipe(recipe_id: str, user_id: str) -> bool:
             status_code=status.HTTP_400_BAD_REQUEST, detail="Recipe deletion failed"
         )
 
+    recipe_cache.delete(recipe_id)
+    bump_versions(RECIPES)
+    purge_recipe(recipe_id)
+
     return True
 
 
@@ -196,7 +236,7 @@ async def get_user_recipes(
     user_id: str, skip: int = 0, limit: int = 20
 ) -> List[Dict[str, Any]]:
     """
-    Get recipes created by a specific user
+    Get recipes created (or generated) by a specific user
 
     Args:
         user_id: User ID to get recipes for
@@ -208,8 +248,10 @@ async def get_user_recipes(
     """
     recipes_collection = get_collection("recipes")
 
+    # Include recipes the user generated that were deduplicated into others
+    query = {"$or": [{"createdBy": user_id}, {"generatedFor": user_id}]}
     recipes = list(
-        recipes_collection.find({"createdBy": user_id})
+        recipes_collection.find(query)
         .sort("createdAt", -1)  # Sort by creation date, newest first
         .skip(skip)
         .limit(limit)
@@ -218,39 +260,42 @@ async def get_user_recipes(
     return recipes
 
 
-async def get_saved_recipes(user_id: str) -> List[Dict[str, Any]]:
+async def get_saved_recipes(
+    user_id: str, limit: int = DEFAULT_PAGE_SIZE, cursor: Optional[str] = None
+) -> Dict[str, Any]:
     """
-    Get recipes saved by a specific user
+    Get one page of recipes saved by a specific user, most recently saved first
 
     Args:
         user_id: User ID to get saved recipes for
+        limit: Maximum number of recipes to return
+        cursor: Cursor from the previous page, or None for the first page
 
     Returns:
-        List of recipe documents
+        Dictionary with the recipe documents and the next page cursor
+
+    Raises:
+        HTTPException: If the user is not found or the cursor is invalid
     """
     users_collection = get_collection("users")
-    recipes_collection = get_collection("recipes")
 
-    # Get user's saved recipe IDs
-    user = users_collection.find_one({"_id": ObjectId(user_id)})
+    # Move any legacy savedRecipes array into bookmarks
+    user = users_collection.find_one({"_id": ObjectId(user_id)}, {"savedRecipes": 1})
 
     if not user:
         raise HTTPException(
             status_code=status.HTTP_404_NOT_FOUND, detail="User not found"
         )
 
-    saved_recipe_ids = user.get("savedRecipes", [])
-
-    # Convert string IDs to ObjectIds
-    object_ids = [ObjectId(id) for id in saved_recipe_ids]
-
-    # Get the recipes
-    if not object_ids:
-        return []
+    migrate_legacy_bookmarks(user)
 
-    recipes = list(recipes_collection.find({"_id": {"$in": object_ids}}))
-
-    return recipes
+    # Page through bookmarks and hydrate just that page of recipes
+    try:
+        return get_saved_recipes_page(user_id, limit, cursor)
+    except ValueError:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid cursor"
+        )
 
 
 async def generate_recipe_from_ingredients(
@@ -267,11 +312,22 @@ async def generate_recipe_from_ingredients(
         Generated recipe document
 
     Raises:
-        HTTPException: If generation fails
+        HTTPException: If generation fails or takes longer than
+            GENERATE_DEADLINE_SECONDS
     """
     try:
-        # Generate recipe using OpenAI
-        recipe_data = await generate_recipe(request.ingredients, request.preferences)
+        # Generate recipe using OpenAI (or reuse one for a similar pantry)
+        with deadline(seconds=GENERATE_DEADLINE_SECONDS):
+            recipe_data, _ = await generate_recipe_cached(
+                request.ingredients, request.preferences
+            )
+
+        # Reuse a near-identical existing recipe instead of saving a clone
+        fp = fingerprint(recipe_data)
+        duplicate = find_duplicate(fp)
+        if duplicate:
+            link_duplicate(duplicate[0], [user_id])
+            return await get_recipe(duplicate[0])
 
         # Create recipe model
         recipe = RecipeCreate(
@@ -282,10 +338,19 @@ async def generate_recipe_from_ingredients(
         )
 
         # Save to database
-        created_recipe = await create_recipe(recipe, user_id)
+        created_recipe = await create_recipe(recipe, user_id, source=SOURCE_AI)
+        save_fingerprint(created_recipe["_id"], fp)
 
         return created_recipe
 
+    except CircuitOpenError as e:
+        raise HTTPException(
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+            detail=str(e),
+            headers={"Retry-After": str(int(e.retry_after) + 1)},
+        )
+    except DeadlineExceeded as e:
+        raise HTTPException(status_code=status.HTTP_504_GATEWAY_TIMEOUT, detail=str(e))
     except ValueError as e:
         raise HTTPException(status_code=status.HTTP_400_BAD_REQUEST, detail=str(e))
     except Exception as e:
@@ -293,3 +358,28 @@ async def generate_recipe_from_ingredients(
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=f"Recipe generation failed: {str(e)}",
         )
+
+
+async def queue_recipe_generation(
+    request: RecipeGenerateRequest, user_id: str
+) -> Dict[str, Any]:
+    """
+    Queue recipe generation as a background job
+
+    Unlike generate_recipe_from_ingredients, this returns immediately; the
+    recipe is created by a job worker.
+
+    Args:
+        request: Recipe generation request with ingredients and preferences
+        user_id: ID of user making the request
+
+    Returns:
+        Dictionary with the job ID and its initial status
+    """
+    job_id = enqueue_recipe_generation(
+        user_id,
+        request.ingredients,
+        request.preferences,
+        deadline=time.time() + GENERATE_DEADLINE_SECONDS,
+    )
+    return {"jobId": job_id, "status": "queued"}
@@ -16,6 +16,8 @@ from models.user import (
     CalorieLogEntry,
 )
 from utils.auth_utils import get_password_hash
+from services.bookmark_service import MAX_BULK_IDS, add_bookmarks, remove_bookmarks
+from services.version_service import bump_versions, user_key
 
 
 async def create_user(user: UserCreate) -> Dict[str, Any]:
@@ -156,6 +158,8 @@ async def update_user(user_id: str, update_data: UserUpdate) -> Dict[str, Any]:
             status_code=status.HTTP_400_BAD_REQUEST, detail="User update failed"
         )
 
+    bump_versions(user_key(user_id, "profile"))
+
     # Get updated user
     updated_user = await get_user(user_id)
 
@@ -200,44 +204,25 @@ async def add_recipe_to_saved(user_id: str, recipe_id: str) -> Dict[str, Any]:
         recipe_id: Recipe ID to save
 
     Returns:
-        Updated user document
+        Result with the recipe ID under added or alreadySaved
 
     Raises:
-        HTTPException: If user or recipe not found
+        HTTPException: If the recipe ID is invalid or the recipe is not found
     """
-    users_collection = get_collection("users")
-    recipes_collection = get_collection("recipes")
-
-    # Validate user exists
-    user = await get_user(user_id)
-
-    # Validate recipe exists
-    try:
-        recipe = recipes_collection.find_one({"_id": ObjectId(recipe_id)})
-        if recipe is None:
-            raise HTTPException(
-                status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found"
-            )
-    except:
+    if not ObjectId.is_valid(recipe_id):
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Invalid recipe ID format"
         )
 
-    # Add recipe ID to saved recipes if not already saved
-    if recipe_id not in user.get("savedRecipes", []):
-        result = users_collection.update_one(
-            {"_id": ObjectId(user_id)}, {"$push": {"savedRecipes": recipe_id}}
-        )
+    # Idempotent upsert into the bookmarks collection
+    result = add_bookmarks(user_id, [recipe_id])
 
-        if result.modified_count == 0:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to save recipe"
-            )
-
-    # Get updated user
-    updated_user = await get_user(user_id)
+    if result["notFound"]:
+        raise HTTPException(
+            status_code=status.HTTP_404_NOT_FOUND, detail="Recipe not found"
+        )
 
-    return updated_user
+    return result
 
 
 async def remove_recipe_from_saved(user_id: str, recipe_id: str) -> Dict[str, Any]:
@@ -249,31 +234,48 @@ async def remove_recipe_from_saved(user_id: str, recipe_id: str) -> Dict[str, An
         recipe_id: Recipe ID to remove
 
     Returns:
-        Updated user document
+        Result with the number of bookmarks removed
 
     Raises:
-        HTTPException: If user not found or operation fails
+        HTTPException: If the recipe was not saved
     """
-    users_collection = get_collection("users")
-
-    # Validate user exists
-    user = await get_user(user_id)
-
-    # Remove recipe ID from saved recipes
-    result = users_collection.update_one(
-        {"_id": ObjectId(user_id)}, {"$pull": {"savedRecipes": recipe_id}}
-    )
+    removed = remove_bookmarks(user_id, [recipe_id])
 
-    if result.modified_count == 0:
+    if removed == 0:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST,
             detail="Recipe not in saved list or removal failed",
         )
 
-    # Get updated user
-    updated_user = await get_user(user_id)
+    return {"removed": removed}
 
-    return updated_user
+
+async def update_saved_recipes(
+    user_id: str, add: List[str], remove: List[str]
+) -> Dict[str, Any]:
+    """
+    Save and remove many recipes in one call
+
+    Args:
+        user_id: User ID
+        add: Recipe IDs to save
+        remove: Recipe IDs to remove
+
+    Returns:
+        Added, alreadySaved and notFound recipe IDs plus the removed count
+
+    Raises:
+        HTTPException: If too many IDs are sent at once
+    """
+    if len(add) + len(remove) > MAX_BULK_IDS:
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail=f"At most {MAX_BULK_IDS} recipe IDs per request",
+        )
+
+    result = add_bookmarks(user_id, add)
+    result["removed"] = remove_bookmarks(user_id, remove)
+    return result
 
 
 async def add_calorie_log(user_id: str, log_entry: CalorieLogEntry) -> Dict[str, Any]:
@@ -290,23 +292,24 @@ async def add_calorie_log(user_id: str, log_entry: CalorieLogEntry) -> Dict[str,
     Raises:
         HTTPException: If user not found or operation fails
     """
-    users_collection = get_collection("users")
+    calorie_logs_collection = get_collection("calorie_logs")
 
     # Validate user exists
     await get_user(user_id)
 
-    # Add log entry
+    # Add log entry as its own document (indexed by userId, date)
     entry_dict = log_entry.dict()
+    entry_dict["userId"] = user_id
 
-    result = users_collection.update_one(
-        {"_id": ObjectId(user_id)}, {"$push": {"calorieLog": entry_dict}}
-    )
+    result = calorie_logs_collection.insert_one(entry_dict)
 
-    if result.modified_count == 0:
+    if not result.inserted_id:
         raise HTTPException(
             status_code=status.HTTP_400_BAD_REQUEST, detail="Failed to add calorie log"
         )
 
+    bump_versions(user_key(user_id, "calories"))
+
     # Get updated user
     updated_user = await get_user(user_id)
 
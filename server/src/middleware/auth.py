@@ -8,13 +8,20 @@ import jwt
 import os
 from datetime import datetime, timedelta
 from bson import ObjectId
+from werkzeug.security import check_password_hash
 
+from config import registry
 from config.database import get_collection
 
-# Require JWT_SECRET to be set in environment
+# Require JWT_SECRET to be set in environment (checked on first use)
 JWT_SECRET = os.getenv("JWT_SECRET")
-if not JWT_SECRET:
-    raise ValueError("Missing JWT_SECRET environment variable!")
+
+
+def get_jwt_secret():
+    """Get the JWT secret, failing loudly if it is not configured"""
+    if not JWT_SECRET:
+        raise ValueError("Missing JWT_SECRET environment variable!")
+    return JWT_SECRET
 
 
 def generate_token(user_id, username, email):
@@ -36,11 +43,49 @@ def generate_token(user_id, username, email):
             "email": email,
             "exp": datetime.utcnow() + timedelta(hours=24),
         },
-        JWT_SECRET,
+        get_jwt_secret(),
         algorithm="HS256",
     )
 
 
+def hash_password(password):
+    """
+    Hash a password for storage
+
+    Uses the shared passlib context (bcrypt), so every new hash is in one
+    scheme.
+    """
+    return registry.get("password_context").hash(password)
+
+
+def verify_password(password, password_hash):
+    """
+    Check a password against a stored hash
+
+    Hashes from hash_password() are checked by the passlib context. Users
+    seeded before that have werkzeug hashes ("scrypt:..." or "pbkdf2:..."),
+    which werkzeug checks. A missing or malformed hash never matches.
+
+    Args:
+        password: Plain-text password
+        password_hash: Hash from the user document
+
+    Returns:
+        True if the password matches
+    """
+    if not password_hash:
+        return False
+
+    context = registry.get("password_context")
+    try:
+        if context.identify(password_hash, required=False):
+            return context.verify(password, password_hash)
+        return check_password_hash(password_hash, password)
+    except ValueError:
+        # Unknown scheme or a corrupt hash
+        return False
+
+
 def authenticate_jwt(f):
     """
     Middleware decorator to authenticate JWT token
@@ -80,7 +125,7 @@ def authenticate_jwt(f):
 
         try:
             # Decode and validate token
-            decoded = jwt.decode(token, JWT_SECRET, algorithms=["HS256"])
+            decoded = jwt.decode(token, get_jwt_secret(), algorithms=["HS256"])
             g.user = decoded  # Store user info in Flask's global context
         except jwt.ExpiredSignatureError:
             return (
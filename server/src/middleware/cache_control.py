@@ -0,0 +1,76 @@
+"""
+Cache-Control headers for public and per-user reads
+
+cache_public marks a view's successful responses (200 and 304) as cacheable
+by browsers and shared caches, with Surrogate-Key tags for purging.
+cache_private lets only the client keep a copy, and makes it revalidate
+with its ETag every time. Error responses are never cached.
+
+Apply these above conditional() so 304 responses carry the same headers.
+"""
+
+from functools import wraps
+from typing import Callable, Iterable, Optional
+
+from flask import g, make_response
+
+from config.settings import (
+    PUBLIC_MAX_AGE,
+    PUBLIC_S_MAXAGE,
+    PUBLIC_STALE_WHILE_REVALIDATE,
+)
+
+CACHEABLE_STATUSES = (200, 304)
+
+PUBLIC_CACHE_CONTROL = (
+    f"public, max-age={PUBLIC_MAX_AGE}, s-maxage={PUBLIC_S_MAXAGE}, "
+    f"stale-while-revalidate={PUBLIC_STALE_WHILE_REVALIDATE}"
+)
+PRIVATE_CACHE_CONTROL = "private, no-cache"
+
+
+def cache_public(surrogate_keys: Optional[Callable[..., Iterable[str]]] = None):
+    """
+    Make a view's responses cacheable by shared caches
+
+    Args:
+        surrogate_keys: Called with the view's arguments; returns keys to tag
+            the response with. Views can add more with add_surrogate_keys().
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            response = make_response(f(*args, **kwargs))
+
+            if response.status_code not in CACHEABLE_STATUSES:
+                response.headers["Cache-Control"] = "no-store"
+                return response
+
+            keys = list(surrogate_keys(*args, **kwargs)) if surrogate_keys else []
+            keys += g.get("surrogate_keys", [])
+
+            response.headers["Cache-Control"] = PUBLIC_CACHE_CONTROL
+            response.vary.add("Accept-Encoding")
+            if keys:
+                response.headers["Surrogate-Key"] = " ".join(dict.fromkeys(keys))
+            return response
+
+        return decorated_function
+
+    return decorator
+
+
+def cache_private(f):
+    """Let only the requesting client cache a view's responses"""
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        response = make_response(f(*args, **kwargs))
+        if response.status_code in CACHEABLE_STATUSES:
+            response.headers["Cache-Control"] = PRIVATE_CACHE_CONTROL
+        else:
+            response.headers["Cache-Control"] = "no-store"
+        return response
+
+    return decorated_function
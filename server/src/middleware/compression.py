@@ -0,0 +1,86 @@
+"""
+Response compression middleware
+
+Compresses text responses above a size threshold with brotli (when the
+package is installed and the client accepts it) or gzip. Small bodies are
+sent as-is, since compressing them costs more CPU than it saves bandwidth.
+"""
+
+import gzip
+
+from flask import Flask, request
+
+from config.settings import (
+    COMPRESS_BROTLI_QUALITY,
+    COMPRESS_GZIP_LEVEL,
+    COMPRESS_MIN_SIZE,
+)
+
+try:
+    import brotli
+except ImportError:  # pragma: no cover - optional dependency
+    brotli = None
+
+COMPRESSIBLE_MIMETYPES = {
+    "application/json",
+    "application/javascript",
+    "text/css",
+    "text/html",
+    "text/plain",
+}
+
+
+def choose_encoding() -> str:
+    """Pick the best encoding the client accepts, or "" for none"""
+    accept = request.accept_encodings
+    if brotli is not None and accept.quality("br") > 0:
+        return "br"
+    if accept.quality("gzip") > 0:
+        return "gzip"
+    return ""
+
+
+def compress_response(response):
+    """after_request hook that compresses eligible responses in place"""
+    if response.mimetype not in COMPRESSIBLE_MIMETYPES:
+        return response
+
+    # The body depends on Accept-Encoding, even when sent uncompressed
+    response.vary.add("Accept-Encoding")
+
+    if (
+        response.status_code < 200
+        or response.status_code >= 300
+        or response.direct_passthrough
+        or response.is_streamed
+        or "Content-Encoding" in response.headers
+    ):
+        return response
+
+    encoding = choose_encoding()
+    if not encoding:
+        return response
+
+    data = response.get_data()
+    if len(data) < COMPRESS_MIN_SIZE:
+        return response
+
+    if encoding == "br":
+        data = brotli.compress(data, quality=COMPRESS_BROTLI_QUALITY)
+    else:
+        data = gzip.compress(data, compresslevel=COMPRESS_GZIP_LEVEL, mtime=0)
+
+    response.set_data(data)
+    response.headers["Content-Encoding"] = encoding
+
+    # A strong ETag identifies exact bytes, so tag each encoding separately
+    etag, weak = response.get_etag()
+    if etag:
+        response.set_etag(f"{etag}-{encoding}", weak)
+
+    return response
+
+
+def init_compression(app: Flask):
+    """Register the compression hook on an app"""
+    app.after_request(compress_response)
@@ -0,0 +1,80 @@
+"""
+Conditional GET support (strong ETags and 304 Not Modified)
+
+The conditional() decorator asks a cheap version function for the current
+version of the data a view returns. The ETag is derived from that version,
+the request URL and the user, so If-None-Match can be answered with a 304
+before the view runs its queries.
+"""
+
+import hashlib
+import logging
+from functools import wraps
+from typing import Any, Callable, Optional
+
+from flask import current_app, g, make_response, request
+
+logger = logging.getLogger(__name__)
+
+# Suffixes the compression middleware appends to ETags of encoded bodies
+ENCODING_SUFFIXES = ("", "-gzip", "-br")
+
+
+def make_etag(*parts: Any) -> str:
+    """Hash the given parts into an ETag value"""
+    digest = hashlib.blake2b(repr(parts).encode(), digest_size=12)
+    return digest.hexdigest()
+
+
+def etag_matches(etag: str) -> bool:
+    """Check If-None-Match against an ETag, in any content encoding"""
+    if_none_match = request.if_none_match
+    if not if_none_match:
+        return False
+    return any(if_none_match.contains(etag + suffix) for suffix in ENCODING_SUFFIXES)
+
+
+def conditional(version_fn: Callable[..., Optional[Any]], per_user: bool = True):
+    """
+    Make a GET view conditional on a version lookup
+
+    Apply below login_required so g.user is set when the version is read.
+
+    Args:
+        version_fn: Called with the view's arguments; returns a hashable
+            version of the data, or None to serve the view unconditionally
+            (e.g. when the resource does not exist)
+        per_user: Include the user in the ETag. Pass False for public data,
+            so shared caches can revalidate one copy for everyone.
+    """
+
+    def decorator(f):
+        @wraps(f)
+        def decorated_function(*args, **kwargs):
+            try:
+                version = version_fn(*args, **kwargs)
+            except Exception as e:
+                logger.warning(f"Version lookup failed for {request.path}: {e}")
+                version = None
+
+            if version is None:
+                return f(*args, **kwargs)
+
+            user_id = None
+            if per_user:
+                user_id = (getattr(g, "user", None) or {}).get("id")
+            etag = make_etag(request.full_path, user_id, version)
+
+            if etag_matches(etag):
+                response = current_app.response_class(status=304)
+                response.set_etag(etag)
+                return response
+
+            response = make_response(f(*args, **kwargs))
+            if response.status_code == 200:
+                response.set_etag(etag)
+            return response
+
+        return decorated_function
+
+    return decorator
@@ -0,0 +1,228 @@
+"""
+Idempotency keys for non-idempotent POST endpoints
+
+Clients that retry a POST after a timeout send the same Idempotency-Key
+header on every attempt. The first request with a key claims it in the
+`idempotency_keys` collection, together with a fingerprint of the request
+(method, path and JSON body), runs the view and stores its response. A
+retry of that request never runs the view again:
+
+- while the original is still running, the retry waits for it (up to
+  IDEMPOTENCY_WAIT_SECONDS) and gets its response, or a 409 with
+  Retry-After if it takes longer;
+- once the original has finished, its stored response is replayed, marked
+  with an Idempotent-Replayed header;
+- reusing a key for a different request is rejected with a 422.
+
+Server errors (5xx) are not stored: the key is released so the retry can run
+the request again. Keys are scoped per user, and expire by a TTL index after
+IDEMPOTENCY_TTL_SECONDS. A claim whose request died mid-run is taken over
+once its lock (IDEMPOTENCY_LOCK_SECONDS) expires.
+
+Apply below login_required so g.user is set when the key is claimed.
+"""
+
+import hashlib
+import json
+import logging
+import time
+from datetime import datetime, timedelta
+from functools import wraps
+from typing import Any, Dict, Optional
+
+from flask import current_app, g, jsonify, make_response, request
+from pymongo.errors import DuplicateKeyError
+
+from config.database import get_collection
+from config.settings import (
+    IDEMPOTENCY_LOCK_SECONDS,
+    IDEMPOTENCY_WAIT_SECONDS,
+)
+
+logger = logging.getLogger(__name__)
+
+IDEMPOTENCY_HEADER = "Idempotency-Key"
+REPLAYED_HEADER = "Idempotent-Replayed"
+MAX_KEY_LENGTH = 255
+
+# Response headers stored and replayed with the body
+REPLAYED_HEADERS = ("Content-Type", "Location", "Retry-After")
+
+# Seconds between checks while waiting for the original request
+WAIT_POLL_INTERVAL = 0.2
+
+IN_PROGRESS = "in_progress"
+COMPLETED = "completed"
+
+
+def request_fingerprint() -> str:
+    """
+    Hash of what makes a request the same request
+
+    JSON bodies are hashed in canonical form, so retries that serialize the
+    same body with different key order or spacing still match.
+    """
+    body = request.get_json(silent=True)
+    if body is not None:
+        payload = json.dumps(body, sort_keys=True, separators=(",", ":"), default=str)
+    else:
+        payload = request.get_data(as_text=True)
+    digest = hashlib.blake2b(digest_size=16)
+    for part in (request.method, request.path, payload):
+        digest.update(part.encode())
+        digest.update(b"\0")
+    return digest.hexdigest()
+
+
+def _error(message: str, status: int, retry_after: Optional[int] = None):
+    response = jsonify({"success": False, "message": message})
+    response.status_code = status
+    if retry_after is not None:
+        response.headers["Retry-After"] = str(retry_after)
+    return response
+
+
+def _replay(record: Dict[str, Any]):
+    """Rebuild a stored response"""
+    stored = record["response"]
+    response = current_app.response_class(
+        stored["body"], status=stored["status"], headers=stored.get("headers", {})
+    )
+    response.headers[REPLAYED_HEADER] = "true"
+    return response
+
+
+def _claim(collection, key_id: str, fingerprint: str) -> Optional[Dict[str, Any]]:
+    """
+    Claim a key for this request
+
+    Returns:
+        None if this request owns the key now, otherwise the existing record
+    """
+    now = datetime.now()
+    locked_until = now + timedelta(seconds=IDEMPOTENCY_LOCK_SECONDS)
+    try:
+        collection.insert_one(
+            {
+                "_id": key_id,
+                "fingerprint": fingerprint,
+                "status": IN_PROGRESS,
+                "lockedUntil": locked_until,
+                "createdAt": now,
+            }
+        )
+        return None
+    except DuplicateKeyError:
+        pass
+
+    # Take over a claim whose request died before finishing
+    taken = collection.find_one_and_update(
+        {
+            "_id": key_id,
+            "fingerprint": fingerprint,
+            "status": IN_PROGRESS,
+            "lockedUntil": {"$lt": now},
+        },
+        {"$set": {"lockedUntil": locked_until}},
+    )
+    if taken is not None:
+        logger.warning(f"Taking over stale idempotency key {key_id}")
+        return None
+
+    record = collection.find_one({"_id": key_id})
+    if record is None:
+        # Released (or expired) in the meantime; try again from the start
+        return _claim(collection, key_id, fingerprint)
+    return record
+
+
+def _wait(collection, key_id: str) -> Optional[Dict[str, Any]]:
+    """Wait for the request holding a key to finish; None if it was released"""
+    give_up = time.monotonic() + IDEMPOTENCY_WAIT_SECONDS
+    while True:
+        record = collection.find_one({"_id": key_id})
+        if record is None or record["status"] == COMPLETED:
+            return record
+        if time.monotonic() >= give_up:
+            return record
+        time.sleep(WAIT_POLL_INTERVAL)
+
+
+def idempotent(f):
+    """
+    Run a view at most once per Idempotency-Key
+
+    Requests without the header are served as usual.
+    """
+
+    @wraps(f)
+    def decorated_function(*args, **kwargs):
+        key = request.headers.get(IDEMPOTENCY_HEADER)
+        if key is None:
+            return f(*args, **kwargs)
+        if not key or len(key) > MAX_KEY_LENGTH:
+            return _error(f"Invalid {IDEMPOTENCY_HEADER} header", 400)
+
+        user_id = (getattr(g, "user", None) or {}).get("id")
+        key_id = f"{user_id}:{key}"
+        fingerprint = request_fingerprint()
+        collection = get_collection("idempotency_keys")
+
+        try:
+            record = _claim(collection, key_id, fingerprint)
+            if record is not None and record["fingerprint"] == fingerprint:
+                if record["status"] == IN_PROGRESS:
+                    record = _wait(collection, key_id)
+                    if record is None:
+                        # The original failed and released the key
+                        record = _claim(collection, key_id, fingerprint)
+        except Exception as e:
+            # Without the store, serve the request rather than fail it
+            logger.error(f"Idempotency store unavailable: {e}")
+            return f(*args, **kwargs)
+
+        if record is not None:
+            if record["fingerprint"] != fingerprint:
+                return _error(
+                    f"{IDEMPOTENCY_HEADER} was already used for a different request",
+                    422,
+                )
+            if record["status"] == COMPLETED:
+                return _replay(record)
+            return _error("A request with this key is still in progress", 409, 1)
+
+        try:
+            response = make_response(f(*args, **kwargs))
+        except Exception:
+            collection.delete_one({"_id": key_id})
+            raise
+
+        try:
+            if response.status_code >= 500 or response.is_streamed:
+                collection.delete_one({"_id": key_id})
+            else:
+                headers = {
+                    name: response.headers[name]
+                    for name in REPLAYED_HEADERS
+                    if name in response.headers
+                }
+                collection.update_one(
+                    {"_id": key_id},
+                    {
+                        "$set": {
+                            "status": COMPLETED,
+                            "response": {
+                                "status": response.status_code,
+                                "body": response.get_data(),
+                                "headers": headers,
+                            },
+                            "completedAt": datetime.now(),
+                        },
+                        "$unset": {"lockedUntil": ""},
+                    },
+                )
+        except Exception as e:
+            logger.error(f"Could not store response for idempotency key: {e}")
+        return response
+
+    return decorated_function
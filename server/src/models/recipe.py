@@ -7,6 +7,8 @@ from datetime import datetime
 from pydantic import BaseModel, Field, validator
 from bson import ObjectId
 
+from models.records import RecipeRecord
+
 
 # Custom ObjectId field for Pydantic validation
 class PyObjectId(str):
@@ -105,14 +107,11 @@ def recipe_to_db(recipe: RecipeCreate, user_id: str) -> Dict[str, Any]:
     }
 
 
-def db_to_recipe(recipe_data: Dict[str, Any]) -> RecipeResponse:
-    """Convert MongoDB document to RecipeResponse"""
-    return RecipeResponse(
-        _id=str(recipe_data.get("_id")),
-        name=recipe_data.get("name"),
-        ingredients=recipe_data.get("ingredients", []),
-        instructions=recipe_data.get("instructions"),
-        estimatedCalories=recipe_data.get("estimatedCalories"),
-        createdBy=recipe_data.get("createdBy"),
-        createdAt=recipe_data.get("createdAt"),
-    )
+def db_to_recipe(recipe_data: Dict[str, Any]) -> RecipeRecord:
+    """
+    Convert MongoDB document to a response record
+
+    Documents from our own collection are trusted, so this skips pydantic
+    validation; use RecipeResponse only for data from outside.
+    """
+    return RecipeRecord.from_doc(recipe_data)
@@ -0,0 +1,177 @@
+"""
+Lightweight record types for trusted database-to-response paths
+
+Documents read from our own collections have already been validated on the
+way in, so running them back through pydantic on every read only costs time
+and memory. These records copy the fields with no validation and use
+__slots__, so no per-instance __dict__ is allocated. Pydantic models in
+recipe.py and user.py remain the boundary for untrusted request data.
+
+Records convert to plain dicts with to_dict(), and dict(record) also works,
+so FastAPI's encoder and utils.serialization both serialize them directly.
+"""
+
+from datetime import datetime
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+
+class Record:
+    """Base class for slotted records"""
+
+    __slots__ = ()
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to a JSON-ready dict keyed by the response field names"""
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        for name in self.__slots__:
+            yield name, getattr(self, name)
+
+    def __eq__(self, other: Any) -> bool:
+        return type(other) is type(self) and tuple(self) == tuple(other)
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={value!r}" for name, value in self)
+        return f"{type(self).__name__}({fields})"
+
+
+class RecipeRecord(Record):
+    """
+    Recipe as returned by the API
+
+    Fields the record does not name (fields added by later features, or
+    user_id on recipes written before createdBy existed) are kept in
+    `extra`, and optional fields the document did not have are left out of
+    to_dict(). A recipe therefore serializes to the same JSON as the
+    document it was read from.
+    """
+
+    __slots__ = (
+        "_id",
+        "name",
+        "ingredients",
+        "instructions",
+        "estimatedCalories",
+        "category",
+        "source",
+        "createdBy",
+        "createdAt",
+        "updatedAt",
+        "extra",
+        "_unset",
+    )
+
+    # Response fields, in output order (extra keys follow)
+    FIELDS = __slots__[:-2]
+    OPTIONAL = FIELDS[3:]
+
+    def __init__(
+        self,
+        _id: str,
+        name: str,
+        ingredients: List[str],
+        instructions: Optional[str] = None,
+        estimatedCalories: Optional[float] = None,
+        createdBy: Optional[str] = None,
+        createdAt: Optional[datetime] = None,
+        category: Optional[str] = None,
+        source: Optional[str] = None,
+        updatedAt: Optional[datetime] = None,
+        extra: Optional[Dict[str, Any]] = None,
+        unset: Tuple[str, ...] = (),
+    ):
+        self._id = _id
+        self.name = name
+        self.ingredients = ingredients
+        self.instructions = instructions
+        self.estimatedCalories = estimatedCalories
+        self.category = category
+        self.source = source
+        self.createdBy = createdBy
+        self.createdAt = createdAt
+        self.updatedAt = updatedAt
+        self.extra = extra or {}
+        self._unset = unset
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Convert to the JSON-ready dict the source document would give"""
+        data = {
+            name: getattr(self, name)
+            for name in self.FIELDS
+            if name not in self._unset
+        }
+        data.update(self.extra)
+        return data
+
+    def __iter__(self) -> Iterator[Tuple[str, Any]]:
+        return iter(self.to_dict().items())
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "RecipeRecord":
+        """
+        Build a record from a recipes collection document
+
+        Args:
+            doc: Document as read from MongoDB
+
+        Returns:
+            RecipeRecord with a string _id
+        """
+        get = doc.get
+        known = cls.FIELDS
+        return cls(
+            str(doc["_id"]),
+            get("name"),
+            get("ingredients", []),
+            get("instructions"),
+            get("estimatedCalories"),
+            # Recipes written before createdBy existed stored user_id
+            get("createdBy") or get("user_id"),
+            get("createdAt"),
+            get("category"),
+            get("source"),
+            get("updatedAt"),
+            {key: value for key, value in doc.items() if key not in known},
+            tuple(name for name in cls.OPTIONAL if name not in doc),
+        )
+
+
+class UserRecord(Record):
+    """Public user profile as returned by the API (no password fields)"""
+
+    __slots__ = ("_id", "username", "email", "created_at")
+
+    def __init__(
+        self,
+        _id: str,
+        username: str,
+        email: str,
+        created_at: Optional[datetime] = None,
+    ):
+        self._id = _id
+        self.username = username
+        self.email = email
+        self.created_at = created_at
+
+    @property
+    def id(self) -> str:
+        return self._id
+
+    @classmethod
+    def from_doc(cls, doc: Dict[str, Any]) -> "UserRecord":
+        """
+        Build a record from a users collection document
+
+        Args:
+            doc: Document as read from MongoDB
+
+        Returns:
+            UserRecord with a string _id
+        """
+        get = doc.get
+        return cls(str(doc["_id"]), get("username"), get("email"), get("created_at"))
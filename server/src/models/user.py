@@ -7,6 +7,8 @@ from datetime import datetime
 from pydantic import BaseModel, EmailStr, Field, validator
 from bson import ObjectId
 
+from models.records import UserRecord
+
 
 # Custom ObjectId field for Pydantic validation
 class PyObjectId(str):
@@ -34,7 +36,7 @@ class UserCreate(UserBase):
     password: str
 
     @validator("password")
-    def password_strength(self, cls, v):
+    def password_strength(cls, v):
         if len(v) < 8:
             raise ValueError("Password must be at least 8 characters")
         return v
@@ -100,19 +102,16 @@ def user_to_db(user: UserCreate, password_hash: str) -> Dict[str, Any]:
         "username": user.username,
         "email": user.email,
         "password_hash": password_hash,
-        "savedRecipes": [],
-        "calorieLog": [],
         "created_at": datetime.now(),
         "updated_at": datetime.now(),
     }
 
 
-def db_to_user(user_data: Dict[str, Any]) -> UserResponse:
-    """Convert MongoDB document to UserResponse"""
-    return UserResponse(
-        _id=str(user_data.get("_id")),
-        username=user_data.get("username"),
-        email=user_data.get("email"),
-        savedRecipes=user_data.get("savedRecipes", []),
-        created_at=user_data.get("created_at"),
-    )
+def db_to_user(user_data: Dict[str, Any]) -> UserRecord:
+    """
+    Convert MongoDB document to a response record
+
+    Documents from our own collection are trusted, so this skips pydantic
+    validation; use UserResponse only for data from outside.
+    """
+    return UserRecord.from_doc(user_data)
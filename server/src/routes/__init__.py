@@ -1,15 +1,29 @@
-from fastapi import APIRouter
-from .auth_routes import router as auth_router
-from .recipe_routes import router as recipe_router
-from .user_routes import router as user_router
+# The combined FastAPI router is built on first access (PEP 562), so importing
+# a single route module such as routes.recipe_routes does not pull in FastAPI
+# and every other route module.
 
-# Create the main router
-router = APIRouter()
+__all__ = ["router"]
 
-# Include all route modules
-router.include_router(auth_router)
-router.include_router(recipe_router)
-router.include_router(user_router)
 
-# Export the main router
-__all__ = ["router"]
+def _build_router():
+    from fastapi import APIRouter
+    from .auth_routes import router as auth_router
+    from .recipe_routes import router as recipe_router
+    from .user_routes import router as user_router
+
+    # Create the main router
+    router = APIRouter()
+
+    # Include all route modules
+    router.include_router(auth_router)
+    router.include_router(recipe_router)
+    router.include_router(user_router)
+
+    return router
+
+
+def __getattr__(name):
+    if name == "router":
+        globals()["router"] = _build_router()
+        return globals()["router"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
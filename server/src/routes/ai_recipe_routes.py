@@ -1,34 +1,92 @@
 """
 Routes for AI recipe generation
+
+POST /api/recipes/generate-ai generates a recipe and waits for it, for
+clients that cannot poll a job (POST /api/recipes/generate queues one
+instead). It goes through recipe_service, so prompts, structured output,
+model routing and the OpenAI circuit breaker are the same as for queued
+generations. Logging in is optional; the response keeps the fields this
+endpoint has always returned (estimatedTime, servings, image, ai_generated,
+diets).
 """
 
+import logging
+import time
+from urllib.parse import quote_plus
+
 from flask import Blueprint, request, jsonify, g
-from services.ai_recipe_service import generate_recipe
+
+from config.settings import GENERATE_DEADLINE_SECONDS
+from middleware.idempotency import idempotent
+from services.recipe_service import estimate_calories, generate_recipe
+from utils import async_runner
+from utils.circuit_breaker import CircuitOpenError
+from utils.deadline import DeadlineExceeded, deadline
+
+logger = logging.getLogger(__name__)
 
 # Initialize blueprint
 ai_recipe_bp = Blueprint("ai_recipe", __name__)
 
+# Used when the model leaves a field out
+DEFAULT_MINUTES = 30
+DEFAULT_SERVINGS = 4
+
+
+async def generate_with_calories(ingredients, preferences):
+    """Generate a recipe, estimating its calories if the model left them out"""
+    with deadline(seconds=GENERATE_DEADLINE_SECONDS):
+        recipe = await generate_recipe(ingredients, preferences)
+        if recipe.get("estimatedCalories") is None:
+            calories = await estimate_calories(recipe["name"], recipe["ingredients"])
+            if calories:
+                recipe["estimatedCalories"] = calories
+    return recipe
+
+
+def ai_recipe_response(recipe, preferences):
+    """Shape a generated recipe the way /generate-ai has always returned it"""
+    minutes = recipe.get("estimatedTime") or DEFAULT_MINUTES
+    return {
+        "_id": f"ai-{int(time.time())}",
+        "name": recipe["name"],
+        "ingredients": recipe["ingredients"],
+        "instructions": recipe["instructions"],
+        "estimatedCalories": recipe.get("estimatedCalories") or 0,
+        "estimatedTime": f"{minutes:g} mins",
+        "servings": recipe.get("servings") or DEFAULT_SERVINGS,
+        "image": "https://source.unsplash.com/random/800x600/?"
+        + quote_plus(recipe["name"]),
+        "ai_generated": True,
+        "diets": [preferences] if preferences else [],
+    }
+
 
 @ai_recipe_bp.route("/generate-ai", methods=["POST"])
+@idempotent
 def generate_ai_recipe():
     """Generate a recipe using OpenAI based on ingredients"""
     try:
         # Get request data
-        data = request.json
+        data = request.get_json(silent=True) or {}
 
-        # Validate request
-        if not data or "ingredients" not in data:
+        # Accept a list or a comma-separated string
+        ingredients = data.get("ingredients") or []
+        if isinstance(ingredients, str):
+            ingredients = [item.strip() for item in ingredients.split(",")]
+        ingredients = [item for item in ingredients if item]
+        if not ingredients:
             return (
                 jsonify({"success": False, "message": "Ingredients are required"}),
                 400,
             )
 
-        # Extract ingredients and preferences
-        ingredients = data.get("ingredients", [])
+        # Generate the recipe on the shared event loop
         preferences = data.get("preferences")
-
-        # Generate the recipe using AI
-        recipe = await generate_recipe(ingredients, preferences)
+        recipe = ai_recipe_response(
+            async_runner.run(generate_with_calories(ingredients, preferences)),
+            preferences,
+        )
 
         # Add user ID if user is authenticated
         if hasattr(g, "user"):
@@ -36,12 +94,22 @@ def generate_ai_recipe():
 
         return jsonify({"success": True, "data": recipe}), 200
 
+    except CircuitOpenError as e:
+        response = jsonify({"success": False, "message": str(e)})
+        response.status_code = 503
+        response.headers["Retry-After"] = str(max(1, round(e.retry_after)))
+        return response
+    except DeadlineExceeded:
+        return (
+            jsonify({"success": False, "message": "Recipe generation timed out"}),
+            504,
+        )
     except ValueError as e:
-        # Handle validation errors
+        # recipe_service raises ValueError when no valid recipe came back
+        logger.error(f"Error in generate_ai_recipe: {e}")
         return jsonify({"success": False, "message": str(e)}), 400
     except Exception as e:
-        # Handle other errors
-        print(f"Error in generate_ai_recipe: {str(e)}")
+        logger.error(f"Error in generate_ai_recipe: {e}")
         return (
             jsonify(
                 {
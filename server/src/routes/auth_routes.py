@@ -1,166 +1,136 @@
 """
 Authentication routes for the Recipe Generator API
+
+Users register and log in here; both return a JWT that the other blueprints
+accept as "Authorization: Bearer <token>" (see middleware.auth).
 """
 
-from fastapi import APIRouter, Depends, HTTPException, status, Request
-from fastapi.security import OAuth2PasswordRequestForm, OAuth2PasswordBearer
-from typing import Annotated, Dict, Any
-from datetime import timedelta, datetime
+from flask import Blueprint, request, jsonify, g
+from datetime import datetime
 import logging
 
-# Set up logger
-logging.basicConfig(level=logging.INFO)
-logger = logging.getLogger(__name__)
-
-# Create router - CHANGED: removed the prefix since it will be added in main.py
-router = APIRouter(tags=["authentication"])
+from pymongo.errors import DuplicateKeyError
 
-# Temporary authentication for development
-oauth2_scheme = OAuth2PasswordBearer(tokenUrl="api/auth/login")
+from config.database import get_collection
+from middleware.auth import (
+    authenticate_jwt,
+    find_user_by_id,
+    generate_token,
+    hash_password,
+    verify_password,
+)
+from models.user import db_to_user
 
-# Temporary in-memory user store for testing
-test_users = {
-    "user@example.com": {
-        "_id": "temp-user-id",
-        "username": "testuser",
-        "email": "user@example.com",
-        "password": "password123",
-    }
-}
+logger = logging.getLogger(__name__)
 
+# Create blueprint
+auth_bp = Blueprint("auth", __name__)
+
+MIN_PASSWORD_LENGTH = 8
+
+
+def token_response(user, status=200):
+    """Respond with a fresh token for a user"""
+    token = generate_token(user["_id"], user["username"], user["email"])
+    return (
+        jsonify({"success": True, "data": {"token": token, "user": db_to_user(user)}}),
+        status,
+    )
+
+
+@auth_bp.route("/register", methods=["POST"])
+def register():
+    """Create a user and log them in"""
+    data = request.get_json(silent=True) or {}
+    username = (data.get("username") or "").strip()
+    email = (data.get("email") or "").strip().lower()
+    password = data.get("password") or ""
+
+    if not username or not email or not password:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "Username, email and password are required",
+                }
+            ),
+            400,
+        )
+    if len(password) < MIN_PASSWORD_LENGTH:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": f"Password must be at least {MIN_PASSWORD_LENGTH} "
+                    "characters",
+                }
+            ),
+            400,
+        )
 
-# Helper functions until your real utils are working
-def create_access_token(data: Dict[str, Any], expires_delta: timedelta = None) -> str:
-    """Simple token generator for development"""
-    return "temp-access-token"
+    now = datetime.now()
+    user = {
+        "username": username,
+        "email": email,
+        "password_hash": hash_password(password),
+        "created_at": now,
+        "updated_at": now,
+    }
+    try:
+        # username and email have unique indexes (config.indexes)
+        user["_id"] = get_collection("users").insert_one(user).inserted_id
+    except DuplicateKeyError:
+        return (
+            jsonify(
+                {
+                    "success": False,
+                    "message": "A user with this username or email already exists",
+                }
+            ),
+            409,
+        )
+    except Exception as e:
+        logger.error(f"Registration failed: {e}")
+        return jsonify({"success": False, "message": "Registration failed"}), 500
 
+    return token_response(user, 201)
 
-async def get_current_user(token: str = Depends(oauth2_scheme)):
-    """Simple user lookup for development"""
-    # In a real app, you would decode the token
-    return {"_id": "temp-user-id", "username": "testuser", "email": "user@example.com"}
 
+@auth_bp.route("/login", methods=["POST"])
+def login():
+    """Log in with an email (or username) and password"""
+    data = request.get_json(silent=True) or {}
+    login_name = (data.get("email") or data.get("username") or "").strip()
+    password = data.get("password") or ""
 
-@router.post("/api/auth/register")
-async def register_user(request: Request):
-    """
-    Register a new user and return access token
-    """
-    try:
-        # Get JSON body
-        user_data = await request.json()
-        logger.info(f"Registration data received: {user_data}")
-
-        # Extract user info
-        username = user_data.get("username")
-        email = user_data.get("email")
-        password = user_data.get("password")
-
-        # Simple validation
-        if not all([username, email, password]):
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Missing required fields",
-            )
-
-        # Check if user exists (simple in-memory check)
-        if email in test_users:
-            raise HTTPException(
-                status_code=status.HTTP_409_CONFLICT,
-                detail="User with this email already exists",
-            )
-
-        # Store user (in memory for now)
-        test_users[email] = {
-            "_id": f"user-{len(test_users) + 1}",
-            "username": username,
-            "email": email,
-            "password": password,  # In a real app, this would be hashed
-        }
-
-        # Return response in the format expected by the frontend
-        return {
-            "id": test_users[email]["_id"],
-            "username": username,
-            "email": email,
-            "access_token": "temp-access-token",
-            "token_type": "bearer",
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Registration error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Registration failed. Please try again later.",
+    if not login_name or not password:
+        return (
+            jsonify({"success": False, "message": "Email and password are required"}),
+            400,
         )
 
-
-@router.post("/api/auth/login")
-async def login(request: Request):
-    """
-    Authenticate a user and return access token
-    """
     try:
-        # Get JSON body
-        login_data = await request.json()
-        logger.info(f"Login data received: {login_data}")
-
-        email = login_data.get("email")
-        password = login_data.get("password")
-
-        # Simple validation
-        if not email or not password:
-            raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Email and password are required",
-            )
-
-        # Check if user exists and password matches
-        # (Using simple in-memory check for development)
-        user = test_users.get(email)
-        if not user or user["password"] != password:
-            raise HTTPException(
-                status_code=status.HTTP_401_UNAUTHORIZED,
-                detail="Incorrect email or password",
-            )
-
-        # Return response in the format expected by the frontend
-        return {
-            "access_token": "temp-access-token",
-            "token_type": "bearer",
-            "user": {
-                "id": user["_id"],
-                "username": user["username"],
-                "email": user["email"],
-            },
-        }
-    except HTTPException:
-        raise
-    except Exception as e:
-        logger.error(f"Login error: {str(e)}")
-        raise HTTPException(
-            status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
-            detail="Login failed. Please try again later.",
+        user = get_collection("users").find_one(
+            {"$or": [{"email": login_name.lower()}, {"username": login_name}]}
         )
+    except Exception as e:
+        logger.error(f"Login failed: {e}")
+        return jsonify({"success": False, "message": "Login failed"}), 500
 
+    if not user or not verify_password(password, user.get("password_hash")):
+        return (
+            jsonify({"success": False, "message": "Incorrect email or password"}),
+            401,
+        )
 
-@router.get("/api/auth/me")
-async def get_user_profile(current_user: Dict[str, Any] = Depends(get_current_user)):
-    """
-    Get current user profile
-    """
-    # Return user info for the authenticated user
-    return {
-        "id": current_user["_id"],
-        "username": current_user["username"],
-        "email": current_user["email"],
-    }
+    return token_response(user)
 
 
-@router.get("/api/auth/health-check")
-async def health_check():
-    """
-    Health check endpoint for the auth service
-    """
-    return {"status": "ok", "message": "Auth service is running"}
+@auth_bp.route("/me", methods=["GET"])
+@authenticate_jwt
+def me():
+    """The user a token belongs to"""
+    user = find_user_by_id(g.user.get("id"))
+    if not user:
+        return jsonify({"success": False, "message": "User not found"}), 404
+    return jsonify({"success": True, "data": db_to_user(user)})
@@ -0,0 +1,129 @@
+"""
+Job routes for the Flask application
+Handles status polling, completion events and cancellation of background jobs
+"""
+
+import time
+
+from flask import Blueprint, Response, jsonify, g, request, stream_with_context
+
+from middleware.auth import authenticate_jwt as login_required
+from services.job_queue import TERMINAL_STATES, cancel_job, get_job, wait_for_job
+from utils.serialization import dumps
+
+# Initialize blueprint
+job_bp = Blueprint("job", __name__)
+
+# Server-sent events: keep-alive interval and maximum stream length (seconds)
+SSE_HEARTBEAT_SECONDS = 15
+SSE_MAX_SECONDS = 300
+
+# Keep-alive interval when the job is cancelled on disconnect: a closed
+# connection is only noticed when a write fails
+SSE_CANCEL_HEARTBEAT_SECONDS = 2
+
+
+def sse_event(event: str, data) -> bytes:
+    """Format one server-sent event"""
+    return b"event: " + event.encode() + b"\ndata: " + dumps(data) + b"\n\n"
+
+
+@job_bp.route("/<job_id>", methods=["GET"])
+@login_required
+def get_job_status(job_id):
+    """Get the status (and result, once finished) of one of the user's jobs"""
+    try:
+        job = get_job(job_id, g.user.get("id"))
+
+        if not job:
+            return jsonify({"success": False, "message": "Job not found"}), 404
+
+        response = jsonify({"success": True, "data": job})
+        if job["status"] not in TERMINAL_STATES:
+            # Hint for clients that poll instead of using /events
+            response.headers["Retry-After"] = "1"
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@job_bp.route("/<job_id>", methods=["DELETE"])
+@login_required
+def cancel_job_route(job_id):
+    """Cancel one of the user's jobs (running jobs stop within a second or so)"""
+    try:
+        job = cancel_job(job_id, g.user.get("id"))
+
+        if not job:
+            return jsonify({"success": False, "message": "Job not found"}), 404
+
+        if job["status"] in TERMINAL_STATES and not job.get("cancelRequested"):
+            message = f"Job already {job['status']}"
+        else:
+            message = "Job cancelled"
+        response = jsonify({"success": True, "data": job, "message": message})
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@job_bp.route("/<job_id>/events", methods=["GET"])
+@login_required
+def job_events(job_id):
+    """
+    Stream a job's status changes as server-sent events until it finishes
+
+    With ?cancelOnDisconnect=true the job is cancelled if the client goes
+    away before it finishes, so nobody pays for a result nobody reads.
+    """
+    user_id = g.user.get("id")
+    job = get_job(job_id, user_id)
+
+    if not job:
+        return jsonify({"success": False, "message": "Job not found"}), 404
+
+    cancel_on_disconnect = (
+        request.args.get("cancelOnDisconnect", "false").lower() == "true"
+    )
+    heartbeat = (
+        SSE_CANCEL_HEARTBEAT_SECONDS if cancel_on_disconnect else SSE_HEARTBEAT_SECONDS
+    )
+
+    def stream(job):
+        started = time.monotonic()
+        status = job["status"]
+        try:
+            yield sse_event("status", job)
+
+            while job["status"] not in TERMINAL_STATES:
+                if time.monotonic() - started > SSE_MAX_SECONDS:
+                    # Clients reconnect (EventSource does so automatically)
+                    yield sse_event("timeout", {"status": job["status"]})
+                    return
+
+                job = wait_for_job(job_id, heartbeat, user_id)
+                if job is None:
+                    return
+
+                if job["status"] != status:
+                    status = job["status"]
+                    yield sse_event("status", job)
+                else:
+                    # Comment line keeps proxies from closing an idle stream
+                    yield b": keep-alive\n\n"
+
+            yield sse_event("done", job)
+        except GeneratorExit:
+            # The server closes the stream when the client disconnects
+            if cancel_on_disconnect and job["status"] not in TERMINAL_STATES:
+                cancel_job(job_id, user_id)
+            raise
+
+    response = Response(stream_with_context(stream(job)), mimetype="text/event-stream")
+    response.headers["Cache-Control"] = "no-store"
+    response.headers["X-Accel-Buffering"] = "no"
+    return response
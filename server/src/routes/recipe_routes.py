@@ -5,46 +5,177 @@ Handles all recipe-related endpoints
 
 from flask import Blueprint, request, jsonify, g
 from bson import ObjectId
-import json
-from functools import wraps
+from datetime import datetime
+import logging
+import re
+import time
+
+from config.database import get_collection
+from config.settings import GENERATE_DEADLINE_SECONDS
+from middleware.auth import authenticate_jwt as login_required
+from middleware.cache_control import cache_private, cache_public
+from middleware.conditional import conditional
+from middleware.idempotency import idempotent
+from models.recipe import db_to_recipe
+from services import bookmark_service
+from services.version_service import RECIPES, bump_versions, get_versions, user_key
+from utils.cache import recipe_cache
+from utils.cdn import RECIPES_KEY, add_surrogate_keys, purge, purge_recipe, recipe_key
+
+# The recommender, vector index, cache warming and generation jobs load numpy
+# and scipy, so they are imported where they are used: importing the routes
+# stays within its budget (benchmarks/startup_profile.py), and the app
+# factory loads them at startup anyway
+
+logger = logging.getLogger(__name__)
 
 # Initialize blueprint
 recipe_bp = Blueprint("recipe", __name__)
 
+# Share of a recipe's ingredients the pantry must cover for /generate to
+# answer with an existing recipe instead of generating a new one
+GENERATE_MATCH_COVERAGE = 0.8
+
+# Most results a semantic query pages through
+SEMANTIC_MAX_RESULTS = 200
+
 
-# Mock database function (replace with actual MongoDB connection)
 def get_db_collection(collection_name):
-    """Get MongoDB collection - placeholder for actual implementation"""
-    from flask import current_app
+    """Get MongoDB collection from the shared connection manager"""
+    return get_collection(collection_name)
 
-    return current_app.mongo.db[collection_name]
 
+def recipe_owner(recipe):
+    """Get the creator of a recipe (older documents stored user_id)"""
+    return recipe.get("createdBy", recipe.get("user_id"))
 
-# Authentication decorator (replace with your actual auth implementation)
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # This is just a placeholder - replace with your actual auth logic
-        if not hasattr(g, "user"):
-            return (
-                jsonify({"success": False, "message": "Authentication required"}),
-                401,
-            )
-        return f(*args, **kwargs)
 
-    return decorated_function
+def recipes_version(*args, **kwargs):
+    """Version of the recipes collection as a whole (for listings)"""
+    return get_versions([RECIPES])[RECIPES]
+
+
+def recipe_version(recipe_id):
+    """Version of one recipe: its last update time, read without the body"""
+    if not ObjectId.is_valid(recipe_id):
+        return None
+
+    recipe = recipe_cache.get(recipe_id)
+    if recipe is None:
+        recipe = get_db_collection("recipes").find_one(
+            {"_id": ObjectId(recipe_id)}, {"updatedAt": 1, "createdAt": 1}
+        )
+    if not recipe:
+        return None
+    return recipe.get("updatedAt", recipe.get("createdAt"))
+
+
+def recommendations_version(*args, **kwargs):
+    """Version for personalized recommendations: recipes plus saved history"""
+    keys = [RECIPES, user_key(g.user.get("id"), "saved")]
+    return tuple(get_versions(keys).values())
+
+
+def parse_pantry(value):
+    """Split a comma-separated ingredient list from a query parameter"""
+    return [item.strip() for item in value.split(",") if item.strip()]
+
+
+def matching_recipes(pantry, user_id=None, limit=10, min_coverage=0.0):
+    """
+    Rank existing recipes for a pantry and load them
+
+    Args:
+        pantry: Ingredients the user has
+        user_id: Signed-in user, to personalize the ranking
+        limit: Maximum number of recipes
+        min_coverage: Minimum share of a recipe's ingredients in the pantry
+
+    Returns:
+        Recipe documents, best first, each with a "match" entry holding its
+        score, coverage and missing ingredients
+    """
+    from services import recommender
+
+    # Sync the index to the version the response's ETag was built from
+    version = get_versions([RECIPES])[RECIPES]
+    matches = recommender.recommend(pantry, user_id, limit, min_coverage, version)
+    recipes, _ = bookmark_service.hydrate_recipes(
+        [match["recipeId"] for match in matches], full=True
+    )
+
+    # Recipes deleted since the index last synced are skipped
+    by_id = {str(recipe["_id"]): recipe for recipe in recipes}
+    return [
+        {**db_to_recipe(by_id[match.pop("recipeId")]).to_dict(), "match": match}
+        for match in matches
+        if match["recipeId"] in by_id
+    ]
+
+
+def similar_recipes(matches):
+    """
+    Load recipes for (recipe ID, similarity) pairs, keeping their order
+
+    Recipes deleted since the vector index last synced are skipped.
+    """
+    recipes, _ = bookmark_service.hydrate_recipes(
+        [recipe_id for recipe_id, _ in matches], full=True
+    )
+    by_id = {str(recipe["_id"]): recipe for recipe in recipes}
+    return [
+        {**db_to_recipe(by_id[recipe_id]).to_dict(), "similarity": similarity}
+        for recipe_id, similarity in matches
+        if recipe_id in by_id
+    ]
+
+
+def listing_keys(*args, **kwargs):
+    """Surrogate keys for listings; each recipe's own key is added in the view"""
+    return [RECIPES_KEY]
 
 
 @recipe_bp.route("/", methods=["GET"])
+@cache_public(listing_keys)
+@conditional(recipes_version, per_user=False)
 def get_recipes():
     """Get a list of recipes, can be filtered by query parameters"""
     try:
         # Get query parameters
         search = request.args.get("search", "")
+        semantic_query = request.args.get("q", "").strip()
         limit = int(request.args.get("limit", 10))
         page = int(request.args.get("page", 1))
         skip = (page - 1) * limit
 
+        if semantic_query:
+            from services import vector_index
+
+            try:
+                # Rank by meaning ("something like carbonara") rather than name
+                version = get_versions([RECIPES])[RECIPES]
+                # Rank up to SEMANTIC_MAX_RESULTS, so total and pages describe
+                # every page of the result, not just the pages up to this one
+                matches = vector_index.search_text(
+                    semantic_query, SEMANTIC_MAX_RESULTS, version
+                )
+                recipes = similar_recipes(matches[skip : skip + limit])
+                add_surrogate_keys(recipe_key(recipe["_id"]) for recipe in recipes)
+
+                return jsonify(
+                    {
+                        "success": True,
+                        "data": recipes,
+                        "total": len(matches),
+                        "page": page,
+                        "limit": limit,
+                        "pages": (len(matches) + limit - 1) // limit,
+                    }
+                )
+            except Exception as e:
+                logger.error(f"Semantic search unavailable, matching names: {e}")
+                search = re.escape(semantic_query)
+
         # Create query
         query = {}
         if search:
@@ -53,12 +184,17 @@ def get_recipes():
         # Get recipes collection
         recipes_collection = get_db_collection("recipes")
 
-        # Execute query
-        recipes = list(recipes_collection.find(query).skip(skip).limit(limit))
+        # Execute query, newest first (served by the createdAt index)
+        recipes = [
+            db_to_recipe(recipe)
+            for recipe in recipes_collection.find(query)
+            .sort("createdAt", -1)
+            .skip(skip)
+            .limit(limit)
+        ]
 
-        # Convert ObjectId to string for JSON serialization
-        for recipe in recipes:
-            recipe["_id"] = str(recipe["_id"])
+        # Tag the response so a change to any listed recipe purges it
+        add_surrogate_keys(recipe_key(recipe.id) for recipe in recipes)
 
         # Get total count for pagination
         total = recipes_collection.count_documents(query)
@@ -79,6 +215,8 @@ def get_recipes():
 
 
 @recipe_bp.route("/<recipe_id>", methods=["GET"])
+@cache_public(lambda recipe_id: [recipe_key(recipe_id)])
+@conditional(recipe_version, per_user=False)
 def get_recipe(recipe_id):
     """Get a single recipe by ID"""
     try:
@@ -86,19 +224,21 @@ def get_recipe(recipe_id):
         if not ObjectId.is_valid(recipe_id):
             return jsonify({"success": False, "message": "Invalid recipe ID"}), 400
 
-        # Get recipes collection
-        recipes_collection = get_db_collection("recipes")
+        # Serve from the single-recipe cache when possible
+        recipe = recipe_cache.get(recipe_id)
+        if recipe is None:
+            # Get recipes collection
+            recipes_collection = get_db_collection("recipes")
 
-        # Find recipe
-        recipe = recipes_collection.find_one({"_id": ObjectId(recipe_id)})
+            # Find recipe
+            recipe = recipes_collection.find_one({"_id": ObjectId(recipe_id)})
 
-        if not recipe:
-            return jsonify({"success": False, "message": "Recipe not found"}), 404
+            if not recipe:
+                return jsonify({"success": False, "message": "Recipe not found"}), 404
 
-        # Convert ObjectId to string for JSON serialization
-        recipe["_id"] = str(recipe["_id"])
+            recipe_cache.set(recipe_id, recipe)
 
-        return jsonify({"success": True, "data": recipe})
+        return jsonify({"success": True, "data": db_to_recipe(recipe)})
 
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -106,6 +246,7 @@ def get_recipe(recipe_id):
 
 @recipe_bp.route("/", methods=["POST"])
 @login_required
+@idempotent
 def create_recipe():
     """Create a new recipe"""
     try:
@@ -126,18 +267,20 @@ def create_recipe():
                     400,
                 )
 
-        # Add user ID to recipe
-        data["user_id"] = g.user.get("id")
+        # Add creator and timestamp (indexed as createdBy, createdAt)
+        data["createdBy"] = g.user.get("id")
+        data["createdAt"] = datetime.now()
 
         # Get recipes collection
         recipes_collection = get_db_collection("recipes")
 
         # Insert recipe
         result = recipes_collection.insert_one(data)
+        bump_versions(RECIPES)
+        purge(RECIPES_KEY)
 
         # Get created recipe
         created_recipe = recipes_collection.find_one({"_id": result.inserted_id})
-        created_recipe["_id"] = str(created_recipe["_id"])
 
         return (
             jsonify(
@@ -176,7 +319,7 @@ def update_recipe(recipe_id):
             return jsonify({"success": False, "message": "Recipe not found"}), 404
 
         # Check if user owns the recipe
-        if recipe.get("user_id") != g.user.get("id"):
+        if recipe_owner(recipe) != g.user.get("id"):
             return (
                 jsonify(
                     {
@@ -187,12 +330,15 @@ def update_recipe(recipe_id):
                 403,
             )
 
-        # Update recipe
+        # Update recipe (updatedAt versions it for conditional GETs)
+        data["updatedAt"] = datetime.now()
         recipes_collection.update_one({"_id": ObjectId(recipe_id)}, {"$set": data})
+        recipe_cache.delete(recipe_id)
+        bump_versions(RECIPES)
+        purge_recipe(recipe_id)
 
         # Get updated recipe
         updated_recipe = recipes_collection.find_one({"_id": ObjectId(recipe_id)})
-        updated_recipe["_id"] = str(updated_recipe["_id"])
 
         return jsonify(
             {
@@ -225,7 +371,7 @@ def delete_recipe(recipe_id):
             return jsonify({"success": False, "message": "Recipe not found"}), 404
 
         # Check if user owns the recipe
-        if recipe.get("user_id") != g.user.get("id"):
+        if recipe_owner(recipe) != g.user.get("id"):
             return (
                 jsonify(
                     {
@@ -236,8 +382,11 @@ def delete_recipe(recipe_id):
                 403,
             )
 
-        # Delete recipe
+        # Delete recipe (bookmarks pointing at it are dropped lazily)
         recipes_collection.delete_one({"_id": ObjectId(recipe_id)})
+        recipe_cache.delete(recipe_id)
+        bump_versions(RECIPES)
+        purge_recipe(recipe_id)
 
         return jsonify({"success": True, "message": "Recipe deleted successfully"})
 
@@ -245,7 +394,26 @@ def delete_recipe(recipe_id):
         return jsonify({"success": False, "message": str(e)}), 500
 
 
+@recipe_bp.before_request
+def count_searched_pantry():
+    """
+    Count the pantry of every /search request that reaches the server
+
+    Runs before the view's decorators, so revalidations answered with a 304
+    are counted too: they are the popular pantries cache warming is for.
+    Hits served by a CDN never reach the server and are not counted.
+    """
+    if request.endpoint == "recipe.search_recipes_by_ingredients":
+        ingredients = parse_pantry(request.args.get("ingredients", ""))
+        if ingredients:
+            from services.cache_warming import record_pantry
+
+            record_pantry(ingredients)
+
+
 @recipe_bp.route("/search", methods=["GET"])
+@cache_public(listing_keys)
+@conditional(recipes_version, per_user=False)
 def search_recipes_by_ingredients():
     """Search for recipes by ingredients"""
     try:
@@ -261,35 +429,120 @@ def search_recipes_by_ingredients():
                 400,
             )
 
-        # Parse ingredients
-        ingredients_list = [ing.strip() for ing in ingredients.split(",")]
+        # Parse ingredients (counted by count_searched_pantry)
+        ingredients_list = parse_pantry(ingredients)
 
-        # Get recipes collection
-        recipes_collection = get_db_collection("recipes")
+        try:
+            # Rank by how much of each recipe the ingredients cover
+            recipes = matching_recipes(ingredients_list, limit=limit)
+        except Exception as e:
+            logger.error(f"Recommender unavailable, using plain search: {e}")
+
+            # Get recipes collection
+            recipes_collection = get_db_collection("recipes")
+
+            # Create query to find recipes containing any of the ingredients
+            query = {"ingredients": {"$elemMatch": {"$in": ingredients_list}}}
+
+            # Execute query
+            recipes = [
+                db_to_recipe(recipe).to_dict()
+                for recipe in recipes_collection.find(query).limit(limit)
+            ]
+
+        add_surrogate_keys(recipe_key(recipe["_id"]) for recipe in recipes)
+
+        return jsonify({"success": True, "data": recipes, "count": len(recipes)})
+
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
 
-        # Create query to find recipes containing any of the ingredients
-        query = {"ingredients": {"$elemMatch": {"$in": ingredients_list}}}
 
-        # Execute query
-        recipes = list(recipes_collection.find(query).limit(limit))
+@recipe_bp.route("/similar", methods=["GET"])
+@cache_public(listing_keys)
+@conditional(recipes_version, per_user=False)
+def get_similar_recipes():
+    """Find recipes similar to a recipe (id=) or to a description (q=)"""
+    from services import vector_index
 
-        # Convert ObjectId to string for JSON serialization
-        for recipe in recipes:
-            recipe["_id"] = str(recipe["_id"])
+    try:
+        # Get query parameters
+        recipe_id = request.args.get("id", "")
+        text = request.args.get("q", "").strip()
+        limit = min(int(request.args.get("limit", 10)), 50)
+
+        if not recipe_id and not text:
+            return (
+                jsonify({"success": False, "message": "id or q parameter is required"}),
+                400,
+            )
+
+        version = get_versions([RECIPES])[RECIPES]
+        if recipe_id:
+            matches = vector_index.similar_to(recipe_id, limit, version)
+            if matches is None:
+                return jsonify({"success": False, "message": "Recipe not found"}), 404
+        else:
+            matches = vector_index.search_text(text, limit, version)
+
+        recipes = similar_recipes(matches)
+        add_surrogate_keys(recipe_key(recipe["_id"]) for recipe in recipes)
+
+        return jsonify({"success": True, "data": recipes, "count": len(recipes)})
+
+    except vector_index.IndexNotReady as e:
+        response = jsonify({"success": False, "message": str(e)})
+        response.status_code = 503
+        response.headers["Retry-After"] = "5"
+        return response
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid limit"}), 400
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@recipe_bp.route("/recommend", methods=["GET"])
+@login_required
+@cache_private
+@conditional(recommendations_version)
+def recommend_recipes():
+    """Recommend existing recipes for the user's pantry and saved recipes"""
+    try:
+        # Get query parameters
+        pantry = parse_pantry(request.args.get("pantry", ""))
+        limit = min(int(request.args.get("limit", 20)), 100)
+        min_coverage = float(request.args.get("minCoverage", 0))
+
+        if not pantry:
+            return (
+                jsonify({"success": False, "message": "Pantry parameter is required"}),
+                400,
+            )
+
+        recipes = matching_recipes(pantry, g.user.get("id"), limit, min_coverage)
 
         return jsonify({"success": True, "data": recipes, "count": len(recipes)})
 
+    except ValueError:
+        return (
+            jsonify({"success": False, "message": "Invalid limit or minCoverage"}),
+            400,
+        )
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
 
 
 @recipe_bp.route("/generate", methods=["POST"])
 @login_required
+@idempotent
 def generate_recipe():
     """Generate a recipe based on ingredients using external API"""
+    from services.cache_warming import record_pantry
+    from services.recipe_jobs import enqueue_recipe_generation
+
     try:
         # Get request data
-        data = request.json
+        data = request.json or {}
 
         if "ingredients" not in data or not data["ingredients"]:
             return (
@@ -297,36 +550,64 @@ def generate_recipe():
                 400,
             )
 
-        # This is where you would integrate with your recipe_api module
-        # For now, return a mock response
-        generated_recipe = {
-            "name": f"Recipe with {', '.join(data['ingredients'][:3])}",
-            "ingredients": data["ingredients"],
-            "instructions": "This is a placeholder for generated instructions.",
-            "estimatedCalories": 500,
-            "user_id": g.user.get("id"),
-        }
+        # Work on the generation stops once the client stops waiting: after
+        # GENERATE_DEADLINE_SECONDS, or sooner if it asks for a shorter timeout
+        budget = GENERATE_DEADLINE_SECONDS
+        if data.get("timeout") is not None:
+            try:
+                budget = min(float(data["timeout"]), budget)
+            except (TypeError, ValueError):
+                budget = 0
+            if budget <= 0:
+                return (
+                    jsonify({"success": False, "message": "Invalid timeout"}),
+                    400,
+                )
 
-        # Get recipes collection
-        recipes_collection = get_db_collection("recipes")
+        record_pantry(data["ingredients"], data.get("preferences"))
 
-        # Save the generated recipe
-        result = recipes_collection.insert_one(generated_recipe)
+        # Answer from existing recipes the ingredients (nearly) cover
+        if data.get("useExisting", True):
+            try:
+                recipes = matching_recipes(
+                    data["ingredients"],
+                    g.user.get("id"),
+                    limit=5,
+                    min_coverage=GENERATE_MATCH_COVERAGE,
+                )
+            except Exception as e:
+                logger.error(f"Recommender unavailable, generating instead: {e}")
+                recipes = []
 
-        # Get created recipe
-        created_recipe = recipes_collection.find_one({"_id": result.inserted_id})
-        created_recipe["_id"] = str(created_recipe["_id"])
+            if recipes:
+                return jsonify(
+                    {
+                        "success": True,
+                        "data": {"source": "existing", "recipes": recipes},
+                        "message": "Found existing recipes for these ingredients",
+                    }
+                )
 
-        return (
-            jsonify(
-                {
-                    "success": True,
-                    "data": created_recipe,
-                    "message": "Recipe generated successfully",
-                }
-            ),
-            201,
+        # Generation runs on a background worker; the client polls
+        # /api/jobs/<id> or listens on /api/jobs/<id>/events for the result
+        job_id = enqueue_recipe_generation(
+            g.user.get("id"),
+            data["ingredients"],
+            data.get("preferences"),
+            use_cache=data.get("useExisting", True),
+            deadline=time.time() + budget,
+        )
+
+        response = jsonify(
+            {
+                "success": True,
+                "data": {"jobId": job_id, "status": "queued"},
+                "message": "Recipe generation started",
+            }
         )
+        response.status_code = 202
+        response.headers["Location"] = f"/api/jobs/{job_id}"
+        return response
 
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -5,55 +5,71 @@ Handles user profile and saved recipes
 
 from flask import Blueprint, request, jsonify, g
 from bson import ObjectId
-from functools import wraps
+from datetime import datetime
+
+from config.database import get_collection
+from middleware.auth import authenticate_jwt as login_required
+from middleware.cache_control import cache_private
+from middleware.conditional import conditional
+from services.bookmark_service import (
+    DEFAULT_PAGE_SIZE,
+    MAX_BULK_IDS,
+    add_bookmarks,
+    remove_bookmarks,
+    is_saved,
+    get_saved_recipes_page,
+    migrate_legacy_bookmarks,
+)
+from services.calorie_log_service import (
+    entry_response,
+    log_entry,
+    migrate_legacy_calorie_log,
+)
+from services.version_service import RECIPES, bump_versions, get_versions, user_key
 
 # Initialize blueprint
 user_bp = Blueprint("user", __name__)
 
 
-# Mock database function (replace with actual MongoDB connection)
 def get_db_collection(collection_name):
-    """Get MongoDB collection - placeholder for actual implementation"""
-    from flask import current_app
+    """Get MongoDB collection from the shared connection manager"""
+    return get_collection(collection_name)
 
-    return current_app.mongo.db[collection_name]
 
+def user_version(*scopes):
+    """Build a version function over some of the current user's counters"""
 
-# Authentication decorator (replace with your actual auth implementation)
-def login_required(f):
-    @wraps(f)
-    def decorated_function(*args, **kwargs):
-        # This is just a placeholder - replace with your actual auth logic
-        if not hasattr(g, "user"):
-            return (
-                jsonify({"success": False, "message": "Authentication required"}),
-                401,
-            )
-        return f(*args, **kwargs)
+    def version(*args, **kwargs):
+        keys = [user_key(g.user.get("id"), scope) for scope in scopes]
+        if "saved" in scopes:
+            # Saved recipes embed recipe content, so recipe edits count too
+            keys.append(RECIPES)
+        return tuple(get_versions(keys).values())
 
-    return decorated_function
+    return version
 
 
 @user_bp.route("/profile", methods=["GET"])
 @login_required
+@cache_private
+@conditional(user_version("profile"))
 def get_profile():
     """Get the current user's profile"""
     try:
         # Get users collection
         users_collection = get_db_collection("users")
 
-        # Find user
-        user = users_collection.find_one({"_id": ObjectId(g.user.get("id"))})
+        # Find user (saved recipes live in the bookmarks collection)
+        user = users_collection.find_one(
+            {"_id": ObjectId(g.user.get("id"))}, {"password": 0, "password_hash": 0}
+        )
 
         if not user:
             return jsonify({"success": False, "message": "User not found"}), 404
 
-        # Remove sensitive information
-        user.pop("password", None)
-        user.pop("password_hash", None)
-
-        # Convert ObjectId to string for JSON serialization
-        user["_id"] = str(user["_id"])
+        # Move any legacy savedRecipes array into bookmarks
+        migrate_legacy_bookmarks(user)
+        user.pop("savedRecipes", None)
 
         return jsonify({"success": True, "data": user})
 
@@ -85,6 +101,7 @@ def update_profile():
 
         # Update user
         users_collection.update_one({"_id": ObjectId(g.user.get("id"))}, {"$set": data})
+        bump_versions(user_key(g.user.get("id"), "profile"))
 
         # Get updated user
         updated_user = users_collection.find_one({"_id": ObjectId(g.user.get("id"))})
@@ -93,9 +110,6 @@ def update_profile():
         updated_user.pop("password", None)
         updated_user.pop("password_hash", None)
 
-        # Convert ObjectId to string for JSON serialization
-        updated_user["_id"] = str(updated_user["_id"])
-
         return jsonify(
             {
                 "success": True,
@@ -110,35 +124,96 @@ def update_profile():
 
 @user_bp.route("/saved-recipes", methods=["GET"])
 @login_required
+@cache_private
+@conditional(user_version("saved"))
 def get_saved_recipes():
-    """Get the current user's saved recipes"""
+    """Get one page of the current user's saved recipes, most recently saved first"""
     try:
+        # Get query parameters
+        limit = int(request.args.get("limit", DEFAULT_PAGE_SIZE))
+        cursor = request.args.get("cursor")
+        full = request.args.get("full", "false").lower() == "true"
+
         # Get users collection
         users_collection = get_db_collection("users")
-        recipes_collection = get_db_collection("recipes")
 
-        # Find user
-        user = users_collection.find_one({"_id": ObjectId(g.user.get("id"))})
+        # Move any legacy savedRecipes array into bookmarks
+        user = users_collection.find_one(
+            {"_id": ObjectId(g.user.get("id"))}, {"savedRecipes": 1}
+        )
 
         if not user:
             return jsonify({"success": False, "message": "User not found"}), 404
 
-        # Get saved recipe IDs
-        saved_recipe_ids = user.get("savedRecipes", [])
+        migrate_legacy_bookmarks(user)
 
-        # Convert string IDs to ObjectIds
-        saved_recipe_object_ids = [ObjectId(id) for id in saved_recipe_ids]
+        # Page through bookmarks and hydrate just that page of recipes
+        try:
+            page = get_saved_recipes_page(g.user.get("id"), limit, cursor, full=full)
+        except ValueError:
+            return jsonify({"success": False, "message": "Invalid cursor"}), 400
 
-        # Find recipes
-        recipes = list(
-            recipes_collection.find({"_id": {"$in": saved_recipe_object_ids}})
+        return jsonify(
+            {
+                "success": True,
+                "data": page["recipes"],
+                "count": len(page["recipes"]),
+                "nextCursor": page["nextCursor"],
+            }
         )
 
-        # Convert ObjectId to string for JSON serialization
-        for recipe in recipes:
-            recipe["_id"] = str(recipe["_id"])
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@user_bp.route("/saved-recipes/bulk", methods=["POST"])
+@login_required
+def bulk_update_saved_recipes():
+    """Save and/or remove many recipes in one request"""
+    try:
+        # Get request data
+        data = request.json or {}
+        to_add = data.get("add", [])
+        to_remove = data.get("remove", [])
+
+        if not isinstance(to_add, list) or not isinstance(to_remove, list):
+            return (
+                jsonify(
+                    {"success": False, "message": "'add' and 'remove' must be lists"}
+                ),
+                400,
+            )
+
+        if len(to_add) + len(to_remove) > MAX_BULK_IDS:
+            return (
+                jsonify(
+                    {
+                        "success": False,
+                        "message": f"At most {MAX_BULK_IDS} recipe IDs per request",
+                    }
+                ),
+                400,
+            )
 
-        return jsonify({"success": True, "data": recipes, "count": len(recipes)})
+        added = add_bookmarks(g.user.get("id"), to_add)
+        removed = remove_bookmarks(g.user.get("id"), to_remove)
+
+        return jsonify({"success": True, "data": {**added, "removed": removed}})
+
+    except Exception as e:
+        return jsonify({"success": False, "message": str(e)}), 500
+
+
+@user_bp.route("/saved-recipes/<recipe_id>", methods=["GET"])
+@login_required
+@cache_private
+@conditional(user_version("saved"))
+def check_saved_recipe(recipe_id):
+    """Check whether the current user has saved a recipe"""
+    try:
+        return jsonify(
+            {"success": True, "data": {"saved": is_saved(g.user.get("id"), recipe_id)}}
+        )
 
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
@@ -153,32 +228,14 @@ def save_recipe(recipe_id):
         if not ObjectId.is_valid(recipe_id):
             return jsonify({"success": False, "message": "Invalid recipe ID"}), 400
 
-        # Get collections
-        users_collection = get_db_collection("users")
-        recipes_collection = get_db_collection("recipes")
-
-        # Check if recipe exists
-        recipe = recipes_collection.find_one({"_id": ObjectId(recipe_id)})
+        # Idempotent upsert into the bookmarks collection
+        result = add_bookmarks(g.user.get("id"), [recipe_id])
 
-        if not recipe:
+        if result["notFound"]:
             return jsonify({"success": False, "message": "Recipe not found"}), 404
 
-        # Update user's saved recipes (if not already saved)
-        result = users_collection.update_one(
-            {"_id": ObjectId(g.user.get("id")), "savedRecipes": {"$ne": recipe_id}},
-            {"$push": {"savedRecipes": recipe_id}},
-        )
-
-        if result.modified_count == 0:
-            # Check if it's because recipe was already saved
-            user = users_collection.find_one({"_id": ObjectId(g.user.get("id"))})
-            if recipe_id in user.get("savedRecipes", []):
-                return jsonify({"success": True, "message": "Recipe already saved"})
-            else:
-                return (
-                    jsonify({"success": False, "message": "Failed to save recipe"}),
-                    500,
-                )
+        if result["alreadySaved"]:
+            return jsonify({"success": True, "message": "Recipe already saved"})
 
         return jsonify({"success": True, "message": "Recipe saved successfully"})
 
@@ -191,31 +248,10 @@ def save_recipe(recipe_id):
 def unsave_recipe(recipe_id):
     """Remove a recipe from the current user's saved recipes"""
     try:
-        # Get users collection
-        users_collection = get_db_collection("users")
+        removed = remove_bookmarks(g.user.get("id"), [recipe_id])
 
-        # Update user's saved recipes
-        result = users_collection.update_one(
-            {"_id": ObjectId(g.user.get("id"))}, {"$pull": {"savedRecipes": recipe_id}}
-        )
-
-        if result.modified_count == 0:
-            # Check if it's because recipe wasn't saved
-            user = users_collection.find_one({"_id": ObjectId(g.user.get("id"))})
-            if recipe_id not in user.get("savedRecipes", []):
-                return jsonify(
-                    {"success": True, "message": "Recipe was not in saved list"}
-                )
-            else:
-                return (
-                    jsonify(
-                        {
-                            "success": False,
-                            "message": "Failed to remove recipe from saved list",
-                        }
-                    ),
-                    500,
-                )
+        if not removed:
+            return jsonify({"success": True, "message": "Recipe was not in saved list"})
 
         return jsonify(
             {"success": True, "message": "Recipe removed from saved list successfully"}
@@ -247,21 +283,16 @@ def add_calorie_log():
                     400,
                 )
 
-        # Get users collection
-        users_collection = get_db_collection("users")
+        # Move any legacy calorieLog array into calorie_logs first
+        migrate_legacy_calorie_log(g.user.get("id"))
 
-        # Update user's calorie log
-        result = users_collection.update_one(
-            {"_id": ObjectId(g.user.get("id"))}, {"$push": {"calorieLog": data}}
-        )
+        # Get calorie logs collection
+        calorie_logs_collection = get_db_collection("calorie_logs")
 
-        if result.modified_count == 0:
-            return (
-                jsonify(
-                    {"success": False, "message": "Failed to add calorie log entry"}
-                ),
-                500,
-            )
+        # Insert the entry as its own document, with every posted field
+        entry = log_entry(g.user.get("id"), data)
+        calorie_logs_collection.insert_one(entry)
+        bump_versions(user_key(g.user.get("id"), "calories"))
 
         return jsonify(
             {"success": True, "message": "Calorie log entry added successfully"}
@@ -273,26 +304,48 @@ def add_calorie_log():
 
 @user_bp.route("/calorie-log", methods=["GET"])
 @login_required
+@cache_private
+@conditional(user_version("calories"))
 def get_calorie_log():
-    """Get the current user's calorie log"""
-    try:
-        # Get users collection
-        users_collection = get_db_collection("users")
+    """
+    Get the current user's calorie log, in the order it was added
 
-        # Find user
-        user = users_collection.find_one({"_id": ObjectId(g.user.get("id"))})
-
-        if not user:
-            return jsonify({"success": False, "message": "User not found"}), 404
-
-        # Get calorie log
-        calorie_log = user.get("calorieLog", [])
+    All entries by default; `limit` returns only the latest ones, and
+    `from`/`to` (ISO dates) a date range.
+    """
+    try:
+        # Get query parameters
+        limit = request.args.get("limit", type=int)
+        query = {"userId": g.user.get("id")}
+
+        # Optional date range (ISO dates)
+        date_range = {}
+        if request.args.get("from"):
+            date_range["$gte"] = datetime.fromisoformat(request.args["from"])
+        if request.args.get("to"):
+            date_range["$lte"] = datetime.fromisoformat(request.args["to"])
+        if date_range:
+            query["date"] = date_range
+
+        # Move any legacy calorieLog array into calorie_logs
+        migrate_legacy_calorie_log(g.user.get("id"))
+
+        # Get calorie logs collection
+        calorie_logs_collection = get_db_collection("calorie_logs")
+
+        # _id order is the order entries were added (migrated ones first)
+        cursor = calorie_logs_collection.find(query, {"_id": 0, "userId": 0})
+        if limit:
+            entries = list(cursor.sort("_id", -1).limit(limit))[::-1]
+        else:
+            entries = list(cursor.sort("_id", 1))
+        calorie_log = [entry_response(entry) for entry in entries]
 
         return jsonify(
             {"success": True, "data": calorie_log, "count": len(calorie_log)}
         )
 
+    except ValueError:
+        return jsonify({"success": False, "message": "Invalid date format"}), 400
     except Exception as e:
         return jsonify({"success": False, "message": str(e)}), 500
-
-/* Make a route that serves the website in production mode, render it only runs api server
@@ -2,56 +2,71 @@
 Database seeding script for Recipe Generator App
 
 This script populates the MongoDB database with initial data:
-- Sample users with hashed passwords (loaded from userdata.json)
+- Sample users with hashed passwords (loaded from userData.json)
 - Sample recipes across different categories
 - User relationships (saved recipes, etc.)
+- Optionally, deterministic synthetic users, recipes and calorie logs at
+  production scale for load testing (see seeds/synthetic.py)
+
+All writes are batched (insert_many / bulk_write) and idempotent: re-running
+the script never duplicates documents.
 
 Usage:
     python seed.py             # Runs full seeding operation
     python seed.py --clear     # Clears DB before seeding
     python seed.py --users     # Only seeds users
     python seed.py --recipes   # Only seeds recipes
+    python seed.py --synthetic-users 100000 --synthetic-recipes 1000000
 """
 
 import os
 import sys
-from flask import Flask
 import json
 import random
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
 from datetime import datetime, timedelta
-from pymongo import MongoClient
 from dotenv import load_dotenv
-from werkzeug.security import generate_password_hash
 import argparse
 
 # Load environment variables
 load_dotenv()
 
-app = Flask(__name__)
-app.config["MONGODB_URI"] = os.getenv("MONGODB_URI")
-# MongoDB connection
-client = MongoClient(app.config["MONGODB_URI"])
-db = client.get_database("recipe_db")
-
-# Collections
-users_collection = db.users
-recipes_collection = db.recipes
-
 # Get the directory where the script is located
 script_dir = os.path.dirname(os.path.abspath(__file__))
 
+# Make src/ importable when run as a script
+sys.path.insert(0, os.path.dirname(script_dir))
+
+from config.database import manager, get_collection  # noqa: E402
+from config.indexes import reconcile_indexes  # noqa: E402
+from middleware.auth import hash_password  # noqa: E402
+from pymongo import UpdateOne  # noqa: E402
+from pymongo.errors import BulkWriteError  # noqa: E402
+from seeds import synthetic  # noqa: E402
+from utils.cdn import RECIPES_KEY, purge  # noqa: E402
+
+# Documents per insert_many / bulk_write call
+DEFAULT_BATCH_SIZE = 5000
+
+# Password shared by every synthetic user (hashed once per run)
+SYNTHETIC_PASSWORD = "password123"
+
+# MongoDB duplicate key error code
+DUPLICATE_KEY = 11000
+
 # Load user data from JSON file
 try:
-    with open(os.path.join(script_dir, "userdata.json"), "r") as f:
+    with open(os.path.join(script_dir, "userData.json"), "r") as f:
         USERS = json.load(f)
-    print(f"Loaded {len(USERS)} users from userdata.json")
+    print(f"Loaded {len(USERS)} users from userData.json")
 except FileNotFoundError:
     print(
-        "Warning: userdata.json not found. Make sure it's in the same directory as seed.py"
+        "Warning: userData.json not found. Make sure it's in the same directory as seed.py"
     )
     USERS = []
 except json.JSONDecodeError:
-    print("Error: userdata.json contains invalid JSON")
+    print("Error: userData.json contains invalid JSON")
     sys.exit(1)
 
 # Sample recipe data
@@ -177,98 +192,284 @@ RECIPES = [
 
 def clear_database():
     """Clear all collections in the database"""
-    users_collection.delete_many({})
-    recipes_collection.delete_many({})
+    for collection_name in ("users", "recipes", "bookmarks", "calorie_logs"):
+        get_collection(collection_name).delete_many({})
     print("Database cleared successfully!")
 
 
+def bump_all_versions():
+    """Bump every data version counter so clients refetch seeded data"""
+    versions = get_collection("versions")
+    versions.update_many({}, {"$inc": {"version": 1}})
+    versions.update_one({"_id": "recipes"}, {"$inc": {"version": 1}}, upsert=True)
+
+
+def hash_passwords(passwords, workers=None):
+    """
+    Hash passwords in parallel worker processes
+
+    Identical passwords are only hashed once.
+
+    Args:
+        passwords: Iterable of plain-text passwords
+        workers: Number of worker processes (defaults to CPU count)
+
+    Returns:
+        Dictionary mapping each plain-text password to its hash
+    """
+    unique = sorted(set(passwords))
+    if len(unique) <= 1:
+        return {password: hash_password(password) for password in unique}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        return dict(zip(unique, pool.map(hash_password, unique)))
+
+
+def is_existing_document(error):
+    """Whether a bulk write error is a duplicate _id (already inserted)"""
+    if error.get("code") != DUPLICATE_KEY:
+        return False
+    key_pattern = error.get("keyPattern")
+    if key_pattern is not None:
+        return list(key_pattern) == ["_id"]
+    # Servers before 4.4 only name the index in the message
+    return "index: _id_ " in error.get("errmsg", "")
+
+
+def insert_batch(collection_name, documents):
+    """
+    Insert a batch of documents, skipping ones that already exist
+
+    Uses an unordered insert_many so one duplicate does not stop the batch.
+    Duplicate _id errors are expected on re-runs and ignored; a duplicate on
+    any other unique index (a username or email taken by a different
+    document) is raised, since documents referring to the skipped one would
+    point at nothing.
+
+    Args:
+        collection_name: Collection to insert into
+        documents: Documents with deterministic _id values
+
+    Returns:
+        Number of documents actually inserted
+    """
+    if not documents:
+        return 0
+
+    try:
+        result = get_collection(collection_name).insert_many(documents, ordered=False)
+        return len(result.inserted_ids)
+    except BulkWriteError as e:
+        errors = e.details.get("writeErrors", [])
+        if not all(is_existing_document(error) for error in errors):
+            raise
+        return e.details.get("nInserted", 0)
+
+
 def seed_users():
-    """Seed users collection with sample data from userdata.json"""
-    print("Seeding users...")
+    """Seed users collection with sample data from userData.json"""
+    users_collection = get_collection("users")
 
-    # Skip if users already exist
-    if users_collection.count_documents({}) > 0:
-        print("Users collection already populated. Use --clear to reset.")
-        return
+    print("Seeding users...")
 
     if not USERS:
-        print("No user data found. Make sure userdata.json is properly formatted.")
+        print("No user data found. Make sure userData.json is properly formatted.")
         return
 
-    # Create users with hashed passwords
+    # Hash all passwords up front, in parallel
+    hashes = hash_passwords(user["password"] for user in USERS)
+
+    # Upsert by email so re-running never creates duplicates
+    now = datetime.now()
+    operations = []
     for user_data in USERS:
         # Make a copy of the user data to avoid modifying the original
         user = user_data.copy()
+        user["password_hash"] = hashes[user.pop("password")]
+        user.setdefault("created_at", now)
+        user.setdefault("updated_at", now)
 
-        # Hash password
-        user["password_hash"] = generate_password_hash(user.pop("password"))
-
-        # Add timestamps if not present
-        if "created_at" not in user:
-            user["created_at"] = datetime.now()
-        if "updated_at" not in user:
-            user["updated_at"] = datetime.now()
+        operations.append(
+            UpdateOne({"email": user["email"]}, {"$setOnInsert": user}, upsert=True)
+        )
 
-        # Insert user
-        users_collection.insert_one(user)
+    result = users_collection.bulk_write(operations, ordered=False)
 
-    print(f"Added {len(USERS)} users to the database!")
+    print(f"Added {result.upserted_count} users to the database!")
 
 
 def seed_recipes():
     """Seed recipes collection with sample data"""
-    print("Seeding recipes...")
+    users_collection = get_collection("users")
+    recipes_collection = get_collection("recipes")
 
-    # Skip if recipes already exist
-    if recipes_collection.count_documents({}) > 0:
-        print("Recipes collection already populated. Use --clear to reset.")
-        return
+    print("Seeding recipes...")
 
     # Get user IDs to assign as creators
-    users = list(users_collection.find({"role": "user"}))
+    users = list(users_collection.find({"role": "user"}, {"_id": 1}))
 
     if not users:
         print("No users found. Seed users first!")
         return
 
-    # Create recipes
+    # Upsert recipes by name so re-running never creates duplicates
+    operations = []
     for recipe_data in RECIPES:
-        # Assign to random user
-        user = random.choice(users)
-
-        # Add additional fields
-        recipe_data["createdBy"] = str(user["_id"])
-        recipe_data["createdAt"] = datetime.now() - timedelta(
-            days=random.randint(1, 30)
+        recipe = recipe_data.copy()
+        recipe["createdBy"] = str(random.choice(users)["_id"])
+        recipe["createdAt"] = datetime.now() - timedelta(days=random.randint(1, 30))
+        operations.append(
+            UpdateOne({"name": recipe["name"]}, {"$setOnInsert": recipe}, upsert=True)
         )
 
-        # Insert recipe
-        recipe_id = recipes_collection.insert_one(recipe_data).inserted_id
+    result = recipes_collection.bulk_write(operations, ordered=False)
+
+    # Look up IDs for all seeded recipes (new and pre-existing) in one query
+    recipe_ids = [
+        str(recipe["_id"])
+        for recipe in recipes_collection.find(
+            {"name": {"$in": [recipe["name"] for recipe in RECIPES]}}, {"_id": 1}
+        )
+    ]
 
-        # Randomly save recipe for some users
+    # Randomly save recipes for some users, in one bulk write
+    saved = {}
+    for recipe_id in recipe_ids:
         if random.random() > 0.5:  # 50% chance
             random_users = random.sample(users, random.randint(1, min(3, len(users))))
             for random_user in random_users:
-                users_collection.update_one(
-                    {"_id": random_user["_id"]},
-                    {"$push": {"savedRecipes": str(recipe_id)}},
+                saved.setdefault(random_user["_id"], []).append(recipe_id)
+
+    if saved:
+        now = datetime.now()
+        get_collection("bookmarks").bulk_write(
+            [
+                UpdateOne(
+                    {"userId": str(user_id), "recipeId": recipe_id},
+                    {"$setOnInsert": {"createdAt": now}},
+                    upsert=True,
                 )
+                for user_id, user_recipe_ids in saved.items()
+                for recipe_id in user_recipe_ids
+            ],
+            ordered=False,
+        )
+
+    print(f"Added {result.upserted_count} recipes to the database!")
+
+
+def _seed_synthetic_batch(kind, batch_index, options):
+    """
+    Generate and insert one synthetic batch (runs in a worker process)
+
+    Args:
+        kind: "users", "recipes" or "calorie_logs"
+        batch_index: Batch to generate
+        options: Dictionary of generator options
+
+    Returns:
+        Tuple of (kind, generated count, inserted count)
+    """
+    seed = options["seed"]
+    batch_size = options["batch_size"]
+
+    if kind == "users":
+        documents = synthetic.generate_users(
+            options["users"], seed, batch_index, batch_size, options["password_hash"]
+        )
+    elif kind == "recipes":
+        documents = synthetic.generate_recipes(
+            options["recipes"], options["users"], seed, batch_index, batch_size
+        )
+    else:
+        # Calorie logs are batched by user; shrink batches to keep them bounded
+        documents = synthetic.generate_calorie_logs(
+            options["users"],
+            options["calorie_days"],
+            seed,
+            batch_index,
+            options["log_batch_users"],
+        )
+
+    return kind, len(documents), insert_batch(kind, documents)
+
+
+def seed_synthetic(
+    users, recipes, calorie_days=30, seed=42, batch_size=DEFAULT_BATCH_SIZE, workers=None
+):
+    """
+    Seed deterministic synthetic data at scale
+
+    Batches are generated and inserted in parallel worker processes; each
+    worker gets its own MongoClient from the connection manager.
+
+    Args:
+        users: Number of synthetic users
+        recipes: Number of synthetic recipes
+        calorie_days: Days of calorie logs per synthetic user (0 to skip)
+        seed: Generator seed; the same seed always produces the same data
+        batch_size: Documents per insert_many
+        workers: Number of worker processes (defaults to CPU count)
+    """
+    if users <= 0:
+        print("Synthetic data needs at least one synthetic user.")
+        return
 
-    print(f"Added {len(RECIPES)} recipes to the database!")
+    print(
+        f"Seeding synthetic data: {users} users, {recipes} recipes, "
+        f"{calorie_days} days of calorie logs (seed={seed})..."
+    )
+    start = time.perf_counter()
+
+    options = {
+        "users": users,
+        "recipes": recipes,
+        "calorie_days": calorie_days,
+        "seed": seed,
+        "batch_size": batch_size,
+        "log_batch_users": max(1, batch_size // max(1, calorie_days)),
+        # Same scheme as the app's login, so synthetic users can sign in
+        "password_hash": hash_password(SYNTHETIC_PASSWORD),
+    }
+
+    tasks = [("users", i) for i in range(synthetic.batch_count(users, batch_size))]
+    tasks += [("recipes", i) for i in range(synthetic.batch_count(recipes, batch_size))]
+    if calorie_days > 0:
+        tasks += [
+            ("calorie_logs", i)
+            for i in range(synthetic.batch_count(users, options["log_batch_users"]))
+        ]
+
+    generated = {"users": 0, "recipes": 0, "calorie_logs": 0}
+    inserted = {"users": 0, "recipes": 0, "calorie_logs": 0}
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = [
+            pool.submit(_seed_synthetic_batch, kind, batch_index, options)
+            for kind, batch_index in tasks
+        ]
+        for done, future in enumerate(as_completed(futures), 1):
+            kind, generated_count, inserted_count = future.result()
+            generated[kind] += generated_count
+            inserted[kind] += inserted_count
+            if done % 20 == 0 or done == len(futures):
+                print(f"  {done}/{len(futures)} batches done")
+
+    elapsed = time.perf_counter() - start
+    for kind in generated:
+        print(
+            f"  {kind}: {inserted[kind]} inserted, "
+            f"{generated[kind] - inserted[kind]} already present"
+        )
+    print(f"Synthetic seeding finished in {elapsed:.1f}s")
 
 
 def create_indexes():
     """Create database indexes for optimized queries"""
     print("Creating database indexes...")
 
-    # User indexes
-    users_collection.create_index("username", unique=True)
-    users_collection.create_index("email", unique=True)
-
-    # Recipe indexes
-    recipes_collection.create_index("name")
-    recipes_collection.create_index("createdBy")
-    recipes_collection.create_index("ingredients")
+    # Indexes are declared once in config.indexes
+    reconcile_indexes()
 
     print("Database indexes created successfully!")
 
@@ -281,21 +482,39 @@ def main():
     )
     parser.add_argument("--users", action="store_true", help="Only seed users")
     parser.add_argument("--recipes", action="store_true", help="Only seed recipes")
+    parser.add_argument(
+        "--synthetic-users", type=int, default=0, help="Number of synthetic users"
+    )
+    parser.add_argument(
+        "--synthetic-recipes", type=int, default=0, help="Number of synthetic recipes"
+    )
+    parser.add_argument(
+        "--calorie-days",
+        type=int,
+        default=30,
+        help="Days of calorie logs per synthetic user",
+    )
+    parser.add_argument("--seed", type=int, default=42, help="Synthetic data seed")
+    parser.add_argument(
+        "--batch-size", type=int, default=DEFAULT_BATCH_SIZE, help="Documents per batch"
+    )
+    parser.add_argument("--workers", type=int, default=None, help="Worker processes")
 
     args = parser.parse_args()
 
     # Connect to MongoDB
-    try:
-        client.admin.command("ping")
-        print(f"Connected to MongoDB: {app.config['MONGODB_URI']}")
-    except Exception as e:
-        print(f"Error connecting to MongoDB: {e}")
+    if not manager.warm_up():
+        print("Error connecting to MongoDB")
         sys.exit(1)
+    print(f"Connected to MongoDB: {manager.get_database().name}")
 
     # Clear database if requested
     if args.clear:
         clear_database()
 
+    # Build indexes first so unique keys guard the idempotent upserts
+    create_indexes()
+
     # Seed based on arguments
     if args.users:
         seed_users()
@@ -306,8 +525,19 @@ def main():
         seed_users()
         seed_recipes()
 
-    # Create indexes
-    create_indexes()
+    if args.synthetic_users or args.synthetic_recipes:
+        seed_synthetic(
+            args.synthetic_users,
+            args.synthetic_recipes,
+            calorie_days=args.calorie_days,
+            seed=args.seed,
+            batch_size=args.batch_size,
+            workers=args.workers,
+        )
+
+    # Seeded writes bypass the services, so invalidate ETags in one go
+    bump_all_versions()
+    purge(RECIPES_KEY)
 
     print("Seeding completed successfully!")
 
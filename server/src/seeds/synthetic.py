@@ -0,0 +1,361 @@
+"""
+Deterministic synthetic data generator for load testing
+
+Generates users, recipes and calorie log entries at production scale. Every
+document is generated from its own RNG seeded by (seed, kind, document
+index), so batches can be produced in parallel worker processes and the same
+seed always yields the same documents (including their _id values), whatever
+the batch size. That makes re-running the seeder idempotent. Usernames and
+emails include the seed too, so runs with different seeds add users side by
+side instead of colliding on the unique indexes.
+
+Ingredient popularity follows a Zipf-like distribution so a few staples
+(salt, olive oil, garlic, ...) appear in most recipes while the long tail is
+rare, like in real recipe collections.
+"""
+
+import hashlib
+import random
+from itertools import accumulate
+from datetime import datetime, timedelta
+from typing import Any, Dict, List, Tuple, Union
+
+from bson import ObjectId
+
+# Ingredient vocabulary: (name, unit, typical amount, calories per amount)
+# roughly ordered by how common the ingredient is in home cooking
+INGREDIENTS: List[Tuple[str, str, float, int]] = [
+    ("salt", "teaspoon", 1, 0),
+    ("olive oil", "tablespoons", 2, 240),
+    ("garlic", "cloves", 2, 10),
+    ("onion", "", 1, 45),
+    ("black pepper", "teaspoon", 0.5, 3),
+    ("butter", "tablespoons", 2, 200),
+    ("eggs", "large", 2, 140),
+    ("all-purpose flour", "cups", 1, 455),
+    ("sugar", "cup", 0.5, 387),
+    ("milk", "cup", 1, 103),
+    ("tomatoes", "", 2, 44),
+    ("chicken breast", "lb", 1, 545),
+    ("lemon", "", 1, 17),
+    ("parmesan cheese", "cup", 0.5, 216),
+    ("rice", "cups", 1, 685),
+    ("carrots", "", 2, 50),
+    ("bell pepper", "", 1, 30),
+    ("soy sauce", "tablespoons", 2, 18),
+    ("ginger", "tablespoon", 1, 5),
+    ("potatoes", "", 3, 330),
+    ("heavy cream", "cup", 0.5, 410),
+    ("ground beef", "lb", 1, 1150),
+    ("spinach", "cups", 2, 14),
+    ("honey", "tablespoons", 2, 128),
+    ("cheddar cheese", "cup", 1, 455),
+    ("brown sugar", "cup", 0.5, 415),
+    ("baking powder", "teaspoons", 2, 5),
+    ("vanilla extract", "teaspoon", 1, 12),
+    ("celery", "stalks", 2, 12),
+    ("mushrooms", "cups", 2, 30),
+    ("pasta", "oz", 8, 840),
+    ("cilantro", "tablespoons", 2, 1),
+    ("lime", "", 1, 20),
+    ("broccoli", "cups", 2, 62),
+    ("zucchini", "", 1, 33),
+    ("bacon", "slices", 4, 172),
+    ("greek yogurt", "cup", 1, 130),
+    ("cumin", "teaspoon", 1, 8),
+    ("paprika", "teaspoon", 1, 6),
+    ("oregano", "teaspoon", 1, 3),
+    ("basil", "tablespoons", 2, 1),
+    ("red onion", "", 1, 44),
+    ("black beans", "can", 1, 340),
+    ("coconut milk", "can", 1, 445),
+    ("shrimp", "lb", 1, 480),
+    ("salmon fillet", "lb", 1, 940),
+    ("avocado", "", 2, 640),
+    ("feta cheese", "oz", 4, 300),
+    ("chickpeas", "can", 1, 380),
+    ("tofu", "oz", 14, 350),
+    ("quinoa", "cup", 1, 626),
+    ("oats", "cup", 1, 307),
+    ("bananas", "", 2, 210),
+    ("blueberries", "cup", 1, 85),
+    ("strawberries", "cups", 2, 98),
+    ("maple syrup", "tablespoons", 2, 104),
+    ("sesame oil", "teaspoons", 2, 80),
+    ("chili flakes", "teaspoon", 0.5, 3),
+    ("pork chops", "", 2, 520),
+    ("sweet potatoes", "", 2, 224),
+    ("kale", "cups", 2, 66),
+    ("cabbage", "cups", 3, 66),
+    ("peanut butter", "tablespoons", 2, 190),
+    ("almonds", "cup", 0.25, 207),
+    ("walnuts", "cup", 0.25, 196),
+    ("cocoa powder", "tablespoons", 3, 36),
+    ("chocolate chips", "cup", 1, 805),
+    ("mozzarella", "cup", 1, 336),
+    ("ricotta", "cup", 1, 428),
+    ("eggplant", "", 1, 137),
+    ("green beans", "cups", 2, 62),
+    ("corn", "cups", 1, 132),
+    ("peas", "cup", 1, 117),
+    ("lentils", "cup", 1, 678),
+    ("thyme", "teaspoon", 1, 1),
+    ("rosemary", "teaspoon", 1, 2),
+    ("dijon mustard", "tablespoon", 1, 15),
+    ("balsamic vinegar", "tablespoons", 2, 28),
+    ("red wine vinegar", "tablespoon", 1, 3),
+    ("chicken broth", "cups", 2, 30),
+    ("vegetable broth", "cups", 2, 30),
+    ("tortillas", "", 4, 560),
+    ("bread crumbs", "cup", 0.5, 214),
+    ("cream cheese", "oz", 4, 396),
+    ("sour cream", "cup", 0.5, 222),
+    ("jalapeno", "", 1, 4),
+    ("scallions", "", 3, 15),
+    ("cucumber", "", 1, 45),
+    ("apples", "", 2, 190),
+    ("cinnamon", "teaspoon", 1, 6),
+    ("nutmeg", "teaspoon", 0.25, 3),
+    ("turkey", "lb", 1, 680),
+    ("lamb", "lb", 1, 1200),
+    ("cod", "lb", 1, 372),
+    ("tuna", "can", 1, 191),
+    ("pine nuts", "tablespoons", 2, 113),
+    ("saffron", "pinch", 1, 0),
+    ("fish sauce", "tablespoon", 1, 6),
+    ("miso paste", "tablespoon", 1, 34),
+    ("tahini", "tablespoons", 2, 178),
+]
+
+ADJECTIVES = [
+    "Easy", "Classic", "Spicy", "Creamy", "Quick", "Rustic", "Lemony", "Garlicky",
+    "Smoky", "Herbed", "Crispy", "Hearty", "Roasted", "Honey", "Zesty", "One-Pan",
+]
+DISHES = [
+    ("Stir Fry", "Main Dish"), ("Pasta", "Main Dish"), ("Soup", "Soup"),
+    ("Salad", "Salad"), ("Tacos", "Main Dish"), ("Curry", "Main Dish"),
+    ("Bowl", "Main Dish"), ("Casserole", "Main Dish"), ("Skillet", "Main Dish"),
+    ("Muffins", "Breakfast"), ("Pancakes", "Breakfast"), ("Smoothie", "Beverage"),
+    ("Cookies", "Dessert"), ("Cake", "Dessert"), ("Dip", "Appetizer"),
+    ("Wraps", "Main Dish"), ("Frittata", "Breakfast"), ("Stew", "Soup"),
+]
+STEPS = [
+    "Preheat the oven to {temp}°F.",
+    "Heat {fat} in a large skillet over medium heat.",
+    "Add {a} and cook for {minutes} minutes, stirring occasionally.",
+    "Stir in {b} and season with salt and pepper.",
+    "Whisk {a} and {b} together in a bowl.",
+    "Simmer for {minutes} minutes until thickened.",
+    "Transfer to a baking dish and bake for {minutes} minutes.",
+    "Toss everything together and adjust seasoning to taste.",
+    "Garnish with {b} and serve warm.",
+]
+
+# Zipf exponent for ingredient popularity
+ZIPF_EXPONENT = 1.1
+INGREDIENT_CUM_WEIGHTS = list(
+    accumulate(1 / (rank + 1) ** ZIPF_EXPONENT for rank in range(len(INGREDIENTS)))
+)
+INGREDIENT_INDEXES = range(len(INGREDIENTS))
+
+# Fixed reference time so the same seed always produces the same dates
+EPOCH = datetime(2025, 1, 1)
+
+
+def deterministic_object_id(
+    kind: str, seed: int, index: Union[int, str]
+) -> ObjectId:
+    """
+    Build a stable ObjectId for a generated document
+
+    Args:
+        kind: Document kind ("user", "recipe", ...)
+        seed: Generator seed
+        index: Position of the document in the generated sequence, or a
+            composite key such as "<user>-<day>"
+
+    Returns:
+        ObjectId that is identical across runs with the same arguments
+    """
+    digest = hashlib.blake2b(f"{kind}:{seed}:{index}".encode(), digest_size=12)
+    return ObjectId(digest.digest())
+
+
+def document_rng(kind: str, seed: int, index: int) -> random.Random:
+    """Get the RNG for one document, independent of batching"""
+    return random.Random(f"{kind}:{seed}:{index}")
+
+
+def synthetic_username(seed: int, index: int) -> str:
+    """Username of a synthetic user (its email is this @example.com)"""
+    return f"loadtest_{seed}_user_{index}"
+
+
+def _format_quantity(amount: float) -> str:
+    if amount == int(amount):
+        return str(int(amount))
+    return {0.25: "1/4", 0.5: "1/2", 0.75: "3/4"}.get(amount, f"{amount:g}")
+
+
+def _pick_ingredients(rng: random.Random) -> List[Tuple[str, str, float, int]]:
+    """Pick 4-12 distinct ingredients following the popularity distribution"""
+    count = min(12, max(4, int(rng.gauss(8, 2))))
+    picked = {}
+    while len(picked) < count:
+        for index in rng.choices(
+            INGREDIENT_INDEXES, cum_weights=INGREDIENT_CUM_WEIGHTS, k=count
+        ):
+            if len(picked) < count:
+                picked[index] = INGREDIENTS[index]
+    return list(picked.values())
+
+
+def generate_users(
+    count: int, seed: int, batch_index: int, batch_size: int, password_hash: str
+) -> List[Dict[str, Any]]:
+    """
+    Generate one batch of user documents
+
+    Args:
+        count: Total number of users being generated
+        seed: Generator seed
+        batch_index: Which batch to generate
+        batch_size: Documents per batch
+        password_hash: Pre-computed hash shared by all synthetic users
+
+    Returns:
+        List of user documents
+    """
+    start = batch_index * batch_size
+    users = []
+    for index in range(start, min(start + batch_size, count)):
+        rng = document_rng("user", seed, index)
+        created_at = EPOCH - timedelta(days=rng.randint(0, 720))
+        users.append(
+            {
+                "_id": deterministic_object_id("user", seed, index),
+                "username": synthetic_username(seed, index),
+                "email": f"{synthetic_username(seed, index)}@example.com",
+                "password_hash": password_hash,
+                "role": "user",
+                "synthetic": True,
+                "created_at": created_at,
+                "updated_at": created_at,
+            }
+        )
+    return users
+
+
+def generate_recipes(
+    count: int, user_count: int, seed: int, batch_index: int, batch_size: int
+) -> List[Dict[str, Any]]:
+    """
+    Generate one batch of recipe documents
+
+    Creators are drawn from the synthetic users with a skew, so a few power
+    users own many recipes.
+
+    Args:
+        count: Total number of recipes being generated
+        user_count: Number of synthetic users to attribute recipes to
+        seed: Generator seed
+        batch_index: Which batch to generate
+        batch_size: Documents per batch
+
+    Returns:
+        List of recipe documents
+    """
+    start = batch_index * batch_size
+    recipes = []
+    for index in range(start, min(start + batch_size, count)):
+        rng = document_rng("recipe", seed, index)
+        ingredients = _pick_ingredients(rng)
+        main = max(ingredients, key=lambda ingredient: ingredient[3])[0]
+        dish, category = rng.choice(DISHES)
+        name = f"{rng.choice(ADJECTIVES)} {main.title()} {dish}"
+
+        scale = rng.choice([0.5, 1, 1, 1, 1.5, 2])
+        lines = []
+        calories = 0
+        for ingredient, unit, amount, kcal in ingredients:
+            quantity = _format_quantity(amount * scale)
+            lines.append(" ".join(part for part in (quantity, unit, ingredient) if part))
+            calories += kcal * scale
+
+        steps = []
+        for number, template in enumerate(rng.sample(STEPS, rng.randint(3, 6)), 1):
+            step = template.format(
+                temp=rng.choice([350, 375, 400, 425]),
+                fat=rng.choice(["olive oil", "butter", "sesame oil"]),
+                a=rng.choice(ingredients)[0],
+                b=rng.choice(ingredients)[0],
+                minutes=rng.randint(3, 45),
+            )
+            steps.append(f"{number}. {step}")
+
+        # Skewed creator choice: low user indexes create the most recipes
+        creator = int(user_count * rng.random() ** 2)
+        recipes.append(
+            {
+                "_id": deterministic_object_id("recipe", seed, index),
+                "name": name,
+                "ingredients": lines,
+                "instructions": "\n".join(steps),
+                "estimatedCalories": round(calories),
+                "category": category,
+                "createdBy": str(deterministic_object_id("user", seed, creator)),
+                "createdAt": EPOCH - timedelta(minutes=rng.randint(0, 525600)),
+                "synthetic": True,
+            }
+        )
+    return recipes
+
+
+def generate_calorie_logs(
+    user_count: int, days: int, seed: int, batch_index: int, batch_size: int
+) -> List[Dict[str, Any]]:
+    """
+    Generate calorie log entries for one batch of users
+
+    Each user logs on roughly 70% of the days in the window, with intake and
+    exercise drawn around a per-user baseline.
+
+    Args:
+        user_count: Total number of synthetic users
+        days: Length of the log window in days
+        seed: Generator seed
+        batch_index: Which batch of users to generate logs for
+        batch_size: Users per batch
+
+    Returns:
+        List of calorie log documents
+    """
+    start = batch_index * batch_size
+    entries = []
+    for user_index in range(start, min(start + batch_size, user_count)):
+        # One RNG per user, so a user's log does not depend on batching
+        rng = document_rng("calorie_log", seed, user_index)
+        user_id = str(deterministic_object_id("user", seed, user_index))
+        baseline = rng.gauss(2100, 350)
+        for day in range(days):
+            if rng.random() > 0.7:
+                continue
+            entries.append(
+                {
+                    # Keyed on (user, day), so runs with other --calorie-days
+                    # values produce the same entry for the same day
+                    "_id": deterministic_object_id(
+                        "calorie_log", seed, f"{user_index}-{day}"
+                    ),
+                    "userId": user_id,
+                    "date": EPOCH - timedelta(days=day),
+                    "caloriesConsumed": max(800, round(rng.gauss(baseline, 300))),
+                    "caloriesBurned": max(0, round(rng.expovariate(1 / 350))),
+                }
+            )
+    return entries
+
+
+def batch_count(count: int, batch_size: int) -> int:
+    """Number of batches needed for count documents"""
+    return (count + batch_size - 1) // batch_size
@@ -0,0 +1,95 @@
+"""
+Persistent event loop for running async code from sync contexts
+
+Flask views and job worker threads are synchronous, while the AI services
+are coroutines. Rather than spinning up a new event loop per call with
+asyncio.run(), coroutines are submitted to one long-lived loop running in a
+daemon thread, so loop-bound resources (HTTP connection pools, clients) are
+created once and reused.
+"""
+
+import asyncio
+import os
+import threading
+from concurrent.futures import Future, TimeoutError
+from typing import Any, Awaitable, Optional
+
+_loop: Optional[asyncio.AbstractEventLoop] = None
+_thread: Optional[threading.Thread] = None
+_pid: Optional[int] = None
+_lock = threading.Lock()
+
+
+def get_loop() -> asyncio.AbstractEventLoop:
+    """Get the shared loop, starting it on first use (and after a fork)"""
+    global _loop, _thread, _pid
+
+    if _loop is not None and _pid == os.getpid() and _loop.is_running():
+        return _loop
+
+    with _lock:
+        if _loop is None or _pid != os.getpid() or not _loop.is_running():
+            loop = asyncio.new_event_loop()
+            started = threading.Event()
+
+            def run_loop():
+                asyncio.set_event_loop(loop)
+                loop.call_soon(started.set)
+                loop.run_forever()
+
+            _thread = threading.Thread(
+                target=run_loop, name="async-runner", daemon=True
+            )
+            _thread.start()
+            started.wait()
+            _loop, _pid = loop, os.getpid()
+
+    return _loop
+
+
+def submit(coro: Awaitable[Any]) -> Future:
+    """
+    Schedule a coroutine on the shared loop
+
+    Returns:
+        concurrent.futures.Future for the coroutine's result
+    """
+    return asyncio.run_coroutine_threadsafe(coro, get_loop())
+
+
+def run(coro: Awaitable[Any], timeout: Optional[float] = None) -> Any:
+    """
+    Run a coroutine on the shared loop and wait for its result
+
+    Must not be called from the loop's own thread.
+
+    Args:
+        coro: Coroutine to run
+        timeout: Seconds to wait before giving up (the coroutine is cancelled)
+
+    Returns:
+        The coroutine's result
+
+    Raises:
+        TimeoutError: If the timeout expires
+    """
+    future = submit(coro)
+    try:
+        return future.result(timeout)
+    except TimeoutError:
+        future.cancel()
+        raise
+
+
+def shutdown(timeout: float = 5):
+    """Stop the shared loop after pending callbacks run"""
+    global _loop, _thread
+
+    with _lock:
+        loop, thread = _loop, _thread
+        _loop = _thread = None
+
+    if loop is not None and loop.is_running():
+        loop.call_soon_threadsafe(loop.stop)
+        if thread is not None:
+            thread.join(timeout)
@@ -7,32 +7,28 @@ from typing import Optional, Dict, Any
 
 from fastapi import Depends, HTTPException, status
 from fastapi.security import OAuth2PasswordBearer
-from jose import JWTError, jwt
-from passlib.context import CryptContext
 
+from config import registry
 from config.settings import JWT_SECRET, JWT_ALGORITHM, JWT_EXPIRATION
 from config.database import get_collection
-from models.user import UserInDB
 
 # OAuth2 password bearer scheme for JWT
 oauth2_scheme = OAuth2PasswordBearer(tokenUrl="/api/auth/login")
 
-# Password context for hashing and verifying
-pwd_context = CryptContext(schemes=["bcrypt"], deprecated="auto")
-
 
 def verify_password(plain_password: str, hashed_password: str) -> bool:
     """
     Verify a plain password against a hashed password
     """
-    return pwd_context.verify(plain_password, hashed_password)
+    # Password context (passlib + bcrypt) is built on first use
+    return registry.get("password_context").verify(plain_password, hashed_password)
 
 
 def get_password_hash(password: str) -> str:
     """
     Hash a password for storage
     """
-    return pwd_context.hash(password)
+    return registry.get("password_context").hash(password)
 
 
 def create_access_token(
@@ -59,6 +55,8 @@ def create_access_token(
     to_encode.update({"exp": expire})
 
     # Create the JWT token
+    from jose import jwt
+
     encoded_jwt = jwt.encode(to_encode, JWT_SECRET, algorithm=JWT_ALGORITHM)
     return encoded_jwt
 
@@ -82,6 +80,8 @@ async def get_current_user(token: str = Depends(oauth2_scheme)) -> Dict[str, Any
         headers={"WWW-Authenticate": "Bearer"},
     )
 
+    from jose import JWTError, jwt
+
     try:
         # Decode the JWT token
         payload = jwt.decode(token, JWT_SECRET, algorithms=[JWT_ALGORITHM])
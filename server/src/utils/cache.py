@@ -0,0 +1,86 @@
+"""
+In-process caching utilities
+"""
+
+import threading
+import time
+from collections import OrderedDict
+from typing import Any, Dict, Hashable, Iterable, Optional
+
+
+class TTLCache:
+    """
+    Thread-safe LRU cache whose entries expire after a fixed time
+
+    Args:
+        maxsize: Maximum number of entries kept
+        ttl: Seconds an entry stays valid
+    """
+
+    def __init__(self, maxsize: int = 1024, ttl: float = 300):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data = OrderedDict()
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key: Hashable, default: Any = None) -> Any:
+        """Get a value, or default if missing or expired"""
+        with self._lock:
+            entry = self._data.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._data[key]
+                self.misses += 1
+                return default
+            self._data.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def get_many(self, keys: Iterable[Hashable]) -> Dict[Hashable, Any]:
+        """Get every cached value among keys, skipping misses"""
+        found = {}
+        for key in keys:
+            value = self.get(key)
+            if value is not None:
+                found[key] = value
+        return found
+
+    def set(self, key: Hashable, value: Any, ttl: Optional[float] = None):
+        """Store a value, evicting the least recently used entry if full"""
+        expires = time.monotonic() + (self.ttl if ttl is None else ttl)
+        with self._lock:
+            self._data[key] = (expires, value)
+            self._data.move_to_end(key)
+            while len(self._data) > self.maxsize:
+                self._data.popitem(last=False)
+
+    def delete(self, key: Hashable):
+        """Remove a value if present"""
+        with self._lock:
+            self._data.pop(key, None)
+
+    def clear(self):
+        """Remove every value"""
+        with self._lock:
+            self._data.clear()
+
+    def __len__(self):
+        return len(self._data)
+
+    def stats(self) -> Dict[str, Any]:
+        """Hit/miss counters for health checks"""
+        total = self.hits + self.misses
+        return {
+            "size": len(self._data),
+            "maxsize": self.maxsize,
+            "hits": self.hits,
+            "misses": self.misses,
+            "hitRate": self.hits / total if total else 0.0,
+        }
+
+
+# Full recipe documents by string ID, shared by the single-recipe endpoint
+# and saved-recipe hydration
+recipe_cache = TTLCache(maxsize=5000, ttl=300)
@@ -0,0 +1,82 @@
+"""
+Surrogate keys and purge hook for a CDN or caching proxy
+
+Public responses are tagged with Surrogate-Key headers: "recipes" on every
+recipe listing and "recipe-<id>" for each recipe a response contains. When a
+recipe changes, purge() asks the cache in front of the app to drop every
+response tagged with those keys. This works with Fastly, and with Varnish
+(xkey) or nginx set up to purge by tag.
+
+Purge requests are sent from a background worker so writes never wait on
+the CDN. With CDN_PURGE_URL unset, purging is a no-op.
+"""
+
+import logging
+import urllib.request
+from concurrent.futures import ThreadPoolExecutor
+from typing import Iterable, List
+
+from flask import g
+
+from config.settings import (
+    CDN_PURGE_METHOD,
+    CDN_PURGE_TOKEN,
+    CDN_PURGE_TOKEN_HEADER,
+    CDN_PURGE_URL,
+)
+
+logger = logging.getLogger(__name__)
+
+# Key on every recipe listing and search result
+RECIPES_KEY = "recipes"
+
+PURGE_TIMEOUT_SECONDS = 5
+
+_executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="cdn-purge")
+
+
+def recipe_key(recipe_id) -> str:
+    """Surrogate key for one recipe"""
+    return f"recipe-{recipe_id}"
+
+
+def add_surrogate_keys(keys: Iterable[str]):
+    """Tag the current response with surrogate keys (see cache_public)"""
+    if "surrogate_keys" not in g:
+        g.surrogate_keys = []
+    g.surrogate_keys.extend(keys)
+
+
+def _send_purge(keys: List[str]):
+    request = urllib.request.Request(
+        CDN_PURGE_URL,
+        method=CDN_PURGE_METHOD,
+        headers={"Surrogate-Key": " ".join(keys)},
+    )
+    if CDN_PURGE_TOKEN:
+        # e.g. "Fastly-Key: <token>" or "Authorization: Bearer <token>"
+        request.add_header(CDN_PURGE_TOKEN_HEADER, CDN_PURGE_TOKEN)
+
+    try:
+        with urllib.request.urlopen(request, timeout=PURGE_TIMEOUT_SECONDS) as response:
+            logger.debug(f"Purged {keys}: HTTP {response.status}")
+    except Exception as e:
+        # Cached copies still expire after s-maxage
+        logger.warning(f"CDN purge failed for {keys}: {e}")
+
+
+def purge(*keys: str):
+    """
+    Purge cached responses tagged with any of the given keys
+
+    Args:
+        keys: Surrogate keys, e.g. recipe_key(id) and RECIPES_KEY
+    """
+    if not CDN_PURGE_URL or not keys:
+        return
+    _executor.submit(_send_purge, list(keys))
+
+
+def purge_recipe(recipe_id):
+    """Purge one recipe and every listing that may contain it"""
+    purge(recipe_key(recipe_id), RECIPES_KEY)
@@ -0,0 +1,212 @@
+"""
+Circuit breakers for upstream services
+
+A breaker watches the outcome and latency of the last calls to one
+upstream. When too many of them fail or are slow, it opens and calls fail
+immediately with CircuitOpenError instead of waiting on a service that is
+down, so request threads and job workers stay free and callers can fall
+back. After a cool-down it lets a few probe calls through (half-open): if
+they succeed it closes again, otherwise it stays open for another cool-down.
+
+Callers bracket each upstream call with before_call() and after_call(), and
+decide themselves what counts as a failure (a rejected request is the
+caller's fault, not an outage):
+
+    probe = breaker.before_call()
+    started = time.monotonic()
+    ...
+    breaker.after_call(failed, time.monotonic() - started, probe)
+
+A call cancelled before it finished (a lost hedge, a deadline, a cancelled
+job) says nothing about the upstream: report it with cancelled=True so it is
+left out of the window and, if it was a probe, frees the probe slot without
+closing the breaker.
+"""
+
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, Optional
+
+from config.settings import (
+    BREAKER_FAILURE_RATE,
+    BREAKER_MIN_CALLS,
+    BREAKER_OPEN_SECONDS,
+    BREAKER_SLOW_RATE,
+    BREAKER_WINDOW,
+)
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling an upstream whose breaker is open"""
+
+    def __init__(self, name: str, retry_after: float):
+        super().__init__(f"{name} is unavailable (circuit open)")
+        self.name = name
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """
+    Thread-safe breaker over a sliding window of recent calls
+
+    Args:
+        name: Upstream name, used in errors and health checks
+        slow_seconds: Calls taking longer count as slow
+        window: Number of recent calls considered
+        min_calls: Calls needed in the window before the breaker can open
+        failure_rate: Share of failed calls that opens the breaker
+        slow_rate: Share of slow calls that opens the breaker
+        open_seconds: Cool-down before probing
+        probes: Successful probe calls needed to close again
+    """
+
+    def __init__(
+        self,
+        name: str,
+        slow_seconds: float,
+        window: int = BREAKER_WINDOW,
+        min_calls: int = BREAKER_MIN_CALLS,
+        failure_rate: float = BREAKER_FAILURE_RATE,
+        slow_rate: float = BREAKER_SLOW_RATE,
+        open_seconds: float = BREAKER_OPEN_SECONDS,
+        probes: int = 1,
+    ):
+        self.name = name
+        self.slow_seconds = slow_seconds
+        self.min_calls = min_calls
+        self.failure_rate = failure_rate
+        self.slow_rate = slow_rate
+        self.open_seconds = open_seconds
+        self.probes = probes
+
+        self.state = CLOSED
+        self._calls = deque(maxlen=window)  # (failed, slow) per call
+        self._opened_at = 0.0
+        self._probing = 0
+        self._probe_successes = 0
+        self._lock = threading.Lock()
+        self.rejected = 0
+        self.opened = 0
+
+    def _open(self):
+        self.state = OPEN
+        self._opened_at = time.monotonic()
+        self._probing = 0
+        self._probe_successes = 0
+        self.opened += 1
+
+    def before_call(self) -> bool:
+        """
+        Reserve a call, or raise if the breaker is open
+
+        Returns:
+            Whether the call is a half-open probe (pass to after_call)
+
+        Raises:
+            CircuitOpenError: While open, or half-open with probes in flight
+        """
+        with self._lock:
+            if self.state == OPEN:
+                waited = time.monotonic() - self._opened_at
+                if waited < self.open_seconds:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, self.open_seconds - waited)
+                self.state = HALF_OPEN
+
+            if self.state == HALF_OPEN:
+                if self._probing >= self.probes - self._probe_successes:
+                    self.rejected += 1
+                    raise CircuitOpenError(self.name, 1.0)
+                self._probing += 1
+                return True
+            return False
+
+    def after_call(
+        self, failed: bool, seconds: float, probe: bool = False, cancelled: bool = False
+    ):
+        """
+        Record the outcome of a call reserved with before_call()
+
+        Args:
+            failed: The upstream failed (outage, server error, timeout)
+            seconds: How long the call took
+            probe: Value returned by before_call()
+            cancelled: The caller gave up on the call; nothing is recorded
+        """
+        slow = seconds >= self.slow_seconds
+        with self._lock:
+            if probe:
+                if self.state != HALF_OPEN:
+                    return
+                self._probing -= 1
+                if cancelled:
+                    # Let another call probe; no evidence either way
+                    return
+                if failed or slow:
+                    self._open()
+                    return
+                self._probe_successes += 1
+                if self._probe_successes >= self.probes:
+                    self.state = CLOSED
+                    self._calls.clear()
+                return
+
+            if cancelled:
+                return
+            self._calls.append((failed, slow))
+            if self.state == CLOSED and len(self._calls) >= self.min_calls:
+                failures = sum(call[0] for call in self._calls) / len(self._calls)
+                slow_calls = sum(call[1] for call in self._calls) / len(self._calls)
+                if failures >= self.failure_rate or slow_calls >= self.slow_rate:
+                    self._open()
+
+    def stats(self) -> Dict[str, Any]:
+        """Current state and recent error and slow-call rates"""
+        with self._lock:
+            calls = len(self._calls)
+            failures = sum(call[0] for call in self._calls)
+            slow_calls = sum(call[1] for call in self._calls)
+            retry_after = None
+            if self.state == OPEN:
+                retry_after = max(
+                    self.open_seconds - (time.monotonic() - self._opened_at), 0.0
+                )
+            return {
+                "state": self.state,
+                "recentCalls": calls,
+                "failureRate": round(failures / calls, 4) if calls else 0.0,
+                "slowRate": round(slow_calls / calls, 4) if calls else 0.0,
+                "retryAfter": retry_after,
+                "timesOpened": self.opened,
+                "rejected": self.rejected,
+            }
+
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+
+def get_breaker(name: str, slow_seconds: Optional[float] = None) -> CircuitBreaker:
+    """
+    Get the process-wide breaker for an upstream, creating it on first use
+
+    Args:
+        name: Upstream name
+        slow_seconds: Slow-call threshold (used when creating)
+    """
+    with _breakers_lock:
+        if name not in _breakers:
+            _breakers[name] = CircuitBreaker(name, slow_seconds or 10.0)
+        return _breakers[name]
+
+
+def breaker_stats() -> Dict[str, Dict[str, Any]]:
+    """State of every breaker, for health checks"""
+    with _breakers_lock:
+        breakers = list(_breakers.values())
+    return {breaker.name: breaker.stats() for breaker in breakers}
@@ -0,0 +1,86 @@
+"""
+Request deadlines that follow the work they limit
+
+A deadline is an absolute wall-clock time (epoch seconds), so it can be
+stored in a job payload and honored by whichever process runs the job. It is
+held in a context variable: code deep in the call stack (an upstream API
+call) reads the remaining budget with remaining() instead of every function
+taking a timeout argument, and asyncio tasks started inside inherit it.
+"""
+
+import asyncio
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Any, Awaitable, Iterator, Optional
+
+_deadline: ContextVar[Optional[float]] = ContextVar("deadline", default=None)
+
+
+class DeadlineExceeded(TimeoutError):
+    """Raised when the current deadline has passed"""
+
+
+def current() -> Optional[float]:
+    """The current deadline (epoch seconds), or None if unbounded"""
+    return _deadline.get()
+
+
+def remaining() -> Optional[float]:
+    """Seconds left before the current deadline, or None if unbounded"""
+    at = _deadline.get()
+    return None if at is None else at - time.time()
+
+
+def check():
+    """
+    Raise if the current deadline has passed
+
+    Raises:
+        DeadlineExceeded: If there is no time left
+    """
+    left = remaining()
+    if left is not None and left <= 0:
+        raise DeadlineExceeded("Deadline exceeded")
+
+
+@contextmanager
+def deadline(at: Optional[float] = None, seconds: Optional[float] = None) -> Iterator:
+    """
+    Bound the code inside the block by a deadline
+
+    A nested deadline can only shorten the current one.
+
+    Args:
+        at: Absolute deadline (epoch seconds)
+        seconds: Relative budget from now
+    """
+    limits = [limit for limit in (at, _deadline.get()) if limit is not None]
+    if seconds is not None:
+        limits.append(time.time() + seconds)
+
+    token = _deadline.set(min(limits) if limits else None)
+    try:
+        yield
+    finally:
+        _deadline.reset(token)
+
+
+async def within_deadline(awaitable: Awaitable[Any]) -> Any:
+    """
+    Await something, cancelling it if the current deadline passes first
+
+    Raises:
+        DeadlineExceeded: If the deadline passes
+    """
+    left = remaining()
+    if left is None:
+        return await awaitable
+    if left <= 0:
+        if asyncio.iscoroutine(awaitable):
+            awaitable.close()
+        raise DeadlineExceeded("Deadline exceeded")
+    try:
+        return await asyncio.wait_for(awaitable, left)
+    except asyncio.TimeoutError:
+        raise DeadlineExceeded("Deadline exceeded") from None
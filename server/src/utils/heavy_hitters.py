@@ -0,0 +1,95 @@
+"""
+Bounded-memory frequent item counting
+"""
+
+import heapq
+import threading
+from typing import Dict, Hashable, List, Tuple
+
+
+class SpaceSaving:
+    """
+    Thread-safe Space-Saving sketch of the most frequent items in a stream
+
+    Keeps at most `capacity` counters. When a new item arrives and the
+    sketch is full, it takes over the smallest counter (and its count, as
+    an upper bound on the error), so every item seen more than
+    total / capacity times is guaranteed to be kept.
+
+    Args:
+        capacity: Number of counters kept
+    """
+
+    def __init__(self, capacity: int = 1000):
+        self.capacity = capacity
+        self.total = 0
+        self._counts: Dict[Hashable, int] = {}
+        self._errors: Dict[Hashable, int] = {}
+        # Lazy min-heap of (count, tiebreak, item); stale entries are skipped
+        self._heap: List[Tuple[int, int, Hashable]] = []
+        self._pushes = 0
+        self._lock = threading.Lock()
+
+    def _push(self, item: Hashable):
+        self._pushes += 1
+        heapq.heappush(self._heap, (self._counts[item], self._pushes, item))
+        if len(self._heap) > 4 * self.capacity:
+            self._heap = [
+                (count, index, key)
+                for index, (key, count) in enumerate(self._counts.items())
+            ]
+            heapq.heapify(self._heap)
+
+    def _pop_min(self) -> Tuple[Hashable, int]:
+        while True:
+            count, _, item = heapq.heappop(self._heap)
+            if self._counts.get(item) == count:
+                return item, count
+
+    def add(self, item: Hashable, count: int = 1):
+        """Count an occurrence of item"""
+        with self._lock:
+            self.total += count
+            if item in self._counts:
+                self._counts[item] += count
+            elif len(self._counts) < self.capacity:
+                self._counts[item] = count
+                self._errors[item] = 0
+            else:
+                evicted, floor = self._pop_min()
+                del self._counts[evicted]
+                del self._errors[evicted]
+                self._counts[item] = floor + count
+                self._errors[item] = floor
+            self._push(item)
+
+    def top(self, limit: int = 0) -> List[Tuple[Hashable, int, int]]:
+        """
+        Most frequent items
+
+        Args:
+            limit: Maximum number of items (0 for all counters)
+
+        Returns:
+            (item, count, error) tuples, highest count first; the true count
+            lies between count - error and count
+        """
+        with self._lock:
+            items = sorted(self._counts.items(), key=lambda pair: -pair[1])
+            if limit:
+                items = items[:limit]
+            return [(item, count, self._errors[item]) for item, count in items]
+
+    def drain(self) -> List[Tuple[Hashable, int, int]]:
+        """Return all counters (as top()) and reset the sketch"""
+        with self._lock:
+            items = [
+                (item, count, self._errors[item])
+                for item, count in self._counts.items()
+            ]
+            self._counts, self._errors, self._heap = {}, {}, []
+            self.total = 0
+        return items
+
+    def __len__(self):
+        return len(self._counts)
@@ -0,0 +1,117 @@
+"""
+Ingredient text normalization
+
+Recipes store free-text ingredient lines ("1/2 cup grated Parmesan cheese")
+while users list pantry items ("parmesan"). normalize_ingredient() strips
+quantities, units, preparation notes and plurals so both sides reduce to the
+same key ("parmesan cheese").
+"""
+
+import re
+from typing import Iterable, List
+
+# Units and size words that can precede an ingredient name
+UNITS = {
+    "bag", "bags", "bottle", "bottles", "box", "boxes", "bunch", "bunches",
+    "can", "cans", "clove", "cloves", "container", "cup", "cups", "dash",
+    "dashes", "drop", "drops", "fl", "g", "gal", "gallon", "gram", "grams",
+    "handful", "handfuls", "head", "heads", "jar", "jars", "kg", "l", "large",
+    "lb", "lbs", "liter", "liters", "litre", "litres", "medium", "ml", "oz",
+    "ounce", "ounces", "package", "packages", "packet", "piece", "pieces",
+    "pinch", "pinches", "pint", "pints", "pound", "pounds", "quart", "quarts",
+    "slice", "slices", "small", "sprig", "sprigs", "stalk", "stalks", "stick",
+    "sticks", "tablespoon", "tablespoons", "tbsp", "teaspoon", "teaspoons",
+    "tsp", "whole",
+}  # fmt: skip
+
+# Preparation and quality words that do not change what the ingredient is
+DESCRIPTORS = {
+    "chopped", "cooked", "crushed", "cubed", "diced", "divided", "drained",
+    "finely", "fresh", "freshly", "granulated", "grated", "halved", "julienned",
+    "melted", "minced", "optional", "packed", "peeled", "rinsed", "roughly",
+    "shredded", "sifted", "sliced", "softened", "thinly", "to", "taste",
+    "trimmed", "unsalted", "uncooked",
+}  # fmt: skip
+
+# Words ending in "s" that are not plurals
+NOT_PLURAL = {
+    "asparagus", "couscous", "grits", "hummus", "molasses", "swiss", "octopus",
+    "citrus", "bass", "watercress", "anise",
+}  # fmt: skip
+
+_PARENTHETICAL = re.compile(r"\([^)]*\)")
+_QUANTITY = re.compile(r"^[\d\s/.\-¼-¾⅐-⅞]+(?=[a-z]|\s|$)")
+_NON_WORD = re.compile(r"[^a-z\s-]")
+_ALTERNATIVES = re.compile(r"\s+(?:and|or|&)\s+")
+
+
+def singularize(word: str) -> str:
+    """Reduce a plural noun to its singular form using simple suffix rules"""
+    if word in NOT_PLURAL or len(word) <= 3:
+        return word
+    if word.endswith("ies"):
+        return word[:-3] + "y"
+    if word.endswith("oes"):
+        return word[:-2]
+    if word.endswith(("ches", "shes", "sses", "xes")):
+        return word[:-2]
+    if word.endswith("s") and not word.endswith(("ss", "us", "is")):
+        return word[:-1]
+    return word
+
+
+def parse_ingredients(text: str) -> List[str]:
+    """
+    Normalize one ingredient line into ingredient keys
+
+    A line naming alternatives or pairs ("salt and black pepper", "honey or
+    maple syrup") yields one key per ingredient.
+
+    Args:
+        text: Ingredient line or pantry item
+
+    Returns:
+        Normalized keys (possibly empty)
+    """
+    text = _PARENTHETICAL.sub(" ", text.lower())
+    # Anything after a comma is preparation ("butter, softened")
+    text = text.split(",", 1)[0]
+
+    keys = []
+    for part in _ALTERNATIVES.split(text):
+        part = _QUANTITY.sub("", part.strip())
+        words = [word for word in _NON_WORD.sub(" ", part).split() if word]
+
+        # Drop leading units ("cups", "8oz" leftovers) and descriptors anywhere
+        while words and words[0] in UNITS:
+            words.pop(0)
+        words = [word for word in words if word not in DESCRIPTORS]
+
+        if words:
+            words[-1] = singularize(words[-1])
+            keys.append(" ".join(words))
+    return keys
+
+
+def normalize_ingredient(text: str) -> str:
+    """Normalize one ingredient line to its first key ("" if none)"""
+    keys = parse_ingredients(text)
+    return keys[0] if keys else ""
+
+
+def normalize_ingredients(lines: Iterable[str]) -> List[str]:
+    """
+    Normalize a list of ingredient lines to distinct keys, keeping order
+
+    Args:
+        lines: Ingredient lines or pantry items
+
+    Returns:
+        Distinct normalized keys
+    """
+    keys = {}
+    for line in lines:
+        if isinstance(line, str):
+            for key in parse_ingredients(line):
+                keys[key] = None
+    return list(keys)
@@ -0,0 +1,376 @@
+"""
+Deterministic calorie estimates from ingredient lines
+
+Parses lines like "1 1/2 cups all-purpose flour" or "2 (15 oz) cans black
+beans" into an amount, a unit and a known food, converts the amount to grams
+(by weight, by volume through the food's density, or by count through its
+typical piece weight) and adds up the calories. Nothing leaves the process,
+so an estimate takes microseconds instead of an API round trip, and the same
+ingredients always give the same number.
+
+Lines naming a food missing from FOODS are reported through the coverage
+ratio, so callers can fall back to a model when too much of a recipe is
+unknown.
+"""
+
+import re
+from fractions import Fraction
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class Food(NamedTuple):
+    """Calorie density and the weights needed to convert other units"""
+
+    kcal_per_100g: float
+    grams_per_cup: Optional[float] = None
+    grams_per_piece: Optional[float] = None
+
+
+# Common ingredients. Raw weights unless the name says otherwise; dry grains,
+# pasta and legumes are uncooked.
+FOODS: Dict[str, Food] = {
+    # Fats and oils
+    "olive oil": Food(884, 216),
+    "vegetable oil": Food(884, 218),
+    "sesame oil": Food(884, 218),
+    "coconut oil": Food(862, 218),
+    "oil": Food(884, 218),
+    "butter": Food(717, 227, 113),
+    "mayonnaise": Food(680, 220),
+    # Dairy and eggs
+    "egg": Food(143, 243, 50),
+    "egg white": Food(52, 243, 33),
+    "milk": Food(61, 244),
+    "heavy cream": Food(340, 238),
+    "cream": Food(340, 238),
+    "sour cream": Food(198, 230),
+    "greek yogurt": Food(73, 245),
+    "yogurt": Food(61, 245),
+    "cream cheese": Food(342, 232),
+    "cheddar": Food(403, 113),
+    "parmesan": Food(431, 100),
+    "mozzarella": Food(280, 113),
+    "feta": Food(264, 150),
+    "ricotta": Food(174, 246),
+    "cheese": Food(400, 113),
+    # Meat and fish
+    "chicken breast": Food(120, 140, 200),
+    "chicken thigh": Food(150, 140, 110),
+    "chicken": Food(143, 140),
+    "ground beef": Food(254, 225),
+    "beef": Food(250, 225),
+    "steak": Food(250, None, 225),
+    "pork chop": Food(180, None, 180),
+    "pork": Food(200, 225),
+    "bacon": Food(417, None, 12),
+    "sausage": Food(300, None, 75),
+    "ham": Food(145, 140),
+    "turkey": Food(150, 225),
+    "lamb": Food(265, 225),
+    "shrimp": Food(99, 145, 15),
+    "salmon": Food(208, None, 170),
+    "cod": Food(82, None, 170),
+    "tuna": Food(116, 154, 142),
+    "tofu": Food(100, 250),
+    # Grains, pasta and bread
+    "cooked rice": Food(130, 158),
+    "rice": Food(365, 185),
+    "pasta": Food(371, 100),
+    "spaghetti": Food(371, 100),
+    "noodle": Food(371, 100),
+    "quinoa": Food(368, 170),
+    "oat": Food(389, 81),
+    "all-purpose flour": Food(364, 125),
+    "flour": Food(364, 125),
+    "bread crumb": Food(395, 108),
+    "bread": Food(265, None, 30),
+    "tortilla": Food(310, None, 45),
+    # Legumes
+    "lentil": Food(352, 192),
+    "black bean": Food(85, 172),
+    "kidney bean": Food(85, 177),
+    "chickpea": Food(95, 164),
+    "bean": Food(85, 172),
+    # Vegetables
+    "onion": Food(40, 160, 110),
+    "red onion": Food(40, 160, 110),
+    "scallion": Food(32, 100, 15),
+    "green onion": Food(32, 100, 15),
+    "shallot": Food(72, 160, 25),
+    "garlic": Food(149, 136, 3),
+    "ginger": Food(80, 96),
+    "tomato paste": Food(82, 262),
+    "tomato": Food(18, 180, 123),
+    "potato": Food(77, 150, 213),
+    "sweet potato": Food(86, 133, 130),
+    "carrot": Food(41, 128, 61),
+    "celery": Food(14, 101, 40),
+    "bell pepper": Food(26, 149, 120),
+    "jalapeno": Food(29, 90, 14),
+    "spinach": Food(23, 30),
+    "kale": Food(49, 67),
+    "broccoli": Food(34, 91),
+    "cauliflower": Food(25, 107, 575),
+    "cabbage": Food(25, 89),
+    "mushroom": Food(22, 70, 18),
+    "zucchini": Food(17, 124, 196),
+    "eggplant": Food(25, 82, 458),
+    "cucumber": Food(15, 119, 300),
+    "green bean": Food(31, 100),
+    "corn": Food(86, 154),
+    "pea": Food(81, 145),
+    "lettuce": Food(15, 47),
+    "avocado": Food(160, 150, 200),
+    # Fruit
+    "lemon juice": Food(22, 244),
+    "lime juice": Food(25, 242),
+    "lemon": Food(29, None, 58),
+    "lime": Food(30, None, 67),
+    "apple": Food(52, 125, 182),
+    "banana": Food(89, 150, 118),
+    "blueberry": Food(57, 148),
+    "strawberry": Food(32, 152, 12),
+    # Sweeteners and baking
+    "sugar": Food(387, 200),
+    "brown sugar": Food(380, 220),
+    "powdered sugar": Food(389, 120),
+    "honey": Food(304, 340),
+    "maple syrup": Food(260, 315),
+    "baking powder": Food(53, 220),
+    "baking soda": Food(0, 220),
+    "vanilla extract": Food(288, 208),
+    "cocoa powder": Food(228, 86),
+    "chocolate chip": Food(480, 168),
+    "chocolate": Food(546, 170),
+    # Nuts
+    "peanut butter": Food(588, 258),
+    "almond": Food(579, 143),
+    "walnut": Food(654, 117),
+    "peanut": Food(567, 146),
+    # Herbs and spices
+    "salt": Food(0, 292),
+    "black pepper": Food(251, 116),
+    "pepper": Food(251, 116),
+    "cilantro": Food(23, 16),
+    "basil": Food(23, 21),
+    "parsley": Food(36, 60),
+    "thyme": Food(276, 43),
+    "rosemary": Food(331, 53),
+    "oregano": Food(265, 43),
+    "cumin": Food(375, 96),
+    "paprika": Food(282, 109),
+    "chili powder": Food(282, 128),
+    "chili flake": Food(318, 45),
+    "cinnamon": Food(247, 125),
+    "nutmeg": Food(525, 112),
+    # Sauces and liquids
+    "soy sauce": Food(53, 255),
+    "dijon mustard": Food(66, 250),
+    "mustard": Food(66, 250),
+    "balsamic vinegar": Food(88, 255),
+    "vinegar": Food(18, 240),
+    "ketchup": Food(101, 240),
+    "coconut milk": Food(197, 240),
+    "chicken broth": Food(6, 240),
+    "vegetable broth": Food(6, 240),
+    "broth": Food(6, 240),
+    "stock": Food(6, 240),
+    "wine": Food(83, 240),
+    "water": Food(0, 237),
+}
+
+# Weight of one can (grams); other canned foods use CAN_GRAMS
+CAN_WEIGHTS = {"tuna": 142, "tomato paste": 170, "coconut milk": 400}
+CAN_GRAMS = 425
+
+MASS_UNITS = {
+    "g": 1.0,
+    "gram": 1.0,
+    "kg": 1000.0,
+    "kilogram": 1000.0,
+    "oz": 28.35,
+    "ounce": 28.35,
+    "lb": 453.6,
+    "pound": 453.6,
+}
+
+# In cups
+VOLUME_UNITS = {
+    "cup": 1.0,
+    "c": 1.0,
+    "tablespoon": 1 / 16,
+    "tbsp": 1 / 16,
+    "tbs": 1 / 16,
+    "teaspoon": 1 / 48,
+    "tsp": 1 / 48,
+    "ml": 1 / 236.6,
+    "milliliter": 1 / 236.6,
+    "l": 4.227,
+    "liter": 4.227,
+    "pint": 2.0,
+    "quart": 4.0,
+    "pinch": 1 / 768,
+    "dash": 1 / 384,
+    "handful": 0.5,
+}
+
+# Counted units, as multiples of the food's typical piece
+PIECE_UNITS = {
+    "piece": 1.0,
+    "whole": 1.0,
+    "clove": 1.0,
+    "slice": 1.0,
+    "stalk": 1.0,
+    "fillet": 1.0,
+    "breast": 1.0,
+    "thigh": 1.0,
+    "head": 1.0,
+    "medium": 1.0,
+    "large": 1.0,  # typical pieces are medium-large already
+    "small": 0.75,
+    "stick": 1.0,
+}
+
+# Lines that do not add measurable calories
+NEGLIGIBLE = re.compile(r"\b(to taste|for garnish|as needed|optional)\b")
+
+_FRACTION_CHARS = {"½": "1/2", "⅓": "1/3", "⅔": "2/3", "¼": "1/4", "¾": "3/4"}
+_NUMBER = r"\d+(?:\.\d+)?(?:/\d+)?"
+_QUANTITY = re.compile(
+    rf"^\s*({_NUMBER}(?:\s+{_NUMBER})?)(?:\s*(?:-|to)\s*({_NUMBER}))?\s*"
+)
+
+
+def _food_pattern(name: str) -> "re.Pattern":
+    if name.endswith("y"):
+        # berry -> berries
+        return re.compile(rf"\b{re.escape(name[:-1])}(?:y|ies)\b")
+    return re.compile(rf"\b{re.escape(name)}(?:e?s)?\b")
+
+
+# Longest names first, so "sweet potato" wins over "potato"
+_FOOD_PATTERNS: List[Tuple[str, "re.Pattern"]] = [
+    (name, _food_pattern(name)) for name in sorted(FOODS, key=len, reverse=True)
+]
+
+
+def _number(text: str) -> float:
+    return float(sum(Fraction(part) for part in text.split()))
+
+
+def _unit(word: str) -> str:
+    word = word.lower().rstrip(".")
+    if word in ("lbs", "ozs"):
+        return word[:-1]
+    for candidate in (word, word[:-2], word[:-1]):
+        if candidate in MASS_UNITS or candidate in VOLUME_UNITS:
+            return candidate
+        if candidate in PIECE_UNITS or candidate == "can":
+            return candidate
+    return word
+
+
+def match_food(text: str) -> Optional[str]:
+    """Name of the most specific known food mentioned in text, if any"""
+    text = text.lower()
+    for name, pattern in _FOOD_PATTERNS:
+        if pattern.search(text):
+            return name
+    return None
+
+
+def parse_line(line: str) -> Tuple[Optional[float], str, str]:
+    """
+    Split an ingredient line into quantity, unit and the rest
+
+    Returns:
+        (quantity or None, unit or "", remaining text)
+    """
+    text = line.lower()
+    for char, fraction in _FRACTION_CHARS.items():
+        text = text.replace(char, f" {fraction}")
+    text = re.sub(r"\([^)]*\)", " ", text)
+
+    quantity = None
+    match = _QUANTITY.match(text)
+    if match:
+        quantity = _number(match.group(1))
+        if match.group(2):
+            quantity = (quantity + _number(match.group(2))) / 2
+        text = text[match.end() :]
+
+    words = text.split()
+    unit = ""
+    if words:
+        candidate = _unit(words[0])
+        if (
+            candidate in MASS_UNITS
+            or candidate in VOLUME_UNITS
+            or candidate in PIECE_UNITS
+            or candidate == "can"
+        ):
+            unit = candidate
+            words = words[1:]
+            if words and words[0] == "of":
+                words = words[1:]
+    return quantity, unit, " ".join(words)
+
+
+def line_grams(quantity: Optional[float], unit: str, name: str) -> float:
+    """Weight in grams of an amount of a known food"""
+    food = FOODS[name]
+    if quantity is None:
+        # Unmeasured: one piece, else a tablespoon, else a small serving
+        if food.grams_per_piece:
+            return food.grams_per_piece
+        if food.grams_per_cup:
+            return food.grams_per_cup / 16
+        return 100.0
+
+    if unit in MASS_UNITS:
+        return quantity * MASS_UNITS[unit]
+    if unit in VOLUME_UNITS:
+        return quantity * VOLUME_UNITS[unit] * (food.grams_per_cup or 240)
+    if unit == "can":
+        return quantity * CAN_WEIGHTS.get(name, CAN_GRAMS)
+
+    # Counted (no unit, or a piece unit)
+    pieces = quantity * PIECE_UNITS.get(unit, 1.0)
+    if food.grams_per_piece:
+        return pieces * food.grams_per_piece
+    if food.grams_per_cup:
+        return pieces * food.grams_per_cup
+    return pieces * 100.0
+
+
+def estimate_calories(ingredients: List[str]) -> Tuple[float, float]:
+    """
+    Estimate the total calories of a recipe
+
+    Args:
+        ingredients: Ingredient lines, with or without amounts
+
+    Returns:
+        (calories, coverage): calories of the recognized lines, and the
+        share of lines that were recognized (1.0 for an empty list)
+    """
+    calories = 0.0
+    counted = recognized = 0
+    for line in ingredients:
+        if not line or not line.strip():
+            continue
+        counted += 1
+
+        quantity, unit, rest = parse_line(line)
+        name = match_food(rest) or match_food(line)
+        if name is None:
+            if NEGLIGIBLE.search(line.lower()):
+                recognized += 1
+            continue
+
+        recognized += 1
+        if quantity is None and NEGLIGIBLE.search(line.lower()):
+            continue
+        calories += line_grams(quantity, unit, name) * FOODS[name].kcal_per_100g / 100
+
+    return round(calories), (recognized / counted if counted else 1.0)
@@ -0,0 +1,103 @@
+"""
+Fast JSON serialization for API responses
+
+Uses orjson when it is installed (falling back to the stdlib encoder) with
+native handling of the BSON types that come straight out of MongoDB, so
+routes can return documents as-is instead of looping over them to convert
+`_id` to a string first. FastJSONProvider plugs this into Flask, so every
+`jsonify` call and dict return value is encoded to bytes in one pass.
+"""
+
+import datetime
+import decimal
+import json
+import uuid
+from typing import Any
+
+from bson import ObjectId
+from bson.decimal128 import Decimal128
+from bson.raw_bson import RawBSONDocument
+from flask.json.provider import JSONProvider
+
+from models.records import Record
+
+try:
+    import orjson
+except ImportError:  # pragma: no cover - optional dependency
+    orjson = None
+
+
+def default(obj: Any) -> Any:
+    """
+    Encode types the JSON encoder does not handle natively
+
+    Args:
+        obj: Object the encoder could not serialize
+
+    Returns:
+        JSON-compatible replacement
+
+    Raises:
+        TypeError: If the type is not supported
+    """
+    if isinstance(obj, ObjectId):
+        return str(obj)
+    if isinstance(obj, Record):
+        return obj.to_dict()
+    if isinstance(obj, RawBSONDocument):
+        # Decoded lazily by pymongo; materialize only when serializing
+        return dict(obj.items())
+    if isinstance(obj, Decimal128):
+        return float(obj.to_decimal())
+    if isinstance(obj, decimal.Decimal):
+        return float(obj)
+    if isinstance(obj, (datetime.datetime, datetime.date)):
+        # Only reached on the stdlib path; orjson encodes these natively
+        return obj.isoformat()
+    if isinstance(obj, uuid.UUID):
+        return str(obj)
+    if isinstance(obj, (set, frozenset)):
+        return list(obj)
+    if hasattr(obj, "dict"):
+        # Pydantic models
+        return obj.dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
+
+
+def dumps(obj: Any) -> bytes:
+    """
+    Serialize an object to JSON bytes
+
+    Args:
+        obj: Object to serialize (may contain ObjectId, datetime, ...)
+
+    Returns:
+        UTF-8 encoded JSON
+    """
+    if orjson is not None:
+        return orjson.dumps(obj, default=default, option=orjson.OPT_NON_STR_KEYS)
+    return json.dumps(obj, default=default, separators=(",", ":")).encode()
+
+
+def loads(data: Any) -> Any:
+    """Deserialize JSON from bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+class FastJSONProvider(JSONProvider):
+    """Flask JSON provider backed by dumps()/loads() above"""
+
+    mimetype = "application/json"
+
+    def dumps(self, obj: Any, **kwargs: Any) -> str:
+        return dumps(obj).decode()
+
+    def loads(self, s: Any, **kwargs: Any) -> Any:
+        return loads(s)
+
+    def response(self, *args: Any, **kwargs: Any):
+        # Build the body as bytes directly, skipping the str round trip
+        obj = self._prepare_response_obj(args, kwargs)
+        return self._app.response_class(dumps(obj), mimetype=self.mimetype)
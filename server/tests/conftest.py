@@ -0,0 +1,12 @@
+"""
+Shared test setup
+
+The app imports its modules from server/ and server/src, so, as in the
+benchmarks, both go on sys.path first.
+"""
+
+import os
+import sys
+
+SERVER_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+sys.path[:0] = [SERVER_DIR, os.path.join(SERVER_DIR, "src")]
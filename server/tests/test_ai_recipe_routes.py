@@ -0,0 +1,37 @@
+"""Tests for the /generate-ai response shape in routes.ai_recipe_routes"""
+
+from routes.ai_recipe_routes import ai_recipe_response
+
+GENERATED = {
+    "name": "Tomato Soup",
+    "ingredients": ["4 tomatoes", "1 onion"],
+    "instructions": "Simmer and blend.",
+    "estimatedCalories": 320,
+    "estimatedTime": 25,
+    "servings": 2,
+}
+
+
+def test_response_keeps_generate_ai_fields():
+    recipe = ai_recipe_response(GENERATED, "vegan")
+
+    assert recipe["_id"].startswith("ai-")
+    assert recipe["estimatedTime"] == "25 mins"
+    assert recipe["servings"] == 2
+    assert recipe["image"].endswith("/?Tomato+Soup")
+    assert recipe["ai_generated"] is True
+    assert recipe["diets"] == ["vegan"]
+    assert recipe["estimatedCalories"] == 320
+
+
+def test_response_defaults_missing_fields():
+    generated = {
+        key: GENERATED[key] for key in ("name", "ingredients", "instructions")
+    }
+
+    recipe = ai_recipe_response(generated, None)
+
+    assert recipe["estimatedTime"] == "30 mins"
+    assert recipe["servings"] == 4
+    assert recipe["estimatedCalories"] == 0
+    assert recipe["diets"] == []
@@ -0,0 +1,46 @@
+"""Tests for calorie log entries in services.calorie_log_service"""
+
+from datetime import datetime
+
+from bson import ObjectId
+
+from services.calorie_log_service import _legacy_entry_id, entry_response, log_entry
+
+USER_ID = str(ObjectId())
+
+
+def test_entry_keeps_posted_fields_and_date_text():
+    posted = {
+        "date": "2024-03-01T08:30:00Z",
+        "caloriesConsumed": 1800,
+        "caloriesBurned": 300,
+        "notes": "Long run",
+        "userId": "someone-else",
+    }
+
+    entry = log_entry(USER_ID, posted)
+
+    assert entry["userId"] == USER_ID
+    assert isinstance(entry["date"], datetime)
+    assert entry["notes"] == "Long run"
+
+    stored = {k: v for k, v in entry.items() if k != "userId"}
+    posted.pop("userId")
+    assert entry_response(stored) == posted
+
+
+def test_round_trip_returns_what_was_posted():
+    for date in ("2024-03-01", "March 1st", 1709251200):
+        posted = {"date": date, "caloriesConsumed": 1800, "caloriesBurned": 300}
+        stored = {k: v for k, v in log_entry(USER_ID, posted).items() if k != "userId"}
+
+        assert entry_response(stored) == posted
+
+
+def test_legacy_ids_keep_array_order_before_new_entries():
+    ids = [_legacy_entry_id(USER_ID, index) for index in range(300)]
+
+    assert ids == sorted(ids)
+    assert len(set(ids)) == len(ids)
+    assert ids[-1] < ObjectId()
+    assert _legacy_entry_id(USER_ID, 7) == ids[7]
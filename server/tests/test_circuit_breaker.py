@@ -0,0 +1,150 @@
+"""Tests for half-open probing in utils.circuit_breaker"""
+
+import pytest
+
+from utils import circuit_breaker
+from utils.circuit_breaker import (
+    CLOSED,
+    HALF_OPEN,
+    OPEN,
+    CircuitBreaker,
+    CircuitOpenError,
+)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    fake = Clock()
+    monkeypatch.setattr(circuit_breaker.time, "monotonic", fake)
+    return fake
+
+
+def make_breaker(probes=1):
+    return CircuitBreaker(
+        "upstream",
+        slow_seconds=5.0,
+        window=4,
+        min_calls=4,
+        failure_rate=0.5,
+        slow_rate=0.5,
+        open_seconds=30.0,
+        probes=probes,
+    )
+
+
+def call(breaker, failed=False, seconds=0.1, cancelled=False):
+    probe = breaker.before_call()
+    breaker.after_call(failed, seconds, probe, cancelled=cancelled)
+    return probe
+
+
+def open_breaker(breaker, clock):
+    for failed in (True, True, False, False):
+        call(breaker, failed=failed)
+    assert breaker.state == OPEN
+    clock.now += breaker.open_seconds
+
+
+def test_opens_at_failure_rate_and_rejects_until_cool_down(clock):
+    breaker = make_breaker()
+    for failed in (True, False, True):
+        call(breaker, failed=failed)
+    assert breaker.state == CLOSED  # fewer than min_calls
+
+    call(breaker, failed=False)
+    assert breaker.state == OPEN
+
+    clock.now += 10
+    with pytest.raises(CircuitOpenError) as raised:
+        breaker.before_call()
+    assert raised.value.retry_after == pytest.approx(20.0)
+    assert breaker.rejected == 1
+
+
+def test_one_probe_at_a_time_and_success_closes(clock):
+    breaker = make_breaker()
+    open_breaker(breaker, clock)
+
+    assert breaker.before_call() is True
+    assert breaker.state == HALF_OPEN
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.after_call(False, 0.1, probe=True)
+    assert breaker.state == CLOSED
+    assert breaker.stats()["recentCalls"] == 0
+
+
+def test_failed_or_slow_probe_reopens(clock):
+    for outcome in ({"failed": True}, {"seconds": 6.0}):
+        breaker = make_breaker()
+        open_breaker(breaker, clock)
+
+        assert call(breaker, **outcome) is True
+        assert breaker.state == OPEN
+        with pytest.raises(CircuitOpenError):
+            breaker.before_call()
+
+
+def test_cancelled_probe_frees_its_slot_without_closing(clock):
+    breaker = make_breaker()
+    open_breaker(breaker, clock)
+
+    assert call(breaker, cancelled=True) is True
+    assert breaker.state == HALF_OPEN
+
+    # The slot is free again, and the cancelled call was not a success
+    assert breaker.before_call() is True
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+    breaker.after_call(False, 0.1, probe=True)
+    assert breaker.state == CLOSED
+
+
+def test_needs_every_probe_to_succeed(clock):
+    breaker = make_breaker(probes=2)
+    open_breaker(breaker, clock)
+
+    first = breaker.before_call()
+    second = breaker.before_call()
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.after_call(False, 0.1, first)
+    assert breaker.state == HALF_OPEN
+    # One success left to go, and that probe is still in flight
+    with pytest.raises(CircuitOpenError):
+        breaker.before_call()
+
+    breaker.after_call(False, 0.1, second)
+    assert breaker.state == CLOSED
+
+
+def test_late_probe_result_after_reopening_is_ignored(clock):
+    breaker = make_breaker(probes=2)
+    open_breaker(breaker, clock)
+
+    first = breaker.before_call()
+    second = breaker.before_call()
+    breaker.after_call(True, 0.1, first)
+    assert breaker.state == OPEN
+
+    breaker.after_call(False, 0.1, second)
+    assert breaker.state == OPEN
+
+
+def test_cancelled_calls_stay_out_of_the_window(clock):
+    breaker = make_breaker()
+    for _ in range(4):
+        call(breaker, failed=True, cancelled=True)
+
+    assert breaker.state == CLOSED
+    assert breaker.stats()["recentCalls"] == 0
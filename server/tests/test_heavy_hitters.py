@@ -0,0 +1,71 @@
+"""Tests for the Space-Saving sketch in utils.heavy_hitters"""
+
+import random
+from collections import Counter
+
+from utils.heavy_hitters import SpaceSaving
+
+
+def test_counts_are_exact_below_capacity():
+    sketch = SpaceSaving(capacity=3)
+    for item in "abacab":
+        sketch.add(item)
+
+    assert sketch.top() == [("a", 3, 0), ("b", 2, 0), ("c", 1, 0)]
+    assert sketch.total == 6
+
+
+def test_new_item_takes_over_the_smallest_counter():
+    sketch = SpaceSaving(capacity=2)
+    for item in "aab":
+        sketch.add(item)
+
+    sketch.add("c")
+
+    # b (count 1) is evicted; c inherits its count as the error bound
+    assert sketch.top() == [("a", 2, 0), ("c", 2, 1)]
+    assert len(sketch) == 2
+
+
+def test_frequent_items_are_kept_within_error_bounds():
+    rng = random.Random(7)
+    stream = ["hot"] * 300 + ["warm"] * 150 + [f"cold{i}" for i in range(550)]
+    rng.shuffle(stream)
+    sketch = SpaceSaving(capacity=10)
+    for item in stream:
+        sketch.add(item)
+
+    true_counts = Counter(stream)
+    top = {item: (count, error) for item, count, error in sketch.top()}
+    # Anything seen more than total / capacity times must still be counted
+    for item in ("hot", "warm"):
+        count, error = top[item]
+        assert count - error <= true_counts[item] <= count
+
+
+def test_heap_is_rebuilt_and_still_finds_the_minimum():
+    sketch = SpaceSaving(capacity=3)
+    for _ in range(20):
+        sketch.add("a")
+        sketch.add("b")
+    sketch.add("c")
+
+    # Every add pushes a heap entry; stale ones are compacted away
+    assert len(sketch._heap) <= 4 * sketch.capacity
+
+    sketch.add("d")
+    assert [item for item, _, _ in sketch.top()] == ["a", "b", "d"]
+    assert sketch.top(1) == [("a", 20, 0)]
+
+
+def test_drain_returns_counters_and_resets():
+    sketch = SpaceSaving(capacity=2)
+    sketch.add("a", count=5)
+    sketch.add("b")
+
+    assert sorted(sketch.drain()) == [("a", 5, 0), ("b", 1, 0)]
+    assert len(sketch) == 0
+    assert sketch.total == 0
+
+    sketch.add("c")
+    assert sketch.top() == [("c", 1, 0)]
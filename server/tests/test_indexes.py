@@ -0,0 +1,58 @@
+"""Tests for index reconciliation in config.indexes"""
+
+import pytest
+
+from config import indexes
+from config.indexes import IndexSpec
+
+
+class FakeCollection:
+    """Records index operations instead of running them"""
+
+    def __init__(self, live):
+        self.live = live
+        self.calls = []
+
+    def list_indexes(self):
+        return list(self.live)
+
+    def create_index(self, keys, **options):
+        self.calls.append(("create_index", options["name"]))
+
+    def drop_index(self, name):
+        self.calls.append(("drop_index", name))
+
+
+@pytest.fixture
+def collection(monkeypatch):
+    fake = FakeCollection(
+        [
+            {"name": "_id_", "key": {"_id": 1}},
+            # Same keys, but the registry wants it unique
+            {"name": "email_1", "key": {"email": 1}},
+        ]
+    )
+    monkeypatch.setattr(indexes, "get_collection", lambda name: fake)
+    return fake
+
+
+def test_mismatched_index_is_reported_not_dropped(collection):
+    specs = [IndexSpec(keys=(("email", 1),), unique=True)]
+
+    result = indexes.reconcile_collection("users", specs)
+
+    assert result["mismatched"] == ["email_1"]
+    assert collection.calls == []
+
+
+def test_missing_index_is_created(collection):
+    specs = [
+        IndexSpec(keys=(("email", 1),)),
+        IndexSpec(keys=(("username", 1),), unique=True),
+    ]
+
+    result = indexes.reconcile_collection("users", specs)
+
+    assert result["created"] == ["username_1"]
+    assert result["mismatched"] == []
+    assert collection.calls == [("create_index", "username_1")]
@@ -0,0 +1,100 @@
+"""Tests for job lease renewal in services.job_queue"""
+
+import threading
+import time
+from datetime import datetime
+
+import pytest
+
+from services import job_queue
+
+
+class FakeJobs:
+    """Just enough of a collection for run_job and the lease heartbeat"""
+
+    def __init__(self, job):
+        self.job = dict(job)
+        self.renewals = 0
+        self.lock = threading.Lock()
+
+    def _matches(self, query):
+        return all(self.job.get(key) == value for key, value in query.items())
+
+    def update_one(self, query, update):
+        with self.lock:
+            matched = self._matches(query)
+            if matched:
+                if "lockedUntil" in update.get("$set", {}) and len(update) == 1:
+                    self.renewals += 1
+                self.job.update(update.get("$set", {}))
+                for key in update.get("$unset", {}):
+                    self.job.pop(key, None)
+
+        class Result:
+            matched_count = int(matched)
+
+        return Result()
+
+    def count_documents(self, query, limit=0):
+        return int(self._matches(query))
+
+
+@pytest.fixture
+def jobs(monkeypatch):
+    job = {
+        "_id": "job-1",
+        "type": "test_slow",
+        "payload": {},
+        "status": job_queue.RUNNING,
+        "attempts": 1,
+        "maxAttempts": 1,
+        "lockedBy": "worker-1",
+        "lockedUntil": datetime.now(),
+    }
+    fake = FakeJobs(job)
+    monkeypatch.setattr(job_queue, "get_collection", lambda name: fake)
+    monkeypatch.setattr(job_queue, "JOB_LEASE_SECONDS", 0.3)
+    return fake
+
+
+def test_lease_is_renewed_while_a_sync_handler_runs(jobs, monkeypatch):
+    monkeypatch.setitem(
+        job_queue._handlers,
+        "test_slow",
+        job_queue.JobHandler(lambda payload: time.sleep(1.0) or "done"),
+    )
+
+    job_queue.run_job(dict(jobs.job))
+
+    # A 1s handler with a 0.3s lease renewed every 0.1s
+    assert jobs.renewals >= 5
+    assert jobs.job["status"] == job_queue.SUCCEEDED
+    assert "lockedBy" not in jobs.job
+
+
+def test_heartbeat_stops_when_the_job_finishes(jobs, monkeypatch):
+    monkeypatch.setitem(
+        job_queue._handlers,
+        "test_slow",
+        job_queue.JobHandler(lambda payload: "done"),
+    )
+
+    job_queue.run_job(dict(jobs.job))
+    renewals = jobs.renewals
+    time.sleep(0.3)
+
+    assert jobs.renewals == renewals
+
+
+def test_heartbeat_gives_up_once_the_lease_is_lost(jobs):
+    stop = threading.Event()
+    job = dict(jobs.job)
+    jobs.job["lockedBy"] = "worker-2"  # requeued and claimed elsewhere
+
+    heartbeat = threading.Thread(target=job_queue._renew_lease, args=(job, stop))
+    heartbeat.start()
+    heartbeat.join(1.0)
+
+    assert not heartbeat.is_alive()
+    assert jobs.renewals == 0
+    stop.set()
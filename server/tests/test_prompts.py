@@ -0,0 +1,65 @@
+"""Tests for token budgets in services.prompts"""
+
+import pytest
+
+from services import prompts
+from services.prompts import count_tokens, fit_ingredients, tidy_ingredients, truncate
+
+
+@pytest.fixture(autouse=True)
+def estimated_tokens(monkeypatch):
+    """Count tokens from text length, as when tiktoken cannot load"""
+    monkeypatch.setattr(prompts, "_estimate_only", True)
+    prompts._encoding.cache_clear()
+    yield
+    prompts._encoding.cache_clear()
+
+
+PANTRY = [f"ingredient number {i}" for i in range(50)]
+
+
+def test_list_within_budget_is_kept_whole():
+    text, left_out = fit_ingredients(["eggs", "milk", "flour"], budget=50)
+
+    assert (text, left_out) == ("eggs, milk, flour", 0)
+
+
+def test_long_list_is_cut_in_order_and_counted():
+    text, left_out = fit_ingredients(PANTRY, budget=40)
+
+    kept = text.split(" (and ")[0].split(", ")
+    assert kept == PANTRY[: len(kept)]
+    assert left_out == len(PANTRY) - len(kept) > 0
+    assert text.endswith(f"(and {left_out} more)")
+    assert count_tokens(text) <= 40
+
+
+@pytest.mark.parametrize("budget", [10, 25, 60, 120])
+def test_cut_list_never_exceeds_budget(budget):
+    text, _ = fit_ingredients(PANTRY, budget=budget)
+
+    assert count_tokens(text) <= budget
+
+
+def test_single_ingredient_over_budget_is_truncated():
+    text, left_out = fit_ingredients(["x" * 400], budget=20)
+
+    assert (text, left_out) == ("x" * 80, 0)
+
+
+def test_first_ingredient_over_budget_keeps_a_truncated_start():
+    text, left_out = fit_ingredients(["x" * 400, "eggs", "milk"], budget=20)
+
+    assert text == "x" * 56 + " (and 2 more)"
+    assert left_out == 2
+
+
+def test_ingredients_are_tidied_before_fitting():
+    assert tidy_ingredients(
+        ["  2 Eggs (large) ", "2 eggs", "", "milk  (whole)", 3]
+    ) == ["2 Eggs", "milk", "3"]
+
+
+def test_truncate_cuts_to_budget():
+    assert truncate("vegetarian, no nuts", budget=2) == "vegetari"
+    assert truncate("vegan", budget=10) == "vegan"
@@ -0,0 +1,72 @@
+"""Tests for the slotted response records in models.records"""
+
+from datetime import datetime
+
+from bson import ObjectId
+
+from models.recipe import db_to_recipe
+from models.records import RecipeRecord
+from utils.serialization import dumps, loads
+
+
+def as_json(obj):
+    return loads(dumps(obj))
+
+
+def test_seeded_recipe_serializes_like_its_document():
+    doc = {
+        "_id": ObjectId(),
+        "name": "Lemony Chicken Pasta",
+        "ingredients": ["8 oz pasta", "1 lb chicken breast", "1 lemon"],
+        "instructions": "1. Cook the pasta.",
+        "estimatedCalories": 1400,
+        "category": "Main Dish",
+        "source": "ai",
+        "createdBy": str(ObjectId()),
+        "createdAt": datetime(2025, 1, 1, 12, 30),
+        "updatedAt": datetime(2025, 1, 2, 8, 0),
+        "synthetic": True,
+        "tags": ["quick", "weeknight"],
+    }
+
+    assert as_json(db_to_recipe(doc)) == as_json(doc)
+
+
+def test_missing_optional_fields_stay_missing():
+    doc = {"_id": ObjectId(), "name": "Toast", "ingredients": ["bread"]}
+
+    assert as_json(db_to_recipe(doc)) == as_json(doc)
+
+
+def test_stored_nulls_are_kept():
+    doc = {
+        "_id": ObjectId(),
+        "name": "Rice",
+        "ingredients": ["rice"],
+        "instructions": "Boil.",
+        "estimatedCalories": None,
+    }
+
+    assert as_json(db_to_recipe(doc))["estimatedCalories"] is None
+    assert as_json(db_to_recipe(doc)) == as_json(doc)
+
+
+def test_legacy_owner_field_is_kept_as_stored():
+    owner = str(ObjectId())
+    doc = {"_id": ObjectId(), "name": "Soup", "ingredients": [], "user_id": owner}
+
+    record = db_to_recipe(doc)
+
+    # The attribute resolves the owner; the response keeps the stored shape
+    assert record.createdBy == owner
+    assert as_json(record) == as_json(doc)
+
+
+def test_dict_and_equality_use_the_response_fields():
+    doc = {"_id": ObjectId(), "name": "Salad", "ingredients": ["kale"], "x": 1}
+
+    record = RecipeRecord.from_doc(doc)
+
+    assert dict(record) == {**doc, "_id": str(doc["_id"])}
+    assert record == RecipeRecord.from_doc(dict(doc))
+    assert not hasattr(record, "__dict__")
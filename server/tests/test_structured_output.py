@@ -0,0 +1,110 @@
+"""Tests for JSON repair and coercion in services.structured_output"""
+
+import pytest
+
+from services.recipe_service import RECIPE_SCHEMA
+from services.structured_output import coerce, parse_reply, repair_json
+
+RECIPE = {
+    "name": "Tomato Soup",
+    "ingredients": ["4 tomatoes", "1 onion"],
+    "instructions": "Simmer, then blend.",
+}
+
+
+def test_fenced_reply_with_prose_around_it():
+    text = (
+        "Here is your recipe:\n```json\n"
+        '{"name": "Tomato Soup", "ingredients": ["4 tomatoes", "1 onion"], '
+        '"instructions": "Simmer, then blend."}\n```\nEnjoy!'
+    )
+
+    assert repair_json(text) == RECIPE
+
+
+@pytest.mark.parametrize(
+    "text, expected",
+    [
+        # Cut off inside a string
+        (
+            '{"name": "Tomato Soup", "instructions": "Simmer, th',
+            {
+                "name": "Tomato Soup",
+                "instructions": "Simmer, th",
+            },
+        ),
+        # Cut off inside a list, after a comma
+        (
+            '{"name": "Soup", "ingredients": ["4 tomatoes",',
+            {
+                "name": "Soup",
+                "ingredients": ["4 tomatoes"],
+            },
+        ),
+        # Cut off after a key, and after its colon
+        ('{"name": "Soup", "servings"', {"name": "Soup", "servings": None}),
+        ('{"name": "Soup", "servings":', {"name": "Soup", "servings": None}),
+        # Cut off in the middle of an escape
+        ('{"name": "Soup \\', {"name": "Soup "}),
+    ],
+)
+def test_truncated_reply_is_closed_off(text, expected):
+    assert repair_json(text) == expected
+
+
+def test_common_defects_are_repaired():
+    text = """{
+        name: 'Tomato Soup',  // the model's favourite
+        "ingredients": ["4 tomatoes", "1 onion",],
+        "instructions": "Say "hi"
+then blend.",
+        "vegan": True, "rating": None,
+    }"""
+
+    assert repair_json(text) == {
+        "name": "Tomato Soup",
+        "ingredients": ["4 tomatoes", "1 onion"],
+        "instructions": 'Say "hi"\nthen blend.',
+        "vegan": True,
+        "rating": None,
+    }
+
+
+def test_no_json_at_all_raises():
+    with pytest.raises(ValueError):
+        repair_json("Sorry, I can't help with that.")
+
+
+def test_parse_reply_flags_repairs_and_problems():
+    value, problems, repaired = parse_reply(
+        '```json\n{"name": "Soup", "ingredients": "- 4 tomatoes\\n- 1 onion", '
+        '"instructions": "Blend.", "estimatedCalories": "about 320 kcal"',
+        RECIPE_SCHEMA,
+    )
+
+    assert problems == []
+    assert repaired is True
+    assert value["ingredients"] == ["4 tomatoes", "1 onion"]
+    assert value["estimatedCalories"] == 320
+
+    _, problems, _ = parse_reply('{"name": "Soup"}', RECIPE_SCHEMA)
+    assert problems == [
+        "missing required field 'ingredients'",
+        "missing required field 'instructions'",
+    ]
+
+
+def test_clean_reply_is_not_marked_repaired():
+    value, problems, repaired = parse_reply(
+        '{"name": "Soup", "ingredients": ["1 onion"], "instructions": "Cook."}',
+        RECIPE_SCHEMA,
+    )
+
+    assert (problems, repaired) == ([], False)
+    assert value["name"] == "Soup"
+
+
+def test_coerce_reports_values_it_cannot_fix():
+    _, problems = coerce({**RECIPE, "estimatedCalories": "lots"}, RECIPE_SCHEMA)
+
+    assert problems == ["estimatedCalories: expected a number, got 'lots'"]
@@ -0,0 +1,107 @@
+"""
+Standalone job worker process
+
+Runs background jobs without serving HTTP, so job throughput can be scaled
+separately from the web server:
+
+    python worker.py --workers 4
+
+Set JOB_WORKERS=0 on web processes to leave all jobs to dedicated workers.
+
+Queue a one-off merge of near-duplicate recipes (run by any worker):
+
+    python worker.py --enqueue-dedup [--dry-run] [--all-sources]
+
+Warm the generation cache for the most requested pantries now (otherwise
+runs are scheduled for the WARM_CACHE_HOURS window):
+
+    python worker.py --enqueue-warm
+"""
+
+import argparse
+import logging
+import os
+import signal
+import sys
+import threading
+
+# Make src/ and services/ importable
+server_dir = os.path.dirname(os.path.abspath(__file__))
+sys.path[:0] = [server_dir, os.path.join(server_dir, "src")]
+
+from config import registry  # noqa: E402
+from config.database import manager  # noqa: E402
+from config.settings import JOB_WORKERS, WARM_CACHE_HOURS  # noqa: E402
+from services import recipe_jobs  # noqa: E402,F401  (registers handlers)
+from services.job_queue import start_workers, stop_workers  # noqa: E402
+from services.recipe_jobs import (  # noqa: E402
+    enqueue_dedup,
+    enqueue_warming,
+    schedule_warming,
+)
+from utils import async_runner  # noqa: E402
+
+logging.basicConfig(
+    level=logging.INFO, format="%(asctime)s - %(name)s - %(levelname)s - %(message)s"
+)
+logger = logging.getLogger(__name__)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Run background job workers")
+    parser.add_argument(
+        "--workers", type=int, default=max(JOB_WORKERS, 1), help="Worker threads"
+    )
+    parser.add_argument(
+        "--enqueue-dedup",
+        action="store_true",
+        help="Queue a near-duplicate recipe merge and exit",
+    )
+    parser.add_argument(
+        "--dry-run", action="store_true", help="With --enqueue-dedup: only count"
+    )
+    parser.add_argument(
+        "--all-sources",
+        action="store_true",
+        help="With --enqueue-dedup: also merge recipes not generated by AI",
+    )
+    parser.add_argument(
+        "--enqueue-warm",
+        action="store_true",
+        help="Queue a cache warming run for the top pantries now and exit",
+    )
+    args = parser.parse_args()
+
+    if not manager.warm_up():
+        logger.error("Could not connect to MongoDB")
+        sys.exit(1)
+
+    if args.enqueue_dedup:
+        job_id = enqueue_dedup(ai_only=not args.all_sources, dry_run=args.dry_run)
+        logger.info(f"Queued recipe dedup job {job_id}")
+        return
+
+    if args.enqueue_warm:
+        logger.info(f"Queued cache warming job {enqueue_warming()}")
+        return
+
+    if WARM_CACHE_HOURS:
+        schedule_warming()
+
+    stopping = threading.Event()
+    for signum in (signal.SIGINT, signal.SIGTERM):
+        signal.signal(signum, lambda *_: stopping.set())
+
+    start_workers(args.workers)
+    stopping.wait()
+
+    logger.info("Stopping workers after their current jobs")
+    stop_workers()
+    # Close the OpenAI connection pool on its loop before stopping the loop
+    registry.close_all()
+    async_runner.shutdown()
+    manager.close()
+
+
+if __name__ == "__main__":
+    main()